@@ -0,0 +1,127 @@
+from datetime import date
+
+import numpy as np
+
+from nutricao_app.datas import para_dia
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.registros import TIPO_DATA, montar_df
+from nutricao_app.repositorio import ler_medias, primeiro_dia
+
+# Máximo de pontos por série enviados ao navegador, qualquer que seja o tamanho do histórico
+LIMITE_PONTOS = 200
+
+# Início do período de cada granularidade, calculado no SQL sobre o número do dia
+# (semanas começam na segunda-feira; 1970-01-01 foi uma quinta-feira)
+GRANULARIDADES = {
+    'dia': 'data',
+    'semana': 'data - (data % 7 + 10) % 7',
+    'mes': "CAST(julianday(date(data * 86400, 'unixepoch', 'start of month')) - 2440587.5 AS INTEGER)",
+    'ano': "CAST(julianday(date(data * 86400, 'unixepoch', 'start of year')) - 2440587.5 AS INTEGER)",
+}
+DIAS_GRANULARIDADE = {'dia': 1, 'semana': 7, 'mes': 30.44, 'ano': 365.25}
+
+ESQUEMA_CONSUMO = {
+    'data': TIPO_DATA,
+    'calorias': 'float32',
+    'proteinas': 'float32',
+    'carboidratos': 'float32',
+    'gorduras': 'float32',
+    'dias': 'int32',
+}
+ESQUEMA_SERIE_MEDIDAS = {
+    'data': TIPO_DATA,
+    'peso': 'float32',
+    'gordura_corporal': 'float32',
+}
+ESQUEMA_CIRCUNFERENCIAS = {
+    'data': TIPO_DATA,
+    'cintura': 'float32',
+    'quadril': 'float32',
+}
+
+
+# Função para escolher a granularidade pelo intervalo visível (em dias):
+# a mais fina que não passa do limite de pontos
+def escolher_granularidade(dias, limite=LIMITE_PONTOS):
+    for granularidade, tamanho in DIAS_GRANULARIDADE.items():
+        if dias / tamanho <= limite:
+            return granularidade
+    return 'ano'
+
+
+# Função para obter o consumo do usuário agregado no SQL (média diária por período)
+# A granularidade é escolhida pelo intervalo entre data_inicio (None = todo o histórico) e hoje
+# Retorna (DataFrame, granularidade)
+@rastrear
+def obter_consumo_agregado(usuario_id, data_inicio=None, limite=LIMITE_PONTOS):
+    if data_inicio is None:
+        inicio = primeiro_dia('resumo_diario', usuario_id)
+    else:
+        inicio = para_dia(data_inicio)
+    granularidade = escolher_granularidade(para_dia(date.today()) - (inicio or 0) + 1, limite)
+
+    df = ler_medias('resumo_diario', ['calorias', 'proteinas', 'carboidratos', 'gorduras'], usuario_id,
+                    GRANULARIDADES[granularidade], inicio=inicio or 0, contar=True,
+                    converter=lambda cursor: montar_df(cursor, ESQUEMA_CONSUMO))
+
+    return df, granularidade
+
+
+# Função para selecionar os pontos de uma série com o Largest-Triangle-Three-Buckets:
+# mantém o primeiro e o último ponto e, em cada faixa, o ponto que forma o maior
+# triângulo com o ponto escolhido antes e a média da faixa seguinte (preserva picos e vales)
+# Retorna os índices dos pontos escolhidos
+def lttb(x, y, limite=LIMITE_PONTOS):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= limite or limite < 3:
+        return np.arange(n)
+
+    limites = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    anterior = 0
+    for faixa in range(limite - 2):
+        inicio, fim = limites[faixa], limites[faixa + 1]
+        fim_proxima = limites[faixa + 2] if faixa + 2 < len(limites) else n
+        media_x = x[fim:fim_proxima].mean()
+        media_y = y[fim:fim_proxima].mean()
+
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[faixa + 1] = anterior
+
+    return indices
+
+
+# Função para reduzir uma coluna da série diária com LTTB (linhas sem valor são ignoradas)
+# Retorna um DataFrame com data e a coluna
+def reduzir_serie(df, coluna, limite=LIMITE_PONTOS):
+    serie = df.loc[df[coluna].notna(), ['data', coluna]]
+    dias = serie['data'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return serie.iloc[lttb(dias, serie[coluna].to_numpy(), limite)].reset_index(drop=True)
+
+
+# Função para obter as séries de progresso corporal do usuário:
+# peso e gordura corporal (média por dia no SQL, reduzidas com LTTB) e
+# cintura/quadril (média por período no SQL, granularidade pelo tamanho do histórico)
+# Retorna (peso, gordura_corporal, circunferencias, granularidade)
+@rastrear
+def obter_progresso_agregado(usuario_id, limite=LIMITE_PONTOS):
+    diario = ler_medias('medidas', ['peso', 'gordura_corporal'], usuario_id,
+                        converter=lambda cursor: montar_df(cursor, ESQUEMA_SERIE_MEDIDAS))
+
+    dias = (diario['data'].iloc[-1] - diario['data'].iloc[0]).days + 1 if len(diario) else 1
+    granularidade = escolher_granularidade(dias, limite)
+
+    circunferencias = ler_medias('medidas', ['cintura', 'quadril'], usuario_id, GRANULARIDADES[granularidade],
+                                 converter=lambda cursor: montar_df(cursor, ESQUEMA_CIRCUNFERENCIAS))
+
+    return (reduzir_serie(diario, 'peso', limite), reduzir_serie(diario, 'gordura_corporal', limite),
+            circunferencias, granularidade)
@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode
+
+from sqlalchemy import event, select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from nutricao_app import banco
+from nutricao_app.busca import LIMITE_CANDIDATOS, LIMITE_SUGESTOES, montar_consulta_fts, normalizar_termo
+from nutricao_app.datas import de_dia, para_dia
+from nutricao_app.gravacao import estatisticas_gravacao
+from nutricao_app.models import METAS_PADRAO, AlimentosTaco, Medidas, Metas, Refeicoes, ResumoDiario, Usuarios
+from nutricao_app.registros import enfileirar_medida, enfileirar_refeicao
+from nutricao_app.repositorio import CONSULTA_FTS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# API JSON da aplicação, sem o Streamlit (aplicativo móvel e integrações):
+#   GET  /usuarios/{id}/refeicoes?inicio=&fim=&limite=&cursor=   (POST grava uma refeição)
+#   GET  /usuarios/{id}/medidas?inicio=&fim=&limite=&cursor=     (POST grava uma medida)
+#   GET  /usuarios/{id}/metas                                     (PUT grava as metas)
+#   GET  /usuarios/{id}/resumo?inicio=&fim=&limite=&cursor=
+#   GET  /alimentos?busca=&limite=
+#   GET  /metricas
+# Listas paginadas por cursor (data, id): {"itens": [...], "proximo": cursor ou null} e
+# cabeçalho Link rel="next"; respostas GET com ETag (304 para If-None-Match igual) e
+# gzip acima de TAMANHO_MINIMO_GZIP
+
+# Tamanho das páginas das listas
+LIMITE_PAGINA = 100
+LIMITE_MAXIMO_PAGINA = 1000
+
+# Respostas menores não compensam a compressão
+TAMANHO_MINIMO_GZIP = 1024
+
+COLUNAS_NUTRIENTES = ['calorias', 'proteinas', 'carboidratos', 'gorduras']
+
+# Colunas de cada recurso devolvidas pela API (a data sai em ISO 8601)
+COLUNAS_REFEICOES = [Refeicoes.id, Refeicoes.data, Refeicoes.refeicao, Refeicoes.alimento, Refeicoes.quantidade,
+                     Refeicoes.calorias, Refeicoes.proteinas, Refeicoes.carboidratos, Refeicoes.gorduras]
+COLUNAS_MEDIDAS = [Medidas.id, Medidas.data, Medidas.peso, Medidas.imc, Medidas.cintura, Medidas.quadril,
+                   Medidas.gordura_corporal]
+COLUNAS_RESUMO = [ResumoDiario.data, ResumoDiario.calorias, ResumoDiario.proteinas, ResumoDiario.carboidratos,
+                  ResumoDiario.gorduras, ResumoDiario.refeicoes]
+
+_engine = None
+_sessoes = None
+
+
+# Função para aplicar as pragmas do banco em cada nova conexão do engine assíncrono
+def _configurar_conexao(conexao_dbapi, registro_conexao):
+    cursor = conexao_dbapi.cursor()
+    for pragma in banco.PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# Função para criar o engine assíncrono (aiosqlite) e a fábrica de sessões do serviço
+def criar_engine(caminho_bd=None):
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{caminho_bd or banco.CAMINHO_BD}',
+        pool_size=banco.TAMANHO_POOL,
+        max_overflow=banco.EXCEDENTE_POOL,
+        connect_args={'timeout': banco.TIMEOUT_OCUPADO_MS / 1000},
+    )
+    event.listen(engine.sync_engine, 'connect', _configurar_conexao)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(aplicacao):
+    global _engine, _sessoes
+    _engine, _sessoes = criar_engine()
+    try:
+        yield
+    finally:
+        await _engine.dispose()
+        _engine = _sessoes = None
+
+
+# Função para serializar o corpo das respostas (orjson, quando instalado)
+def _serializar(dados):
+    if orjson is not None:
+        return orjson.dumps(dados)
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# Função para montar a resposta JSON; respostas GET levam um ETag fraco (o corpo
+# comprimido pelo gzip muda os bytes, não o conteúdo) e viram 304 quando o cliente
+# já tem a mesma versão
+def _resposta(request, dados, status=200, cabecalhos=None):
+    corpo = _serializar(dados)
+    cabecalhos = dict(cabecalhos or {})
+    if request.method == 'GET':
+        etag = f'W/"{hashlib.blake2b(corpo, digest_size=16).hexdigest()}"'
+        cabecalhos['ETag'] = etag
+        cabecalhos['Cache-Control'] = 'private, no-cache'
+        if etag in [valor.strip() for valor in request.headers.get('if-none-match', '').split(',')]:
+            return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, status_code=status, headers=cabecalhos, media_type='application/json')
+
+
+async def _erro_http(request, excecao):
+    return Response(_serializar({'erro': excecao.detail}), status_code=excecao.status_code,
+                    headers=excecao.headers, media_type='application/json')
+
+
+# Função para ler um inteiro positivo da query string (400 se inválido)
+def _inteiro(request, nome, padrao, maximo):
+    valor = request.query_params.get(nome)
+    if valor is None:
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise HTTPException(400, f'Parâmetro {nome} inválido: {valor}')
+    if valor < 1:
+        raise HTTPException(400, f'Parâmetro {nome} deve ser positivo')
+    return min(valor, maximo)
+
+
+# Função para converter uma data em texto ISO no número do dia (400 se inválida)
+def _dia(valor, nome):
+    try:
+        return para_dia(str(valor))
+    except (TypeError, ValueError):
+        raise HTTPException(400, f'Data inválida em {nome}: {valor}')
+
+
+# Funções para codificar o cursor de paginação (última chave da página) em texto opaco
+def _codificar_cursor(chave):
+    return base64.urlsafe_b64encode('.'.join(map(str, chave)).encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor, tamanho):
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        chave = tuple(int(parte) for parte in texto.split('.'))
+    except ValueError:
+        raise HTTPException(400, 'Cursor inválido')
+    if len(chave) != tamanho:
+        raise HTTPException(400, 'Cursor inválido')
+    return chave
+
+
+# Função para converter uma linha do banco em dicionário JSON (data em ISO 8601)
+def _item(linha):
+    item = linha._asdict()
+    item['data'] = de_dia(item['data']).isoformat() if item['data'] is not None else None
+    return item
+
+
+# Função para listar uma tabela do usuário em páginas, em ordem de (data, id): filtra o
+# período pedido e continua a partir do cursor, que é a chave da última linha entregue
+# (paginação por chave: cada página é uma busca no índice (usuario_id, data), sem OFFSET)
+async def _listar(request, modelo, colunas, chave):
+    usuario_id = request.path_params['usuario_id']
+    limite = _inteiro(request, 'limite', LIMITE_PAGINA, LIMITE_MAXIMO_PAGINA)
+
+    consulta = select(*colunas).where(modelo.usuario_id == usuario_id)
+    if 'inicio' in request.query_params:
+        consulta = consulta.where(modelo.data >= _dia(request.query_params['inicio'], 'inicio'))
+    if 'fim' in request.query_params:
+        consulta = consulta.where(modelo.data <= _dia(request.query_params['fim'], 'fim'))
+    if 'cursor' in request.query_params:
+        cursor = _decodificar_cursor(request.query_params['cursor'], len(chave))
+        consulta = consulta.where(tuple_(*chave) > tuple_(*cursor) if len(chave) > 1 else chave[0] > cursor[0])
+    consulta = consulta.order_by(*chave).limit(limite + 1)
+
+    async with _sessoes() as sessao:
+        linhas = (await sessao.execute(consulta)).all()
+
+    cabecalhos = {}
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proximo = _codificar_cursor([getattr(ultima, coluna.key) for coluna in chave])
+        parametros = {**request.query_params, 'cursor': proximo}
+        cabecalhos['Link'] = f'<{request.url.path}?{urlencode(parametros)}>; rel="next"'
+
+    return _resposta(request, {'itens': [_item(linha) for linha in linhas], 'proximo': proximo}, cabecalhos=cabecalhos)
+
+
+# Função para ler o corpo JSON de uma gravação (400 se não for um objeto JSON)
+async def _corpo_json(request):
+    try:
+        corpo = await request.json()
+    except ValueError:
+        raise HTTPException(400, 'Corpo da requisição não é JSON válido')
+    if not isinstance(corpo, dict):
+        raise HTTPException(400, 'Corpo da requisição deve ser um objeto JSON')
+    return corpo
+
+
+# Função para ler um campo numérico finito do corpo (400 se ausente ou inválido)
+def _numero(corpo, campo, obrigatorio=True):
+    valor = corpo.get(campo)
+    if valor is None and not obrigatorio:
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise HTTPException(400, f'Campo {campo} deve ser numérico')
+    return float(valor)
+
+
+# Função para ler um campo de texto não vazio do corpo
+def _texto(corpo, campo):
+    valor = corpo.get(campo)
+    if not isinstance(valor, str) or not valor.strip():
+        raise HTTPException(400, f'Campo {campo} é obrigatório')
+    return valor.strip()
+
+
+async def _verificar_usuario(sessao, usuario_id):
+    if await sessao.get(Usuarios, usuario_id) is None:
+        raise HTTPException(404, f'Usuário {usuario_id} não encontrado')
+
+
+# Função para gravar pelo gravador em lotes do processo e aguardar o commit do lote
+# (com a fila do gravador cheia, responde 503 em vez de bloquear o servidor)
+async def _gravar(enfileirar, *args):
+    try:
+        futuro = enfileirar(*args, espera=0)
+    except TimeoutError as e:
+        raise HTTPException(503, str(e), headers={'Retry-After': '1'})
+    return await asyncio.wrap_future(futuro)
+
+
+async def saude(request):
+    return _resposta(request, {'ok': True})
+
+
+# Métricas do processo: gravador em lotes (tamanho dos lotes, latência dos commits,
+# ocupação da fila) e pool de conexões usado por ele
+async def metricas(request):
+    return _resposta(request, {'gravacao': estatisticas_gravacao(), 'pool': banco.estatisticas_pool()})
+
+
+async def listar_refeicoes(request):
+    return await _listar(request, Refeicoes, COLUNAS_REFEICOES, [Refeicoes.data, Refeicoes.id])
+
+
+# Grava uma refeição; sem os nutrientes no corpo, calcula-os pela tabela TACO a partir
+# do nome exato do alimento e da quantidade em gramas
+async def gravar_refeicao(request):
+    usuario_id = request.path_params['usuario_id']
+    corpo = await _corpo_json(request)
+    dia = _dia(corpo.get('data'), 'data')
+    refeicao = _texto(corpo, 'refeicao')
+    alimento = _texto(corpo, 'alimento')
+    quantidade = _numero(corpo, 'quantidade')
+    if quantidade <= 0:
+        raise HTTPException(400, 'Campo quantidade deve ser positivo')
+    nutrientes = {campo: _numero(corpo, campo, obrigatorio=False) for campo in COLUNAS_NUTRIENTES}
+
+    async with _sessoes() as sessao:
+        await _verificar_usuario(sessao, usuario_id)
+        if any(valor is None for valor in nutrientes.values()):
+            taco = (await sessao.execute(
+                select(AlimentosTaco.energia_kcal, AlimentosTaco.proteina_g, AlimentosTaco.carboidrato_g,
+                       AlimentosTaco.lipideos_g).where(AlimentosTaco.nome == alimento).limit(1)
+            )).first()
+            if taco is None:
+                raise HTTPException(400, f'Alimento fora da tabela TACO: informe {", ".join(COLUNAS_NUTRIENTES)}')
+            for campo, por_100g in zip(COLUNAS_NUTRIENTES, taco):
+                if nutrientes[campo] is None:
+                    nutrientes[campo] = (por_100g or 0) * quantidade / 100
+
+    id_refeicao = await _gravar(enfileirar_refeicao, usuario_id, dia, refeicao, alimento, quantidade,
+                                *[nutrientes[campo] for campo in COLUNAS_NUTRIENTES])
+    item = {'id': id_refeicao, 'data': de_dia(dia).isoformat(), 'refeicao': refeicao, 'alimento': alimento,
+            'quantidade': quantidade, **nutrientes}
+    return _resposta(request, item, status=201,
+                     cabecalhos={'Location': f'/usuarios/{usuario_id}/refeicoes?inicio={item["data"]}'})
+
+
+async def listar_medidas(request):
+    return await _listar(request, Medidas, COLUNAS_MEDIDAS, [Medidas.data, Medidas.id])
+
+
+# Grava uma medida (o IMC é calculado pelo peso e pela altura em cm, como no formulário)
+async def gravar_medida(request):
+    usuario_id = request.path_params['usuario_id']
+    corpo = await _corpo_json(request)
+    dia = _dia(corpo.get('data'), 'data')
+    peso = _numero(corpo, 'peso')
+    altura = _numero(corpo, 'altura')
+    if peso <= 0 or altura <= 0:
+        raise HTTPException(400, 'Campos peso e altura devem ser positivos')
+
+    medidas = {campo: _numero(corpo, campo, obrigatorio=False) for campo in ['cintura', 'quadril', 'gordura_corporal']}
+
+    async with _sessoes() as sessao:
+        await _verificar_usuario(sessao, usuario_id)
+
+    id_medida = await _gravar(enfileirar_medida, usuario_id, dia, peso, altura, medidas['cintura'],
+                              medidas['quadril'], medidas['gordura_corporal'])
+    item = {'id': id_medida, 'data': de_dia(dia).isoformat(), 'peso': peso, 'imc': peso / ((altura / 100) ** 2),
+            **medidas}
+    return _resposta(request, item, status=201)
+
+
+# Metas do usuário (as metas padrão enquanto ele não salvou as suas)
+async def obter_metas(request):
+    usuario_id = request.path_params['usuario_id']
+    async with _sessoes() as sessao:
+        metas = await sessao.get(Metas, usuario_id)
+    if metas is None:
+        return _resposta(request, dict(METAS_PADRAO))
+    return _resposta(request, {campo: getattr(metas, campo) for campo in METAS_PADRAO})
+
+
+# Grava todas as metas do usuário (cria a linha no primeiro salvamento)
+async def gravar_metas(request):
+    usuario_id = request.path_params['usuario_id']
+    corpo = await _corpo_json(request)
+    metas = {campo: _numero(corpo, campo) for campo in METAS_PADRAO}
+
+    async with _sessoes() as sessao:
+        await _verificar_usuario(sessao, usuario_id)
+        consulta = insert(Metas).values(usuario_id=usuario_id, **metas)
+        await sessao.execute(consulta.on_conflict_do_update(index_elements=[Metas.usuario_id], set_=metas))
+        await sessao.commit()
+
+    return _resposta(request, metas)
+
+
+async def listar_resumo(request):
+    return await _listar(request, ResumoDiario, COLUNAS_RESUMO, [ResumoDiario.data])
+
+
+# Busca na tabela TACO pelo índice de texto completo (a mesma consulta da busca do app)
+async def buscar_alimentos(request):
+    termo = normalizar_termo(request.query_params.get('busca', ''))
+    limite = _inteiro(request, 'limite', LIMITE_SUGESTOES, LIMITE_CANDIDATOS)
+    consulta = montar_consulta_fts(termo)
+    if not consulta:
+        return _resposta(request, {'itens': []})
+
+    async with _sessoes() as sessao:
+        try:
+            linhas = (await sessao.execute(text(CONSULTA_FTS), {
+                'consulta': consulta, 'candidatos': LIMITE_CANDIDATOS, 'limite': limite,
+            })).all()
+        except OperationalError:
+            # Índice de busca ainda não criado: busca parcial sem índice
+            await sessao.rollback()
+            linhas = (await sessao.execute(
+                select(AlimentosTaco.id, AlimentosTaco.nome, AlimentosTaco.energia_kcal, AlimentosTaco.proteina_g,
+                       AlimentosTaco.lipideos_g, AlimentosTaco.carboidrato_g)
+                .where(AlimentosTaco.nome.like(f'%{termo}%')).order_by(AlimentosTaco.nome).limit(limite)
+            )).all()
+
+    return _resposta(request, {'itens': [linha._asdict() for linha in linhas]})
+
+
+rotas = [
+    Route('/saude', saude),
+    Route('/metricas', metricas),
+    Route('/usuarios/{usuario_id:int}/refeicoes', listar_refeicoes, methods=['GET']),
+    Route('/usuarios/{usuario_id:int}/refeicoes', gravar_refeicao, methods=['POST']),
+    Route('/usuarios/{usuario_id:int}/medidas', listar_medidas, methods=['GET']),
+    Route('/usuarios/{usuario_id:int}/medidas', gravar_medida, methods=['POST']),
+    Route('/usuarios/{usuario_id:int}/metas', obter_metas, methods=['GET']),
+    Route('/usuarios/{usuario_id:int}/metas', gravar_metas, methods=['PUT']),
+    Route('/usuarios/{usuario_id:int}/resumo', listar_resumo, methods=['GET']),
+    Route('/alimentos', buscar_alimentos, methods=['GET']),
+]
+
+app = Starlette(
+    routes=rotas,
+    middleware=[Middleware(GZipMiddleware, minimum_size=TAMANHO_MINIMO_GZIP)],
+    exception_handlers={HTTPException: _erro_http},
+    lifespan=_ciclo_de_vida,
+)
+
+
+# Servidor: python -m nutricao_app.api [--banco nutricao.db] [--host 127.0.0.1] [--porta 8000]
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Serve a API JSON da aplicação')
+    parser.add_argument('--banco', help='arquivo do banco (padrão: NUTRICAO_DB ou nutricao.db)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    argumentos = parser.parse_args()
+
+    if argumentos.banco:
+        banco.definir_caminho_bd(argumentos.banco)
+
+    uvicorn.run(app, host=argumentos.host, port=argumentos.porta, log_level='warning', access_log=False)
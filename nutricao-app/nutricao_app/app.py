@@ -2,15 +2,35 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
-import requests
-import io
 import os
-
-from nutricao_app.models import obter_metas
+import sqlite3
+import tempfile
+
+from nutricao_app import models
+from nutricao_app.banco import conectar_bd
+from nutricao_app.busca import buscar_alimentos
+from nutricao_app.catalogo import estado_catalogo, garantir_catalogo_completo
+from nutricao_app.datas import para_dia
+from nutricao_app.exportacao import (FORMATOS_EXPORTACAO, TAMANHO_MAXIMO_DOWNLOAD, exportar_dados,
+                                     formatos_disponiveis)
+from nutricao_app.graficos import figuras_consumo_diario, figuras_progresso_corporal
+from nutricao_app.historico import HistoricoRefeicoes
+from nutricao_app.importacao import formato_arquivo, importar_refeicoes
+from nutricao_app.inicializacao import inicializar_aplicacao
+from nutricao_app.metas import obter_metas, salvar_metas
+from nutricao_app.rastreamento import finalizar_rastreamento, rastrear_execucao, span
+from nutricao_app.receitas import excluir_receita, listar_receitas, obter_ingredientes, porcao_receita, salvar_receita
+from nutricao_app.registros import (COLUNAS_MEDIDAS, COLUNAS_REFEICOES, adicionar_medida, adicionar_refeicao,
+                                    obter_todas_medidas)
+from nutricao_app.repositorio import inserir_em_massa, tabela_vazia
+from nutricao_app.snapshot import materializar_snapshot_taco
+from nutricao_app.taco import LINHAS_TACO_COMPLETA, gravar_lotes_taco, normalizar_lote
+from nutricao_app.tendencias import JANELA_TAXA_PESO, TendenciasUsuario
+from nutricao_app.resumo import criar_resumo_diario, obter_resumo_do_dia, reconstruir_resumo_diario
+from nutricao_app.usuarios import ID_USUARIO_PADRAO, MULTIUSUARIO, USUARIO_PADRAO, obter_id_usuario
 
 # Configuração da página
 st.set_page_config(
@@ -19,170 +39,98 @@ st.set_page_config(
     layout="wide"
 )
 
-# Função para criar e conectar ao banco de dados SQLite
-def conectar_bd():
-    conn = sqlite3.connect('nutricao.db')
-    return conn
-
-# Função para inicializar o banco de dados
+# Função para inicializar o banco de dados (tabelas dos modelos, usuário padrão e resumo diário)
 def inicializar_bd():
+    models.inicializar_bd()
+
     conn = conectar_bd()
     cursor = conn.cursor()
 
-    # Criar tabela de refeições
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS refeicoes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        data TEXT,
-        refeicao TEXT,
-        alimento TEXT,
-        quantidade REAL,
-        calorias REAL,
-        proteinas REAL,
-        carboidratos REAL,
-        gorduras REAL
-    )
-    ''')
-
-    # Criar tabela de medidas corporais
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS medidas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        data TEXT,
-        peso REAL,
-        imc REAL,
-        cintura REAL,
-        quadril REAL,
-        gordura_corporal REAL
-    )
-    ''')
-
-    # Criar tabela para metas
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS metas (
-        id INTEGER PRIMARY KEY CHECK (id = 1),
-        calorias_diarias REAL,
-        proteinas_diarias REAL,
-        carboidratos_diarios REAL,
-        gorduras_diarias REAL,
-        peso_meta REAL,
-        gordura_corporal_meta REAL
-    )
-    ''')
-
-    # Criar tabela para alimentos TACO
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS alimentos_taco (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT,
-        energia_kcal REAL,
-        proteina_g REAL,
-        lipideos_g REAL,
-        carboidrato_g REAL,
-        fibra_g REAL,
-        calcio_mg REAL,
-        ferro_mg REAL
-    )
-    ''')
+    # Criar tabela de resumo diário (mantida por gatilhos a cada escrita em refeições)
+    criar_resumo_diario(cursor)
 
-    conn.commit()
     conn.commit()
     conn.close()
 
 # Função para carregar a tabela TACO da internet e salvar no banco de dados
 def carregar_tabela_taco():
-    conn = conectar_bd()
-    cursor = conn.cursor()
-
     # Verificar se a tabela já contém dados
-    cursor.execute("SELECT COUNT(*) FROM alimentos_taco")
-    count = cursor.fetchone()[0]
+    if tabela_vazia('alimentos_taco'):
+        try:
+            # Usar o snapshot da tabela TACO distribuído com o pacote (sem acesso à rede)
+            estatisticas = materializar_snapshot_taco(forcar=True)
+            if estatisticas and estatisticas['linhas'] >= LINHAS_TACO_COMPLETA:
+                st.success(f"Tabela TACO carregada com sucesso! ({estatisticas['linhas']} alimentos)")
+                return
+            if estatisticas:
+                # Snapshot só com a tabela de exemplo: a completa é baixada depois das migrações
+                st.info(f"Tabela TACO de exemplo carregada ({estatisticas['linhas']} alimentos). A tabela completa será baixada em segundo plano.")
+                return
+        except Exception as e:
+            st.warning(f"Não foi possível usar o snapshot da tabela TACO: {str(e)}")
 
-    if count == 0:
         try:
-            # URL da tabela TACO em formato CSV (pode ser necessário ajustar conforme disponibilidade)
-            url = "https://www.nepa.unicamp.br/taco/tabela/taco_4_edicao_2011.csv"
-
-            # Tentar fazer o download dos dados
-            st.info("Baixando tabela TACO. Aguarde...")
-
-            try:
-                # Tentar baixar diretamente
-                response = requests.get(url)
-                response.raise_for_status()
-                df_taco = pd.read_csv(io.StringIO(response.content.decode('utf-8')), sep=';')
-            except:
-                # Caso a URL direta não funcione, usar uma versão simplificada para exemplo
-                st.warning("Não foi possível baixar a tabela TACO original. Usando dados de exemplo.")
-
-                # Criar dados de exemplo da tabela TACO
-                dados_taco = {
-                    'nome': [
-                        'Arroz, tipo 1, cozido',
-                        'Feijão, carioca, cozido',
-                        'Frango, peito, sem pele, cozido',
-                        'Pão, francês',
-                        'Maçã, com casca',
-                        'Banana prata',
-                        'Leite, integral',
-                        'Ovo, galinha, inteiro, cozido',
-                        'Alface, lisa, crua',
-                        'Cenoura, crua',
-                        'Batata, inglesa, cozida',
-                        'Carne, bovina, patinho, sem gordura, cozido',
-                        'Azeite, de oliva',
-                        'Manteiga, com sal',
-                        'Aveia, flocos'
-                    ],
-                    'energia_kcal': [128, 76, 159, 300, 56, 98, 62, 146, 14, 34, 52, 219, 884, 726, 394],
-                    'proteina_g': [2.5, 4.8, 32, 8, 0.3, 1.3, 3.2, 13.3, 1.7, 1.3, 1.2, 35.9, 0, 0.9, 13.9],
-                    'lipideos_g': [0.2, 0.5, 3.2, 3.1, 0.2, 0.1, 3.4, 9.5, 0.2, 0.2, 0, 8.5, 100, 82.4, 8.5],
-                    'carboidrato_g': [28.1, 13.6, 0, 58.6, 15, 26, 4.7, 0.6, 2.4, 7.7, 11.9, 0, 0, 0.1, 67.0],
-                    'fibra_g': [1.6, 8.5, 0, 2.3, 2.4, 2.0, 0, 0, 1.8, 3.2, 1.3, 0, 0, 0, 9.0],
-                    'calcio_mg': [4, 27, 7, 16, 4, 8, 123, 42, 38, 23, 4, 4, 0, 15, 52],
-                    'ferro_mg': [0.1, 1.3, 0.4, 1.0, 0.1, 0.3, 0.1, 1.5, 0.4, 0.1, 0.2, 3.4, 0.4, 0, 4.4]
-                }
-                df_taco = pd.DataFrame(dados_taco)
-
-            # Inserir dados na tabela
-            for _, row in df_taco.iterrows():
-                cursor.execute('''
-                INSERT INTO alimentos_taco
-                (nome, energia_kcal, proteina_g, lipideos_g, carboidrato_g, fibra_g, calcio_mg, ferro_mg)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    row['nome'],
-                    row['energia_kcal'],
-                    row['proteina_g'],
-                    row['lipideos_g'],
-                    row['carboidrato_g'],
-                    row['fibra_g'],
-                    row['calcio_mg'],
-                    row['ferro_mg']
-                ))
-
-            conn.commit()
-            st.success("Tabela TACO carregada com sucesso!")
+            # Sem snapshot: usar uma versão simplificada para exemplo; a tabela TACO completa
+            # é baixada em segundo plano (sincronizar_snapshot_taco), sem bloquear a primeira página
+            # Criar dados de exemplo da tabela TACO
+            dados_taco = {
+                'nome': [
+                    'Arroz, tipo 1, cozido',
+                    'Feijão, carioca, cozido',
+                    'Frango, peito, sem pele, cozido',
+                    'Pão, francês',
+                    'Maçã, com casca',
+                    'Banana prata',
+                    'Leite, integral',
+                    'Ovo, galinha, inteiro, cozido',
+                    'Alface, lisa, crua',
+                    'Cenoura, crua',
+                    'Batata, inglesa, cozida',
+                    'Carne, bovina, patinho, sem gordura, cozido',
+                    'Azeite, de oliva',
+                    'Manteiga, com sal',
+                    'Aveia, flocos'
+                ],
+                'energia_kcal': [128, 76, 159, 300, 56, 98, 62, 146, 14, 34, 52, 219, 884, 726, 394],
+                'proteina_g': [2.5, 4.8, 32, 8, 0.3, 1.3, 3.2, 13.3, 1.7, 1.3, 1.2, 35.9, 0, 0.9, 13.9],
+                'lipideos_g': [0.2, 0.5, 3.2, 3.1, 0.2, 0.1, 3.4, 9.5, 0.2, 0.2, 0, 8.5, 100, 82.4, 8.5],
+                'carboidrato_g': [28.1, 13.6, 0, 58.6, 15, 26, 4.7, 0.6, 2.4, 7.7, 11.9, 0, 0, 0.1, 67.0],
+                'fibra_g': [1.6, 8.5, 0, 2.3, 2.4, 2.0, 0, 0, 1.8, 3.2, 1.3, 0, 0, 0, 9.0],
+                'calcio_mg': [4, 27, 7, 16, 4, 8, 123, 42, 38, 23, 4, 4, 0, 15, 52],
+                'ferro_mg': [0.1, 1.3, 0.4, 1.0, 0.1, 0.3, 0.1, 1.5, 0.4, 0.1, 0.2, 3.4, 0.4, 0, 4.4]
+            }
+            estatisticas = gravar_lotes_taco([normalizar_lote(pd.DataFrame(dados_taco))])
+
+            st.info(f"Tabela TACO de exemplo carregada ({estatisticas['linhas']} alimentos). A tabela completa será baixada em segundo plano.")
         except Exception as e:
             st.error(f"Erro ao carregar tabela TACO: {str(e)}")
 
-    conn.close()
+# Função para atualizar a tabela TACO quando o pacote traz um snapshot de versão nova e
+# baixar a tabela completa em segundo plano enquanto o banco só tem a tabela de exemplo
+def sincronizar_snapshot_taco():
+    try:
+        estatisticas = materializar_snapshot_taco()
+        if estatisticas:
+            st.info(f"Tabela TACO atualizada a partir do snapshot ({estatisticas['linhas']} alimentos)")
+    except Exception as e:
+        st.warning(f"Não foi possível atualizar a tabela TACO pelo snapshot: {str(e)}")
+    garantir_catalogo_completo()
+
+# Função para mostrar o andamento do download da tabela TACO em segundo plano
+def mostrar_estado_catalogo():
+    estado = estado_catalogo()
+    if estado['situacao'] == 'carregando':
+        if estado['progresso'] is not None:
+            st.progress(min(estado['progresso'], 1.0), text=f"{estado['mensagem']} ({estado['progresso']:.0%})")
+        else:
+            st.caption(f"{estado['mensagem']}... as sugestões usam a tabela de exemplo até o fim do download")
+    elif estado['situacao'] == 'erro':
+        st.caption(f"{estado['mensagem']}. As sugestões usam a tabela de exemplo.")
 
 # Função para buscar alimento na tabela TACO
+# (índice de texto completo: ignora acentos, aceita prefixos e ordena por relevância)
 def buscar_alimento_taco(nome_alimento):
-    conn = conectar_bd()
-    cursor = conn.cursor()
-
-    # Buscar alimento pelo nome (usando LIKE para busca parcial)
-    cursor.execute('''
-    SELECT nome, energia_kcal, proteina_g, lipideos_g, carboidrato_g
-    FROM alimentos_taco
-    WHERE nome LIKE ?
-    ORDER BY nome
-    ''', (f'%{nome_alimento}%',))
-
-    resultados = cursor.fetchall()
-    conn.close()
+    resultados = [linha[1:] for linha in buscar_alimentos(nome_alimento)]
 
     if not resultados:
         return None
@@ -191,43 +139,21 @@ def buscar_alimento_taco(nome_alimento):
     df_resultados = pd.DataFrame(resultados, columns=['Nome', 'Calorias (kcal)', 'Proteínas (g)', 'Gorduras (g)', 'Carboidratos (g)'])
     return df_resultados
 
-# Função para obter informações nutricionais de um alimento específico
-# def obter_info_nutricional(nome_exato):
-#     conn = conectar_bd()
-#     cursor = conn.cursor()
-
-#     cursor.execute('''
-#     SELECT energia_kcal, proteina_g, lipideos_g, carboidrato_g
-#     FROM alimentos_taco
-#     WHERE nome = ?
-#     ''', (nome_exato,))
-
-#     resultado = cursor.fetchone()
-#     conn.close()
+# Função para calcular o valor de um nutriente (por 100 g) para a quantidade informada
+def calcular_por_quantidade(valor_100g, quantidade):
+    if valor_100g is None or pd.isna(valor_100g):
+        return 0.0
+    return round(float(valor_100g) * quantidade / 100, 1)
 
-#     if not resultado:
-#         return None
-
-#     return {
-#         'calorias': resultado[0],
-#         'proteinas': resultado[1],
-#         'gorduras': resultado[2],
-#         'carboidratos': resultado[3]
-#     }
-
-# Função para criar dados de exemplo no banco de dados
+# Função para criar dados de exemplo no banco de dados (para o usuário padrão)
 def criar_dados_exemplo():
     conn = conectar_bd()
-    cursor = conn.cursor()
 
     # Verificar se já existem refeições
-    cursor.execute("SELECT COUNT(*) FROM refeicoes")
-    count_refeicoes = cursor.fetchone()[0]
-
-    if count_refeicoes == 0:
+    if tabela_vazia('refeicoes'):
         # Dados de exemplo para refeições
         refeicoes_exemplo = [
-            ((datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d'), refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
+            (ID_USUARIO_PADRAO, para_dia(datetime.now() - timedelta(days=i)), refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
             for i, (refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras) in enumerate([
                 ('Café da Manhã', 'Pão Integral', 100, 240, 8, 45, 2),
                 ('Almoço', 'Arroz', 150, 195, 4, 40, 0),
@@ -242,19 +168,13 @@ def criar_dados_exemplo():
             ])
         ]
 
-        cursor.executemany('''
-        INSERT INTO refeicoes (data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', refeicoes_exemplo)
+        inserir_em_massa(conn, 'refeicoes', ['usuario_id', *COLUNAS_REFEICOES], refeicoes_exemplo)
 
     # Verificar se já existem medidas
-    cursor.execute("SELECT COUNT(*) FROM medidas")
-    count_medidas = cursor.fetchone()[0]
-
-    if count_medidas == 0:
+    if tabela_vazia('medidas'):
         # Dados de exemplo para medidas corporais
         medidas_exemplo = [
-            ((datetime.now() - timedelta(days=i*5)).strftime('%Y-%m-%d'), peso, imc, cintura, quadril, gordura)
+            (ID_USUARIO_PADRAO, para_dia(datetime.now() - timedelta(days=i*5)), peso, imc, cintura, quadril, gordura)
             for i, (peso, imc, cintura, quadril, gordura) in enumerate([
                 (78.5, 26.8, 92, 100, 22),
                 (78.0, 26.6, 91, 99, 21.5),
@@ -265,53 +185,35 @@ def criar_dados_exemplo():
             ])
         ]
 
-        cursor.executemany('''
-        INSERT INTO medidas (data, peso, imc, cintura, quadril, gordura_corporal)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', medidas_exemplo)
+        inserir_em_massa(conn, 'medidas', ['usuario_id', *COLUNAS_MEDIDAS], medidas_exemplo)
 
     # Verificar se já existem metas
-    cursor.execute("SELECT COUNT(*) FROM metas")
-    count_metas = cursor.fetchone()[0]
-
-    if count_metas == 0:
+    if tabela_vazia('metas'):
         # Dados de exemplo para metas
-        cursor.execute('''
-        INSERT INTO metas (id, calorias_diarias, proteinas_diarias, carboidratos_diarios, gorduras_diarias, peso_meta, gordura_corporal_meta)
-        VALUES (1, 2000, 150, 225, 65, 70.0, 15.0)
-        ''')
+        inserir_em_massa(conn, 'metas', ['usuario_id', *models.METAS_PADRAO],
+                         [(ID_USUARIO_PADRAO, *models.METAS_PADRAO.values())])
 
     conn.commit()
     conn.close()
 
-# Função para obter metas do banco de dados
-# def obter_metas():
-#     conn = conectar_bd()
-#     cursor = conn.cursor()
-
-#     cursor.execute("SELECT * FROM metas WHERE id = 1")
-#     resultado = cursor.fetchone()
-
-#     conn.close()
-
-#     if resultado:
-#         return {
-#             'calorias_diarias': resultado[1],
-#             'proteinas_diarias': resultado[2],
-#             'carboidratos_diarios': resultado[3],
-#             'gorduras_diarias': resultado[4],
-#             'peso_meta': resultado[5],
-#             'gordura_corporal_meta': resultado[6]
-#         }
-#     else:
-#         return {
-#             'calorias_diarias': 2000.0,
-#             'proteinas_diarias': 150.0,
-#             'carboidratos_diarios': 225.0,
-#             'gorduras_diarias': 65.0,
-#             'peso_meta': 70.0,
-#             'gordura_corporal_meta': 15.0
-#         }
+# Função para mostrar o painel de desempenho da execução (fases em ordem de início,
+# recuadas pelo nível) e gravar os spans no log
+def mostrar_painel_desempenho(execucao):
+    duracao_ms = execucao.duracao_ms()
+    spans = sorted(finalizar_rastreamento(execucao), key=lambda registro: registro['inicio_ms'])
+
+    with st.expander("⏱️ Desempenho desta execução", expanded=True):
+        st.caption(f"Execução {execucao.id}: {duracao_ms:.0f} ms até o painel, {len(spans)} fases medidas")
+        if spans:
+            df_spans = pd.DataFrame(spans)
+            st.dataframe(pd.DataFrame({
+                'fase': ['\u2003' * nivel + nome for nivel, nome in zip(df_spans['nivel'], df_spans['nome'])],
+                'início (ms)': df_spans['inicio_ms'].round(1),
+                'duração (ms)': df_spans['duracao_ms'].round(1),
+                'linhas': df_spans['linhas'].astype('Int64'),
+                'alocado (KiB)': (df_spans['bytes_alocados'] / 1024).round(1),
+                'retido (KiB)': (df_spans['bytes_retidos'] / 1024).round(1),
+            }), hide_index=True, use_container_width=True)
 
 # Aplicar estilo
 def aplicar_estilo():
@@ -354,601 +256,484 @@ def aplicar_estilo():
     </style>
     """, unsafe_allow_html=True)
 
-# Função para adicionar refeição
-def adicionar_refeicao(data, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras):
-    conn = conectar_bd()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    INSERT INTO refeicoes (data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (data, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras))
-
-    conn.commit()
-    conn.close()
-
-# Função para adicionar medida
-def adicionar_medida(data, peso, altura, cintura, quadril, gordura_corporal):
-    imc = peso / ((altura/100) ** 2)
-
-    conn = conectar_bd()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    INSERT INTO medidas (data, peso, imc, cintura, quadril, gordura_corporal)
-    VALUES (?, ?, ?, ?, ?, ?)
-    ''', (data, peso, imc, cintura, quadril, gordura_corporal))
-
-    conn.commit()
-    conn.close()
-
-# Função para atualizar metas
-def atualizar_metas(metas_dict):
-    conn = conectar_bd()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    UPDATE metas
-    SET calorias_diarias = ?,
-        proteinas_diarias = ?,
-        carboidratos_diarios = ?,
-        gorduras_diarias = ?,
-        peso_meta = ?,
-        gordura_corporal_meta = ?
-    WHERE id = 1
-    ''', (
-        metas_dict['calorias_diarias'],
-        metas_dict['proteinas_diarias'],
-        metas_dict['carboidratos_diarios'],
-        metas_dict['gorduras_diarias'],
-        metas_dict['peso_meta'],
-        metas_dict['gordura_corporal_meta']
-    ))
-
-    conn.commit()
-    conn.close()
-
-# Função para obter refeições por data
-def obter_refeicoes_por_data(data):
-    conn = conectar_bd()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    SELECT data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras
-    FROM refeicoes
-    WHERE data = ?
-    ''', (data,))
-
-    resultados = cursor.fetchall()
-    conn.close()
+# Períodos do filtro do dashboard (em dias; None = todo o histórico)
+PERIODOS_ANALISE = {
+    "7 dias": 7,
+    "14 dias": 14,
+    "30 dias": 30,
+    "3 meses": 90,
+    "6 meses": 182,
+    "1 ano": 365,
+    "2 anos": 730,
+    "Tudo": None,
+}
+
+# Tabelas oferecidas na exportação de dados
+TABELAS_EXPORTACAO_ROTULOS = {
+    "Refeições": "refeicoes",
+    "Medidas": "medidas",
+}
+
+# Rastreamento de desempenho desta execução: com ?desempenho=1 na URL, cada fase é medida,
+# o painel aparece no fim da página e os spans vão para o log (desligado, nada é medido).
+# A página inteira fica no bloco: o rastreamento termina mesmo se a execução for interrompida
+with rastrear_execucao('app', ativo=st.query_params.get('desempenho') == '1') as execucao_rastreada:
+    # Inicializar a aplicação (executado uma única vez por processo e banco de dados)
+    with span('inicializacao'):
+        inicializar_aplicacao(
+            [inicializar_bd, carregar_tabela_taco, criar_dados_exemplo, reconstruir_resumo_diario],
+            [sincronizar_snapshot_taco]
+        )
+    aplicar_estilo()
+
+    # Usuário da sessão: com NUTRICAO_MULTIUSUARIO=1, informado na barra lateral (ou por
+    # ?usuario=nome na URL), sem autenticação; sem a opção, sempre o usuário padrão
+    if MULTIUSUARIO:
+        nome_usuario = st.sidebar.text_input("Usuário", value=st.query_params.get('usuario', USUARIO_PADRAO))
+        usuario_id = obter_id_usuario(nome_usuario)
+    else:
+        usuario_id = ID_USUARIO_PADRAO
+
+    # carregar dados na sessão
+    # Histórico de refeições da sessão: carrega só a janela usada pelas telas
+    # e, nas execuções seguintes, apenas as refeições gravadas desde a última leitura
+    with span('carregar_sessao'):
+        historico = st.session_state.get('historico_refeicoes')
+        if historico is None or historico.usuario_id != usuario_id:
+            st.session_state.historico_refeicoes = HistoricoRefeicoes(usuario_id)
+        else:
+            historico.atualizar()
+        st.session_state.refeicoes = st.session_state.historico_refeicoes.refeicoes
+        st.session_state.metas = obter_metas(usuario_id)
+        # Tendências (médias móveis, peso suavizado): recalculadas só a partir dos dias alterados
+        tendencias = st.session_state.get('tendencias')
+        if tendencias is None or tendencias.usuario_id != usuario_id:
+            st.session_state.tendencias = TendenciasUsuario(usuario_id)
+        else:
+            tendencias.atualizar()
+        st.session_state.medidas = obter_todas_medidas(usuario_id)
 
-    if not resultados:
-        return pd.DataFrame(columns=['data', 'refeicao', 'alimento', 'quantidade', 'calorias', 'proteinas', 'carboidratos', 'gorduras'])
+    # Cabeçalho da aplicação
+    st.title("🥗 Acompanhamento Nutricional")
+    st.markdown("### 📊 Monitore sua alimentação e progresso corporal")
+    st.markdown("---")
 
-    df = pd.DataFrame(resultados, columns=['data', 'refeicao', 'alimento', 'quantidade', 'calorias', 'proteinas', 'carboidratos', 'gorduras'])
-    return df
+    # Menu de navegação
+    tabs = st.tabs(["📈 Dashboard", "🍽️ Registro Alimentar", "📏 Medidas Corporais", "🎯 Metas"])
 
-# Função para obter refeições por período
-def obter_refeicoes_por_periodo(data_inicio):
-    conn = conectar_bd()
-    cursor = conn.cursor()
+    # Tab 1: Dashboard
+    with tabs[0]:
+        st.header("Dashboard de Acompanhamento")
 
-    cursor.execute('''
-    SELECT data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras
-    FROM refeicoes
-    WHERE data >= ?
-    ORDER BY data
-    ''', (data_inicio,))
+        data_hoje = date.today()
 
-    resultados = cursor.fetchall()
-    conn.close()
+        dados_iniciados = True
+        try:
+            resumo_hoje = obter_resumo_do_dia(usuario_id, data_hoje)
+        except sqlite3.Error:
+            dados_iniciados = False
+        if dados_iniciados:
+            # Métricas de hoje
+            st.subheader("Resumo do Dia")
+
+            # Métricas do dia lidas do resumo diário
+            calorias_hoje = resumo_hoje['calorias']
+            proteinas_hoje = resumo_hoje['proteinas']
+            carboidratos_hoje = resumo_hoje['carboidratos']
+            gorduras_hoje = resumo_hoje['gorduras']
+
+            # Mostrar métricas em colunas
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                st.markdown('<p>Calorias</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="metric-value">{calorias_hoje} kcal</p>', unsafe_allow_html=True)
+                st.markdown(f'<p>Meta: {st.session_state.metas["calorias_diarias"]} kcal</p>', unsafe_allow_html=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            with col2:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                st.markdown('<p>Proteínas</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="metric-value">{proteinas_hoje}g</p>', unsafe_allow_html=True)
+                st.markdown(f'<p>Meta: {st.session_state.metas["proteinas_diarias"]}g</p>', unsafe_allow_html=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            with col3:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                st.markdown('<p>Carboidratos</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="metric-value">{carboidratos_hoje}g</p>', unsafe_allow_html=True)
+                st.markdown(f'<p>Meta: {st.session_state.metas["carboidratos_diarios"]}g</p>', unsafe_allow_html=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            with col4:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                st.markdown('<p>Gorduras</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="metric-value">{gorduras_hoje}g</p>', unsafe_allow_html=True)
+                st.markdown(f'<p>Meta: {st.session_state.metas["gorduras_diarias"]}g</p>', unsafe_allow_html=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            # Tendências: médias móveis, déficit da semana, peso suavizado e aderência às metas
+            st.subheader("Tendências")
+            tendencias_hoje = st.session_state.tendencias.resumo(st.session_state.metas)
+
+            def formatar(valor, formato):
+                return '—' if np.isnan(valor) else format(valor, formato)
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                media_7 = tendencias_hoje['media_7']['calorias']
+                media_30 = tendencias_hoje['media_30']['calorias']
+                st.metric("Média de calorias (7 dias)", formatar(media_7, '.0f') + " kcal",
+                          None if np.isnan(media_7 - media_30) else f"{media_7 - media_30:+.0f} kcal vs. 30 dias",
+                          delta_color="off")
+            with col2:
+                st.metric("Déficit calórico (7 dias)", formatar(tendencias_hoje['deficit_semanal'], '+.0f') + " kcal")
+            with col3:
+                taxa_peso = tendencias_hoje['taxa_peso_semanal']
+                st.metric("Peso (tendência)", formatar(tendencias_hoje['tendencia_peso'], '.1f') + " kg",
+                          None if np.isnan(taxa_peso) else f"{taxa_peso:+.2f} kg/semana ({JANELA_TAXA_PESO} dias)",
+                          delta_color="off")
+            with col4:
+                st.metric("Dias na meta de calorias (30 dias)",
+                          formatar(tendencias_hoje['aderencia_30']['calorias'], '.0f') + "%")
+
+            st.markdown("---")
+
+            # Gráficos de consumo
+            st.subheader("Histórico de Consumo")
+
+            # Filtro de período para os gráficos
+            col_period1, col_period2 = st.columns(2)
+            with col_period1:
+                periodo = st.select_slider("Selecione o período de análise", list(PERIODOS_ANALISE), "7 dias")
+
+            # Períodos longos são agregados por semana/mês no banco (ver nutricao_app.agregacao)
+            dias_atras = PERIODOS_ANALISE[periodo]
+            data_inicio = date.today() - timedelta(days=dias_atras) if dias_atras else None
+            # Figuras reaproveitadas entre execuções enquanto refeições e metas não mudam
+            figuras_consumo = figuras_consumo_diario(usuario_id, data_inicio)
+
+            if figuras_consumo:
+                with span('plotly_chart consumo'):
+                    for figura in figuras_consumo:
+                        st.plotly_chart(figura, use_container_width=True)
+            else:
+                st.info("Sem dados de consumo no período selecionado")
 
-    if not resultados:
-        return pd.DataFrame(columns=['data', 'refeicao', 'alimento', 'quantidade', 'calorias', 'proteinas', 'carboidratos', 'gorduras'])
+            st.markdown("---")
 
-    df = pd.DataFrame(resultados, columns=['data', 'refeicao', 'alimento', 'quantidade', 'calorias', 'proteinas', 'carboidratos', 'gorduras'])
-    return df
+            # Mostrar progresso corporal
+            st.subheader("Progresso Corporal")
 
-# Função para obter todas as medidas
-def obter_todas_medidas():
-    conn = conectar_bd()
-    cursor = conn.cursor()
+            figuras_progresso = figuras_progresso_corporal(usuario_id)
 
-    cursor.execute('''
-    SELECT data, peso, imc, cintura, quadril, gordura_corporal
-    FROM medidas
-    ORDER BY data
-    ''')
+            if figuras_progresso:
+                with span('plotly_chart progresso'):
+                    for figura in figuras_progresso:
+                        st.plotly_chart(figura, use_container_width=True)
+            else:
+                st.info("Sem dados de medidas corporais registrados")
 
-    resultados = cursor.fetchall()
-    conn.close()
+    # Tab 2: Registro Alimentar
+    with tabs[1]:
+        st.header("Registro Alimentar")
 
-    if not resultados:
-        return pd.DataFrame(columns=['data', 'peso', 'imc', 'cintura', 'quadril', 'gordura_corporal'])
-
-    df = pd.DataFrame(resultados, columns=['data', 'peso', 'imc', 'cintura', 'quadril', 'gordura_corporal'])
-    return df
-
-# Função para gerar gráfico de consumo diário por macronutriente
-def gerar_grafico_consumo_diario(df_filtrado):
-    df_agrupado = df_filtrado.groupby('data').agg({
-        'calorias': 'sum',
-        'proteinas': 'sum',
-        'carboidratos': 'sum',
-        'gorduras': 'sum'
-    }).reset_index()
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(
-        x=df_agrupado['data'],
-        y=df_agrupado['calorias'],
-        mode='lines+markers',
-        name='Calorias',
-        line=dict(color='#FFA500', width=2),
-        marker=dict(size=8)
-    ))
-
-    metas = obter_metas()
-
-    fig.update_layout(
-        title='Consumo Calórico Diário',
-        xaxis_title='Data',
-        yaxis_title='Calorias (kcal)',
-        template='plotly_white',
-        height=400,
-        hovermode='x unified'
-    )
-
-    # Adicionar linha de meta calórica
-    fig.add_shape(
-        type="line",
-        x0=df_agrupado['data'].min(),
-        y0=metas['calorias_diarias'],
-        x1=df_agrupado['data'].max(),
-        y1=metas['calorias_diarias'],
-        line=dict(color="red", width=2, dash="dash"),
-    )
-
-    fig.add_annotation(
-        x=df_agrupado['data'].max(),
-        y=metas['calorias_diarias'],
-        text="Meta",
-        showarrow=False,
-        yshift=10,
-        font=dict(color="red")
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
-
-    # Gráfico de macronutrientes
-    fig_macro = go.Figure()
-
-    fig_macro.add_trace(go.Scatter(
-        x=df_agrupado['data'],
-        y=df_agrupado['proteinas'],
-        mode='lines+markers',
-        name='Proteínas (g)',
-        line=dict(color='#007BFF', width=2),
-        marker=dict(size=8)
-    ))
-
-    fig_macro.add_trace(go.Scatter(
-        x=df_agrupado['data'],
-        y=df_agrupado['carboidratos'],
-        mode='lines+markers',
-        name='Carboidratos (g)',
-        line=dict(color='#28A745', width=2),
-        marker=dict(size=8)
-    ))
-
-    fig_macro.add_trace(go.Scatter(
-        x=df_agrupado['data'],
-        y=df_agrupado['gorduras'],
-        mode='lines+markers',
-        name='Gorduras (g)',
-        line=dict(color='#DC3545', width=2),
-        marker=dict(size=8)
-    ))
-
-    fig_macro.update_layout(
-        title='Consumo Diário de Macronutrientes',
-        xaxis_title='Data',
-        yaxis_title='Quantidade (g)',
-        template='plotly_white',
-        height=400,
-        hovermode='x unified'
-    )
-
-    st.plotly_chart(fig_macro, use_container_width=True)
-
-# Função para gerar gráfico de progresso corporal
-def gerar_grafico_progresso_corporal():
-    df_medidas = obter_todas_medidas()
-    df_medidas['data'] = pd.to_datetime(df_medidas['data'])
-    df_medidas = df_medidas.sort_values('data')
-
-    metas = obter_metas()
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(
-        x=df_medidas['data'],
-        y=df_medidas['peso'],
-        mode='lines+markers',
-        name='Peso (kg)',
-        line=dict(color='#007BFF', width=2),
-        marker=dict(size=8)
-    ))
-
-    # Adicionar linha de meta de peso
-    fig.add_shape(
-        type="line",
-        x0=df_medidas['data'].min(),
-        y0=metas['peso_meta'],
-        x1=df_medidas['data'].max(),
-        y1=metas['peso_meta'],
-        line=dict(color="red", width=2, dash="dash"),
-    )
-
-    fig.add_annotation(
-        x=df_medidas['data'].max(),
-        y=metas['peso_meta'],
-        text="Meta",
-        showarrow=False,
-        yshift=10,
-        font=dict(color="red")
-    )
-
-    fig.update_layout(
-        title='Progresso de Peso Corporal',
-        xaxis_title='Data',
-        yaxis_title='Peso (kg)',
-        template='plotly_white',
-        height=400,
-        hovermode='x unified'
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
-
-    # Gráfico de composição corporal
-    fig_comp = go.Figure()
-
-    fig_comp.add_trace(go.Scatter(
-        x=df_medidas['data'],
-        y=df_medidas['gordura_corporal'],
-        mode='lines+markers',
-        name='Gordura Corporal (%)',
-        line=dict(color='#FFC107', width=2),
-        marker=dict(size=8)
-    ))
-
-    # Adicionar linha de meta de gordura corporal
-    fig_comp.add_shape(
-        type="line",
-        x0=df_medidas['data'].min(),
-        y0=metas['gordura_corporal_meta'],
-        x1=df_medidas['data'].max(),
-        y1=metas['gordura_corporal_meta'],
-        line=dict(color="red", width=2, dash="dash"),
-    )
-
-    fig_comp.add_annotation(
-        x=df_medidas['data'].max(),
-        y=metas['gordura_corporal_meta'],
-        text="Meta",
-        showarrow=False,
-        yshift=10,
-        font=dict(color="red")
-    )
-
-    fig_comp.update_layout(
-        title='Progresso de Gordura Corporal',
-        xaxis_title='Data',
-        yaxis_title='Gordura Corporal (%)',
-        template='plotly_white',
-        height=400,
-        hovermode='x unified'
-    )
-
-    st.plotly_chart(fig_comp, use_container_width=True)
-
-    # Gráfico de medidas
-    fig_medidas = go.Figure()
-
-    fig_medidas.add_trace(go.Scatter(
-        x=df_medidas['data'],
-        y=df_medidas['cintura'],
-        mode='lines+markers',
-        name='Cintura (cm)',
-        line=dict(color='#6610F2', width=2),
-        marker=dict(size=8)
-    ))
-
-    fig_medidas.add_trace(go.Scatter(
-        x=df_medidas['data'],
-        y=df_medidas['quadril'],
-        mode='lines+markers',
-        name='Quadril (cm)',
-        line=dict(color='#E83E8C', width=2),
-        marker=dict(size=8)
-    ))
-
-    fig_medidas.update_layout(
-        title='Progresso de Medidas Corporais',
-        xaxis_title='Data',
-        yaxis_title='Medida (cm)',
-        template='plotly_white',
-        height=400,
-        hovermode='x unified'
-    )
-
-    st.plotly_chart(fig_medidas, use_container_width=True)
-
-# Inicializar a aplicação
-inicializar_bd()
-carregar_tabela_taco()
-criar_dados_exemplo()
-aplicar_estilo()
-
-# carregar dados na sessão
-st.session_state.refeicoes = obter_refeicoes_por_periodo('202-01-01')
-st.session_state.metas = obter_metas()
-st.session_state.medidas = obter_todas_medidas()
-
-# Cabeçalho da aplicação
-st.title("🥗 Acompanhamento Nutricional")
-st.markdown("### 📊 Monitore sua alimentação e progresso corporal")
-st.markdown("---")
-
-# Menu de navegação
-tabs = st.tabs(["📈 Dashboard", "🍽️ Registro Alimentar", "📏 Medidas Corporais", "🎯 Metas"])
-
-# Tab 1: Dashboard
-with tabs[0]:
-    st.header("Dashboard de Acompanhamento")
-
-    data_hoje = datetime.now().strftime('%Y-%m-%d')
-
-    dados_iniciados = True
-    try:
-        df_hoje = st.session_state.refeicoes[st.session_state.refeicoes['data'] == data_hoje]
-    except:
-        dados_iniciados = False
-    if dados_iniciados:
-        # Métricas de hoje
-        st.subheader("Resumo do Dia")
-
-        # Calcular métricas do dia
-        calorias_hoje = df_hoje['calorias'].sum() if not df_hoje.empty else 0
-        proteinas_hoje = df_hoje['proteinas'].sum() if not df_hoje.empty else 0
-        carboidratos_hoje = df_hoje['carboidratos'].sum() if not df_hoje.empty else 0
-        gorduras_hoje = df_hoje['gorduras'].sum() if not df_hoje.empty else 0
-
-        # Mostrar métricas em colunas
-        col1, col2, col3, col4 = st.columns(4)
+        col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown('<p>Calorias</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="metric-value">{calorias_hoje} kcal</p>', unsafe_allow_html=True)
-            st.markdown(f'<p>Meta: {st.session_state.metas["calorias_diarias"]} kcal</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.subheader("Adicionar Nova Refeição")
+
+            # Formulário de adição de refeição
+            data_refeicao = st.date_input("Data", datetime.now())
+            tipo_refeicao = st.selectbox("Refeição", ["Café da Manhã", "Lanche da Manhã", "Almoço", "Lanche da Tarde", "Jantar", "Ceia"])
+            alimento = st.text_input("Alimento", placeholder="Digite para buscar na tabela TACO")
+            mostrar_estado_catalogo()
+
+            # Sugestões da tabela TACO para o texto digitado
+            info_alimento = None
+            sugestoes = buscar_alimento_taco(alimento) if alimento else None
+            if sugestoes is not None:
+                opcoes = ["Usar o texto digitado"] + sugestoes['Nome'].tolist()
+                escolha = st.selectbox("Sugestões da tabela TACO", opcoes)
+                if escolha != opcoes[0]:
+                    alimento = escolha
+                    info_alimento = sugestoes[sugestoes['Nome'] == escolha].iloc[0]
+
+            if info_alimento is None:
+                quantidade = st.number_input("Quantidade (g)", min_value=0, step=10)
+                calorias = st.number_input("Calorias", min_value=0, step=10)
+                proteinas = st.number_input("Proteínas (g)", min_value=0.0, step=0.1)
+                carboidratos = st.number_input("Carboidratos (g)", min_value=0.0, step=0.1)
+                gorduras = st.number_input("Gorduras (g)", min_value=0.0, step=0.1)
+            else:
+                # Valores calculados a partir da tabela TACO (por 100 g), ainda editáveis
+                quantidade = st.number_input("Quantidade (g)", min_value=0, step=10, value=100)
+                calorias = st.number_input("Calorias", min_value=0, step=10, value=int(calcular_por_quantidade(info_alimento['Calorias (kcal)'], quantidade)))
+                proteinas = st.number_input("Proteínas (g)", min_value=0.0, step=0.1, value=calcular_por_quantidade(info_alimento['Proteínas (g)'], quantidade))
+                carboidratos = st.number_input("Carboidratos (g)", min_value=0.0, step=0.1, value=calcular_por_quantidade(info_alimento['Carboidratos (g)'], quantidade))
+                gorduras = st.number_input("Gorduras (g)", min_value=0.0, step=0.1, value=calcular_por_quantidade(info_alimento['Gorduras (g)'], quantidade))
+
+            if st.button("Adicionar Refeição"):
+                id_refeicao = adicionar_refeicao(usuario_id, data_refeicao, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
+                st.session_state.historico_refeicoes.registrar(id_refeicao, data_refeicao, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
+
+            # Receitas: pratos de vários ingredientes da TACO, registrados como uma refeição
+            # (nutrientes por 100 g calculados ao salvar a receita)
+            with st.expander("Receitas"):
+                receitas = listar_receitas(usuario_id)
+                if receitas:
+                    nomes_receitas = {receita[0]: receita[1] for receita in receitas}
+                    receita_id = st.selectbox("Receita", list(nomes_receitas), format_func=nomes_receitas.get)
+                    quantidade_receita = st.number_input("Porção (g)", min_value=0, step=10, value=100, key="quantidade_receita")
+                    col_registrar, col_excluir = st.columns(2)
+                    if col_registrar.button("Adicionar Receita"):
+                        try:
+                            porcao = porcao_receita(usuario_id, receita_id, quantidade_receita)
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            valores = [porcao[coluna] for coluna in ('alimento', 'quantidade', 'calorias', 'proteinas', 'carboidratos', 'gorduras')]
+                            id_refeicao = adicionar_refeicao(usuario_id, data_refeicao, tipo_refeicao, *valores)
+                            st.session_state.historico_refeicoes.registrar(id_refeicao, data_refeicao, tipo_refeicao, *valores)
+                            st.success(f"{porcao['alimento']} adicionada: {porcao['calorias']:.0f} kcal")
+                    if col_excluir.button("Excluir Receita"):
+                        excluir_receita(usuario_id, receita_id)
+                        st.rerun()
+                    st.dataframe(pd.DataFrame(obter_ingredientes(receita_id), columns=['id', 'Ingrediente', 'Gramas']).drop(columns='id'),
+                                 hide_index=True)
+
+                st.markdown("**Nova receita**")
+                nome_receita = st.text_input("Nome da receita")
+                ingredientes = st.session_state.setdefault('ingredientes_receita', [])
+                termo_ingrediente = st.text_input("Ingrediente", placeholder="Digite para buscar na tabela TACO")
+                encontrados = {linha[0]: linha[1] for linha in buscar_alimentos(termo_ingrediente)} if termo_ingrediente else {}
+                if encontrados:
+                    alimento_id = st.selectbox("Alimento da TACO", list(encontrados), format_func=encontrados.get)
+                    gramas = st.number_input("Quantidade do ingrediente (g)", min_value=0, step=10, value=100)
+                    if st.button("Incluir Ingrediente") and gramas > 0:
+                        ingredientes.append((alimento_id, encontrados[alimento_id], gramas))
+                if ingredientes:
+                    st.dataframe(pd.DataFrame(ingredientes, columns=['id', 'Ingrediente', 'Gramas']).drop(columns='id'),
+                                 hide_index=True)
+                    rendimento = st.number_input("Rendimento da receita pronta (g; 0 = soma dos ingredientes)", min_value=0, step=50)
+                    col_salvar, col_limpar = st.columns(2)
+                    if col_salvar.button("Salvar Receita"):
+                        try:
+                            salvar_receita(usuario_id, nome_receita, [(alimento_id, gramas) for alimento_id, _, gramas in ingredientes],
+                                           rendimento or None)
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            ingredientes.clear()
+                            st.rerun()
+                    if col_limpar.button("Limpar Ingredientes"):
+                        ingredientes.clear()
+                        st.rerun()
+
+            # Importação de refeições de outros aplicativos (CSV, JSON ou JSON Lines)
+            with st.expander("Importar Refeições"):
+                arquivo_importacao = st.file_uploader("Arquivo de refeições", type=['csv', 'json', 'jsonl', 'ndjson'])
+                if arquivo_importacao is not None and st.button("Importar"):
+                    barra_importacao = st.progress(0.0, text="Importando refeições...")
+
+                    def mostrar_progresso_importacao(fracao, parcial):
+                        if fracao is not None:
+                            barra_importacao.progress(fracao, text=f"{parcial['importadas']:,} refeições importadas")
+
+                    try:
+                        estatisticas = importar_refeicoes(arquivo_importacao, usuario_id,
+                                                          formato_arquivo(arquivo_importacao.name),
+                                                          progresso=mostrar_progresso_importacao)
+                    except ValueError as e:
+                        st.error(f"Erro ao importar o arquivo: {str(e)}")
+                    else:
+                        barra_importacao.progress(1.0, text="Importação concluída")
+                        st.session_state.historico_refeicoes.atualizar()
+                        st.success(f"{estatisticas['importadas']:,} refeições importadas "
+                                   f"({estatisticas['duplicadas']:,} duplicadas e {estatisticas['invalidas']:,} inválidas ignoradas)")
+                        # Alimentos sem nome igual na TACO: importados com o nome do arquivo, para revisão
+                        if estatisticas['incertos']:
+                            st.warning("Alimentos sem correspondência exata na tabela TACO (importados com o nome "
+                                       "do arquivo; nutrientes só os informados no arquivo):")
+                            st.dataframe(pd.DataFrame(list(estatisticas['incertos'].items()),
+                                                      columns=['Alimento importado', 'Sugestão da TACO']), hide_index=True)
 
         with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown('<p>Proteínas</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="metric-value">{proteinas_hoje}g</p>', unsafe_allow_html=True)
-            st.markdown(f'<p>Meta: {st.session_state.metas["proteinas_diarias"]}g</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with col3:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown('<p>Carboidratos</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="metric-value">{carboidratos_hoje}g</p>', unsafe_allow_html=True)
-            st.markdown(f'<p>Meta: {st.session_state.metas["carboidratos_diarios"]}g</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with col4:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown('<p>Gorduras</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="metric-value">{gorduras_hoje}g</p>', unsafe_allow_html=True)
-            st.markdown(f'<p>Meta: {st.session_state.metas["gorduras_diarias"]}g</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.subheader("Histórico de Refeições")
+            if dados_iniciados:
+                # Filtro de data
+                data_filtro = st.date_input("Filtrar por data", datetime.now())
+                data_filtro_str = data_filtro.strftime('%Y-%m-%d')
 
-        st.markdown("---")
-
-        # Gráficos de consumo
-        st.subheader("Histórico de Consumo")
-
-        # Filtro de período para os gráficos
-        col_period1, col_period2 = st.columns(2)
-        with col_period1:
-            dias_atras = st.slider("Selecione o período de análise (dias)", 1, 30, 7)
-
-        data_inicio = (datetime.now() - timedelta(days=dias_atras)).strftime('%Y-%m-%d')
-        df_periodo = st.session_state.refeicoes[st.session_state.refeicoes['data'] >= data_inicio]
-
-        if not df_periodo.empty:
-            gerar_grafico_consumo_diario(df_periodo)
-        else:
-            st.info("Sem dados de consumo no período selecionado")
-
-        st.markdown("---")
-
-        # Mostrar progresso corporal
-        st.subheader("Progresso Corporal")
-
-        if not st.session_state.medidas.empty:
-            gerar_grafico_progresso_corporal()
-        else:
-            st.info("Sem dados de medidas corporais registrados")
-
-# Tab 2: Registro Alimentar
-with tabs[1]:
-    st.header("Registro Alimentar")
+                # Mostrar refeições filtradas
+                df_filtrado = st.session_state.historico_refeicoes.refeicoes_do_dia(data_filtro)
 
-    col1, col2 = st.columns(2)
+                if not df_filtrado.empty:
+                    st.dataframe(df_filtrado, hide_index=True, column_config={'data': st.column_config.DateColumn('data')})
 
-    with col1:
-        st.subheader("Adicionar Nova Refeição")
+                    # Totais do dia
+                    st.subheader("Totais do Dia")
+                    with span('totais do dia') as registro:
+                        totais = registro.contar(df_filtrado.agg({
+                            'calorias': 'sum',
+                            'proteinas': 'sum',
+                            'carboidratos': 'sum',
+                            'gorduras': 'sum'
+                        }).to_frame().T)
 
-        # Formulário de adição de refeição
-        data_refeicao = st.date_input("Data", datetime.now()).strftime('%Y-%m-%d')
-        tipo_refeicao = st.selectbox("Refeição", ["Café da Manhã", "Lanche da Manhã", "Almoço", "Lanche da Tarde", "Jantar", "Ceia"])
-        alimento = st.text_input("Alimento")
-        quantidade = st.number_input("Quantidade (g)", min_value=0, step=10)
-        calorias = st.number_input("Calorias", min_value=0, step=10)
-        proteinas = st.number_input("Proteínas (g)", min_value=0.0, step=0.1)
-        carboidratos = st.number_input("Carboidratos (g)", min_value=0.0, step=0.1)
-        gorduras = st.number_input("Gorduras (g)", min_value=0.0, step=0.1)
+                    st.dataframe(totais, hide_index=True)
 
-        if st.button("Adicionar Refeição"):
-            adicionar_refeicao(data_refeicao, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
+                    # Gráfico de distribuição de macronutrientes
+                    st.subheader("Distribuição de Macronutrientes")
 
-    with col2:
-        st.subheader("Histórico de Refeições")
-        if dados_iniciados:
-            # Filtro de data
-            data_filtro = st.date_input("Filtrar por data", datetime.now())
-            data_filtro_str = data_filtro.strftime('%Y-%m-%d')
-
-            # Mostrar refeições filtradas
-            df_filtrado = st.session_state.refeicoes[st.session_state.refeicoes['data'] == data_filtro_str]
-
-            if not df_filtrado.empty:
-                st.dataframe(df_filtrado, hide_index=True)
+                    macros = {
+                        'Nutriente': ['Proteínas', 'Carboidratos', 'Gorduras'],
+                        'Quantidade (g)': [totais['proteinas'].iloc[0], totais['carboidratos'].iloc[0], totais['gorduras'].iloc[0]]
+                    }
 
-                # Totais do dia
-                st.subheader("Totais do Dia")
-                totais = df_filtrado.agg({
-                    'calorias': 'sum',
-                    'proteinas': 'sum',
-                    'carboidratos': 'sum',
-                    'gorduras': 'sum'
-                }).to_frame().T
+                    df_macros = pd.DataFrame(macros)
 
-                st.dataframe(totais, hide_index=True)
+                    fig = px.pie(df_macros, values='Quantidade (g)', names='Nutriente',
+                                color_discrete_sequence=px.colors.qualitative.Set2,
+                                hole=0.4)
 
-                # Gráfico de distribuição de macronutrientes
-                st.subheader("Distribuição de Macronutrientes")
+                    fig.update_layout(height=400)
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info(f"Nenhuma refeição encontrada para {data_filtro_str}")
 
-                macros = {
-                    'Nutriente': ['Proteínas', 'Carboidratos', 'Gorduras'],
-                    'Quantidade (g)': [totais['proteinas'].iloc[0], totais['carboidratos'].iloc[0], totais['gorduras'].iloc[0]]
-                }
+    # Tab 3: Medidas Corporais
+    with tabs[2]:
+        st.header("Registro de Medidas Corporais")
 
-                df_macros = pd.DataFrame(macros)
+        col1, col2 = st.columns(2)
 
-                fig = px.pie(df_macros, values='Quantidade (g)', names='Nutriente',
-                            color_discrete_sequence=px.colors.qualitative.Set2,
-                            hole=0.4)
+        with col1:
+            st.subheader("Adicionar Novas Medidas")
 
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info(f"Nenhuma refeição encontrada para {data_filtro_str}")
+            # Formulário de adição de medidas
+            data_medida = st.date_input("Data da Medição", datetime.now())
+            peso = st.number_input("Peso (kg)", min_value=0.0, step=0.1)
+            altura = st.number_input("Altura (cm)", min_value=0.0, step=0.5, value=170.0)
+            cintura = st.number_input("Circunferência da Cintura (cm)", min_value=0.0, step=0.5)
+            quadril = st.number_input("Circunferência do Quadril (cm)", min_value=0.0, step=0.5)
+            gordura_corporal = st.number_input("Gordura Corporal (%)", min_value=0.0, max_value=100.0, step=0.1)
 
-# Tab 3: Medidas Corporais
-with tabs[2]:
-    st.header("Registro de Medidas Corporais")
+            if st.button("Salvar Medidas"):
+                adicionar_medida(usuario_id, data_medida, peso, altura, cintura, quadril, gordura_corporal)
 
-    col1, col2 = st.columns(2)
+        with col2:
+            st.subheader("Histórico de Medidas")
+            if dados_iniciados:
+                if not st.session_state.medidas.empty:
+                    with span('ordenar medidas') as registro:
+                        medidas_recentes = registro.contar(st.session_state.medidas.sort_values('data', ascending=False))
+                    st.dataframe(medidas_recentes, hide_index=True,
+                                 column_config={'data': st.column_config.DateColumn('data')})
 
-    with col1:
-        st.subheader("Adicionar Novas Medidas")
+                    # Progresso
+                    st.subheader("Progresso")
+                    if len(st.session_state.medidas) >= 2:
+                        primeira_medida = st.session_state.medidas.sort_values('data').iloc[0]
+                        ultima_medida = st.session_state.medidas.sort_values('data').iloc[-1]
 
-        # Formulário de adição de medidas
-        data_medida = st.date_input("Data da Medição", datetime.now()).strftime('%Y-%m-%d')
-        peso = st.number_input("Peso (kg)", min_value=0.0, step=0.1)
-        altura = st.number_input("Altura (cm)", min_value=0.0, step=0.5, value=170.0)
-        cintura = st.number_input("Circunferência da Cintura (cm)", min_value=0.0, step=0.5)
-        quadril = st.number_input("Circunferência do Quadril (cm)", min_value=0.0, step=0.5)
-        gordura_corporal = st.number_input("Gordura Corporal (%)", min_value=0.0, max_value=100.0, step=0.1)
+                        delta_peso = ultima_medida['peso'] - primeira_medida['peso']
+                        delta_gordura = ultima_medida['gordura_corporal'] - primeira_medida['gordura_corporal']
 
-        if st.button("Salvar Medidas"):
-            adicionar_medida(data_medida, peso, altura, cintura, quadril, gordura_corporal)
+                        col_delta1, col_delta2 = st.columns(2)
 
-    with col2:
-        st.subheader("Histórico de Medidas")
-        if dados_iniciados:
-            if not st.session_state.medidas.empty:
-                st.dataframe(st.session_state.medidas.sort_values('data', ascending=False), hide_index=True)
+                        with col_delta1:
+                            st.metric("Variação de Peso", f"{ultima_medida['peso']:.1f} kg", f"{delta_peso:.1f} kg")
 
-                # Progresso
-                st.subheader("Progresso")
-                if len(st.session_state.medidas) >= 2:
-                    primeira_medida = st.session_state.medidas.sort_values('data').iloc[0]
-                    ultima_medida = st.session_state.medidas.sort_values('data').iloc[-1]
+                        with col_delta2:
+                            st.metric("Variação de Gordura Corporal", f"{ultima_medida['gordura_corporal']:.1f}%", f"{delta_gordura:.1f}%")
 
-                    delta_peso = ultima_medida['peso'] - primeira_medida['peso']
-                    delta_gordura = ultima_medida['gordura_corporal'] - primeira_medida['gordura_corporal']
+                else:
+                    st.info("Nenhuma medida corporal registrada ainda")
 
-                    col_delta1, col_delta2 = st.columns(2)
+    # Tab 4: Metas
+    with tabs[3]:
+        st.header("Definição de Metas")
 
-                    with col_delta1:
-                        st.metric("Variação de Peso", f"{ultima_medida['peso']:.1f} kg", f"{delta_peso:.1f} kg")
+        col1, col2 = st.columns(2)
 
-                    with col_delta2:
-                        st.metric("Variação de Gordura Corporal", f"{ultima_medida['gordura_corporal']:.1f}%", f"{delta_gordura:.1f}%")
+        with col1:
+            st.subheader("Metas Nutricionais")
+            # breakpoint()
+            calorias_meta = st.number_input("Meta de Calorias Diárias (kcal)", min_value=0.0, step=50.0, value=st.session_state.metas['calorias_diarias'])
+            proteinas_meta = st.number_input("Meta de Proteínas Diárias (g)", min_value=0.0, step=5.0, value=st.session_state.metas['proteinas_diarias'])
+            carboidratos_meta = st.number_input("Meta de Carboidratos Diários (g)", min_value=0.0, step=5.0, value=st.session_state.metas['carboidratos_diarios'])
+            gorduras_meta = st.number_input("Meta de Gorduras Diárias (g)", min_value=0.0, step=5.0, value=st.session_state.metas['gorduras_diarias'])
 
-            else:
-                st.info("Nenhuma medida corporal registrada ainda")
-
-# Tab 4: Metas
-with tabs[3]:
-    st.header("Definição de Metas")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.subheader("Metas Nutricionais")
-        # breakpoint()
-        calorias_meta = st.number_input("Meta de Calorias Diárias (kcal)", min_value=0.0, step=50.0, value=st.session_state.metas['calorias_diarias'])
-        proteinas_meta = st.number_input("Meta de Proteínas Diárias (g)", min_value=0.0, step=5.0, value=st.session_state.metas['proteinas_diarias'])
-        carboidratos_meta = st.number_input("Meta de Carboidratos Diários (g)", min_value=0.0, step=5.0, value=st.session_state.metas['carboidratos_diarios'])
-        gorduras_meta = st.number_input("Meta de Gorduras Diárias (g)", min_value=0.0, step=5.0, value=st.session_state.metas['gorduras_diarias'])
-
-    with col2:
-        st.subheader("Metas Corporais")
-
-        # Corrigido: usando float para o value para corresponder ao tipo do step
-        peso_meta = st.number_input("Meta de Peso (kg)", min_value=0.0, step=0.5, value=float(st.session_state.metas['peso_meta']))
-        gordura_corporal_meta = st.number_input("Meta de Gordura Corporal (%)", min_value=0.0, max_value=100.0, step=0.5, value=float(st.session_state.metas['gordura_corporal_meta']))
-
-    if st.button("Salvar Metas"):
-        st.session_state.metas = {
-            'calorias_diarias': calorias_meta,
-            'proteinas_diarias': proteinas_meta,
-            'carboidratos_diarios': carboidratos_meta,
-            'gorduras_diarias': gorduras_meta,
-            'peso_meta': peso_meta,
-            'gordura_corporal_meta': gordura_corporal_meta
-        }
-        st.success("Metas atualizadas com sucesso!")
-
-    # Exportar dados
-    st.markdown("---")
-    st.subheader("Exportar Dados")
-
-    col_exp1, col_exp2 = st.columns(2)
-
-    with col_exp1:
-        if st.button("Exportar Refeições para CSV"):
-            csv = st.session_state.refeicoes.to_csv(index=False)
-            st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name="refeicoes.csv",
-                mime="text/csv",
-            )
-
-    with col_exp2:
-        if st.button("Exportar Medidas para CSV"):
-            csv = st.session_state.medidas.to_csv(index=False)
-            st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name="medidas.csv",
-                mime="text/csv",
-            )
\ No newline at end of file
+        with col2:
+            st.subheader("Metas Corporais")
+
+            # Corrigido: usando float para o value para corresponder ao tipo do step
+            peso_meta = st.number_input("Meta de Peso (kg)", min_value=0.0, step=0.5, value=float(st.session_state.metas['peso_meta']))
+            gordura_corporal_meta = st.number_input("Meta de Gordura Corporal (%)", min_value=0.0, max_value=100.0, step=0.5, value=float(st.session_state.metas['gordura_corporal_meta']))
+
+        if st.button("Salvar Metas"):
+            salvar_metas(usuario_id, {
+                'calorias_diarias': calorias_meta,
+                'proteinas_diarias': proteinas_meta,
+                'carboidratos_diarios': carboidratos_meta,
+                'gorduras_diarias': gorduras_meta,
+                'peso_meta': peso_meta,
+                'gordura_corporal_meta': gordura_corporal_meta
+            })
+            st.session_state.metas = obter_metas(usuario_id)
+            st.success("Metas atualizadas com sucesso!")
+
+        # Exportar dados
+        st.markdown("---")
+        st.subheader("Exportar Dados")
+
+        # Exportação lida do banco em lotes para um arquivo temporário
+        # (histórico completo ou período escolhido, não apenas a janela carregada na sessão)
+        col_exp1, col_exp2, col_exp3 = st.columns(3)
+
+        with col_exp1:
+            rotulo_exportacao = st.selectbox("Dados para exportar", list(TABELAS_EXPORTACAO_ROTULOS))
+            tabela_exportacao = TABELAS_EXPORTACAO_ROTULOS[rotulo_exportacao]
+
+        with col_exp2:
+            formato_exportacao = st.selectbox("Formato", formatos_disponiveis())
+
+        with col_exp3:
+            exportar_tudo = st.checkbox("Todo o histórico", value=True)
+            periodo_exportacao = (None, None)
+            if not exportar_tudo:
+                periodo_exportacao = st.date_input("Período", (date.today() - timedelta(days=30), date.today()))
+
+        if st.button("Exportar Dados"):
+            extensao, mime = FORMATOS_EXPORTACAO[formato_exportacao]
+            # Intervalo ainda incompleto no seletor (só a data inicial) exporta até hoje
+            inicio_exportacao, fim_exportacao = (tuple(periodo_exportacao) + (None, None))[:2]
+            with tempfile.TemporaryDirectory() as pasta:
+                caminho_exportacao = os.path.join(pasta, f"{tabela_exportacao}{extensao}")
+                linhas_exportadas = exportar_dados(caminho_exportacao, usuario_id, tabela_exportacao, formato_exportacao,
+                                                   inicio_exportacao, fim_exportacao)
+                st.caption(f"{linhas_exportadas} linhas exportadas")
+                # O botão de download guarda o arquivo inteiro na memória do servidor: acima do
+                # limite, a exportação é feita por período ou pela linha de comando
+                tamanho_exportacao = os.path.getsize(caminho_exportacao)
+                if tamanho_exportacao > TAMANHO_MAXIMO_DOWNLOAD:
+                    st.warning(
+                        f"Arquivo de {tamanho_exportacao / 2**20:.1f} MB, acima do limite de download "
+                        f"({TAMANHO_MAXIMO_DOWNLOAD / 2**20:.0f} MB). Escolha um período menor ou exporte pela linha "
+                        f"de comando: python -m nutricao_app.exportacao {tabela_exportacao}{extensao} "
+                        f"--tabela {tabela_exportacao} --formato {formato_exportacao}"
+                    )
+                else:
+                    with open(caminho_exportacao, "rb") as arquivo:
+                        st.download_button(
+                            label=f"Download {formato_exportacao.upper()}",
+                            data=arquivo,
+                            file_name=f"{tabela_exportacao}{extensao}",
+                            mime=mime,
+                        )
+
+    # Painel de desempenho (?desempenho=1)
+    if execucao_rastreada is not None:
+        mostrar_painel_desempenho(execucao_rastreada)
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+# Caminho do banco de dados (pode ser alterado pela variável de ambiente NUTRICAO_DB)
+CAMINHO_BD = os.environ.get('NUTRICAO_DB', 'nutricao.db')
+
+# Configuração do pool de conexões compartilhado pelo processo
+TAMANHO_POOL = int(os.environ.get('NUTRICAO_POOL_TAMANHO', '5'))
+EXCEDENTE_POOL = int(os.environ.get('NUTRICAO_POOL_EXCEDENTE', '10'))
+TIMEOUT_OCUPADO_MS = 5000
+
+# Pragmas aplicadas a cada nova conexão física
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    f'PRAGMA busy_timeout = {TIMEOUT_OCUPADO_MS}',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 134217728',
+)
+
+_engine = None
+_lock = threading.Lock()
+
+# Conexão dedicada (fora do pool) usada só para ler o contador de alterações do banco, e
+# geração do banco em uso (incrementada ao descartar o pool ou trocar de arquivo)
+_conexao_alteracoes = None
+_geracao = 0
+_contadores = {'conexoes_criadas': 0, 'checkouts': 0, 'checkins': 0}
+
+
+# Função para aplicar as pragmas em uma conexão recém-criada
+def _configurar_conexao(conexao_dbapi, registro_conexao):
+    cursor = conexao_dbapi.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+    with _lock:
+        _contadores['conexoes_criadas'] += 1
+
+
+def _registrar_checkout(conexao_dbapi, registro_conexao, proxy_conexao):
+    with _lock:
+        _contadores['checkouts'] += 1
+
+
+def _registrar_checkin(conexao_dbapi, registro_conexao):
+    with _lock:
+        _contadores['checkins'] += 1
+
+
+# Função para obter o engine SQLAlchemy único do processo
+def obter_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = create_engine(
+                    f'sqlite:///{CAMINHO_BD}',
+                    poolclass=QueuePool,
+                    pool_size=TAMANHO_POOL,
+                    max_overflow=EXCEDENTE_POOL,
+                    connect_args={
+                        'check_same_thread': False,
+                        'timeout': TIMEOUT_OCUPADO_MS / 1000,
+                    },
+                )
+                event.listen(engine, 'connect', _configurar_conexao)
+                event.listen(engine.pool, 'checkout', _registrar_checkout)
+                event.listen(engine.pool, 'checkin', _registrar_checkin)
+                _engine = engine
+    return _engine
+
+
+# Função para obter uma conexão sqlite3 do pool
+# (chamar close() devolve a conexão ao pool em vez de fechá-la)
+def conectar_bd():
+    return obter_engine().raw_connection()
+
+
+# Função para obter o contador de alterações do banco: (geração, PRAGMA data_version) muda
+# a cada commit de outra conexão, deste ou de outro processo. O PRAGMA não lê tabelas, e
+# serve para validar caches em memória sem consultar o banco enquanto nada foi gravado
+def contador_alteracoes():
+    global _conexao_alteracoes
+    with _lock:
+        if _conexao_alteracoes is None:
+            _conexao_alteracoes = sqlite3.connect(CAMINHO_BD, check_same_thread=False,
+                                                  timeout=TIMEOUT_OCUPADO_MS / 1000)
+        return _geracao, _conexao_alteracoes.execute('PRAGMA data_version').fetchone()[0]
+
+
+# Função para obter as estatísticas do pool de conexões
+def estatisticas_pool():
+    pool = obter_engine().pool
+    with _lock:
+        contadores = dict(_contadores)
+    return {
+        'tamanho_pool': pool.size(),
+        'conexoes_abertas': pool.checkedin() + pool.checkedout(),
+        'conexoes_em_uso': pool.checkedout(),
+        'conexoes_criadas': contadores['conexoes_criadas'],
+        'checkouts': contadores['checkouts'],
+        'reutilizacoes': max(contadores['checkouts'] - contadores['conexoes_criadas'], 0),
+    }
+
+
+# Função para descartar o pool (usada ao trocar de banco de dados)
+def fechar_pool():
+    global _engine, _conexao_alteracoes, _geracao
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        if _conexao_alteracoes is not None:
+            _conexao_alteracoes.close()
+            _conexao_alteracoes = None
+        _geracao += 1
+        for chave in _contadores:
+            _contadores[chave] = 0
+
+
+# Função para trocar o arquivo de banco de dados usado pelo processo
+def definir_caminho_bd(caminho):
+    global CAMINHO_BD
+    fechar_pool()
+    CAMINHO_BD = caminho
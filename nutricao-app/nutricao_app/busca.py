@@ -0,0 +1,111 @@
+import re
+import sqlite3
+import unicodedata
+from contextlib import contextmanager
+from functools import lru_cache
+
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.repositorio import buscar_alimentos_fts, buscar_alimentos_por_nome
+
+# Quantidade máxima de sugestões retornadas pela busca
+LIMITE_SUGESTOES = 10
+
+# Quantidade máxima de candidatos ordenados por relevância em cada busca
+# (termos muito curtos casam com milhares de alimentos e o bm25 é calculado por linha)
+LIMITE_CANDIDATOS = 500
+
+GATILHO_INSERIR_BUSCA = '''
+CREATE TRIGGER IF NOT EXISTS alimentos_taco_fts_inserir
+AFTER INSERT ON alimentos_taco
+BEGIN
+    INSERT INTO alimentos_taco_fts (rowid, nome) VALUES (NEW.id, NEW.nome);
+END
+'''
+
+# Comandos da migração que cria o índice de texto completo sobre alimentos_taco.nome
+# (tokenizador unicode61 com remoção de acentos: "feijao" encontra "Feijão")
+COMANDOS_INDICE_BUSCA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS alimentos_taco_fts USING fts5(
+        nome,
+        content='alimentos_taco',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    GATILHO_INSERIR_BUSCA,
+    '''
+    CREATE TRIGGER IF NOT EXISTS alimentos_taco_fts_excluir
+    AFTER DELETE ON alimentos_taco
+    BEGIN
+        INSERT INTO alimentos_taco_fts (alimentos_taco_fts, rowid, nome) VALUES ('delete', OLD.id, OLD.nome);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS alimentos_taco_fts_alterar
+    AFTER UPDATE OF nome ON alimentos_taco
+    BEGIN
+        INSERT INTO alimentos_taco_fts (alimentos_taco_fts, rowid, nome) VALUES ('delete', OLD.id, OLD.nome);
+        INSERT INTO alimentos_taco_fts (rowid, nome) VALUES (NEW.id, NEW.nome);
+    END
+    ''',
+    "INSERT INTO alimentos_taco_fts (alimentos_taco_fts) VALUES ('rebuild')",
+]
+
+
+# Função para remover acentos e padronizar o texto digitado
+def normalizar_termo(texto):
+    sem_acentos = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in sem_acentos if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+# Função para montar a expressão FTS5: todas as palavras, cada uma como prefixo
+def montar_consulta_fts(termo_normalizado):
+    palavras = re.findall(r'\w+', termo_normalizado)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+# Função para buscar alimentos pelo nome usando o índice de texto completo
+# Retorna uma tupla de (id, nome, energia_kcal, proteina_g, lipideos_g, carboidrato_g)
+# ordenada por relevância
+@rastrear
+def buscar_alimentos(texto, limite=LIMITE_SUGESTOES):
+    return _buscar_alimentos(normalizar_termo(texto), limite)
+
+
+@lru_cache(maxsize=2048)
+def _buscar_alimentos(termo, limite):
+    consulta = montar_consulta_fts(termo)
+    if not consulta:
+        return ()
+
+    try:
+        return tuple(buscar_alimentos_fts(consulta, LIMITE_CANDIDATOS, limite))
+    except sqlite3.OperationalError:
+        # Índice de busca ainda não criado: busca parcial sem índice
+        return tuple(buscar_alimentos_por_nome(termo, limite))
+
+
+# Contexto para cargas em massa em alimentos_taco: desliga o gatilho de inserção
+# do índice de busca e indexa as linhas novas de uma só vez ao final
+# (deve ser usado dentro da transação da carga; um rollback restaura o gatilho)
+@contextmanager
+def carga_em_massa_busca(conn):
+    gatilho = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'alimentos_taco_fts_inserir'"
+    ).fetchone()
+    if not gatilho:
+        yield
+        return
+
+    maior_id = conn.execute('SELECT IFNULL(MAX(id), 0) FROM alimentos_taco').fetchone()[0]
+    conn.execute('DROP TRIGGER alimentos_taco_fts_inserir')
+    yield
+    conn.execute('INSERT INTO alimentos_taco_fts (rowid, nome) SELECT id, nome FROM alimentos_taco WHERE id > ?', (maior_id,))
+    conn.execute(GATILHO_INSERIR_BUSCA)
+
+
+# Função para descartar o cache de buscas (chamar após alterar a tabela TACO)
+def limpar_cache_busca():
+    _buscar_alimentos.cache_clear()
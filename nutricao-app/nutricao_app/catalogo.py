@@ -0,0 +1,175 @@
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from nutricao_app.repositorio import contar_linhas
+from nutricao_app.taco import LINHAS_TACO_COMPLETA, importar_csv_taco
+
+# URL da tabela TACO em formato CSV (pode ser alterada pela variável de ambiente NUTRICAO_TACO_URL)
+URL_TACO = os.environ.get('NUTRICAO_TACO_URL', 'https://www.nepa.unicamp.br/taco/tabela/taco_4_edicao_2011.csv')
+
+# Pasta do cache de download (CSV + ETag/Last-Modified para requisições condicionais)
+PASTA_CACHE = os.environ.get('NUTRICAO_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'nutricao-app'))
+
+# Timeouts de conexão e de leitura (segundos), tentativas e espera inicial entre tentativas
+TIMEOUT = (3.05, 15)
+TENTATIVAS = 3
+ESPERA_INICIAL = 0.5
+TAMANHO_BLOCO = 64 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalogo-taco')
+_lock = threading.Lock()
+_futuro = None
+
+
+# Estado do carregamento do catálogo, lido pela interface a cada execução do script
+class EstadoCatalogo:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.situacao = 'ocioso'  # ocioso, carregando, pronto ou erro
+        self.bytes_recebidos = 0
+        self.bytes_total = None
+        self.tentativa = 0
+        self.mensagem = ''
+        self.linhas = 0
+        self.atualizado_em = None
+
+    def atualizar(self, **campos):
+        with self._lock:
+            for campo, valor in campos.items():
+                setattr(self, campo, valor)
+            self.atualizado_em = datetime.now()
+
+    def copia(self):
+        with self._lock:
+            return {
+                'situacao': self.situacao,
+                'bytes_recebidos': self.bytes_recebidos,
+                'bytes_total': self.bytes_total,
+                'progresso': self.bytes_recebidos / self.bytes_total if self.bytes_total else None,
+                'tentativa': self.tentativa,
+                'mensagem': self.mensagem,
+                'linhas': self.linhas,
+            }
+
+
+estado = EstadoCatalogo()
+
+
+def _caminhos_cache(pasta):
+    return os.path.join(pasta, 'taco.csv'), os.path.join(pasta, 'taco.json')
+
+
+# Função para ler os metadados (ETag/Last-Modified) do último download da URL
+def _ler_metadados(pasta, url):
+    caminho_csv, caminho_meta = _caminhos_cache(pasta)
+    if not (os.path.exists(caminho_csv) and os.path.exists(caminho_meta)):
+        return {}
+    with open(caminho_meta, encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+    return metadados if metadados.get('url') == url else {}
+
+
+# Função para gravar o CSV baixado e seus metadados no cache
+def _gravar_cache(pasta, url, conteudo, resposta):
+    os.makedirs(pasta, exist_ok=True)
+    caminho_csv, caminho_meta = _caminhos_cache(pasta)
+    with open(f'{caminho_csv}.tmp', 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(f'{caminho_csv}.tmp', caminho_csv)
+    with open(caminho_meta, 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'url': url,
+            'etag': resposta.headers.get('ETag'),
+            'last_modified': resposta.headers.get('Last-Modified'),
+        }, arquivo)
+
+
+# Função para baixar o CSV com timeout, tentativas com espera exponencial e requisição condicional
+# Retorna o conteúdo do CSV (do servidor ou do cache, quando a resposta é 304)
+def baixar_catalogo(url=URL_TACO, pasta_cache=PASTA_CACHE, sessao=None, timeout=TIMEOUT,
+                    tentativas=TENTATIVAS, espera_inicial=ESPERA_INICIAL):
+    sessao = sessao or requests.Session()
+    metadados = _ler_metadados(pasta_cache, url)
+    cabecalhos = {}
+    if metadados.get('etag'):
+        cabecalhos['If-None-Match'] = metadados['etag']
+    if metadados.get('last_modified'):
+        cabecalhos['If-Modified-Since'] = metadados['last_modified']
+
+    for tentativa in range(1, tentativas + 1):
+        estado.atualizar(tentativa=tentativa, bytes_recebidos=0, bytes_total=None,
+                         mensagem=f'Baixando tabela TACO (tentativa {tentativa} de {tentativas})')
+        try:
+            with sessao.get(url, headers=cabecalhos, timeout=timeout, stream=True) as resposta:
+                if resposta.status_code == 304:
+                    with open(_caminhos_cache(pasta_cache)[0], 'rb') as arquivo:
+                        return arquivo.read()
+
+                if resposta.status_code >= 500 or resposta.status_code == 429:
+                    raise requests.HTTPError(f'Servidor respondeu {resposta.status_code}', response=resposta)
+                resposta.raise_for_status()
+
+                total = resposta.headers.get('Content-Length')
+                estado.atualizar(bytes_total=int(total) if total else None)
+                buffer = io.BytesIO()
+                for bloco in resposta.iter_content(TAMANHO_BLOCO):
+                    buffer.write(bloco)
+                    estado.atualizar(bytes_recebidos=buffer.tell())
+
+                conteudo = buffer.getvalue()
+                _gravar_cache(pasta_cache, url, conteudo, resposta)
+                return conteudo
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError,
+                requests.exceptions.ChunkedEncodingError) as erro:
+            resposta = getattr(erro, 'response', None)
+            repetir = resposta is None or resposta.status_code >= 500 or resposta.status_code == 429
+            if not repetir or tentativa == tentativas:
+                raise
+            time.sleep(espera_inicial * 2 ** (tentativa - 1))
+
+
+# Função executada em segundo plano: baixa o CSV e troca o catálogo em uma única transação
+def _carregar_catalogo(url, pasta_cache):
+    estado.atualizar(situacao='carregando', mensagem='Baixando tabela TACO', linhas=0)
+    try:
+        conteudo = baixar_catalogo(url, pasta_cache)
+        estado.atualizar(mensagem='Gravando tabela TACO')
+        estatisticas = importar_csv_taco(io.BytesIO(conteudo), substituir=True)
+    except Exception as erro:
+        estado.atualizar(situacao='erro', mensagem=f'Erro ao carregar tabela TACO: {erro}')
+        raise
+
+    estado.atualizar(situacao='pronto', linhas=estatisticas['linhas'],
+                     mensagem=f"Tabela TACO carregada ({estatisticas['linhas']} alimentos)")
+    return estatisticas
+
+
+# Função para iniciar o carregamento do catálogo em segundo plano (uma vez por vez)
+# Retorna o Future do carregamento em andamento
+def iniciar_carregamento_catalogo(url=URL_TACO, pasta_cache=PASTA_CACHE):
+    global _futuro
+    with _lock:
+        if _futuro is None or _futuro.done():
+            estado.atualizar(situacao='carregando', mensagem='Aguardando download da tabela TACO')
+            _futuro = _executor.submit(_carregar_catalogo, url, pasta_cache)
+        return _futuro
+
+
+# Função para baixar a tabela completa em segundo plano quando o banco só tem a tabela de
+# exemplo (a do snapshot distribuído ou a embutida no app); retorna o Future ou None
+def garantir_catalogo_completo(url=URL_TACO, pasta_cache=PASTA_CACHE):
+    if contar_linhas('alimentos_taco') >= LINHAS_TACO_COMPLETA:
+        return None
+    return iniciar_carregamento_catalogo(url, pasta_cache)
+
+
+# Função para obter o estado atual do carregamento do catálogo
+def estado_catalogo():
+    return estado.copia()
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# Datas de refeições, medidas e resumo diário são gravadas como número do dia
+# (dias desde 1970-01-01): inteiro compacto, comparado e indexado como número
+# e convertido em lote para datetime64 na leitura
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+
+# Função para converter uma data (date, datetime, Timestamp, datetime64 ou texto
+# 'AAAA-MM-DD') no número do dia gravado no banco
+def para_dia(valor):
+    if isinstance(valor, (int, np.integer)):
+        return int(valor)
+    if isinstance(valor, str):
+        valor = date.fromisoformat(valor[:10])
+    elif isinstance(valor, np.datetime64):
+        valor = pd.Timestamp(valor)
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    return valor.toordinal() - _ORDINAL_EPOCA
+
+
+# Função para converter o número do dia em date
+def de_dia(dia):
+    return date.fromordinal(int(dia) + _ORDINAL_EPOCA)
+
+
+# Função para converter uma coluna de números do dia em datetime64 (NULL vira NaT)
+# (conversão direta no NumPy: bem mais barata que pd.to_datetime a cada consulta)
+def dias_para_datetime(dias):
+    dias = np.asarray(dias, dtype=np.float64)
+    nulos = np.isnan(dias)
+    datas = np.where(nulos, 0, dias).astype(np.int64).astype('datetime64[D]')
+    datas[nulos] = np.datetime64('NaT')
+    return datas.astype('datetime64[s]')
@@ -0,0 +1,166 @@
+import argparse
+import csv
+import gzip
+import io
+import os
+
+from nutricao_app import banco, repositorio
+from nutricao_app.datas import de_dia, para_dia
+from nutricao_app.registros import ESQUEMA_MEDIDAS, ESQUEMA_REFEICOES
+from nutricao_app.usuarios import USUARIO_PADRAO, obter_id_usuario
+
+# pyarrow é opcional: sem ele, só as exportações em CSV ficam disponíveis
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Linhas lidas do banco e gravadas por vez (a memória usada não depende do tamanho do histórico)
+TAMANHO_LOTE = 50000
+
+# Tamanho máximo do arquivo entregue pelo botão de download do app (NUTRICAO_EXPORTACAO_MAXIMO_MB):
+# o Streamlit guarda o arquivo inteiro na memória do servidor até o download, então exportações
+# maiores são feitas por período ou pela linha de comando, que grava direto no destino
+TAMANHO_MAXIMO_DOWNLOAD = int(os.environ.get('NUTRICAO_EXPORTACAO_MAXIMO_MB', '50')) * 1024 * 1024
+
+# Tabelas exportáveis e suas colunas (na ordem do arquivo)
+TABELAS_EXPORTACAO = {
+    'refeicoes': ESQUEMA_REFEICOES,
+    'medidas': ESQUEMA_MEDIDAS,
+}
+
+# Formatos de exportação: extensão do arquivo e tipo MIME
+FORMATOS_EXPORTACAO = {
+    'csv': ('.csv', 'text/csv'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+FORMATOS_PYARROW = {'parquet', 'arrow'}
+
+
+# Função para listar os formatos disponíveis no ambiente (parquet e arrow exigem pyarrow)
+def formatos_disponiveis():
+    return [formato for formato in FORMATOS_EXPORTACAO if pa is not None or formato not in FORMATOS_PYARROW]
+
+
+# Função para ler as linhas de uma tabela do usuário em lotes, ordenadas por data
+# (datas como número do dia; data_inicio e data_fim são opcionais e inclusivas)
+def ler_lotes(usuario_id, tabela, data_inicio=None, data_fim=None, tamanho_lote=TAMANHO_LOTE):
+    return repositorio.ler_lotes(tabela, list(TABELAS_EXPORTACAO[tabela]), usuario_id,
+                                 None if data_inicio is None else para_dia(data_inicio),
+                                 None if data_fim is None else para_dia(data_fim), tamanho_lote)
+
+
+# Função para gravar os lotes como CSV em um arquivo de texto
+# (datas convertidas por consulta a um dicionário: há poucos dias distintos por lote)
+def _escrever_csv(arquivo, colunas, lotes):
+    escritor = csv.writer(arquivo, lineterminator='\n')
+    escritor.writerow(colunas)
+    posicao_data = colunas.index('data')
+    datas = {None: ''}
+
+    total = 0
+    for linhas in lotes:
+        for dia in {linha[posicao_data] for linha in linhas}:
+            if dia not in datas:
+                datas[dia] = de_dia(dia).isoformat()
+        escritor.writerows(
+            linha[:posicao_data] + (datas[linha[posicao_data]],) + linha[posicao_data + 1:] for linha in linhas
+        )
+        total += len(linhas)
+    return total
+
+
+# Função para montar o esquema Arrow de uma tabela (data como date32, que também
+# conta dias desde 1970-01-01; números em float64, como gravados no banco)
+def _esquema_arrow(esquema):
+    tipos = {'category': pa.string(), 'datetime64[s]': pa.date32()}
+    return pa.schema([(coluna, tipos.get(tipo, pa.float64())) for coluna, tipo in esquema.items()])
+
+
+# Função para converter um lote de linhas em um RecordBatch
+def _lote_arrow(linhas, esquema_arrow):
+    colunas = []
+    for valores, campo in zip(zip(*linhas), esquema_arrow):
+        if campo.type == pa.date32():
+            colunas.append(pa.array(valores, type=pa.int32()).view(pa.date32()))
+        else:
+            colunas.append(pa.array(valores, type=campo.type))
+    return pa.RecordBatch.from_arrays(colunas, schema=esquema_arrow)
+
+
+# Função para gravar os lotes como Parquet ou Arrow (arquivo IPC) em um arquivo binário
+def _escrever_arrow(arquivo, esquema, lotes, formato):
+    esquema_arrow = _esquema_arrow(esquema)
+    if formato == 'parquet':
+        escritor = pq.ParquetWriter(arquivo, esquema_arrow, compression='zstd')
+    else:
+        escritor = pa.ipc.new_file(arquivo, esquema_arrow)
+
+    total = 0
+    try:
+        for linhas in lotes:
+            escritor.write_batch(_lote_arrow(linhas, esquema_arrow))
+            total += len(linhas)
+    finally:
+        escritor.close()
+    return total
+
+
+# Função para exportar uma tabela do usuário direto do banco, lote a lote
+# destino: caminho do arquivo ou arquivo binário aberto para escrita
+# Retorna o número de linhas exportadas
+def exportar_dados(destino, usuario_id, tabela, formato='csv', data_inicio=None, data_fim=None,
+                   tamanho_lote=TAMANHO_LOTE):
+    if tabela not in TABELAS_EXPORTACAO:
+        raise ValueError(f'Tabela não exportável: {tabela}')
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f'Formato de exportação desconhecido: {formato}')
+    if formato in FORMATOS_PYARROW and pa is None:
+        raise ImportError(f'A exportação em {formato} requer o pacote pyarrow')
+
+    esquema = TABELAS_EXPORTACAO[tabela]
+    lotes = ler_lotes(usuario_id, tabela, data_inicio, data_fim, tamanho_lote)
+
+    arquivo = open(destino, 'wb') if isinstance(destino, (str, os.PathLike)) else destino
+    try:
+        if formato in FORMATOS_PYARROW:
+            return _escrever_arrow(arquivo, esquema, lotes, formato)
+
+        binario = gzip.GzipFile(fileobj=arquivo, mode='wb', compresslevel=6) if formato == 'csv.gz' else arquivo
+        texto = io.TextIOWrapper(binario, encoding='utf-8', newline='', write_through=False)
+        try:
+            return _escrever_csv(texto, list(esquema), lotes)
+        finally:
+            texto.flush()
+            # Desanexa o texto para não fechar o arquivo recebido; o gzip grava o rodapé ao fechar
+            texto.detach()
+            if binario is not arquivo:
+                binario.close()
+    finally:
+        lotes.close()
+        if arquivo is not destino:
+            arquivo.close()
+
+
+# Exportação manual: python -m nutricao_app.exportacao destino [--tabela refeicoes] [--formato csv]
+#                    [--usuario nome] [--inicio AAAA-MM-DD] [--fim AAAA-MM-DD] [--banco caminho]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta refeições ou medidas de um usuário')
+    parser.add_argument('destino')
+    parser.add_argument('--tabela', choices=list(TABELAS_EXPORTACAO), default='refeicoes')
+    parser.add_argument('--formato', choices=list(FORMATOS_EXPORTACAO), default='csv')
+    parser.add_argument('--usuario', default=USUARIO_PADRAO)
+    parser.add_argument('--inicio')
+    parser.add_argument('--fim')
+    parser.add_argument('--banco', help='arquivo do banco (padrão: NUTRICAO_DB ou nutricao.db)')
+    argumentos = parser.parse_args()
+
+    if argumentos.banco:
+        banco.definir_caminho_bd(argumentos.banco)
+
+    linhas = exportar_dados(argumentos.destino, obter_id_usuario(argumentos.usuario), argumentos.tabela,
+                            argumentos.formato, argumentos.inicio, argumentos.fim)
+    print(f'{linhas} linhas exportadas para {argumentos.destino}')
@@ -0,0 +1,307 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import plotly.graph_objects as go
+
+from nutricao_app.agregacao import obter_consumo_agregado, obter_progresso_agregado
+from nutricao_app.datas import para_dia
+from nutricao_app.metas import obter_metas, versao_metas
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.versoes import versao_dados
+
+# Quantidade máxima de conjuntos de figuras mantidos em memória (todas as sessões do processo)
+TAMANHO_CACHE_FIGURAS = 256
+
+# Complemento do título conforme a granularidade das séries agregadas
+SUFIXOS_GRANULARIDADE = {
+    'dia': '',
+    'semana': ' (média por semana)',
+    'mes': ' (média por mês)',
+    'ano': ' (média por ano)',
+}
+
+
+# Cache LRU das figuras do dashboard, compartilhado pelas sessões do processo
+# A chave inclui as versões dos dados e das metas do usuário, lidas do banco: uma gravação
+# (deste ou de outro processo) gera uma versão nova e as figuras antigas deixam de ser
+# usadas (e saem do cache pelo LRU)
+class CacheFiguras:
+    def __init__(self, tamanho=TAMANHO_CACHE_FIGURAS):
+        self.tamanho = tamanho
+        self._figuras = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, construir):
+        with self._lock:
+            if chave in self._figuras:
+                self._figuras.move_to_end(chave)
+                self.acertos += 1
+                return self._figuras[chave]
+            self.faltas += 1
+
+        # Construção fora da trava: sessões com chaves diferentes não esperam umas pelas outras
+        figuras = construir()
+
+        with self._lock:
+            self._figuras[chave] = figuras
+            self._figuras.move_to_end(chave)
+            while len(self._figuras) > self.tamanho:
+                self._figuras.popitem(last=False)
+        return figuras
+
+    def limpar(self):
+        with self._lock:
+            self._figuras.clear()
+            self.acertos = self.faltas = 0
+
+    def __len__(self):
+        return len(self._figuras)
+
+
+cache_figuras = CacheFiguras()
+
+
+# Função para gerar gráfico de consumo diário por macronutriente
+# (recebe o consumo do usuário já agregado, uma linha por dia, semana, mês ou ano)
+# Retorna as figuras de calorias e de macronutrientes
+@rastrear
+def gerar_grafico_consumo_diario(df_agrupado, metas, granularidade='dia'):
+    sufixo = SUFIXOS_GRANULARIDADE[granularidade]
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=df_agrupado['data'],
+        y=df_agrupado['calorias'],
+        mode='lines+markers',
+        name='Calorias',
+        line=dict(color='#FFA500', width=2),
+        marker=dict(size=8)
+    ))
+
+    fig.update_layout(
+        title=f'Consumo Calórico Diário{sufixo}',
+        xaxis_title='Data',
+        yaxis_title='Calorias (kcal)',
+        template='plotly_white',
+        height=400,
+        hovermode='x unified'
+    )
+
+    # Adicionar linha de meta calórica
+    fig.add_shape(
+        type="line",
+        x0=df_agrupado['data'].min(),
+        y0=metas['calorias_diarias'],
+        x1=df_agrupado['data'].max(),
+        y1=metas['calorias_diarias'],
+        line=dict(color="red", width=2, dash="dash"),
+    )
+
+    fig.add_annotation(
+        x=df_agrupado['data'].max(),
+        y=metas['calorias_diarias'],
+        text="Meta",
+        showarrow=False,
+        yshift=10,
+        font=dict(color="red")
+    )
+
+    # Gráfico de macronutrientes
+    fig_macro = go.Figure()
+
+    fig_macro.add_trace(go.Scatter(
+        x=df_agrupado['data'],
+        y=df_agrupado['proteinas'],
+        mode='lines+markers',
+        name='Proteínas (g)',
+        line=dict(color='#007BFF', width=2),
+        marker=dict(size=8)
+    ))
+
+    fig_macro.add_trace(go.Scatter(
+        x=df_agrupado['data'],
+        y=df_agrupado['carboidratos'],
+        mode='lines+markers',
+        name='Carboidratos (g)',
+        line=dict(color='#28A745', width=2),
+        marker=dict(size=8)
+    ))
+
+    fig_macro.add_trace(go.Scatter(
+        x=df_agrupado['data'],
+        y=df_agrupado['gorduras'],
+        mode='lines+markers',
+        name='Gorduras (g)',
+        line=dict(color='#DC3545', width=2),
+        marker=dict(size=8)
+    ))
+
+    fig_macro.update_layout(
+        title=f'Consumo Diário de Macronutrientes{sufixo}',
+        xaxis_title='Data',
+        yaxis_title='Quantidade (g)',
+        template='plotly_white',
+        height=400,
+        hovermode='x unified'
+    )
+
+    return fig, fig_macro
+
+
+# Função para gerar gráfico de progresso corporal
+# (peso e gordura corporal já reduzidos com LTTB; cintura e quadril agregados por período)
+# Retorna as figuras de peso, de gordura corporal e de medidas
+@rastrear
+def gerar_grafico_progresso_corporal(df_peso, df_gordura, df_circunferencias, metas, granularidade='dia'):
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=df_peso['data'],
+        y=df_peso['peso'],
+        mode='lines+markers',
+        name='Peso (kg)',
+        line=dict(color='#007BFF', width=2),
+        marker=dict(size=8)
+    ))
+
+    # Adicionar linha de meta de peso
+    fig.add_shape(
+        type="line",
+        x0=df_peso['data'].min(),
+        y0=metas['peso_meta'],
+        x1=df_peso['data'].max(),
+        y1=metas['peso_meta'],
+        line=dict(color="red", width=2, dash="dash"),
+    )
+
+    fig.add_annotation(
+        x=df_peso['data'].max(),
+        y=metas['peso_meta'],
+        text="Meta",
+        showarrow=False,
+        yshift=10,
+        font=dict(color="red")
+    )
+
+    fig.update_layout(
+        title='Progresso de Peso Corporal',
+        xaxis_title='Data',
+        yaxis_title='Peso (kg)',
+        template='plotly_white',
+        height=400,
+        hovermode='x unified'
+    )
+
+    # Gráfico de composição corporal
+    fig_comp = go.Figure()
+
+    fig_comp.add_trace(go.Scatter(
+        x=df_gordura['data'],
+        y=df_gordura['gordura_corporal'],
+        mode='lines+markers',
+        name='Gordura Corporal (%)',
+        line=dict(color='#FFC107', width=2),
+        marker=dict(size=8)
+    ))
+
+    # Adicionar linha de meta de gordura corporal
+    fig_comp.add_shape(
+        type="line",
+        x0=df_gordura['data'].min(),
+        y0=metas['gordura_corporal_meta'],
+        x1=df_gordura['data'].max(),
+        y1=metas['gordura_corporal_meta'],
+        line=dict(color="red", width=2, dash="dash"),
+    )
+
+    fig_comp.add_annotation(
+        x=df_gordura['data'].max(),
+        y=metas['gordura_corporal_meta'],
+        text="Meta",
+        showarrow=False,
+        yshift=10,
+        font=dict(color="red")
+    )
+
+    fig_comp.update_layout(
+        title='Progresso de Gordura Corporal',
+        xaxis_title='Data',
+        yaxis_title='Gordura Corporal (%)',
+        template='plotly_white',
+        height=400,
+        hovermode='x unified'
+    )
+
+    # Gráfico de medidas
+    fig_medidas = go.Figure()
+
+    fig_medidas.add_trace(go.Scatter(
+        x=df_circunferencias['data'],
+        y=df_circunferencias['cintura'],
+        mode='lines+markers',
+        name='Cintura (cm)',
+        line=dict(color='#6610F2', width=2),
+        marker=dict(size=8)
+    ))
+
+    fig_medidas.add_trace(go.Scatter(
+        x=df_circunferencias['data'],
+        y=df_circunferencias['quadril'],
+        mode='lines+markers',
+        name='Quadril (cm)',
+        line=dict(color='#E83E8C', width=2),
+        marker=dict(size=8)
+    ))
+
+    fig_medidas.update_layout(
+        title=f'Progresso de Medidas Corporais{SUFIXOS_GRANULARIDADE[granularidade]}',
+        xaxis_title='Data',
+        yaxis_title='Medida (cm)',
+        template='plotly_white',
+        height=400,
+        hovermode='x unified'
+    )
+
+    return fig, fig_comp, fig_medidas
+
+
+# Função para obter as figuras de consumo do período (do cache, se os dados e as
+# metas do usuário não mudaram). data_inicio None mostra todo o histórico
+# Retorna uma tupla vazia se não há refeições no período
+@rastrear
+def figuras_consumo_diario(usuario_id, data_inicio=None):
+    # O dia de hoje entra na chave porque define o intervalo visível (e a granularidade)
+    chave = ('consumo', usuario_id, versao_dados(usuario_id, 'refeicoes'), versao_metas(usuario_id),
+             para_dia(data_inicio) if data_inicio is not None else None, para_dia(date.today()))
+
+    def construir():
+        df_periodo, granularidade = obter_consumo_agregado(usuario_id, data_inicio)
+        if df_periodo.empty:
+            return ()
+        return gerar_grafico_consumo_diario(df_periodo, obter_metas(usuario_id), granularidade)
+
+    return cache_figuras.obter(chave, construir)
+
+
+# Função para obter as figuras de progresso corporal (do cache, se as medidas e as
+# metas do usuário não mudaram). Retorna uma tupla vazia se não há medidas
+@rastrear
+def figuras_progresso_corporal(usuario_id):
+    chave = ('progresso', usuario_id, versao_dados(usuario_id, 'medidas'), versao_metas(usuario_id))
+
+    def construir():
+        df_peso, df_gordura, df_circunferencias, granularidade = obter_progresso_agregado(usuario_id)
+        if df_peso.empty and df_gordura.empty and df_circunferencias.empty:
+            return ()
+        return gerar_grafico_progresso_corporal(df_peso, df_gordura, df_circunferencias,
+                                                obter_metas(usuario_id), granularidade)
+
+    return cache_figuras.obter(chave, construir)
+
+
+# Função para descartar as figuras em cache (ex.: após gravações feitas fora do processo)
+def limpar_cache_figuras():
+    cache_figuras.limpar()
@@ -0,0 +1,219 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from nutricao_app.banco import conectar_bd
+
+# Gravador único de inserções: as gravações de todas as sessões entram em uma fila e
+# uma thread as grava em lotes, cada lote em uma só transação (um commit por lote, em
+# vez de um por linha, e um único escritor disputando o lock de escrita do SQLite)
+
+# Um lote fecha ao juntar LOTE_MAXIMO inserções ou ESPERA_LOTE depois da chegada da
+# mais antiga. Sem espera, o lote leva o que chegou durante o commit anterior: com várias
+# sessões gravando, os lotes se formam sozinhos, e uma gravação isolada não espera
+LOTE_MAXIMO = int(os.environ.get('NUTRICAO_GRAVACAO_LOTE', '256'))
+ESPERA_LOTE = float(os.environ.get('NUTRICAO_GRAVACAO_ESPERA_MS', '0')) / 1000
+
+# Contrapressão: inserções pendentes aceitas na fila; com a fila cheia, enfileirar
+# espera até ESPERA_FILA segundos por espaço e então levanta TimeoutError
+TAMANHO_MAXIMO_FILA = int(os.environ.get('NUTRICAO_GRAVACAO_FILA', '10000'))
+ESPERA_FILA = 5.0
+
+# Sincronização usada nos commits do gravador: com o WAL em FULL, o commit só termina
+# depois do fsync, e o futuro de cada inserção é resolvido quando a linha está no disco
+# (o custo do fsync é dividido pelo lote)
+SINCRONIZACAO_GRAVADOR = 'FULL'
+
+# Lotes recentes usados nas estatísticas de tamanho e de latência
+AMOSTRAS_ESTATISTICAS = 1000
+
+_FIM = object()
+
+
+# Gravador em lotes (uma thread, iniciada na primeira inserção)
+class GravadorEmGrupo:
+    def __init__(self, lote_maximo=LOTE_MAXIMO, espera_lote=ESPERA_LOTE, tamanho_fila=TAMANHO_MAXIMO_FILA):
+        self.lote_maximo = lote_maximo
+        self.espera_lote = espera_lote
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._contadores = {'lotes': 0, 'linhas': 0, 'falhas': 0, 'rejeicoes': 0, 'maior_lote': 0}
+        self._tamanhos = deque(maxlen=AMOSTRAS_ESTATISTICAS)
+        self._latencias_commit = deque(maxlen=AMOSTRAS_ESTATISTICAS)
+        self._esperas = deque(maxlen=AMOSTRAS_ESTATISTICAS)
+
+    # Enfileira uma inserção (sql e parâmetros de um INSERT de uma linha na tabela do usuário)
+    # Retorna um Future resolvido com o id da linha depois do commit do lote, ou com a
+    # exceção do SQLite se a linha não puder ser gravada; espera=0 não bloqueia com a fila cheia
+    def enfileirar(self, usuario_id, tabela, sql, parametros, espera=ESPERA_FILA):
+        self._iniciar()
+        futuro = Future()
+        try:
+            self.fila.put((usuario_id, tabela, sql, parametros, futuro, time.perf_counter()),
+                          block=espera != 0, timeout=espera or None)
+        except queue.Full:
+            with self._lock:
+                self._contadores['rejeicoes'] += 1
+            raise TimeoutError(f'Fila de gravação cheia ({self.fila.maxsize} inserções pendentes)')
+        return futuro
+
+    def _iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='gravador-em-grupo', daemon=True)
+                self._thread.start()
+
+    # Grava os pedidos pendentes e termina a thread (os pedidos já na fila são gravados)
+    def parar(self, timeout=None):
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self.fila.put(_FIM)
+        thread.join(timeout)
+
+    def _executar(self):
+        while True:
+            primeiro = self.fila.get()
+            if primeiro is _FIM:
+                return
+            lote, terminar = self._coletar_lote(primeiro)
+            lote = [pedido for pedido in lote if pedido[4].set_running_or_notify_cancel()]
+            if lote:
+                try:
+                    self._gravar_lote(lote)
+                except Exception as e:
+                    # Erro fora do SQLite (ex.: banco inacessível): falha os pedidos, não a thread
+                    for pedido in lote:
+                        if not pedido[4].done():
+                            pedido[4].set_exception(e)
+            if terminar:
+                return
+
+    # Junta ao primeiro pedido os que já estão na fila e os que chegarem até o fim da
+    # espera do lote. Retorna (lote, terminar)
+    def _coletar_lote(self, primeiro):
+        lote = [primeiro]
+        limite = primeiro[5] + self.espera_lote
+        while len(lote) < self.lote_maximo:
+            restante = limite - time.perf_counter()
+            try:
+                pedido = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if pedido is _FIM:
+                return lote, True
+            lote.append(pedido)
+        return lote, False
+
+    # Grava o lote em uma transação; se alguma linha falhar, grava uma a uma para que só
+    # os pedidos com erro recebam a exceção
+    # (a sincronização da conexão volta à anterior mesmo se o lote falhar: a conexão é do pool)
+    def _gravar_lote(self, lote):
+        conn = conectar_bd()
+        try:
+            sincronizacao = conn.execute('PRAGMA synchronous').fetchone()[0]
+            conn.execute(f'PRAGMA synchronous = {SINCRONIZACAO_GRAVADOR}')
+            try:
+                inicio = time.perf_counter()
+                try:
+                    cursor = conn.cursor()
+                    ids = []
+                    for _, _, sql, parametros, _, _ in lote:
+                        cursor.execute(sql, parametros)
+                        ids.append(cursor.lastrowid)
+                    conn.commit()
+                    resultados = list(zip(lote, ids))
+                except sqlite3.Error:
+                    conn.rollback()
+                    resultados = [(pedido, self._gravar_pedido(conn, pedido)) for pedido in lote]
+                fim = time.perf_counter()
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute(f'PRAGMA synchronous = {sincronizacao}')
+        finally:
+            conn.close()
+
+        gravados = [(pedido, resultado) for pedido, resultado in resultados if not isinstance(resultado, Exception)]
+
+        with self._lock:
+            self._contadores['lotes'] += 1
+            self._contadores['linhas'] += len(gravados)
+            self._contadores['falhas'] += len(resultados) - len(gravados)
+            self._contadores['maior_lote'] = max(self._contadores['maior_lote'], len(lote))
+            self._tamanhos.append(len(lote))
+            self._latencias_commit.append(fim - inicio)
+            self._esperas.extend(fim - pedido[5] for pedido in lote)
+
+        for pedido, resultado in resultados:
+            if isinstance(resultado, Exception):
+                pedido[4].set_exception(resultado)
+            else:
+                pedido[4].set_result(resultado)
+
+    # Grava um pedido em sua própria transação. Retorna o id da linha ou a exceção
+    def _gravar_pedido(self, conn, pedido):
+        try:
+            cursor = conn.execute(pedido[2], pedido[3])
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            conn.rollback()
+            return e
+
+    # Estatísticas do gravador: lotes, linhas, tamanho dos lotes, latência dos commits e
+    # espera total de cada inserção (da fila ao commit), em ms, e ocupação da fila
+    def estatisticas(self):
+        with self._lock:
+            contadores = dict(self._contadores)
+            tamanhos = np.array(self._tamanhos, dtype=np.float64)
+            latencias = np.array(self._latencias_commit) * 1000
+            esperas = np.array(self._esperas) * 1000
+
+        def percentis(valores, prefixo):
+            if not len(valores):
+                return {f'{prefixo}_medio': None, f'{prefixo}_p95': None, f'{prefixo}_max': None}
+            return {f'{prefixo}_medio': float(valores.mean()), f'{prefixo}_p95': float(np.percentile(valores, 95)),
+                    f'{prefixo}_max': float(valores.max())}
+
+        return {
+            **contadores,
+            **percentis(tamanhos, 'tamanho_lote'),
+            **percentis(latencias, 'commit_ms'),
+            **percentis(esperas, 'espera_ms'),
+            'fila_pendente': self.fila.qsize(),
+            'ocupacao_fila': self.fila.qsize() / self.fila.maxsize,
+        }
+
+
+_gravador = GravadorEmGrupo()
+
+
+# Função para enfileirar uma inserção no gravador do processo (ver GravadorEmGrupo.enfileirar)
+def enfileirar_insercao(usuario_id, tabela, sql, parametros, espera=ESPERA_FILA):
+    return _gravador.enfileirar(usuario_id, tabela, sql, parametros, espera)
+
+
+# Função para obter as estatísticas do gravador do processo
+def estatisticas_gravacao():
+    return _gravador.estatisticas()
+
+
+# Função para gravar as inserções pendentes e parar a thread do gravador
+# (chamada na saída do processo; a próxima inserção inicia a thread de novo)
+def parar_gravador(timeout=None):
+    _gravador.parar(timeout)
+
+
+atexit.register(parar_gravador)
@@ -0,0 +1,102 @@
+import pandas as pd
+
+from nutricao_app.datas import para_dia
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.registros import COLUNAS_REFEICOES, ESQUEMA_REFEICOES, concatenar_df, montar_df
+from nutricao_app.repositorio import ler_usuario, maior_id
+
+# Quantidade de dias mantida em memória por sessão (o dashboard mostra até 30 dias)
+JANELA_PADRAO_DIAS = 30
+
+
+# Função para calcular a data inicial da janela padrão
+def inicio_janela_padrao(dias=JANELA_PADRAO_DIAS):
+    return pd.Timestamp.now().normalize() - pd.Timedelta(days=dias)
+
+
+# Função para montar o DataFrame de refeições indexado pelo id
+def _montar_df(linhas):
+    return montar_df(linhas, {'id': 'int64', **ESQUEMA_REFEICOES}).set_index('id')
+
+
+# Função para consultar refeições de um usuário no banco com os filtros de ler_usuario
+# (dia, inicio, fim, apos_id, ate_id)
+def _consultar(usuario_id, ordem=('data', 'id'), **filtros):
+    return ler_usuario('refeicoes', ['id', *COLUNAS_REFEICOES], usuario_id, converter=_montar_df, ordem=ordem,
+                       **filtros)
+
+
+# Histórico de refeições de um usuário na sessão: mantém em memória apenas a janela
+# de datas usada pelas telas e busca no banco somente as linhas novas (id > último id visto)
+# (as datas recebidas podem ser date, datetime, Timestamp ou texto 'AAAA-MM-DD')
+class HistoricoRefeicoes:
+    @rastrear
+    def __init__(self, usuario_id, data_inicio=None):
+        self.usuario_id = usuario_id
+        self.data_inicio = pd.Timestamp(data_inicio).normalize() if data_inicio is not None else inicio_janela_padrao()
+        self.ultimo_id = maior_id('refeicoes', usuario_id)
+        self.refeicoes = _consultar(usuario_id, inicio=para_dia(self.data_inicio), ate_id=self.ultimo_id)
+
+    def _anexar(self, df_novas):
+        if df_novas.empty:
+            return
+        if self.refeicoes.empty:
+            self.refeicoes = df_novas
+        else:
+            self.refeicoes = concatenar_df([self.refeicoes, df_novas])
+        if not self.refeicoes['data'].is_monotonic_increasing:
+            self.refeicoes = self.refeicoes.sort_values('data', kind='stable')
+
+    # Busca apenas as refeições gravadas depois da última leitura
+    @rastrear
+    def atualizar(self):
+        df_novas = _consultar(self.usuario_id, ordem=('id',), apos_id=self.ultimo_id)
+        if df_novas.empty:
+            return 0
+
+        self.ultimo_id = int(df_novas.index.max())
+        df_novas = df_novas[df_novas['data'] >= self.data_inicio]
+        self._anexar(df_novas)
+        return len(df_novas)
+
+    # Ajusta a janela em memória: amplia carregando só o trecho que falta
+    # ou descarta as datas que saíram da janela
+    def ajustar_janela(self, data_inicio):
+        data_inicio = pd.Timestamp(data_inicio).normalize()
+        if data_inicio < self.data_inicio:
+            df_antigas = _consultar(self.usuario_id, inicio=para_dia(data_inicio), fim=para_dia(self.data_inicio) - 1,
+                                    ate_id=self.ultimo_id)
+            self.data_inicio = data_inicio
+            if not df_antigas.empty:
+                self.refeicoes = concatenar_df([df_antigas, self.refeicoes]) if not self.refeicoes.empty else df_antigas
+        elif data_inicio > self.data_inicio:
+            self.data_inicio = data_inicio
+            self.refeicoes = self.refeicoes[self.refeicoes['data'] >= data_inicio]
+
+    # Registra uma refeição recém-gravada por adicionar_refeicao
+    def registrar(self, id_refeicao, data, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras):
+        if id_refeicao != self.ultimo_id + 1:
+            # Outras gravações no intervalo (de outros usuários ou de outra sessão
+            # do mesmo usuário): busca o delta do usuário, que usa o índice (usuario_id, id)
+            self.atualizar()
+            return
+
+        self.ultimo_id = id_refeicao
+        if pd.Timestamp(data).normalize() >= self.data_inicio:
+            linha = (id_refeicao, para_dia(data), tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
+            self._anexar(_montar_df([linha]))
+
+    # Refeições de um dia: usa a memória se a data estiver na janela
+    @rastrear
+    def refeicoes_do_dia(self, data):
+        data = pd.Timestamp(data).normalize()
+        if data >= self.data_inicio:
+            return self.refeicoes[self.refeicoes['data'] == data]
+        return _consultar(self.usuario_id, dia=para_dia(data))
+
+    # Refeições a partir de uma data, ampliando a janela se necessário
+    def refeicoes_desde(self, data_inicio):
+        data_inicio = pd.Timestamp(data_inicio).normalize()
+        if data_inicio < self.data_inicio:
+            self.ajustar_janela(data_inicio)
+        return self.refeicoes[self.refeicoes['data'] >= data_inicio]
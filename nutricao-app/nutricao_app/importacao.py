@@ -0,0 +1,328 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app import banco
+from nutricao_app.busca import buscar_alimentos, normalizar_termo
+from nutricao_app.nutrientes import COLUNAS_NUTRIENTES, COLUNAS_REFEICAO, obter_matriz_nutrientes
+from nutricao_app.registros import COLUNAS_INSERCAO_REFEICOES, chaves_refeicoes
+from nutricao_app.repositorio import inserir_em_massa
+from nutricao_app.resumo import carga_em_massa_resumo
+from nutricao_app.taco import _chave_cabecalho, mapear_cabecalhos
+from nutricao_app.usuarios import USUARIO_PADRAO, obter_id_usuario
+
+# ijson é opcional: com ele, arquivos JSON (uma lista de objetos) são lidos em lotes; sem ele,
+# o arquivo JSON inteiro é carregado na memória (arquivos grandes: use JSON Lines, sempre lido em lotes)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Cabeçalhos aceitos para cada coluna de refeicoes (sem acentos, minúsculos e só letras/números),
+# incluindo os nomes usados nas exportações de outros aplicativos
+CABECALHOS_REFEICOES = {
+    'data': ['data', 'date', 'dia', 'day', 'datahora', 'datetime', 'timestamp'],
+    'refeicao': ['refeicao', 'tiporefeicao', 'meal', 'mealtype', 'mealname'],
+    'alimento': ['alimento', 'nomedoalimento', 'food', 'foodname', 'item', 'descricao', 'nome', 'name'],
+    'quantidade': ['quantidadeg', 'quantidade', 'gramas', 'grams', 'amountg', 'amount', 'quantity', 'servingsizeg'],
+    'calorias': ['calorias', 'caloriaskcal', 'kcal', 'energiakcal', 'energia', 'calories', 'energykcal'],
+    'proteinas': ['proteinasg', 'proteinas', 'proteinag', 'proteina', 'proteing', 'protein'],
+    'carboidratos': ['carboidratosg', 'carboidratos', 'carboidratog', 'carboidrato', 'carbohydratesg',
+                     'carbohydrates', 'carbsg', 'carbs'],
+    'gorduras': ['gordurasg', 'gorduras', 'gordurag', 'gordura', 'lipideosg', 'lipideos', 'fatg', 'fat', 'totalfat'],
+}
+COLUNAS_IMPORTACAO = list(CABECALHOS_REFEICOES)
+COLUNAS_NUMERICAS = COLUNAS_IMPORTACAO[3:]
+
+# Tipos de refeição de outros aplicativos (chave sem acentos e só letras) e o nome usado aqui
+TIPOS_REFEICAO_IMPORTACAO = {
+    'breakfast': 'Café da Manhã',
+    'cafedamanha': 'Café da Manhã',
+    'desjejum': 'Café da Manhã',
+    'morningsnack': 'Lanche da Manhã',
+    'lanchedamanha': 'Lanche da Manhã',
+    'lunch': 'Almoço',
+    'almoco': 'Almoço',
+    'afternoonsnack': 'Lanche da Tarde',
+    'snack': 'Lanche da Tarde',
+    'snacks': 'Lanche da Tarde',
+    'lanche': 'Lanche da Tarde',
+    'lanchedatarde': 'Lanche da Tarde',
+    'dinner': 'Jantar',
+    'jantar': 'Jantar',
+    'supper': 'Ceia',
+    'ceia': 'Ceia',
+}
+REFEICAO_PADRAO = 'Importada'
+
+TAMANHO_LOTE = 50000
+
+# Função para converter uma coluna em números (aceita vírgula decimal em textos)
+def _converter_numeros(serie):
+    if serie.dtype.kind in 'if':
+        return serie.astype(np.float64)
+    texto = serie.astype('string').str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(texto, errors='coerce').astype(np.float64)
+
+
+# Função para converter uma coluna de datas (ISO 8601 ou DD/MM/AAAA, com ou sem hora)
+# em números do dia; datas inválidas ficam como NaN
+def _converter_datas(serie):
+    texto = serie.astype('string').str.strip()
+    datas = pd.to_datetime(texto, errors='coerce', format='ISO8601', utc=True)
+    faltando = datas.isna() & texto.notna()
+    if faltando.any():
+        datas[faltando] = pd.to_datetime(texto[faltando].str[:10], errors='coerce', format='%d/%m/%Y', utc=True)
+
+    dias = datas.dt.tz_localize(None).to_numpy().astype('datetime64[D]').astype(np.int64).astype(np.float64)
+    dias[datas.isna().to_numpy()] = np.nan
+    return dias
+
+
+# Função para padronizar os tipos de refeição (cada valor distinto é convertido uma vez)
+def _converter_refeicoes(serie):
+    codigos, unicos = pd.factorize(serie.astype(object).where(serie.notna(), None))
+    nomes = []
+    for valor in unicos:
+        texto = ' '.join(str(valor).split())
+        nomes.append(TIPOS_REFEICAO_IMPORTACAO.get(_chave_cabecalho(texto), texto) or REFEICAO_PADRAO)
+    nomes = np.array(nomes + [REFEICAO_PADRAO], dtype=object)
+    return nomes[codigos]
+
+
+# Resolução de nomes de alimentos importados para os nomes da tabela TACO: só o nome
+# igual sem acentos/maiúsculas é trocado pelo da tabela. O primeiro resultado da busca
+# de texto completo é uma correspondência incerta: o alimento fica com o nome do arquivo
+# e a sugestão vai para 'incertos' (nome importado -> nome TACO sugerido), para revisão;
+# cada nome distinto é resolvido uma vez
+class ResolvedorAlimentos:
+    def __init__(self, matriz=None):
+        self.matriz = matriz or obter_matriz_nutrientes()
+        self._nomes_taco = {}
+        for nome in self.matriz.nomes:
+            self._nomes_taco.setdefault(normalizar_termo(nome), nome)
+        self._resolvidos = {}
+        self.incertos = {}
+
+    def resolver(self, nome):
+        if nome not in self._resolvidos:
+            encontrado = self._nomes_taco.get(normalizar_termo(nome))
+            if encontrado is None:
+                sugestoes = buscar_alimentos(nome, 1)
+                if sugestoes:
+                    self.incertos[nome] = sugestoes[0][1]
+            self._resolvidos[nome] = encontrado
+        return self._resolvidos[nome]
+
+    # Resolve uma coluna de nomes; retorna os nomes TACO (None quando não encontrado)
+    def resolver_coluna(self, alimentos):
+        codigos, unicos = pd.factorize(alimentos)
+        return np.array([self.resolver(nome) for nome in unicos], dtype=object)[codigos]
+
+
+# Função para normalizar um lote lido do arquivo no layout de refeicoes
+# Nomes de alimentos encontrados na TACO (nome igual) passam a usar o nome da tabela, e
+# nutrientes ausentes desses alimentos são calculados pela TACO a partir da quantidade
+# Retorna o DataFrame com as colunas de refeicoes (linhas sem data ou alimento são descartadas)
+def normalizar_lote_refeicoes(df, mapa, resolvedor=None):
+    df = df[list(mapa)].rename(columns=mapa)
+
+    lote = pd.DataFrame({'data': _converter_datas(df['data'])})
+    lote['refeicao'] = _converter_refeicoes(df['refeicao']) if 'refeicao' in df else REFEICAO_PADRAO
+    alimentos = df['alimento'].astype(object).where(df['alimento'].notna(), None)
+    lote['alimento'] = np.array([' '.join(str(nome).split()) if nome is not None else '' for nome in alimentos],
+                                dtype=object)
+    for coluna in COLUNAS_NUMERICAS:
+        lote[coluna] = _converter_numeros(df[coluna]) if coluna in df else np.nan
+
+    lote = lote[lote['data'].notna() & (lote['alimento'] != '')].reset_index(drop=True)
+
+    if resolvedor is not None and len(lote):
+        nomes_taco = resolvedor.resolver_coluna(lote['alimento'].to_numpy())
+        encontrados = np.array([nome is not None for nome in nomes_taco], dtype=bool)
+        lote.loc[encontrados, 'alimento'] = nomes_taco[encontrados]
+
+        calculado = resolvedor.matriz.calcular(lote['alimento'].to_numpy(), lote['quantidade'].to_numpy())
+        for coluna_taco, coluna_refeicao in COLUNAS_REFEICAO.items():
+            valores = calculado[:, COLUNAS_NUTRIENTES.index(coluna_taco)]
+            lote[coluna_refeicao] = lote[coluna_refeicao].fillna(pd.Series(valores, index=lote.index))
+
+    lote['data'] = lote['data'].astype(np.int64)
+    return lote
+
+
+# Função para encontrar o prefixo do ijson dos objetos de refeições: os itens da lista
+# na raiz ou da primeira lista que é valor de um campo da raiz (None quando não há lista)
+def _prefixo_lista_json(arquivo):
+    inicio = arquivo.tell()
+    try:
+        for prefixo, evento, _ in ijson.parse(arquivo):
+            if evento == 'start_array' and prefixo.count('.') == 0 and prefixo != 'item':
+                return f'{prefixo}.item' if prefixo else 'item'
+        return None
+    finally:
+        arquivo.seek(inicio)
+
+
+# Função para ler os objetos de um arquivo JSON em DataFrames de até tamanho_lote linhas
+def _ler_lotes_json(arquivo, tamanho_lote):
+    if ijson is not None:
+        prefixo = _prefixo_lista_json(arquivo)
+        if prefixo is None:
+            return
+        itens = ijson.items(arquivo, prefixo, use_float=True)
+        while True:
+            lote = list(itertools.islice(itens, tamanho_lote))
+            if not lote:
+                return
+            yield pd.DataFrame(lote)
+
+    dados = json.load(arquivo)
+    if isinstance(dados, dict):
+        dados = next((valor for valor in dados.values() if isinstance(valor, list)), [])
+    for inicio in range(0, len(dados), tamanho_lote):
+        yield pd.DataFrame(dados[inicio:inicio + tamanho_lote])
+
+
+# Função para ler um arquivo de refeições em lotes (CSV com "," ou ";" ou JSON:
+# lista de objetos, objeto com uma lista ou um objeto por linha)
+# Retorna um gerador de (DataFrame do lote, mapa de cabecalhos)
+def ler_arquivo_refeicoes(arquivo, formato='csv', tamanho_lote=TAMANHO_LOTE):
+    if formato == 'csv':
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+        try:
+            primeira_linha = texto.readline()
+            sep = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+            cabecalhos = next(csv.reader([primeira_linha], delimiter=sep))
+            mapa = mapear_cabecalhos(cabecalhos, CABECALHOS_REFEICOES, ('data', 'alimento'))
+            leitor = pd.read_csv(
+                texto,
+                sep=sep,
+                decimal=',' if sep == ';' else '.',
+                header=None,
+                names=cabecalhos,
+                usecols=list(mapa),
+                dtype={cabecalho: str for cabecalho, coluna in mapa.items() if coluna in ('data', 'refeicao', 'alimento')},
+                chunksize=tamanho_lote,
+            )
+            for bloco in leitor:
+                yield bloco, mapa
+        finally:
+            # Devolve o arquivo binário recebido sem fechá-lo
+            texto.detach()
+        return
+
+    if formato == 'jsonl':
+        leitor = pd.read_json(arquivo, lines=True, chunksize=tamanho_lote, dtype=False)
+    else:
+        leitor = _ler_lotes_json(arquivo, tamanho_lote)
+
+    mapa = None
+    for bloco in leitor:
+        mapa = mapa or mapear_cabecalhos(bloco.columns, CABECALHOS_REFEICOES, ('data', 'alimento'))
+        yield bloco, mapa
+
+
+# Função para descobrir o formato pelo nome do arquivo
+def formato_arquivo(nome):
+    nome = nome.lower()
+    if nome.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if nome.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+
+# Função para importar refeições de um arquivo (caminho ou arquivo binário aberto)
+# Cada lote é gravado em uma transação; refeições com a mesma data, refeição, alimento
+# e quantidade de outra já importada (ou repetidas no arquivo) são descartadas pelo
+# índice único (usuario_id, chave_registro), então uma importação interrompida pode ser
+# repetida com o mesmo arquivo
+# progresso: função opcional chamada a cada lote com (fração lida do arquivo, estatísticas)
+# Retorna estatísticas da importação ('incertos': alimentos importados com o nome do
+# arquivo e a sugestão da TACO, para revisão)
+def importar_refeicoes(origem, usuario_id, formato=None, tamanho_lote=TAMANHO_LOTE, resolver_alimentos=True,
+                       progresso=None):
+    inicio = time.perf_counter()
+    estatisticas = {'linhas': 0, 'importadas': 0, 'duplicadas': 0, 'invalidas': 0, 'incertos': {}}
+
+    arquivo = open(origem, 'rb') if isinstance(origem, (str, os.PathLike)) else origem
+    if formato is None:
+        formato = formato_arquivo(str(getattr(arquivo, 'name', origem)))
+    try:
+        tamanho = os.fstat(arquivo.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        tamanho = len(arquivo.getbuffer()) if hasattr(arquivo, 'getbuffer') else None
+
+    resolvedor = ResolvedorAlimentos() if resolver_alimentos else None
+
+    conn = banco.conectar_bd()
+    try:
+        for bloco, mapa in ler_arquivo_refeicoes(arquivo, formato, tamanho_lote):
+            lote = normalizar_lote_refeicoes(bloco, mapa, resolvedor)
+            chaves = chaves_refeicoes(lote['data'], lote['refeicao'], lote['alimento'], lote['quantidade'])
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                with carga_em_massa_resumo(conn):
+                    gravadas = inserir_em_massa(conn, 'refeicoes', COLUNAS_INSERCAO_REFEICOES, zip(
+                        itertools.repeat(usuario_id),
+                        *(lote[coluna].tolist() for coluna in COLUNAS_IMPORTACAO),
+                        chaves.tolist(),
+                    ), conflito=['usuario_id', 'chave_registro'], ignorar=True)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            estatisticas['linhas'] += len(bloco)
+            estatisticas['importadas'] += gravadas
+            estatisticas['duplicadas'] += len(lote) - gravadas
+            estatisticas['invalidas'] = estatisticas['linhas'] - estatisticas['importadas'] - estatisticas['duplicadas']
+            if progresso is not None:
+                progresso(min(arquivo.tell() / tamanho, 1.0) if tamanho else None, dict(estatisticas))
+    finally:
+        conn.close()
+        if arquivo is not origem:
+            arquivo.close()
+
+    if resolvedor is not None:
+        estatisticas['incertos'] = dict(resolvedor.incertos)
+    segundos = time.perf_counter() - inicio
+    estatisticas['segundos'] = segundos
+    estatisticas['linhas_por_segundo'] = estatisticas['linhas'] / segundos if segundos > 0 else float('inf')
+    return estatisticas
+
+
+# Importação manual: python -m nutricao_app.importacao arquivo [--usuario nome] [--banco caminho]
+#                    [--formato csv|json|jsonl] [--sem-taco]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa refeições de um arquivo CSV ou JSON')
+    parser.add_argument('arquivo')
+    parser.add_argument('--usuario', default=USUARIO_PADRAO)
+    parser.add_argument('--banco', help='arquivo do banco (padrão: NUTRICAO_DB ou nutricao.db)')
+    parser.add_argument('--formato', choices=['csv', 'json', 'jsonl'])
+    parser.add_argument('--sem-taco', action='store_true', help='não resolve os alimentos na tabela TACO')
+    argumentos = parser.parse_args()
+
+    if argumentos.banco:
+        banco.definir_caminho_bd(argumentos.banco)
+
+    def mostrar_progresso(fracao, parcial):
+        if fracao is not None:
+            print(f"\r{fracao:6.1%}  {parcial['importadas']:,} importadas", end='', flush=True)
+
+    estatisticas = importar_refeicoes(argumentos.arquivo, obter_id_usuario(argumentos.usuario), argumentos.formato,
+                                      resolver_alimentos=not argumentos.sem_taco, progresso=mostrar_progresso)
+    print(f"\n{estatisticas['importadas']:,} refeições importadas, {estatisticas['duplicadas']:,} duplicadas e "
+          f"{estatisticas['invalidas']:,} inválidas em {estatisticas['segundos']:.1f} s "
+          f"({estatisticas['linhas_por_segundo']:,.0f} linhas/s)")
+    for nome, sugestao in estatisticas['incertos'].items():
+        print(f'Alimento sem correspondência exata na TACO: {nome} (sugestão: {sugestao})')
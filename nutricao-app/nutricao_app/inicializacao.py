@@ -0,0 +1,54 @@
+import os
+import threading
+
+from nutricao_app import banco
+from nutricao_app.migracoes import (MIGRACOES, VERSAO_BASE, aplicar_migracoes, obter_versao_esquema,
+                                    registrar_versao_esquema)
+from nutricao_app.rastreamento import span
+
+# Versão atual do esquema do banco de dados (inicialização + migrações)
+VERSAO_ESQUEMA = max([VERSAO_BASE] + [versao for versao, _, _ in MIGRACOES])
+
+# Bancos já inicializados neste processo (caminho absoluto do arquivo)
+_bancos_inicializados = set()
+_lock = threading.Lock()
+
+
+# Função para executar as etapas de inicialização uma única vez por processo e banco
+# (etapas: só em bancos novos; etapas_por_processo: na primeira execução de cada processo,
+# depois das migrações)
+# Retorna True quando alguma etapa ou migração foi executada nesta chamada
+def inicializar_aplicacao(etapas, etapas_por_processo=()):
+    chave = os.path.abspath(banco.CAMINHO_BD)
+    if chave in _bancos_inicializados:
+        return False
+
+    with _lock:
+        if chave in _bancos_inicializados:
+            return False
+
+        executou = False
+        if obter_versao_esquema() < VERSAO_BASE:
+            for etapa in etapas:
+                with span(etapa.__name__):
+                    etapa()
+            registrar_versao_esquema(VERSAO_BASE, 'Tabelas da aplicação, tabela TACO e dados de exemplo')
+            executou = True
+
+        with span('aplicar_migracoes'):
+            if aplicar_migracoes():
+                executou = True
+
+        for etapa in etapas_por_processo:
+            with span(etapa.__name__):
+                etapa()
+
+        _bancos_inicializados.add(chave)
+
+    return executou
+
+
+# Função para forçar uma nova inicialização no próximo acesso
+def reiniciar_inicializacao():
+    with _lock:
+        _bancos_inicializados.clear()
@@ -0,0 +1,51 @@
+import threading
+
+from nutricao_app import repositorio
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.registros import atualizar_metas
+from nutricao_app.versoes import versao_dados
+
+# Metas de cada usuário mantidas em memória no processo, com a versão em que foram lidas
+# (a versão é conferida pelo contador de alterações do banco, sem consulta enquanto nada é
+# gravado; gravações de outros processos, como a API, invalidam o cache)
+_metas = {}
+_lock = threading.Lock()
+
+
+# Função para obter a versão atual das metas do usuário (chave de cache para as visões derivadas)
+def versao_metas(usuario_id):
+    return versao_dados(usuario_id, 'metas')
+
+
+# Função para obter as metas do usuário (da memória; as tabelas só são lidas na primeira
+# vez ou depois de um commit no banco). Retorna uma cópia, que pode ser alterada por quem chamou
+@rastrear
+def obter_metas(usuario_id):
+    versao = versao_metas(usuario_id)
+    with _lock:
+        guardadas = _metas.get(usuario_id)
+    if guardadas is not None and guardadas[0] == versao:
+        return dict(guardadas[1])
+
+    metas = repositorio.obter_metas(usuario_id)
+    with _lock:
+        # Não substitui metas mais novas gravadas enquanto o banco era lido
+        if usuario_id not in _metas or _metas[usuario_id][0] <= versao:
+            _metas[usuario_id] = (versao, metas)
+    return dict(metas)
+
+
+# Função para salvar as metas do usuário: grava no banco (upsert), gera uma versão nova
+# e deixa as metas gravadas no cache. Retorna a nova versão
+def salvar_metas(usuario_id, metas):
+    metas = {chave: float(valor) for chave, valor in metas.items()}
+    with _lock:
+        versao = atualizar_metas(usuario_id, metas)
+        _metas[usuario_id] = (versao, metas)
+    return versao
+
+
+# Função para descartar as metas em cache (chamar ao trocar de banco de dados)
+def limpar_cache_metas():
+    with _lock:
+        _metas.clear()
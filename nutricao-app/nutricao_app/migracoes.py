@@ -0,0 +1,338 @@
+import sys
+from datetime import date, datetime
+
+from nutricao_app import banco, repositorio
+from nutricao_app.agregacao import obter_consumo_agregado, obter_progresso_agregado
+from nutricao_app.busca import COMANDOS_INDICE_BUSCA, LIMITE_CANDIDATOS, LIMITE_SUGESTOES
+from nutricao_app.historico import HistoricoRefeicoes
+from nutricao_app.receitas import criar_tabelas_receitas, listar_receitas, obter_ingredientes
+from nutricao_app.registros import (chaves_refeicoes, obter_refeicoes_por_data, obter_refeicoes_por_periodo,
+                                    obter_todas_medidas)
+from nutricao_app.resumo import (criar_resumo_diario, obter_resumo_do_dia, obter_resumo_por_periodo,
+                                 preencher_resumo_diario)
+from nutricao_app.tendencias import TendenciasUsuario
+from nutricao_app.usuarios import ID_USUARIO_PADRAO, criar_tabela_usuarios
+from nutricao_app.versoes import criar_versoes_dados
+
+
+# Função para listar as colunas de uma tabela
+def _colunas(conn, tabela):
+    return [linha[1] for linha in conn.execute(f'PRAGMA table_info({tabela})')]
+
+
+# Migração 6: dados separados por usuário. Refeições e medidas ganham a coluna
+# usuario_id (os dados existentes ficam com o usuário padrão), metas passa a ter
+# uma linha por usuário e o resumo diário passa a ser por usuário e dia.
+# Bancos criados já com as colunas novas só têm índices e resumo recriados.
+def _separar_por_usuario(conn):
+    criar_tabela_usuarios(conn)
+
+    for tabela in ('refeicoes', 'medidas'):
+        if 'usuario_id' not in _colunas(conn, tabela):
+            conn.execute(f'ALTER TABLE {tabela} ADD COLUMN usuario_id INTEGER NOT NULL DEFAULT {ID_USUARIO_PADRAO}')
+
+    if 'usuario_id' not in _colunas(conn, 'metas'):
+        # A tabela antiga tem CHECK (id = 1), que não pode ser removido com ALTER TABLE
+        conn.execute('ALTER TABLE metas RENAME TO metas_antiga')
+        conn.execute('''
+        CREATE TABLE metas (
+            usuario_id INTEGER PRIMARY KEY,
+            calorias_diarias REAL,
+            proteinas_diarias REAL,
+            carboidratos_diarios REAL,
+            gorduras_diarias REAL,
+            peso_meta REAL,
+            gordura_corporal_meta REAL
+        )
+        ''')
+        conn.execute(f'''
+        INSERT INTO metas (usuario_id, calorias_diarias, proteinas_diarias, carboidratos_diarios,
+                           gorduras_diarias, peso_meta, gordura_corporal_meta)
+        SELECT {ID_USUARIO_PADRAO}, calorias_diarias, proteinas_diarias, carboidratos_diarios,
+               gorduras_diarias, peso_meta, gordura_corporal_meta
+        FROM metas_antiga
+        ''')
+        conn.execute('DROP TABLE metas_antiga')
+
+    for gatilho in ('resumo_diario_inserir', 'resumo_diario_excluir', 'resumo_diario_alterar'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {gatilho}')
+    conn.execute('DROP TABLE IF EXISTS resumo_diario')
+    criar_resumo_diario(conn)
+    preencher_resumo_diario(conn)
+
+    # Índices compostos: as consultas de um usuário leem só as linhas dele
+    conn.execute('DROP INDEX IF EXISTS idx_refeicoes_data')
+    conn.execute('DROP INDEX IF EXISTS idx_medidas_data')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_refeicoes_usuario_data ON refeicoes (usuario_id, data)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_refeicoes_usuario_id ON refeicoes (usuario_id, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_medidas_usuario_data ON medidas (usuario_id, data)')
+
+
+# Tabelas com datas em texto 'AAAA-MM-DD' convertidas na migração 7 (colunas após id e data)
+TABELAS_COM_DATA = {
+    'refeicoes': ['refeicao TEXT', 'alimento TEXT', 'quantidade REAL', 'calorias REAL',
+                  'proteinas REAL', 'carboidratos REAL', 'gorduras REAL'],
+    'medidas': ['peso REAL', 'imc REAL', 'cintura REAL', 'quadril REAL', 'gordura_corporal REAL'],
+}
+
+
+# Migração 7: datas como número do dia (dias desde 1970-01-01). A coluna data de
+# refeições e medidas tem afinidade TEXT, então as tabelas são recriadas com
+# data INTEGER (mantendo os ids) e o resumo diário é refeito a partir delas.
+def _datas_como_dias(conn):
+    for tabela, colunas in TABELAS_COM_DATA.items():
+        tipos = {linha[1]: linha[2].upper() for linha in conn.execute(f'PRAGMA table_info({tabela})')}
+        if tipos.get('data') == 'INTEGER':
+            continue
+
+        nomes = ', '.join(coluna.split()[0] for coluna in colunas)
+        conn.execute(f'''
+        CREATE TABLE {tabela}_nova (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL DEFAULT {ID_USUARIO_PADRAO},
+            data INTEGER,
+            {', '.join(colunas)}
+        )
+        ''')
+        conn.execute(f'''
+        INSERT INTO {tabela}_nova (id, usuario_id, data, {nomes})
+        SELECT id, usuario_id,
+               CASE WHEN typeof(data) = 'text' THEN CAST(round(julianday(data) - 2440587.5) AS INTEGER) ELSE data END,
+               {nomes}
+        FROM {tabela}
+        ''')
+        conn.execute(f'DROP TABLE {tabela}')
+        conn.execute(f'ALTER TABLE {tabela}_nova RENAME TO {tabela}')
+
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_refeicoes_usuario_data ON refeicoes (usuario_id, data)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_refeicoes_usuario_id ON refeicoes (usuario_id, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_medidas_usuario_data ON medidas (usuario_id, data)')
+
+    conn.execute('DROP TABLE IF EXISTS resumo_diario')
+    criar_resumo_diario(conn)
+    preencher_resumo_diario(conn)
+
+
+# Migração 8: chave de deduplicação das refeições (hash de data, refeição, alimento
+# e quantidade), calculada em lotes para as refeições existentes e indexada por usuário
+def _chave_deduplicacao(conn):
+    if 'chave_registro' not in _colunas(conn, 'refeicoes'):
+        conn.execute('ALTER TABLE refeicoes ADD COLUMN chave_registro INTEGER')
+
+    cursor = conn.execute('SELECT id, data, refeicao, alimento, quantidade FROM refeicoes WHERE chave_registro IS NULL')
+    atualizacoes = []
+    while True:
+        linhas = cursor.fetchmany(50000)
+        if not linhas:
+            break
+        ids, datas, refeicoes, alimentos, quantidades = zip(*linhas)
+        chaves = chaves_refeicoes([dia if dia is not None else 0 for dia in datas], refeicoes, alimentos, quantidades)
+        atualizacoes.extend(zip(chaves.tolist(), ids))
+    conn.executemany('UPDATE refeicoes SET chave_registro = ? WHERE id = ?', atualizacoes)
+
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_refeicoes_usuario_chave ON refeicoes (usuario_id, chave_registro)')
+
+
+# Migrações do esquema, aplicadas em ordem e uma única vez (somente para frente).
+# As versões 1 e 2 correspondem às etapas de inicialização da aplicação.
+# Cada comando é um SQL ou uma função que recebe a conexão (para migrações que
+# dependem do estado atual do banco).
+MIGRACOES = [
+    (3, 'Índices para consultas por data e por nome de alimento', [
+        'CREATE INDEX IF NOT EXISTS idx_refeicoes_data ON refeicoes (data)',
+        'CREATE INDEX IF NOT EXISTS idx_medidas_data ON medidas (data)',
+        'CREATE INDEX IF NOT EXISTS idx_alimentos_taco_nome ON alimentos_taco (nome)',
+    ]),
+    (4, 'Índice de texto completo (FTS5) sem acentos sobre o nome dos alimentos TACO', COMANDOS_INDICE_BUSCA),
+    (5, 'Nome único em alimentos_taco (importação da TACO com upsert)', [
+        'DELETE FROM alimentos_taco WHERE id NOT IN (SELECT MIN(id) FROM alimentos_taco GROUP BY nome)',
+        'DROP INDEX IF EXISTS idx_alimentos_taco_nome',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_alimentos_taco_nome ON alimentos_taco (nome)',
+    ]),
+    (6, 'Dados separados por usuário, com índices (usuario_id, data)', [_separar_por_usuario]),
+    (7, 'Datas gravadas como número do dia (INTEGER) em refeições, medidas e resumo diário', [_datas_como_dias]),
+    (8, 'Chave de deduplicação das refeições (importação em massa)', [_chave_deduplicacao]),
+    (9, 'Receitas com vetor de nutrientes por 100 g, recalculado por gatilhos quando a TACO muda',
+     [criar_tabelas_receitas]),
+    (10, 'Versões dos dados por usuário no banco, incrementadas por gatilhos (chaves de cache entre processos)',
+     [criar_versoes_dados]),
+    (11, 'Chave de deduplicação única por usuário (importação com ON CONFLICT DO NOTHING); '
+         'as refeições repetidas ficam sem chave', [
+        'UPDATE refeicoes SET chave_registro = NULL WHERE chave_registro IS NOT NULL AND id NOT IN '
+        '(SELECT MIN(id) FROM refeicoes WHERE chave_registro IS NOT NULL GROUP BY usuario_id, chave_registro)',
+        'DROP INDEX IF EXISTS idx_refeicoes_usuario_chave',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_refeicoes_usuario_chave ON refeicoes (usuario_id, chave_registro)',
+    ]),
+]
+
+# Operações mais frequentes da aplicação (funções de leitura chamadas com um usuário e um dia):
+# as consultas que elas executam no repositório são verificadas com EXPLAIN QUERY PLAN
+CONSULTAS_CRITICAS = {
+    'obter_refeicoes_por_data': lambda usuario_id, dia: obter_refeicoes_por_data(usuario_id, dia),
+    'obter_refeicoes_por_periodo': lambda usuario_id, dia: obter_refeicoes_por_periodo(usuario_id, dia),
+    'obter_todas_medidas': lambda usuario_id, dia: obter_todas_medidas(usuario_id),
+    'historico': lambda usuario_id, dia: HistoricoRefeicoes(usuario_id, dia).atualizar(),
+    'obter_resumo_por_periodo': lambda usuario_id, dia: obter_resumo_por_periodo(usuario_id, dia),
+    'obter_resumo_do_dia': lambda usuario_id, dia: obter_resumo_do_dia(usuario_id, dia),
+    'consumo_agregado': lambda usuario_id, dia: obter_consumo_agregado(usuario_id),
+    'progresso_agregado': lambda usuario_id, dia: obter_progresso_agregado(usuario_id),
+    'tendencias': lambda usuario_id, dia: TendenciasUsuario(usuario_id, dia).atualizar(dia),
+    'obter_metas': lambda usuario_id, dia: repositorio.obter_metas(usuario_id),
+    'obter_info_nutricional': lambda usuario_id, dia: repositorio.obter_info_nutricional('Arroz'),
+    'buscar_alimentos': lambda usuario_id, dia: repositorio.buscar_alimentos_fts('"arroz"*', LIMITE_CANDIDATOS,
+                                                                                LIMITE_SUGESTOES),
+    'listar_receitas': lambda usuario_id, dia: listar_receitas(usuario_id),
+    'obter_ingredientes': lambda usuario_id, dia: obter_ingredientes(1),
+    'porcao_receita': lambda usuario_id, dia: repositorio.ler_receita(usuario_id, 1, ['nome', 'energia_kcal']),
+}
+
+# Tabelas que crescem com o uso: varrê-las por inteiro em uma consulta com filtro é uma regressão
+TABELAS_GRANDES = ('refeicoes', 'medidas', 'resumo_diario', 'alimentos_taco', 'receitas', 'receita_ingredientes')
+
+
+# Função para criar a tabela de controle de versão do esquema
+def criar_tabela_versao(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        versao INTEGER PRIMARY KEY,
+        descricao TEXT,
+        aplicada_em TEXT
+    )
+    ''')
+    colunas = [linha[1] for linha in conn.execute('PRAGMA table_info(schema_version)')]
+    if 'descricao' not in colunas:
+        conn.execute('ALTER TABLE schema_version ADD COLUMN descricao TEXT')
+
+
+# Versão do esquema criada pelas etapas de inicialização da aplicação (a mesma do
+# esquema original, anterior ao controle de versão)
+VERSAO_BASE = 2
+
+# Tabelas criadas pela primeira versão do app, que não gravava a versão do esquema
+TABELAS_ESQUEMA_ORIGINAL = ('refeicoes', 'medidas', 'metas', 'alimentos_taco')
+
+
+# Função para obter a versão do esquema gravada no banco
+# Um banco sem versão gravada, mas com as tabelas do esquema original, foi criado pela
+# primeira versão do app: é registrado na versão base, e só as migrações o atualizam
+# (as etapas de inicialização de um banco novo supõem o esquema atual)
+def obter_versao_esquema():
+    conn = banco.conectar_bd()
+    try:
+        criar_tabela_versao(conn)
+        versao = conn.execute('SELECT MAX(versao) FROM schema_version').fetchone()[0]
+        if versao is None:
+            tabelas = {nome for (nome,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if tabelas.issuperset(TABELAS_ESQUEMA_ORIGINAL):
+                _gravar_versao(conn, VERSAO_BASE, 'Esquema original (banco anterior ao controle de versão)')
+                versao = VERSAO_BASE
+        conn.commit()
+    finally:
+        conn.close()
+
+    return versao or 0
+
+
+# Função para registrar uma versão do esquema (na transação da conexão recebida)
+def _gravar_versao(conn, versao, descricao):
+    conn.execute(
+        'INSERT OR REPLACE INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)',
+        (versao, descricao, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    )
+
+
+# Função para registrar a versão do esquema aplicada
+def registrar_versao_esquema(versao, descricao=None):
+    conn = banco.conectar_bd()
+    try:
+        _gravar_versao(conn, versao, descricao)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# Função para aplicar as migrações pendentes, cada uma em sua própria transação
+# A versão é relida depois do BEGIN IMMEDIATE: dois processos iniciando juntos não aplicam
+# a mesma migração duas vezes (o segundo espera o primeiro e encontra a versão gravada)
+# Retorna a lista de versões aplicadas
+def aplicar_migracoes():
+    versao_atual = obter_versao_esquema()
+    aplicadas = []
+
+    conn = banco.conectar_bd()
+    try:
+        for versao, descricao, comandos in MIGRACOES:
+            if versao <= versao_atual:
+                continue
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                versao_atual = conn.execute('SELECT MAX(versao) FROM schema_version').fetchone()[0] or 0
+                if versao <= versao_atual:
+                    conn.rollback()
+                    continue
+                for comando in comandos:
+                    if callable(comando):
+                        comando(conn)
+                    else:
+                        conn.execute(comando)
+                _gravar_versao(conn, versao, descricao)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            aplicadas.append(versao)
+    finally:
+        conn.close()
+
+    return aplicadas
+
+
+# Função para listar as varreduras completas de tabelas grandes em um plano de consulta
+def varreduras_tabelas_grandes(plano):
+    return [passo for passo in plano if passo.startswith('SCAN') and passo.split()[1] in TABELAS_GRANDES]
+
+
+# Função para verificar se as consultas das operações críticas usam índices: cada operação
+# roda para o usuário e o dia informados e as consultas que ela executou no repositório
+# passam pelo EXPLAIN QUERY PLAN (o mesmo SQL compilado, com os mesmos argumentos)
+# Retorna {operacao: (usa_indice, plano)}
+def verificar_planos_consulta(usuario_id=ID_USUARIO_PADRAO, dia=None):
+    dia = dia or date.today()
+    resultado = {}
+    conn = banco.conectar_bd()
+    try:
+        for nome, operacao in CONSULTAS_CRITICAS.items():
+            with repositorio.capturar_consultas() as consultas:
+                operacao(usuario_id, dia)
+            plano = []
+            usa_indice = True
+            for consulta, argumentos in consultas:
+                passos = [linha[3] for linha in conn.execute(f'EXPLAIN QUERY PLAN {consulta.sql}', argumentos)]
+                # Varredura completa só é aceita em leituras sem filtro (a tabela inteira é o resultado)
+                # e ordenação em tabela temporária só em agrupamentos ou com LIMIT (poucas linhas)
+                if ' WHERE ' in consulta.sql:
+                    usa_indice &= not varreduras_tabelas_grandes(passos)
+                if 'LIMIT' not in consulta.sql:
+                    usa_indice &= not any('TEMP B-TREE FOR ORDER BY' in passo for passo in passos)
+                plano.extend(passos)
+            resultado[nome] = (usa_indice, plano)
+    finally:
+        conn.close()
+
+    return resultado
+
+
+# Execução manual: python -m nutricao_app.migracoes [caminho do banco]
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        banco.definir_caminho_bd(sys.argv[1])
+
+    aplicadas = aplicar_migracoes()
+    print(f'Migrações aplicadas: {aplicadas or "nenhuma"} (versão atual: {obter_versao_esquema()})')
+
+    falhas = 0
+    for nome, (usa_indice, plano) in verificar_planos_consulta().items():
+        print(f'[{"ok" if usa_indice else "SEM ÍNDICE"}] {nome}: {" | ".join(plano)}')
+        falhas += not usa_indice
+
+    sys.exit(1 if falhas else 0)
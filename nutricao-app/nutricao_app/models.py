@@ -1,15 +1,37 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Index, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+
+from nutricao_app.banco import conectar_bd, obter_engine
+
+# Usuário que recebe os dados gravados antes da separação por usuário
+# (e usado quando a sessão não informa um usuário)
+USUARIO_PADRAO = 'padrao'
+ID_USUARIO_PADRAO = 1
 
 # Criar uma instância do declarative base
 Base = declarative_base()
 
-# Definir as classes que representam as tabelas
+# Definir as classes que representam as tabelas (o esquema do banco é criado a partir
+# delas: AUTOINCREMENT e valores padrão no próprio SQLite, como nos bancos já existentes)
+class Usuarios(Base):
+    __tablename__ = 'usuarios'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nome = Column(String, nullable=False, unique=True)
+    criado_em = Column(String)
+
 class Refeicoes(Base):
     __tablename__ = 'refeicoes'
+    __table_args__ = (
+        Index('idx_refeicoes_usuario_data', 'usuario_id', 'data'),
+        Index('idx_refeicoes_usuario_id', 'usuario_id', 'id'),
+        Index('idx_refeicoes_usuario_chave', 'usuario_id', 'chave_registro', unique=True),
+        {'sqlite_autoincrement': True},
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
-    data = Column(String)
+    usuario_id = Column(Integer, nullable=False, server_default=text(str(ID_USUARIO_PADRAO)))
+    data = Column(Integer)  # número do dia (dias desde 1970-01-01)
     refeicao = Column(String)
     alimento = Column(String)
     quantidade = Column(Float)
@@ -17,11 +39,14 @@ class Refeicoes(Base):
     proteinas = Column(Float)
     carboidratos = Column(Float)
     gorduras = Column(Float)
+    chave_registro = Column(Integer)  # hash de (data, refeição, alimento, quantidade) das refeições importadas
 
 class Medidas(Base):
     __tablename__ = 'medidas'
+    __table_args__ = (Index('idx_medidas_usuario_data', 'usuario_id', 'data'), {'sqlite_autoincrement': True})
     id = Column(Integer, primary_key=True, autoincrement=True)
-    data = Column(String)
+    usuario_id = Column(Integer, nullable=False, server_default=text(str(ID_USUARIO_PADRAO)))
+    data = Column(Integer)  # número do dia (dias desde 1970-01-01)
     peso = Column(Float)
     imc = Column(Float)
     cintura = Column(Float)
@@ -30,7 +55,7 @@ class Medidas(Base):
 
 class Metas(Base):
     __tablename__ = 'metas'
-    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, primary_key=True)
     calorias_diarias = Column(Float)
     proteinas_diarias = Column(Float)
     carboidratos_diarios = Column(Float)
@@ -40,6 +65,7 @@ class Metas(Base):
 
 class AlimentosTaco(Base):
     __tablename__ = 'alimentos_taco'
+    __table_args__ = (Index('idx_alimentos_taco_nome', 'nome', unique=True), {'sqlite_autoincrement': True})
     id = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String)
     energia_kcal = Column(Float)
@@ -50,60 +76,88 @@ class AlimentosTaco(Base):
     calcio_mg = Column(Float)
     ferro_mg = Column(Float)
 
-# Função para criar e conectar ao banco de dados SQLite usando SQLAlchemy
-def conectar_bd():
-    engine = create_engine('sqlite:///nutricao.db')
-    return engine
+class ResumoDiario(Base):
+    __tablename__ = 'resumo_diario'
+    usuario_id = Column(Integer, primary_key=True)
+    data = Column(Integer, primary_key=True)
+    calorias = Column(Float, nullable=False, default=0)
+    proteinas = Column(Float, nullable=False, default=0)
+    carboidratos = Column(Float, nullable=False, default=0)
+    gorduras = Column(Float, nullable=False, default=0)
+    refeicoes = Column(Integer, nullable=False, default=0)
+
+# Versão dos dados de cada usuário por tabela (criada por versoes.criar_versoes_dados,
+# com os gatilhos que incrementam a versão a cada escrita)
+class VersoesDados(Base):
+    __tablename__ = 'versoes_dados'
+    usuario_id = Column(Integer, primary_key=True)
+    tabela = Column(String, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+
+# Receitas do usuário com o vetor de nutrientes por 100 g calculado dos ingredientes
+# (criadas por receitas.criar_tabelas_receitas, com os gatilhos que recalculam o vetor
+# quando um alimento TACO muda; vetor nulo: ingrediente removido da tabela TACO)
+class Receitas(Base):
+    __tablename__ = 'receitas'
+    __table_args__ = (Index('idx_receitas_usuario_nome', 'usuario_id', 'nome', unique=True),
+                      {'sqlite_autoincrement': True})
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, nullable=False)
+    nome = Column(String, nullable=False)
+    rendimento_g = Column(Float, nullable=False)  # peso da receita pronta
+    energia_kcal = Column(Float)
+    proteina_g = Column(Float)
+    lipideos_g = Column(Float)
+    carboidrato_g = Column(Float)
+    fibra_g = Column(Float)
+    calcio_mg = Column(Float)
+    ferro_mg = Column(Float)
+
+class IngredientesReceita(Base):
+    __tablename__ = 'receita_ingredientes'
+    __table_args__ = (
+        Index('idx_receita_ingredientes_receita', 'receita_id'),
+        Index('idx_receita_ingredientes_alimento', 'alimento_id'),
+    )
+    id = Column(Integer, primary_key=True)
+    receita_id = Column(Integer, nullable=False)
+    alimento_id = Column(Integer, nullable=False)  # id em alimentos_taco
+    gramas = Column(Float, nullable=False)
+
+# Metas usadas enquanto o usuário não salvou as suas
+METAS_PADRAO = {
+    'calorias_diarias': 2000.0,
+    'proteinas_diarias': 150.0,
+    'carboidratos_diarios': 225.0,
+    'gorduras_diarias': 65.0,
+    'peso_meta': 70.0,
+    'gordura_corporal_meta': 15.0
+}
+
+# Tabelas criadas a partir dos modelos (usuarios é criada por criar_tabela_usuarios, com o
+# usuário padrão, e resumo_diario por resumo.criar_resumo_diario, com os gatilhos)
+TABELAS_MODELOS = [Refeicoes.__table__, Medidas.__table__, Metas.__table__, AlimentosTaco.__table__]
+
+# Função para criar a tabela de usuários com o usuário padrão
+def criar_tabela_usuarios(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL UNIQUE,
+        criado_em TEXT
+    )
+    ''')
+    conn.execute(
+        'INSERT OR IGNORE INTO usuarios (id, nome, criado_em) VALUES (?, ?, ?)',
+        (ID_USUARIO_PADRAO, USUARIO_PADRAO, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    )
 
-# Função para inicializar o banco de dados
+# Função para inicializar o banco de dados (cria as tabelas que ainda não existem)
 def inicializar_bd():
-    engine = conectar_bd()
-    Base.metadata.create_all(engine)
-
-# Função para obter informações nutricionais usando SQLAlchemy
-def obter_info_nutricional(nome_exato):
-    engine = conectar_bd()
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
-    resultado = session.query(AlimentosTaco).filter(AlimentosTaco.nome == nome_exato).first()
-    session.close()
-
-    if not resultado:
-        return None
-
-    return {
-        'calorias': resultado.energia_kcal,
-        'proteinas': resultado.proteina_g,
-        'gorduras': resultado.lipideos_g,
-        'carboidratos': resultado.carboidrato_g
-    }
-
-# Função para obter metas do banco de dados usando SQLAlchemy
-def obter_metas():
-    engine = conectar_bd()
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
-    resultado = session.query(Metas).filter(Metas.id == 1).first()
-
-    session.close()
-
-    if resultado:
-        return {
-            'calorias_diarias': resultado.calorias_diarias,
-            'proteinas_diarias': resultado.proteinas_diarias,
-            'carboidratos_diarios': resultado.carboidratos_diarios,
-            'gorduras_diarias': resultado.gorduras_diarias,
-            'peso_meta': resultado.peso_meta,
-            'gordura_corporal_meta': resultado.gordura_corporal_meta
-        }
-    else:
-        return {
-            'calorias_diarias': 2000.0,
-            'proteinas_diarias': 150.0,
-            'carboidratos_diarios': 225.0,
-            'gorduras_diarias': 65.0,
-            'peso_meta': 70.0,
-            'gordura_corporal_meta': 15.0
-        }
\ No newline at end of file
+    conn = conectar_bd()
+    try:
+        criar_tabela_usuarios(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    Base.metadata.create_all(obter_engine(), tables=TABELAS_MODELOS)
@@ -0,0 +1,116 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app.repositorio import ler_alimentos_taco
+
+# Colunas da tabela alimentos_taco carregadas na matriz (valores por 100 g)
+COLUNAS_NUTRIENTES = ['energia_kcal', 'proteina_g', 'lipideos_g', 'carboidrato_g', 'fibra_g', 'calcio_mg', 'ferro_mg']
+
+# Correspondência entre as colunas da tabela TACO e as colunas de refeicoes
+COLUNAS_REFEICAO = {
+    'energia_kcal': 'calorias',
+    'proteina_g': 'proteinas',
+    'carboidrato_g': 'carboidratos',
+    'lipideos_g': 'gorduras',
+}
+
+_matriz = None
+_lock = threading.Lock()
+
+
+# Matriz de nutrientes da tabela TACO em memória: uma linha por alimento,
+# uma coluna por nutriente, com índices de id e de nome para a linha
+class MatrizNutrientes:
+    def __init__(self, ids, nomes, valores):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.nomes = np.asarray(nomes, dtype=object)
+        # Nutriente ausente na tabela conta como zero
+        self.valores = np.nan_to_num(np.asarray(valores, dtype=np.float64).reshape(len(self.ids), len(COLUNAS_NUTRIENTES)))
+
+        # Índice por id (ordenado para busca binária vetorizada)
+        self._ordem_ids = np.argsort(self.ids, kind='stable')
+        self._ids_ordenados = self.ids[self._ordem_ids]
+
+        # Índice por nome (nomes repetidos apontam para a primeira ocorrência)
+        linhas_nome = pd.Series(np.arange(len(self.nomes)), index=pd.Index(self.nomes))
+        linhas_nome = linhas_nome[~linhas_nome.index.duplicated()]
+        self._indice_nomes = linhas_nome.index
+        self._linhas_nomes = linhas_nome.to_numpy()
+
+    @classmethod
+    def carregar(cls):
+        resultados = ler_alimentos_taco(['id', 'nome', *COLUNAS_NUTRIENTES])
+
+        if not resultados:
+            return cls([], [], np.empty((0, len(COLUNAS_NUTRIENTES))))
+
+        ids, nomes, *colunas = zip(*resultados)
+        valores = np.array(colunas, dtype=np.float64).T
+        return cls(ids, nomes, valores)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Converte nomes ou ids de alimentos em linhas da matriz (-1 quando não encontrado)
+    def linhas(self, alimentos):
+        alimentos = np.asarray(alimentos)
+        if not len(self.ids):
+            return np.full(len(alimentos), -1)
+
+        if alimentos.dtype.kind in 'iu':
+            posicoes = np.clip(np.searchsorted(self._ids_ordenados, alimentos), 0, len(self.ids) - 1)
+            encontrados = self._ids_ordenados[posicoes] == alimentos
+            return np.where(encontrados, self._ordem_ids[posicoes], -1)
+
+        posicoes = self._indice_nomes.get_indexer(alimentos.astype(object))
+        return np.where(posicoes >= 0, self._linhas_nomes[posicoes], -1)
+
+    # Calcula os nutrientes de um lote de pares (alimento, gramas) em uma única operação
+    # Retorna uma matriz (n, nutrientes); alimentos não encontrados ficam com NaN
+    def calcular(self, alimentos, gramas):
+        linhas = self.linhas(alimentos)
+        fatores = np.asarray(gramas, dtype=np.float64) / 100.0
+
+        resultado = np.full((len(linhas), len(COLUNAS_NUTRIENTES)), np.nan)
+        encontrados = linhas >= 0
+        resultado[encontrados] = self.valores[linhas[encontrados]] * fatores[encontrados, None]
+        return resultado
+
+    # Mesmo cálculo de calcular(), devolvido como DataFrame com o nome de cada nutriente
+    def calcular_df(self, alimentos, gramas):
+        return pd.DataFrame(self.calcular(alimentos, gramas), columns=COLUNAS_NUTRIENTES)
+
+    # Soma dos nutrientes de um lote (por exemplo, os ingredientes de uma receita)
+    def totais(self, alimentos, gramas):
+        return dict(zip(COLUNAS_NUTRIENTES, np.nansum(self.calcular(alimentos, gramas), axis=0)))
+
+    # Recalcula calorias e macronutrientes de refeições (colunas alimento e quantidade)
+    # Refeições cujo alimento não está na tabela TACO mantêm os valores originais
+    def recalcular_refeicoes(self, df_refeicoes):
+        calculado = self.calcular(df_refeicoes['alimento'].to_numpy(), df_refeicoes['quantidade'].to_numpy())
+        encontrados = ~np.isnan(calculado[:, 0])
+
+        df = df_refeicoes.copy()
+        for coluna_taco, coluna_refeicao in COLUNAS_REFEICAO.items():
+            valores = calculado[:, COLUNAS_NUTRIENTES.index(coluna_taco)]
+            df[coluna_refeicao] = np.where(encontrados, valores, df[coluna_refeicao].to_numpy(dtype=np.float64))
+        return df
+
+
+# Função para obter a matriz de nutrientes do processo (carregada uma única vez)
+def obter_matriz_nutrientes():
+    global _matriz
+    if _matriz is None:
+        with _lock:
+            if _matriz is None:
+                _matriz = MatrizNutrientes.carregar()
+    return _matriz
+
+
+# Função para descartar a matriz em memória (chamar após alterar a tabela TACO)
+def invalidar_matriz_nutrientes():
+    global _matriz
+    with _lock:
+        _matriz = None
@@ -0,0 +1,249 @@
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Log dos spans de cada execução rastreada (JSON Lines, uma linha por span, com rotação),
+# na pasta de cache da aplicação (a mesma do download da TACO)
+CAMINHO_LOG = os.environ.get('NUTRICAO_RASTREAMENTO_LOG', os.path.join(
+    os.environ.get('NUTRICAO_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'nutricao-app')),
+    'rastreamento.jsonl'))
+TAMANHO_MAXIMO_LOG = 5 * 2**20
+ARQUIVOS_ANTIGOS_LOG = 3
+
+# Execução rastreada do contexto atual (cada sessão do Streamlit roda em sua própria thread);
+# None quando o rastreamento está desligado: as funções rastreadas só consultam esta variável
+_execucao = contextvars.ContextVar('execucao_rastreada', default=None)
+
+# Execuções rastreadas em andamento no processo: o tracemalloc fica ligado só enquanto houver alguma
+_execucoes_ativas = 0
+_lock = threading.Lock()
+
+_logger = logging.getLogger('nutricao_app.rastreamento')
+# Handler do arquivo de log, criado no primeiro uso (outros handlers podem ser
+# adicionados ao logger por quem configura o logging do processo)
+_manipulador_log = None
+
+
+# Span de uma fase da execução: duração, linhas devolvidas e memória alocada
+# (bytes_alocados: pico de memória acima do início do span, medido pelo tracemalloc,
+# que é global ao processo: inclui alocações de outras threads no mesmo intervalo)
+class Span:
+    def __init__(self, execucao, nome, atributos):
+        self.execucao = execucao
+        self.nome = nome
+        self.atributos = atributos
+        self.nivel = len(execucao.pilha)
+        self.pai = execucao.pilha[-1].nome if execucao.pilha else None
+        self.linhas = None
+
+    # Registra a quantidade de linhas do resultado e devolve o próprio resultado
+    def contar(self, resultado):
+        self.linhas = _contar_linhas(resultado)
+        return resultado
+
+    def __enter__(self):
+        memoria, pico = tracemalloc.get_traced_memory()
+        if self.execucao.pilha:
+            pai = self.execucao.pilha[-1]
+            pai.pico_memoria = max(pai.pico_memoria, pico)
+        tracemalloc.reset_peak()
+
+        self.memoria_inicio = self.pico_memoria = memoria
+        self.execucao.pilha.append(self)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        fim = time.perf_counter()
+        memoria, pico = tracemalloc.get_traced_memory()
+        self.pico_memoria = max(self.pico_memoria, pico)
+        self.execucao.pilha.pop()
+        if self.execucao.pilha:
+            pai = self.execucao.pilha[-1]
+            pai.pico_memoria = max(pai.pico_memoria, self.pico_memoria)
+
+        self.execucao.spans.append({
+            'nome': self.nome,
+            'pai': self.pai,
+            'nivel': self.nivel,
+            'inicio_ms': (self.inicio - self.execucao.inicio) * 1000,
+            'duracao_ms': (fim - self.inicio) * 1000,
+            'linhas': self.linhas,
+            'bytes_alocados': self.pico_memoria - self.memoria_inicio,
+            'bytes_retidos': memoria - self.memoria_inicio,
+            'erro': excecao[0].__name__ if excecao[0] else None,
+            **self.atributos,
+        })
+        return False
+
+
+# Span usado com o rastreamento desligado: não mede nada
+class _SpanInativo:
+    def contar(self, resultado):
+        return resultado
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+
+_SPAN_INATIVO = _SpanInativo()
+
+
+# Execução rastreada (uma execução do script do Streamlit): spans na ordem em que terminaram
+class ExecucaoRastreada:
+    def __init__(self, nome):
+        self.id = uuid.uuid4().hex[:12]
+        self.nome = nome
+        self.data_hora = datetime.now().isoformat(timespec='milliseconds')
+        self.inicio = time.perf_counter()
+        self.spans = []
+        self.pilha = []
+        self.token = None
+
+    def duracao_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+# Função para contar as linhas de um resultado: DataFrames, Series e arrays pelo tamanho,
+# figuras Plotly pelos pontos desenhados e tuplas pela soma dos DataFrames/figuras que contêm
+# (ou pela quantidade de itens, quando não contêm nenhum)
+def _contar_linhas(resultado):
+    if resultado is None:
+        return None
+    if hasattr(resultado, 'shape'):
+        return int(resultado.shape[0]) if resultado.shape else 1
+    if hasattr(resultado, 'data') and hasattr(resultado, 'layout'):
+        return sum(len(traco.x) for traco in resultado.data if getattr(traco, 'x', None) is not None)
+    if isinstance(resultado, (tuple, list)):
+        contaveis = [item for item in resultado if hasattr(item, 'shape') or hasattr(item, 'layout')]
+        return sum(_contar_linhas(item) for item in contaveis) if contaveis else len(resultado)
+    return None
+
+
+# Função para verificar se há uma execução rastreada no contexto atual
+def rastreamento_ativo():
+    return _execucao.get() is not None
+
+
+# Função para iniciar o rastreamento da execução atual (liga o tracemalloc, se preciso)
+# Retorna a execução rastreada, a ser passada para finalizar_rastreamento
+def iniciar_rastreamento(nome='execucao'):
+    global _execucoes_ativas
+    anterior = _execucao.get()
+    if anterior is not None:
+        # Execução anterior interrompida por uma exceção antes de finalizar
+        finalizar_rastreamento(anterior)
+
+    with _lock:
+        if _execucoes_ativas == 0:
+            tracemalloc.start()
+        _execucoes_ativas += 1
+
+    execucao = ExecucaoRastreada(nome)
+    execucao.token = _execucao.set(execucao)
+    return execucao
+
+
+# Função para finalizar o rastreamento: grava os spans no log e desliga o tracemalloc
+# quando não há outras execuções rastreadas. Retorna a lista de spans
+def finalizar_rastreamento(execucao):
+    global _execucoes_ativas
+    if execucao.token is None:
+        return execucao.spans
+
+    try:
+        _execucao.reset(execucao.token)
+    except ValueError:
+        _execucao.set(None)
+    execucao.token = None
+
+    with _lock:
+        _execucoes_ativas -= 1
+        if _execucoes_ativas == 0:
+            tracemalloc.stop()
+
+    _gravar_log(execucao)
+    return execucao.spans
+
+
+# Função para rastrear uma execução inteira em um bloco with (o valor do with é a execução,
+# ou None com ativo=False, quando nada é medido). O rastreamento é finalizado na saída do
+# bloco mesmo se a execução terminar por uma exceção (inclusive as de st.rerun() e st.stop()),
+# e o tracemalloc não fica ligado para as execuções seguintes do processo
+@contextlib.contextmanager
+def rastrear_execucao(nome='execucao', ativo=True):
+    if not ativo:
+        yield None
+        return
+
+    execucao = iniciar_rastreamento(nome)
+    try:
+        yield execucao
+    finally:
+        finalizar_rastreamento(execucao)
+
+
+# Função para obter o logger do arquivo JSON Lines (configurado no primeiro uso)
+def _obter_logger():
+    global _manipulador_log
+    with _lock:
+        if _manipulador_log is None:
+            os.makedirs(os.path.dirname(os.path.abspath(CAMINHO_LOG)), exist_ok=True)
+            manipulador = RotatingFileHandler(CAMINHO_LOG, maxBytes=TAMANHO_MAXIMO_LOG,
+                                              backupCount=ARQUIVOS_ANTIGOS_LOG, encoding='utf-8')
+            manipulador.setFormatter(logging.Formatter('%(message)s'))
+            _logger.addHandler(manipulador)
+            _manipulador_log = manipulador
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False
+    return _logger
+
+
+# Função para gravar os spans de uma execução no log (uma linha JSON por span)
+def _gravar_log(execucao):
+    try:
+        logger = _obter_logger()
+        for registro in execucao.spans:
+            logger.info(json.dumps({'execucao': execucao.id, 'nome_execucao': execucao.nome,
+                                    'data_hora': execucao.data_hora, **registro},
+                                   ensure_ascii=False, default=str))
+    except OSError:
+        # O log é auxiliar: falhas de escrita não interrompem a aplicação
+        pass
+
+
+# Função para medir uma fase da execução em um bloco with (sem efeito com o rastreamento
+# desligado); o valor do with tem contar(resultado), que registra as linhas do resultado
+def span(nome, **atributos):
+    execucao = _execucao.get()
+    if execucao is None:
+        return _SPAN_INATIVO
+    return Span(execucao, nome, atributos)
+
+
+# Decorador que mede cada chamada da função em um span (módulo.função) e conta as linhas
+# do resultado; com o rastreamento desligado, o custo é uma consulta à variável de contexto
+def rastrear(funcao):
+    nome = f"{funcao.__module__.rsplit('.', 1)[-1]}.{funcao.__qualname__}"
+
+    @functools.wraps(funcao)
+    def rastreada(*args, **kwargs):
+        execucao = _execucao.get()
+        if execucao is None:
+            return funcao(*args, **kwargs)
+        with Span(execucao, nome, {}) as registro:
+            return registro.contar(funcao(*args, **kwargs))
+
+    return rastreada
@@ -0,0 +1,114 @@
+from nutricao_app import repositorio
+from nutricao_app.nutrientes import COLUNAS_NUTRIENTES, COLUNAS_REFEICAO
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.registros import adicionar_refeicao
+from nutricao_app.repositorio import sql_calcular_vetor_receitas
+
+# Receitas (pratos de vários ingredientes da tabela TACO) com o vetor de nutrientes por
+# 100 g da receita pronta gravado na própria linha: calculado uma vez ao salvar a receita,
+# de modo que registrar uma porção é uma única leitura (sem consultar cada ingrediente).
+# Gatilhos em alimentos_taco recalculam o vetor das receitas que usam um alimento quando
+# os nutrientes dele mudam, na mesma transação (ex.: atualização do snapshot da TACO);
+# um ingrediente removido da TACO deixa o vetor nulo até a receita ser salva de novo
+# (leituras e gravações no repositório)
+#
+# Função para criar as tabelas de receitas e os gatilhos que mantêm os vetores atualizados
+def criar_tabelas_receitas(conn):
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS receitas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER NOT NULL,
+        nome TEXT NOT NULL,
+        rendimento_g REAL NOT NULL,
+        {', '.join(f'{coluna} REAL' for coluna in COLUNAS_NUTRIENTES)}
+    )
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_receitas_usuario_nome ON receitas (usuario_id, nome)')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS receita_ingredientes (
+        id INTEGER PRIMARY KEY,
+        receita_id INTEGER NOT NULL,
+        alimento_id INTEGER NOT NULL,
+        gramas REAL NOT NULL
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_receita_ingredientes_receita ON receita_ingredientes (receita_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_receita_ingredientes_alimento ON receita_ingredientes (alimento_id)')
+
+    # O upsert da importação da TACO reescreve todas as colunas: só alimentos com algum
+    # nutriente diferente recalculam as receitas
+    alterados = ' OR '.join(f'OLD.{coluna} IS NOT NEW.{coluna}' for coluna in COLUNAS_NUTRIENTES)
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS receitas_alimento_alterar
+    AFTER UPDATE OF {', '.join(COLUNAS_NUTRIENTES)} ON alimentos_taco
+    WHEN {alterados}
+    BEGIN
+        {sql_calcular_vetor_receitas('id IN (SELECT receita_id FROM receita_ingredientes WHERE alimento_id = NEW.id)')};
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS receitas_alimento_excluir
+    AFTER DELETE ON alimentos_taco
+    BEGIN
+        {sql_calcular_vetor_receitas('id IN (SELECT receita_id FROM receita_ingredientes WHERE alimento_id = OLD.id)')};
+    END
+    ''')
+
+
+# Função para salvar uma receita do usuário (cria ou substitui a receita de mesmo nome)
+# ingredientes: pares (id do alimento TACO, gramas); rendimento_g: peso da receita pronta
+# (padrão: soma dos ingredientes). Retorna o id da receita
+def salvar_receita(usuario_id, nome, ingredientes, rendimento_g=None):
+    nome = nome.strip()
+    ingredientes = [(int(alimento_id), float(gramas)) for alimento_id, gramas in ingredientes]
+    if not nome:
+        raise ValueError('Informe o nome da receita')
+    if not ingredientes:
+        raise ValueError('A receita precisa de ao menos um ingrediente')
+    if any(gramas <= 0 for _, gramas in ingredientes):
+        raise ValueError('A quantidade de cada ingrediente deve ser maior que zero')
+    rendimento_g = float(rendimento_g or sum(gramas for _, gramas in ingredientes))
+    if rendimento_g <= 0:
+        raise ValueError('O rendimento da receita deve ser maior que zero')
+
+    return repositorio.gravar_receita(usuario_id, nome, rendimento_g, ingredientes)
+
+
+# Função para excluir uma receita do usuário e seus ingredientes
+def excluir_receita(usuario_id, receita_id):
+    repositorio.excluir_receita(usuario_id, receita_id)
+
+
+# Função para listar as receitas do usuário em ordem de nome
+# Retorna tuplas (id, nome, rendimento_g, nutrientes por 100 g na ordem de COLUNAS_NUTRIENTES)
+def listar_receitas(usuario_id):
+    return repositorio.ler_usuario('receitas', ['id', 'nome', 'rendimento_g', *COLUNAS_NUTRIENTES], usuario_id,
+                                   ordem=('nome',))
+
+
+# Função para obter os ingredientes de uma receita: tuplas (id do alimento, nome, gramas)
+# (nome nulo: alimento removido da tabela TACO)
+def obter_ingredientes(receita_id):
+    return repositorio.ler_ingredientes_receita(receita_id)
+
+
+# Função para calcular uma porção de receita com uma única leitura (o vetor gravado)
+# Retorna o nome da receita e os nutrientes da quantidade em gramas, nas colunas de refeicoes
+@rastrear
+def porcao_receita(usuario_id, receita_id, quantidade):
+    linha = repositorio.ler_receita(usuario_id, receita_id, ['nome', *COLUNAS_REFEICAO])
+    if linha is None:
+        raise ValueError(f'Receita {receita_id} não encontrada')
+    nome, *vetor = linha
+    if vetor[0] is None:
+        raise ValueError(f'A receita "{nome}" tem ingredientes removidos da tabela TACO: salve-a novamente')
+    return {'alimento': nome, 'quantidade': quantidade,
+            **{coluna: valor * quantidade / 100 for coluna, valor in zip(COLUNAS_REFEICAO.values(), vetor)}}
+
+
+# Função para registrar uma porção de receita como refeição (retorna o id da refeição)
+def registrar_receita(usuario_id, data, tipo_refeicao, receita_id, quantidade):
+    porcao = porcao_receita(usuario_id, receita_id, quantidade)
+    return adicionar_refeicao(usuario_id, data, tipo_refeicao, porcao['alimento'], quantidade, porcao['calorias'],
+                              porcao['proteinas'], porcao['carboidratos'], porcao['gorduras'])
@@ -0,0 +1,151 @@
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app import repositorio
+from nutricao_app.datas import dias_para_datetime, para_dia
+from nutricao_app.gravacao import ESPERA_FILA, enfileirar_insercao
+from nutricao_app.models import METAS_PADRAO
+from nutricao_app.rastreamento import rastrear
+
+# Tipos das colunas dos DataFrames carregados do banco (e mantidos na sessão):
+# textos repetidos como categoria (cada tipo de refeição e alimento é guardado
+# uma vez por DataFrame) e nutrientes/medidas em float32
+TIPO_DATA = 'datetime64[s]'
+ESQUEMA_REFEICOES = {
+    'data': TIPO_DATA,
+    'refeicao': 'category',
+    'alimento': 'category',
+    'quantidade': 'float32',
+    'calorias': 'float32',
+    'proteinas': 'float32',
+    'carboidratos': 'float32',
+    'gorduras': 'float32',
+}
+ESQUEMA_MEDIDAS = {
+    'data': TIPO_DATA,
+    'peso': 'float32',
+    'imc': 'float32',
+    'cintura': 'float32',
+    'quadril': 'float32',
+    'gordura_corporal': 'float32',
+}
+
+COLUNAS_REFEICOES = list(ESQUEMA_REFEICOES)
+COLUNAS_MEDIDAS = list(ESQUEMA_MEDIDAS)
+
+# Colunas gravadas em cada inserção (ordem dos valores das linhas passadas ao repositório)
+COLUNAS_INSERCAO_REFEICOES = ['usuario_id', *COLUNAS_REFEICOES, 'chave_registro']
+COLUNAS_INSERCAO_MEDIDAS = ['usuario_id', *COLUNAS_MEDIDAS]
+
+# Tipo de leitura de cada coluna no array intermediário: número do dia como float
+# (NULL vira NaN) e textos como objeto, convertidos depois para datetime64 e categoria
+_TIPOS_LEITURA = {TIPO_DATA: 'f8', 'category': 'O'}
+
+
+# Função para montar um DataFrame tipado direto das linhas do cursor
+# (as linhas vão para um único array estruturado, sem lista de tuplas intermediária)
+def montar_df(linhas, esquema):
+    registros = np.fromiter(linhas, dtype=[(coluna, _TIPOS_LEITURA.get(tipo, tipo)) for coluna, tipo in esquema.items()])
+
+    colunas = {}
+    for coluna, tipo in esquema.items():
+        valores = registros[coluna]
+        if tipo == TIPO_DATA:
+            valores = dias_para_datetime(valores)
+        elif tipo == 'category':
+            codigos, categorias = pd.factorize(valores)
+            valores = pd.Categorical.from_codes(codigos, categories=categorias)
+        colunas[coluna] = valores
+
+    return pd.DataFrame(colunas, columns=list(esquema))
+
+
+# Função para concatenar DataFrames do mesmo esquema sem perder as colunas categóricas
+# (pd.concat converte para texto categorias com valores diferentes)
+def concatenar_df(dfs):
+    df = pd.concat(dfs)
+    for coluna in dfs[0].columns:
+        if isinstance(dfs[0][coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = pd.api.types.union_categoricals([parte[coluna] for parte in dfs])
+    return df
+
+
+# Função para calcular a chave de deduplicação de refeições: hash de 64 bits de
+# (data, refeição, alimento, quantidade), com textos sem espaços extras e em
+# minúsculas e quantidade arredondada. Recebe colunas (listas ou arrays) e
+# retorna um array int64 (o hash dos textos é o SipHash de chave fixa do pandas,
+# estável entre processos)
+def chaves_refeicoes(datas, refeicoes, alimentos, quantidades):
+    hashes = [
+        pd.util.hash_array(np.asarray(datas, dtype=np.int64)),
+        pd.util.hash_array(np.round(np.asarray(quantidades, dtype=np.float64), 2)),
+    ]
+    for textos in (refeicoes, alimentos):
+        # Cada texto distinto é padronizado e calculado uma única vez
+        codigos, unicos = pd.factorize(pd.Series(np.asarray(textos, dtype=object), dtype=object).fillna(''))
+        padronizados = np.array([' '.join(str(texto).lower().split()) for texto in unicos], dtype=object)
+        hashes.append(pd.util.hash_array(padronizados, categorize=False)[codigos])
+
+    chaves = np.zeros(len(hashes[0]), dtype=np.uint64)
+    for valores in hashes:
+        chaves = (chaves * np.uint64(0x100000001B3)) ^ valores
+    return chaves.view(np.int64)
+
+
+# Função para enfileirar uma refeição no gravador em lotes
+# Refeições registradas no app ficam sem chave de deduplicação (a mesma refeição pode ser
+# registrada duas vezes no dia); a chave única por usuário só vale para as importadas
+# Retorna um Future resolvido com o id da refeição quando ela estiver gravada
+def enfileirar_refeicao(usuario_id, data, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos,
+                        gorduras, espera=ESPERA_FILA):
+    return enfileirar_insercao(usuario_id, 'refeicoes', repositorio.sql_insercao('refeicoes', COLUNAS_INSERCAO_REFEICOES),
+                               (usuario_id, para_dia(data), tipo_refeicao, alimento, quantidade, calorias, proteinas,
+                                carboidratos, gorduras, None), espera)
+
+
+# Função para adicionar refeição (espera o commit do lote; retorna o id da refeição)
+def adicionar_refeicao(usuario_id, data, tipo_refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras):
+    return enfileirar_refeicao(usuario_id, data, tipo_refeicao, alimento, quantidade, calorias, proteinas,
+                               carboidratos, gorduras).result()
+
+
+# Função para enfileirar uma medida no gravador em lotes
+# Retorna um Future resolvido com o id da medida quando ela estiver gravada
+def enfileirar_medida(usuario_id, data, peso, altura, cintura, quadril, gordura_corporal, espera=ESPERA_FILA):
+    imc = peso / ((altura/100) ** 2)
+    return enfileirar_insercao(usuario_id, 'medidas', repositorio.sql_insercao('medidas', COLUNAS_INSERCAO_MEDIDAS),
+                               (usuario_id, para_dia(data), peso, imc, cintura, quadril, gordura_corporal), espera)
+
+
+# Função para adicionar medida (espera o commit do lote)
+def adicionar_medida(usuario_id, data, peso, altura, cintura, quadril, gordura_corporal):
+    enfileirar_medida(usuario_id, data, peso, altura, cintura, quadril, gordura_corporal).result()
+
+
+# Função para atualizar metas (cria a linha de metas do usuário no primeiro salvamento)
+# Retorna a nova versão das metas do usuário
+def atualizar_metas(usuario_id, metas_dict):
+    return repositorio.salvar_metas(usuario_id, {campo: metas_dict[campo] for campo in METAS_PADRAO})
+
+
+# Função para obter refeições por data
+@rastrear
+def obter_refeicoes_por_data(usuario_id, data):
+    return repositorio.ler_usuario('refeicoes', COLUNAS_REFEICOES, usuario_id, dia=para_dia(data),
+                                   converter=partial(montar_df, esquema=ESQUEMA_REFEICOES))
+
+
+# Função para obter refeições por período
+@rastrear
+def obter_refeicoes_por_periodo(usuario_id, data_inicio):
+    return repositorio.ler_usuario('refeicoes', COLUNAS_REFEICOES, usuario_id, inicio=para_dia(data_inicio),
+                                   converter=partial(montar_df, esquema=ESQUEMA_REFEICOES))
+
+
+# Função para obter todas as medidas
+@rastrear
+def obter_todas_medidas(usuario_id):
+    return repositorio.ler_usuario('medidas', COLUNAS_MEDIDAS, usuario_id,
+                                   converter=partial(montar_df, esquema=ESQUEMA_MEDIDAS))
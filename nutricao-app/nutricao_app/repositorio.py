@@ -0,0 +1,511 @@
+import sqlite3
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+
+from sqlalchemy import bindparam, delete, func, literal_column, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.sqlite import insert
+
+from nutricao_app.banco import conectar_bd
+from nutricao_app.models import (METAS_PADRAO, AlimentosTaco, IngredientesReceita, Medidas, Metas, Receitas,
+                                Refeicoes, ResumoDiario, Usuarios, VersoesDados)
+from nutricao_app.rastreamento import rastrear
+
+# Repositório das tabelas da aplicação: todas as leituras e gravações dos módulos passam
+# por aqui, escritas em SQLAlchemy Core sobre as tabelas dos modelos (models.py),
+# compiladas para o SQL do SQLite uma única vez por forma (tabela, colunas, filtros) e
+# executadas direto na conexão do pool, sem montar e compilar a consulta a cada chamada
+# (a criação do esquema, os gatilhos e as cargas em massa ficam junto do esquema de cada
+# tabela: models, resumo, busca, receitas, migracoes)
+TABELAS = {modelo.__tablename__: modelo.__table__
+           for modelo in (Usuarios, Refeicoes, Medidas, Metas, AlimentosTaco, ResumoDiario, VersoesDados, Receitas,
+                          IngredientesReceita)}
+
+# Limite de parâmetros por comando do SQLite (999 antes da versão 3.32)
+LIMITE_PARAMETROS = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+# Linhas por INSERT nas gravações em massa (múltiplos VALUES): o restante de cada
+# gravação vai em comandos de potências de 2, para que cada tabela tenha poucas formas
+# compiladas em cache
+LINHAS_POR_INSERCAO = 512
+
+TAMANHO_LOTE_LEITURA = 50000
+
+_DIALETO = sqlite.dialect()
+
+# Consultas executadas enquanto capturar_consultas está ativo (None: captura desligada)
+_capturadas = None
+
+
+# Consulta compilada para o SQL do SQLite: texto e ordem dos parâmetros posicionais
+# (parâmetros sem valor informado usam o valor fixado na consulta, como o LIMIT)
+class ConsultaCompilada:
+    def __init__(self, consulta):
+        compilada = consulta.compile(dialect=_DIALETO)
+        self.sql = compilada.string
+        self.nomes = compilada.positiontup
+        self.padroes = compilada.params
+
+    def argumentos(self, **valores):
+        return tuple(valores[nome] if nome in valores else self.padroes[nome] for nome in self.nomes)
+
+
+# Contexto que registra as consultas de leitura executadas pelo repositório no bloco, como
+# pares (consulta compilada, argumentos): a verificação de planos (migracoes) usa as
+# consultas reais da aplicação em vez de cópias do SQL
+@contextmanager
+def capturar_consultas():
+    global _capturadas
+    _capturadas = capturadas = []
+    try:
+        yield capturadas
+    finally:
+        _capturadas = None
+
+
+# Função para executar uma consulta compilada em uma conexão do pool; 'converter' recebe o
+# cursor (padrão: lista de tuplas), antes de a conexão voltar ao pool
+def _executar(compilada, converter=list, **valores):
+    if _capturadas is not None:
+        _capturadas.append((compilada, compilada.argumentos(**valores)))
+    conn = conectar_bd()
+    try:
+        return converter(conn.execute(compilada.sql, compilada.argumentos(**valores)))
+    finally:
+        conn.close()
+
+
+# Função para montar a consulta das linhas de uma tabela do usuário
+# (filtros por dia exato, por período e por faixa de ids, com os parâmetros dia, inicio,
+# fim, apos_id e ate_id; fim e ate_id inclusivos)
+@lru_cache(maxsize=None)
+def consulta_usuario(tabela, colunas, dia=False, inicio=False, fim=False, ordem=('data',), apos_id=False,
+                     ate_id=False):
+    tabela = TABELAS[tabela]
+    consulta = select(*[tabela.c[coluna] for coluna in colunas]).where(tabela.c.usuario_id == bindparam('usuario_id'))
+    if dia:
+        consulta = consulta.where(tabela.c.data == bindparam('dia'))
+    if inicio:
+        consulta = consulta.where(tabela.c.data >= bindparam('inicio'))
+    if fim:
+        consulta = consulta.where(tabela.c.data <= bindparam('fim'))
+    if apos_id:
+        consulta = consulta.where(tabela.c.id > bindparam('apos_id'))
+    if ate_id:
+        consulta = consulta.where(tabela.c.id <= bindparam('ate_id'))
+    return consulta.order_by(*[tabela.c[coluna] for coluna in ordem])
+
+
+@lru_cache(maxsize=None)
+def _consulta_usuario_compilada(tabela, colunas, dia=False, inicio=False, fim=False, ordem=('data',), apos_id=False,
+                                ate_id=False):
+    return ConsultaCompilada(consulta_usuario(tabela, colunas, dia, inicio, fim, ordem, apos_id, ate_id))
+
+
+# Função para montar a consulta das médias por período de colunas de uma tabela do usuário
+# 'periodo': expressão SQL sobre data que define o período (padrão: o próprio dia);
+# 'positivas': colunas cujas linhas só entram com valor maior que zero; 'contar': inclui
+# a quantidade de linhas do período (filtro opcional a partir do dia 'inicio')
+@lru_cache(maxsize=None)
+def consulta_medias(tabela, colunas, periodo='data', inicio=False, positivas=(), contar=False):
+    tabela = TABELAS[tabela]
+    expressao = literal_column(periodo).label('periodo')
+    consulta = (select(expressao, *[func.avg(tabela.c[coluna]) for coluna in colunas],
+                       *([func.count()] if contar else []))
+                .where(tabela.c.usuario_id == bindparam('usuario_id')))
+    if inicio:
+        consulta = consulta.where(tabela.c.data >= bindparam('inicio'))
+    for coluna in positivas:
+        consulta = consulta.where(tabela.c[coluna] > 0)
+    return consulta.group_by(expressao).order_by(expressao)
+
+
+@lru_cache(maxsize=None)
+def _consulta_medias_compilada(tabela, colunas, periodo='data', inicio=False, positivas=(), contar=False):
+    return ConsultaCompilada(consulta_medias(tabela, colunas, periodo, inicio, positivas, contar))
+
+
+# Função para compilar o INSERT de 'linhas' linhas (múltiplos VALUES) nas colunas dadas
+# (com 'conflito', um upsert: as demais colunas são atualizadas quando a chave já existe;
+# com 'ignorar', as linhas cuja chave já existe são descartadas)
+@lru_cache(maxsize=None)
+def _insercao(tabela, colunas, linhas, conflito=(), ignorar=False):
+    tabela = TABELAS[tabela]
+    consulta = insert(tabela).values([
+        {coluna: bindparam(f'{coluna}_{i}') for coluna in colunas} for i in range(linhas)
+    ])
+    if ignorar:
+        consulta = consulta.on_conflict_do_nothing(index_elements=list(conflito) or None)
+    elif conflito:
+        consulta = consulta.on_conflict_do_update(
+            index_elements=list(conflito),
+            set_={coluna: consulta.excluded[coluna] for coluna in colunas if coluna not in conflito},
+        )
+    compilada = ConsultaCompilada(consulta)
+    # Parâmetros posicionais na ordem das linhas e das colunas: a gravação passa os valores achatados
+    esperados = [f'{coluna}_{i}' for i in range(linhas) for coluna in colunas]
+    if list(compilada.nomes) != esperados:
+        raise ValueError(f'INSERT em {tabela.name} compilado com parâmetros fora da ordem das colunas: '
+                         f'{compilada.nomes[:len(colunas)]}')
+    return compilada
+
+
+# Função para obter o SQL do INSERT de uma linha (parâmetros na ordem das colunas)
+def sql_insercao(tabela, colunas, conflito=(), ignorar=False):
+    return _insercao(tabela, tuple(colunas), 1, tuple(conflito), ignorar).sql
+
+
+# Função para gravar linhas (tuplas na ordem das colunas) em uma tabela, com INSERTs de
+# várias linhas, na transação da conexão informada (o commit fica com quem chama)
+# Retorna a quantidade de linhas gravadas (com 'ignorar', sem as que já existiam)
+def inserir_em_massa(conn, tabela, colunas, linhas, conflito=(), ignorar=False):
+    colunas = tuple(colunas)
+    conflito = tuple(conflito)
+    por_insercao = max(1, min(LINHAS_POR_INSERCAO, LIMITE_PARAMETROS // len(colunas)))
+    por_insercao = 1 << (por_insercao.bit_length() - 1)
+
+    total = 0
+    linhas = iter(linhas)
+    while True:
+        bloco = list(islice(linhas, por_insercao))
+        if not bloco:
+            break
+        inicio = 0
+        while inicio < len(bloco):
+            quantidade = 1 << ((len(bloco) - inicio).bit_length() - 1)
+            parte = bloco[inicio:inicio + quantidade]
+            cursor = conn.execute(_insercao(tabela, colunas, quantidade, conflito, ignorar).sql,
+                                  [valor for linha in parte for valor in linha])
+            total += cursor.rowcount
+            inicio += quantidade
+    return total
+
+
+# Função para ler as linhas de uma tabela do usuário nas colunas dadas, com filtro
+# opcional por dia (número do dia), período (inclusivo) ou faixa de ids (id > apos_id,
+# id <= ate_id); 'converter' recebe o cursor (padrão: lista de tuplas), antes de a
+# conexão voltar ao pool
+def ler_usuario(tabela, colunas, usuario_id, dia=None, inicio=None, fim=None, converter=list, ordem=('data',),
+                apos_id=None, ate_id=None):
+    consulta = _consulta_usuario_compilada(tabela, tuple(colunas), dia is not None, inicio is not None,
+                                           fim is not None, tuple(ordem), apos_id is not None, ate_id is not None)
+    return _executar(consulta, converter, usuario_id=usuario_id, dia=dia, inicio=inicio, fim=fim, apos_id=apos_id,
+                     ate_id=ate_id)
+
+
+# Função para ler as médias por período (consulta_medias) das colunas de uma tabela do
+# usuário: linhas (período, médias..., [quantidade]) em ordem de período
+def ler_medias(tabela, colunas, usuario_id, periodo='data', inicio=None, positivas=(), contar=False,
+               converter=list):
+    consulta = _consulta_medias_compilada(tabela, tuple(colunas), periodo, inicio is not None, tuple(positivas),
+                                          contar)
+    return _executar(consulta, converter, usuario_id=usuario_id, inicio=inicio)
+
+
+@lru_cache(maxsize=None)
+def _consulta_agregado(tabela, expressoes, apos_id=False):
+    tabela = TABELAS[tabela]
+    funcoes = {'min': func.min, 'max': func.max}
+    consulta = (select(*[funcoes[funcao](tabela.c[coluna]) for funcao, coluna in expressoes])
+                .where(tabela.c.usuario_id == bindparam('usuario_id')))
+    if apos_id:
+        consulta = consulta.where(tabela.c.id > bindparam('apos_id'))
+    return ConsultaCompilada(consulta)
+
+
+# Função para obter o dia mais antigo e o maior id das linhas de uma tabela do usuário
+# gravadas depois do id 'apos_id'; (None, None) quando não há linhas novas
+def alteracoes_usuario(tabela, usuario_id, apos_id):
+    return _executar(_consulta_agregado(tabela, (('min', 'data'), ('max', 'id')), True),
+                     lambda cursor: cursor.fetchone(), usuario_id=usuario_id, apos_id=apos_id)
+
+
+# Função para obter o maior id das linhas de uma tabela do usuário (0 quando não há linhas)
+# (MAX sozinho: o SQLite lê só a ponta do índice (usuario_id, id))
+def maior_id(tabela, usuario_id):
+    return _executar(_consulta_agregado(tabela, (('max', 'id'),)), lambda cursor: cursor.fetchone()[0] or 0,
+                     usuario_id=usuario_id)
+
+
+# Função para obter o primeiro dia com linhas de uma tabela do usuário (None quando não há linhas)
+def primeiro_dia(tabela, usuario_id):
+    return _executar(_consulta_agregado(tabela, (('min', 'data'),)), lambda cursor: cursor.fetchone()[0],
+                     usuario_id=usuario_id)
+
+
+@lru_cache(maxsize=None)
+def _consulta_alguma_linha(tabela):
+    return ConsultaCompilada(select(literal_column('1')).select_from(TABELAS[tabela]).limit(1))
+
+
+# Função para verificar se uma tabela está vazia (em todos os usuários)
+def tabela_vazia(tabela):
+    return _executar(_consulta_alguma_linha(tabela), lambda cursor: cursor.fetchone() is None)
+
+
+@lru_cache(maxsize=None)
+def _consulta_contagem(tabela):
+    return ConsultaCompilada(select(func.count()).select_from(TABELAS[tabela]))
+
+
+# Função para contar as linhas de uma tabela (em todos os usuários)
+def contar_linhas(tabela):
+    return _executar(_consulta_contagem(tabela), lambda cursor: cursor.fetchone()[0])
+
+
+# Função para ler as linhas de uma tabela do usuário em lotes (listas de tuplas), ordenadas
+# por (data, id): o cursor entrega tamanho_lote linhas por vez, sem carregar a tabela inteira
+# (direto no cursor do driver: com yield_per, as linhas do SQLAlchemy deixam a leitura
+# 30-40% mais lenta)
+def ler_lotes(tabela, colunas, usuario_id, inicio=None, fim=None, tamanho_lote=TAMANHO_LOTE_LEITURA):
+    consulta = _consulta_usuario_compilada(tabela, tuple(colunas), inicio=inicio is not None, fim=fim is not None,
+                                           ordem=('data', 'id'))
+    if _capturadas is not None:
+        _capturadas.append((consulta, consulta.argumentos(usuario_id=usuario_id, inicio=inicio, fim=fim)))
+    conn = conectar_bd()
+    try:
+        cursor = conn.execute(consulta.sql, consulta.argumentos(usuario_id=usuario_id, inicio=inicio, fim=fim))
+        while True:
+            linhas = cursor.fetchmany(tamanho_lote)
+            if not linhas:
+                break
+            yield linhas
+    finally:
+        conn.close()
+
+
+_CONSULTA_METAS = ConsultaCompilada(
+    select(*[TABELAS['metas'].c[coluna] for coluna in METAS_PADRAO])
+    .where(TABELAS['metas'].c.usuario_id == bindparam('usuario_id'))
+)
+
+_CONSULTA_VERSAO = ConsultaCompilada(
+    select(VersoesDados.versao)
+    .where(VersoesDados.usuario_id == bindparam('usuario_id'), VersoesDados.tabela == bindparam('tabela'))
+)
+
+_CONSULTA_INFO_NUTRICIONAL = ConsultaCompilada(
+    select(AlimentosTaco.energia_kcal, AlimentosTaco.proteina_g, AlimentosTaco.lipideos_g, AlimentosTaco.carboidrato_g)
+    .where(AlimentosTaco.nome == bindparam('nome'))
+    .limit(1)
+)
+
+
+_CONSULTA_ID_USUARIO = ConsultaCompilada(select(Usuarios.id).where(Usuarios.nome == bindparam('nome')))
+
+
+# Função para obter o id do usuário de um nome, criando o usuário se ele ainda não existe
+def obter_ou_criar_usuario(nome, criado_em):
+    conn = conectar_bd()
+    try:
+        inserir_em_massa(conn, 'usuarios', ('nome', 'criado_em'), [(nome, criado_em)], ignorar=True)
+        conn.commit()
+        return conn.execute(_CONSULTA_ID_USUARIO.sql, _CONSULTA_ID_USUARIO.argumentos(nome=nome)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+# Função para obter as metas de um usuário (as metas padrão enquanto ele não salvou as suas)
+@rastrear
+def obter_metas(usuario_id):
+    linha = _executar(_CONSULTA_METAS, lambda cursor: cursor.fetchone(), usuario_id=usuario_id)
+
+    if linha is None:
+        return dict(METAS_PADRAO)
+    return dict(zip(METAS_PADRAO, linha))
+
+
+# Função para obter a versão dos dados de uma tabela do usuário (0: nunca alterada)
+def ler_versao_dados(usuario_id, tabela):
+    return _executar(_CONSULTA_VERSAO, lambda cursor: (cursor.fetchone() or (0,))[0], usuario_id=usuario_id,
+                     tabela=tabela)
+
+
+# Função para gravar as metas de um usuário (cria a linha no primeiro salvamento)
+# Retorna a versão das metas gerada pela gravação (lida na mesma transação)
+def salvar_metas(usuario_id, metas):
+    conn = conectar_bd()
+    try:
+        inserir_em_massa(conn, 'metas', ('usuario_id', *METAS_PADRAO),
+                         [(usuario_id, *(metas[campo] for campo in METAS_PADRAO))], conflito=('usuario_id',))
+        versao = conn.execute(_CONSULTA_VERSAO.sql,
+                              _CONSULTA_VERSAO.argumentos(usuario_id=usuario_id, tabela='metas')).fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    return versao
+
+
+# Função para obter os nutrientes (por 100 g) de um alimento da tabela TACO pelo nome exato
+@rastrear
+def obter_info_nutricional(nome_exato):
+    linha = _executar(_CONSULTA_INFO_NUTRICIONAL, lambda cursor: cursor.fetchone(), nome=nome_exato)
+
+    if linha is None:
+        return None
+    return dict(zip(['calorias', 'proteinas', 'gorduras', 'carboidratos'], linha))
+
+
+# Busca pelo índice de texto completo: os candidatos mais relevantes (ordenados pelo rank
+# antes do LIMIT, para que os melhores não fiquem de fora em buscas amplas) e, entre eles,
+# os nomes mais curtos primeiro (parâmetros :consulta, :candidatos e :limite)
+CONSULTA_FTS = '''
+SELECT t.id, t.nome, t.energia_kcal, t.proteina_g, t.lipideos_g, t.carboidrato_g
+FROM (
+    SELECT rowid, rank FROM alimentos_taco_fts
+    WHERE alimentos_taco_fts MATCH :consulta
+    ORDER BY rank
+    LIMIT :candidatos
+) f
+JOIN alimentos_taco t ON t.id = f.rowid
+ORDER BY f.rank, length(t.nome)
+LIMIT :limite
+'''
+
+_CONSULTA_FTS = ConsultaCompilada(text(CONSULTA_FTS))
+
+COLUNAS_SUGESTAO = ['id', 'nome', 'energia_kcal', 'proteina_g', 'lipideos_g', 'carboidrato_g']
+
+_CONSULTA_NOME_PARCIAL = ConsultaCompilada(
+    select(*[AlimentosTaco.__table__.c[coluna] for coluna in COLUNAS_SUGESTAO])
+    .where(AlimentosTaco.nome.like(bindparam('padrao')))
+    .order_by(AlimentosTaco.nome)
+    .limit(bindparam('limite'))
+)
+
+
+# Função para buscar alimentos TACO pela expressão FTS5 (CONSULTA_FTS)
+# Retorna tuplas nas colunas de COLUNAS_SUGESTAO (sqlite3.OperationalError sem o índice de busca)
+def buscar_alimentos_fts(consulta, candidatos, limite):
+    return _executar(_CONSULTA_FTS, consulta=consulta, candidatos=candidatos, limite=limite)
+
+
+# Função para buscar alimentos TACO cujo nome contém o termo, em ordem de nome (sem índice)
+def buscar_alimentos_por_nome(termo, limite):
+    return _executar(_CONSULTA_NOME_PARCIAL, padrao=f'%{termo}%', limite=limite)
+
+
+@lru_cache(maxsize=None)
+def _consulta_alimentos_taco(colunas):
+    return ConsultaCompilada(select(*[AlimentosTaco.__table__.c[coluna] for coluna in colunas])
+                             .order_by(AlimentosTaco.id))
+
+
+# Função para ler todos os alimentos da tabela TACO nas colunas dadas, em ordem de id
+def ler_alimentos_taco(colunas, converter=list):
+    return _executar(_consulta_alimentos_taco(tuple(colunas)), converter)
+
+
+# Colunas do vetor de nutrientes por 100 g gravado em cada receita (as mesmas de alimentos_taco)
+COLUNAS_VETOR_RECEITA = [coluna.name for coluna in Receitas.__table__.c
+                         if coluna.name not in ('id', 'usuario_id', 'nome', 'rendimento_g')]
+
+
+# Função para montar o UPDATE que recalcula o vetor das receitas filtradas por 'filtro'
+# (SQL sobre receitas): soma de nutriente × gramas dos ingredientes dividida pelo rendimento
+# (nutriente sem valor na TACO conta como zero, como na matriz de nutrientes; ingrediente
+# sem linha na TACO deixa o vetor nulo). Usado na gravação e nos gatilhos de receitas
+def sql_calcular_vetor_receitas(filtro):
+    return f'''
+    UPDATE receitas SET ({', '.join(COLUNAS_VETOR_RECEITA)}) = (
+        SELECT {', '.join(f'CASE WHEN COUNT(t.id) = COUNT(*) THEN SUM(IFNULL(t.{coluna}, 0) * i.gramas) / receitas.rendimento_g END'
+                          for coluna in COLUNAS_VETOR_RECEITA)}
+        FROM receita_ingredientes i
+        LEFT JOIN alimentos_taco t ON t.id = i.alimento_id
+        WHERE i.receita_id = receitas.id
+    )
+    WHERE {filtro}
+    '''
+
+
+COLUNAS_INGREDIENTES = ['receita_id', 'alimento_id', 'gramas']
+
+_receitas = TABELAS['receitas']
+_ingredientes = TABELAS['receita_ingredientes']
+_taco = TABELAS['alimentos_taco']
+
+_CONSULTA_ID_RECEITA = ConsultaCompilada(
+    select(_receitas.c.id).where(_receitas.c.usuario_id == bindparam('usuario_id'),
+                                 _receitas.c.nome == bindparam('nome'))
+)
+_EXCLUIR_RECEITA = ConsultaCompilada(
+    delete(_receitas).where(_receitas.c.id == bindparam('receita_id'), _receitas.c.usuario_id == bindparam('usuario_id'))
+)
+_EXCLUIR_INGREDIENTES = ConsultaCompilada(delete(_ingredientes).where(_ingredientes.c.receita_id == bindparam('receita_id')))
+_CONSULTA_INGREDIENTES = ConsultaCompilada(
+    select(_ingredientes.c.alimento_id, _taco.c.nome, _ingredientes.c.gramas)
+    .select_from(_ingredientes.outerjoin(_taco, _taco.c.id == _ingredientes.c.alimento_id))
+    .where(_ingredientes.c.receita_id == bindparam('receita_id'))
+    .order_by(_ingredientes.c.id)
+)
+_CONSULTA_INGREDIENTES_AUSENTES = ConsultaCompilada(
+    select(func.count())
+    .select_from(_ingredientes.outerjoin(_taco, _taco.c.id == _ingredientes.c.alimento_id))
+    .where(_ingredientes.c.receita_id == bindparam('receita_id'), _taco.c.id.is_(None))
+)
+_CALCULAR_VETOR_RECEITA = ConsultaCompilada(text(sql_calcular_vetor_receitas('id = :receita_id')))
+
+
+# Função para gravar uma receita do usuário e seus ingredientes (pares id do alimento,
+# gramas) em uma transação: cria ou substitui a receita de mesmo nome e calcula o vetor
+# Retorna o id da receita (ValueError se algum ingrediente não está na tabela TACO)
+def gravar_receita(usuario_id, nome, rendimento_g, ingredientes):
+    conn = conectar_bd()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        inserir_em_massa(conn, 'receitas', ('usuario_id', 'nome', 'rendimento_g'),
+                         [(usuario_id, nome, rendimento_g)], conflito=('usuario_id', 'nome'))
+        receita_id = conn.execute(_CONSULTA_ID_RECEITA.sql,
+                                  _CONSULTA_ID_RECEITA.argumentos(usuario_id=usuario_id, nome=nome)).fetchone()[0]
+        conn.execute(_EXCLUIR_INGREDIENTES.sql, _EXCLUIR_INGREDIENTES.argumentos(receita_id=receita_id))
+        inserir_em_massa(conn, 'receita_ingredientes', COLUNAS_INGREDIENTES,
+                         [(receita_id, alimento_id, gramas) for alimento_id, gramas in ingredientes])
+        if conn.execute(_CONSULTA_INGREDIENTES_AUSENTES.sql,
+                        _CONSULTA_INGREDIENTES_AUSENTES.argumentos(receita_id=receita_id)).fetchone()[0]:
+            raise ValueError('Ingrediente não encontrado na tabela TACO')
+        conn.execute(_CALCULAR_VETOR_RECEITA.sql, _CALCULAR_VETOR_RECEITA.argumentos(receita_id=receita_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return receita_id
+
+
+# Função para excluir uma receita do usuário e seus ingredientes
+def excluir_receita(usuario_id, receita_id):
+    conn = conectar_bd()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if conn.execute(_EXCLUIR_RECEITA.sql,
+                        _EXCLUIR_RECEITA.argumentos(receita_id=receita_id, usuario_id=usuario_id)).rowcount:
+            conn.execute(_EXCLUIR_INGREDIENTES.sql, _EXCLUIR_INGREDIENTES.argumentos(receita_id=receita_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# Função para ler os ingredientes de uma receita: tuplas (id do alimento, nome, gramas)
+# (nome nulo: alimento removido da tabela TACO)
+def ler_ingredientes_receita(receita_id):
+    return _executar(_CONSULTA_INGREDIENTES, receita_id=receita_id)
+
+
+@lru_cache(maxsize=None)
+def _consulta_receita(colunas):
+    return ConsultaCompilada(
+        select(*[_receitas.c[coluna] for coluna in colunas])
+        .where(_receitas.c.id == bindparam('receita_id'), _receitas.c.usuario_id == bindparam('usuario_id'))
+    )
+
+
+# Função para ler uma receita do usuário nas colunas dadas (None se não existe)
+def ler_receita(usuario_id, receita_id, colunas):
+    return _executar(_consulta_receita(tuple(colunas)), lambda cursor: cursor.fetchone(), usuario_id=usuario_id,
+                     receita_id=receita_id)
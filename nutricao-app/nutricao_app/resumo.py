@@ -0,0 +1,180 @@
+import sys
+from contextlib import contextmanager
+
+from nutricao_app.banco import conectar_bd
+from nutricao_app.datas import para_dia
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.registros import TIPO_DATA, montar_df
+from nutricao_app.repositorio import ler_usuario
+
+ESQUEMA_RESUMO = {
+    'data': TIPO_DATA,
+    'calorias': 'float32',
+    'proteinas': 'float32',
+    'carboidratos': 'float32',
+    'gorduras': 'float32',
+    'refeicoes': 'int32',
+}
+COLUNAS_RESUMO = list(ESQUEMA_RESUMO)
+
+
+# Função para criar a tabela de resumo diário e os gatilhos que a mantêm atualizada
+# (uma linha por usuário e dia; os gatilhos rodam na mesma transação da escrita em refeicoes)
+def criar_resumo_diario(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_diario (
+        usuario_id INTEGER NOT NULL,
+        data INTEGER NOT NULL,
+        calorias REAL NOT NULL DEFAULT 0,
+        proteinas REAL NOT NULL DEFAULT 0,
+        carboidratos REAL NOT NULL DEFAULT 0,
+        gorduras REAL NOT NULL DEFAULT 0,
+        refeicoes INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (usuario_id, data)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS resumo_diario_inserir
+    AFTER INSERT ON refeicoes
+    BEGIN
+        INSERT INTO resumo_diario (usuario_id, data, calorias, proteinas, carboidratos, gorduras, refeicoes)
+        VALUES (NEW.usuario_id, NEW.data, IFNULL(NEW.calorias, 0), IFNULL(NEW.proteinas, 0),
+                IFNULL(NEW.carboidratos, 0), IFNULL(NEW.gorduras, 0), 1)
+        ON CONFLICT (usuario_id, data) DO UPDATE SET
+            calorias = calorias + excluded.calorias,
+            proteinas = proteinas + excluded.proteinas,
+            carboidratos = carboidratos + excluded.carboidratos,
+            gorduras = gorduras + excluded.gorduras,
+            refeicoes = refeicoes + 1;
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS resumo_diario_excluir
+    AFTER DELETE ON refeicoes
+    BEGIN
+        UPDATE resumo_diario SET
+            calorias = calorias - IFNULL(OLD.calorias, 0),
+            proteinas = proteinas - IFNULL(OLD.proteinas, 0),
+            carboidratos = carboidratos - IFNULL(OLD.carboidratos, 0),
+            gorduras = gorduras - IFNULL(OLD.gorduras, 0),
+            refeicoes = refeicoes - 1
+        WHERE usuario_id = OLD.usuario_id AND data = OLD.data;
+        DELETE FROM resumo_diario WHERE usuario_id = OLD.usuario_id AND data = OLD.data AND refeicoes <= 0;
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS resumo_diario_alterar
+    AFTER UPDATE OF usuario_id, data, calorias, proteinas, carboidratos, gorduras ON refeicoes
+    BEGIN
+        UPDATE resumo_diario SET
+            calorias = calorias - IFNULL(OLD.calorias, 0),
+            proteinas = proteinas - IFNULL(OLD.proteinas, 0),
+            carboidratos = carboidratos - IFNULL(OLD.carboidratos, 0),
+            gorduras = gorduras - IFNULL(OLD.gorduras, 0),
+            refeicoes = refeicoes - 1
+        WHERE usuario_id = OLD.usuario_id AND data = OLD.data;
+        DELETE FROM resumo_diario WHERE usuario_id = OLD.usuario_id AND data = OLD.data AND refeicoes <= 0;
+        INSERT INTO resumo_diario (usuario_id, data, calorias, proteinas, carboidratos, gorduras, refeicoes)
+        VALUES (NEW.usuario_id, NEW.data, IFNULL(NEW.calorias, 0), IFNULL(NEW.proteinas, 0),
+                IFNULL(NEW.carboidratos, 0), IFNULL(NEW.gorduras, 0), 1)
+        ON CONFLICT (usuario_id, data) DO UPDATE SET
+            calorias = calorias + excluded.calorias,
+            proteinas = proteinas + excluded.proteinas,
+            carboidratos = carboidratos + excluded.carboidratos,
+            gorduras = gorduras + excluded.gorduras,
+            refeicoes = refeicoes + 1;
+    END
+    ''')
+
+
+# Função para preencher o resumo diário a partir das refeições existentes (cursor ou conexão)
+# Retorna a quantidade de linhas (usuário e dia) gravadas
+def preencher_resumo_diario(cursor):
+    cursor.execute('DELETE FROM resumo_diario')
+    inseridas = cursor.execute('''
+    INSERT INTO resumo_diario (usuario_id, data, calorias, proteinas, carboidratos, gorduras, refeicoes)
+    SELECT usuario_id, data, IFNULL(SUM(calorias), 0), IFNULL(SUM(proteinas), 0),
+           IFNULL(SUM(carboidratos), 0), IFNULL(SUM(gorduras), 0), COUNT(*)
+    FROM refeicoes
+    GROUP BY usuario_id, data
+    ''')
+    return inseridas.rowcount
+
+
+# Contexto para cargas em massa em refeicoes: desliga o gatilho de inserção do
+# resumo diário e soma ao resumo, de uma só vez, os totais por usuário e dia das
+# linhas novas (mesmo resultado do gatilho, com uma escrita por dia em vez de uma por linha)
+# (deve ser usado dentro da transação da carga; um rollback restaura o gatilho)
+@contextmanager
+def carga_em_massa_resumo(conn):
+    gatilho = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'resumo_diario_inserir'"
+    ).fetchone()
+    if not gatilho:
+        yield
+        return
+
+    maior_id = conn.execute('SELECT IFNULL(MAX(id), 0) FROM refeicoes').fetchone()[0]
+    conn.execute('DROP TRIGGER resumo_diario_inserir')
+    yield
+    # NOT INDEXED: as linhas novas são lidas pelo intervalo de rowid, não por um índice inteiro
+    conn.execute('''
+    INSERT INTO resumo_diario (usuario_id, data, calorias, proteinas, carboidratos, gorduras, refeicoes)
+    SELECT usuario_id, data, IFNULL(SUM(calorias), 0), IFNULL(SUM(proteinas), 0),
+           IFNULL(SUM(carboidratos), 0), IFNULL(SUM(gorduras), 0), COUNT(*)
+    FROM refeicoes NOT INDEXED
+    WHERE id > ?
+    GROUP BY usuario_id, data
+    ON CONFLICT (usuario_id, data) DO UPDATE SET
+        calorias = calorias + excluded.calorias,
+        proteinas = proteinas + excluded.proteinas,
+        carboidratos = carboidratos + excluded.carboidratos,
+        gorduras = gorduras + excluded.gorduras,
+        refeicoes = refeicoes + excluded.refeicoes
+    ''', (maior_id,))
+    conn.execute(gatilho[0])
+
+
+# Função para reconstruir o resumo diário a partir das refeições existentes
+def reconstruir_resumo_diario():
+    conn = conectar_bd()
+    cursor = conn.cursor()
+
+    criar_resumo_diario(cursor)
+    dias = preencher_resumo_diario(cursor)
+
+    conn.commit()
+    conn.close()
+
+    return dias
+
+
+# Função para obter o resumo diário de um usuário a partir de uma data
+@rastrear
+def obter_resumo_por_periodo(usuario_id, data_inicio):
+    return ler_usuario('resumo_diario', COLUNAS_RESUMO, usuario_id, inicio=para_dia(data_inicio),
+                       converter=lambda cursor: montar_df(cursor, ESQUEMA_RESUMO))
+
+
+# Função para obter os totais de um usuário em um dia (zeros quando não há refeições)
+@rastrear
+def obter_resumo_do_dia(usuario_id, data):
+    resultado = ler_usuario('resumo_diario', COLUNAS_RESUMO[1:], usuario_id, dia=para_dia(data),
+                            converter=lambda cursor: cursor.fetchone())
+
+    if not resultado:
+        return {'calorias': 0, 'proteinas': 0, 'carboidratos': 0, 'gorduras': 0, 'refeicoes': 0}
+
+    return dict(zip(COLUNAS_RESUMO[1:], resultado))
+
+
+# Reconstrução manual: python -m nutricao_app.resumo [caminho do banco]
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        from nutricao_app.banco import definir_caminho_bd
+        definir_caminho_bd(sys.argv[1])
+
+    print(f'Resumo diário reconstruído: {reconstruir_resumo_diario()} dias (somando todos os usuários)')
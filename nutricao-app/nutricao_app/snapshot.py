@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app.banco import conectar_bd
+from nutricao_app.nutrientes import COLUNAS_NUTRIENTES
+from nutricao_app.repositorio import contar_linhas
+from nutricao_app.taco import COLUNAS_TACO, LINHAS_TACO_COMPLETA, gravar_lotes_taco, ler_csv_taco
+
+# Snapshot da tabela TACO distribuído junto com o pacote
+CAMINHO_SNAPSHOT = os.path.join(os.path.dirname(__file__), 'dados', 'taco_snapshot.bin')
+
+# Formato do arquivo (little-endian):
+#   cabeçalho de 64 bytes: assinatura, formato, versão do catálogo, linhas, colunas,
+#                          tamanho da tabela de nomes e SHA-256 do conteúdo
+#   bloco de nutrientes:   float64 [linhas x colunas], na ordem de COLUNAS_NUTRIENTES (NaN = sem valor)
+#   deslocamentos:         uint32 [linhas + 1] dentro da tabela de nomes
+#   tabela de nomes:       nomes em UTF-8, concatenados
+ASSINATURA = b'TACOSNAP'
+FORMATO = 1
+CABECALHO = struct.Struct('<8sHHIIIQ32s')
+
+
+# Snapshot aberto por mapeamento em memória: os nutrientes são lidos direto do
+# arquivo, sem cópia, e os nomes só são decodificados quando usados
+class SnapshotTaco:
+    def __init__(self, caminho=CAMINHO_SNAPSHOT):
+        self.caminho = caminho
+        with open(caminho, 'rb') as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        assinatura, formato, _, self.versao, self.linhas, colunas, tamanho_nomes, self._sha256 = \
+            CABECALHO.unpack_from(self._mapa, 0)
+        if assinatura != ASSINATURA or formato != FORMATO:
+            self.fechar()
+            raise ValueError(f'Arquivo não é um snapshot TACO válido: {caminho}')
+        if colunas != len(COLUNAS_NUTRIENTES):
+            self.fechar()
+            raise ValueError(f'Snapshot com {colunas} nutrientes; esperado {len(COLUNAS_NUTRIENTES)}')
+
+        inicio = CABECALHO.size
+        self.valores = np.frombuffer(self._mapa, dtype='<f8', count=self.linhas * colunas, offset=inicio) \
+            .reshape(self.linhas, colunas)
+        inicio += self.valores.nbytes
+        self._deslocamentos = np.frombuffer(self._mapa, dtype='<u4', count=self.linhas + 1, offset=inicio)
+        self._inicio_nomes = inicio + self._deslocamentos.nbytes
+        self._fim = self._inicio_nomes + tamanho_nomes
+
+    @property
+    def checksum(self):
+        return self._sha256.hex()
+
+    # Snapshot com a tabela completa (e não só a tabela de exemplo)
+    @property
+    def completo(self):
+        return self.linhas >= LINHAS_TACO_COMPLETA
+
+    # Confere o SHA-256 gravado no cabeçalho com o conteúdo do arquivo
+    def verificar(self):
+        return hashlib.sha256(self._mapa[CABECALHO.size:self._fim]).digest() == self._sha256
+
+    def nome(self, linha):
+        inicio, fim = self._deslocamentos[linha], self._deslocamentos[linha + 1]
+        return self._mapa[self._inicio_nomes + inicio:self._inicio_nomes + fim].decode('utf-8')
+
+    # Catálogo completo no layout de alimentos_taco
+    def como_dataframe(self):
+        texto_bytes = self._mapa[self._inicio_nomes:self._fim]
+        nomes = [texto_bytes[inicio:fim].decode('utf-8')
+                 for inicio, fim in zip(self._deslocamentos[:-1], self._deslocamentos[1:])]
+        df = pd.DataFrame(np.array(self.valores), columns=COLUNAS_NUTRIENTES)
+        df.insert(0, 'nome', nomes)
+        return df[COLUNAS_TACO]
+
+    def fechar(self):
+        self.valores = None
+        self._deslocamentos = None
+        self._mapa.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+
+# Função para gravar um snapshot a partir de um DataFrame no layout de alimentos_taco
+def construir_snapshot(df_alimentos, destino=CAMINHO_SNAPSHOT, versao=1):
+    df_alimentos = df_alimentos.drop_duplicates('nome')
+    nomes = [nome.encode('utf-8') for nome in df_alimentos['nome']]
+    valores = np.ascontiguousarray(df_alimentos[COLUNAS_NUTRIENTES].to_numpy(dtype='<f8'))
+    deslocamentos = np.zeros(len(nomes) + 1, dtype='<u4')
+    deslocamentos[1:] = np.cumsum([len(nome) for nome in nomes])
+
+    conteudo = valores.tobytes() + deslocamentos.tobytes() + b''.join(nomes)
+    cabecalho = CABECALHO.pack(
+        ASSINATURA, FORMATO, 0, versao, len(nomes), len(COLUNAS_NUTRIENTES),
+        int(deslocamentos[-1]), hashlib.sha256(conteudo).digest()
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    temporario = f'{destino}.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(cabecalho)
+        arquivo.write(conteudo)
+    os.replace(temporario, destino)
+
+    return destino
+
+
+# Função para criar a tabela que registra o snapshot materializado no banco
+def _criar_tabela_snapshot(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS taco_snapshot (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER,
+        checksum TEXT,
+        linhas INTEGER,
+        materializado_em TEXT
+    )
+    ''')
+
+
+# Função para obter (versão, checksum) do snapshot já gravado em alimentos_taco
+def obter_snapshot_materializado():
+    conn = conectar_bd()
+    try:
+        _criar_tabela_snapshot(conn)
+        conn.commit()
+        resultado = conn.execute('SELECT versao, checksum FROM taco_snapshot WHERE id = 1').fetchone()
+    finally:
+        conn.close()
+
+    return resultado
+
+
+# Função para gravar o snapshot em alimentos_taco quando a versão mudou
+# Retorna as estatísticas da gravação, ou None se não há snapshot ou ele já está no banco
+def materializar_snapshot_taco(caminho=CAMINHO_SNAPSHOT, forcar=False):
+    if not os.path.exists(caminho):
+        return None
+
+    with SnapshotTaco(caminho) as snapshot:
+        if not forcar and obter_snapshot_materializado() == (snapshot.versao, snapshot.checksum):
+            return None
+        # Um snapshot só com a tabela de exemplo não sobrescreve a tabela completa já baixada
+        if not snapshot.completo and contar_linhas('alimentos_taco') >= LINHAS_TACO_COMPLETA:
+            return None
+        if not snapshot.verificar():
+            raise ValueError(f'Checksum inválido no snapshot TACO: {caminho}')
+
+        estatisticas = gravar_lotes_taco([snapshot.como_dataframe()], substituir=snapshot.completo)
+
+        conn = conectar_bd()
+        try:
+            _criar_tabela_snapshot(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO taco_snapshot (id, versao, checksum, linhas, materializado_em) VALUES (1, ?, ?, ?, ?)',
+                (snapshot.versao, snapshot.checksum, snapshot.linhas, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    return estatisticas
+
+
+# Geração do snapshot: python -m nutricao_app.snapshot tabela_taco.csv --versao 2
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera o snapshot binário da tabela TACO')
+    parser.add_argument('csv', help='CSV da TACO (layout da 4ª edição ou de alimentos_taco)')
+    parser.add_argument('--versao', type=int, required=True)
+    parser.add_argument('--destino', default=CAMINHO_SNAPSHOT)
+    parser.add_argument('--decimal', default=',')
+    argumentos = parser.parse_args()
+
+    df = pd.concat(list(ler_csv_taco(argumentos.csv, decimal=argumentos.decimal)), ignore_index=True)
+    destino = construir_snapshot(df, argumentos.destino, argumentos.versao)
+    with SnapshotTaco(destino) as snapshot:
+        print(f'Snapshot versão {snapshot.versao}: {snapshot.linhas} alimentos, sha256 {snapshot.checksum}')
@@ -0,0 +1,229 @@
+import io
+import re
+import sys
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app.banco import conectar_bd
+from nutricao_app.busca import carga_em_massa_busca, limpar_cache_busca
+from nutricao_app.nutrientes import invalidar_matriz_nutrientes
+from nutricao_app.repositorio import inserir_em_massa
+
+# Colunas gravadas em alimentos_taco
+COLUNAS_TACO = ['nome', 'energia_kcal', 'proteina_g', 'lipideos_g', 'carboidrato_g', 'fibra_g', 'calcio_mg', 'ferro_mg']
+
+# Cabeçalhos aceitos para cada coluna (sem acentos, minúsculos e só letras/números),
+# incluindo o layout da TACO 4ª edição e o próprio layout da tabela alimentos_taco
+CABECALHOS_TACO = {
+    'nome': ['nome', 'descricaodosalimentos', 'descricaodoalimento', 'descricao', 'alimento'],
+    'energia_kcal': ['energiakcal', 'energia', 'kcal'],
+    'proteina_g': ['proteinag', 'proteina'],
+    'lipideos_g': ['lipideosg', 'lipideos', 'lipidiosg'],
+    'carboidrato_g': ['carboidratog', 'carboidrato', 'carboidratototalg'],
+    'fibra_g': ['fibraalimentarg', 'fibrag', 'fibraalimentar', 'fibra'],
+    'calcio_mg': ['calciomg', 'calcio'],
+    'ferro_mg': ['ferromg', 'ferro'],
+}
+
+# Marcações da TACO para valores não numéricos: traços contam como zero,
+# "NA", "*", "-" e vazio ficam sem valor
+VALORES_TRACO = {'tr', 'traco', 'traços', 'tracos'}
+VALORES_AUSENTES = ['NA', 'N/A', '*', '-', '']
+
+# Traço em um campo numérico do CSV (entre separadores), trocado por zero antes do parser
+_RE_TRACO = re.compile(r';[ \t]*"?[Tt]r"?[ \t]*(?=[;\r\n]|$)')
+
+# Alimentos a partir dos quais o catálogo é a tabela completa (a TACO 4ª edição tem 597);
+# abaixo disso é a tabela de exemplo e a completa ainda precisa ser baixada
+LINHAS_TACO_COMPLETA = 500
+
+TAMANHO_LOTE = 5000
+TAMANHO_LEITURA = 1 << 16
+
+# Função para padronizar um cabeçalho do CSV para comparação
+def _chave_cabecalho(cabecalho):
+    texto = unicodedata.normalize('NFKD', str(cabecalho))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]', '', texto.lower())
+
+
+# Função para mapear os cabeçalhos do arquivo para as colunas de alimentos_taco
+# (ou de outra tabela, com outros aliases e colunas obrigatórias)
+def mapear_cabecalhos(cabecalhos, aliases_colunas=CABECALHOS_TACO, obrigatorias=('nome',)):
+    chaves = {_chave_cabecalho(cabecalho): cabecalho for cabecalho in cabecalhos}
+    mapa = {}
+    for coluna, aliases in aliases_colunas.items():
+        for alias in aliases:
+            if alias in chaves:
+                mapa[chaves[alias]] = coluna
+                break
+
+    for coluna in obrigatorias:
+        if coluna not in mapa.values():
+            raise ValueError(f'Coluna "{coluna}" não encontrada no arquivo: {list(cabecalhos)}')
+
+    return mapa
+
+
+# Função para converter uma coluna de texto com vírgula decimal em números
+def _converter_numeros(serie):
+    if serie.dtype.kind in 'if':
+        return serie.astype(np.float64)
+
+    texto = serie.astype('string').str.strip().str.lower()
+    texto = texto.mask(texto.isin(VALORES_TRACO), '0')
+    # Vírgula decimal: "1.234,5" vira "1234.5"; valores sem vírgula ficam como estão
+    com_virgula = texto.str.contains(',', regex=False).fillna(False)
+    texto = texto.where(~com_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce').astype(np.float64)
+
+
+# Leitor de texto que troca os traços ("Tr") por zero linha a linha, para que o
+# parser em C do pandas converta as colunas numéricas diretamente
+class _LeitorSemTracos:
+    def __init__(self, arquivo):
+        self._arquivo = arquivo
+        self._resto = ''
+
+    def read(self, tamanho=-1):
+        while True:
+            bloco = self._arquivo.read(tamanho if tamanho and tamanho > 0 else TAMANHO_LEITURA)
+            texto = self._resto + bloco
+            if not bloco:
+                self._resto = ''
+                return _RE_TRACO.sub(';0', texto)
+
+            corte = texto.rfind('\n') + 1
+            if corte:
+                self._resto = texto[corte:]
+                return _RE_TRACO.sub(';0', texto[:corte])
+            self._resto = texto
+
+
+# Função para abrir a origem (caminho, arquivo binário ou de texto) como texto
+def _abrir_texto(origem, encoding):
+    if isinstance(origem, (str, bytes)) or hasattr(origem, '__fspath__'):
+        return open(origem, encoding=encoding, newline='')
+    if isinstance(origem, io.TextIOBase):
+        return origem
+    return io.TextIOWrapper(origem, encoding=encoding, newline='')
+
+
+# Função para normalizar um lote lido do arquivo no layout de alimentos_taco
+def normalizar_lote(df, mapa=None):
+    mapa = mapa or mapear_cabecalhos(df.columns)
+    df = df[list(mapa)].rename(columns=mapa)
+
+    lote = pd.DataFrame({'nome': df['nome'].astype('string').str.strip()})
+    for coluna in COLUNAS_TACO[1:]:
+        lote[coluna] = _converter_numeros(df[coluna]) if coluna in df else np.nan
+
+    return lote[lote['nome'].notna() & (lote['nome'] != '')]
+
+
+# Função para ler um CSV da TACO em lotes (separador ";" e vírgula decimal)
+# Só as colunas conhecidas são lidas e os números são convertidos pelo parser do pandas
+def ler_csv_taco(origem, tamanho_lote=TAMANHO_LOTE, sep=';', decimal=',', encoding='utf-8-sig'):
+    aliases = {alias for lista in CABECALHOS_TACO.values() for alias in lista}
+    arquivo = _abrir_texto(origem, encoding)
+    try:
+        leitor = pd.read_csv(
+            _LeitorSemTracos(arquivo),
+            sep=sep,
+            decimal=decimal,
+            thousands='.' if decimal == ',' else None,
+            usecols=lambda cabecalho: _chave_cabecalho(cabecalho) in aliases,
+            na_values=VALORES_AUSENTES,
+            chunksize=tamanho_lote,
+            skip_blank_lines=True,
+        )
+        mapa = None
+        for bloco in leitor:
+            mapa = mapa or mapear_cabecalhos(bloco.columns)
+            yield normalizar_lote(bloco, mapa)
+    finally:
+        if isinstance(arquivo, io.TextIOWrapper) and arquivo.buffer is origem:
+            # Devolve o arquivo binário recebido sem fechá-lo
+            arquivo.detach()
+        elif arquivo is not origem:
+            arquivo.close()
+
+
+# Função para gravar lotes de alimentos com upsert em uma única transação
+# Retorna estatísticas da importação (linhas, segundos e linhas por segundo)
+# (BEGIN IMMEDIATE: a carga pode rodar em segundo plano junto com outras gravações,
+# e a trava de escrita pedida no início respeita o busy_timeout)
+# substituir: o arquivo é o catálogo inteiro; na mesma transação são excluídos os alimentos
+# que não estão nele (tabela de exemplo, nomes antigos), menos os usados em receitas,
+# e quem lê o banco só vê o catálogo anterior ou o novo
+def gravar_lotes_taco(lotes, substituir=False):
+    inicio = time.perf_counter()
+    total = 0
+
+    conn = conectar_bd()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if substituir:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS nomes_catalogo (nome TEXT PRIMARY KEY) WITHOUT ROWID')
+            conn.execute('DELETE FROM temp.nomes_catalogo')
+        with carga_em_massa_busca(conn):
+            for lote in lotes:
+                valores = lote[COLUNAS_TACO].astype(object).where(lote[COLUNAS_TACO].notna(), None)
+                inserir_em_massa(conn, 'alimentos_taco', COLUNAS_TACO, valores.itertuples(index=False, name=None),
+                                 conflito=['nome'])
+                if substituir:
+                    conn.executemany('INSERT OR IGNORE INTO temp.nomes_catalogo (nome) VALUES (?)',
+                                     ((nome,) for nome in lote['nome']))
+                total += len(lote)
+        if substituir:
+            # Antes das migrações (banco novo) ainda não há receitas
+            com_receitas = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'receita_ingredientes'"
+            ).fetchone()
+            conn.execute(f'''
+            DELETE FROM alimentos_taco
+            WHERE nome NOT IN (SELECT nome FROM temp.nomes_catalogo)
+            {'AND id NOT IN (SELECT alimento_id FROM receita_ingredientes)' if com_receitas else ''}
+            ''')
+            conn.execute('DROP TABLE temp.nomes_catalogo')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    limpar_cache_busca()
+    invalidar_matriz_nutrientes()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'linhas': total,
+        'segundos': segundos,
+        'linhas_por_segundo': total / segundos if segundos > 0 else float('inf'),
+    }
+
+
+# Função para importar um CSV da TACO (ou tabela no mesmo layout) para alimentos_taco
+# Arquivos que não estão em UTF-8 são relidos como Latin-1 (comum nas planilhas da TACO)
+def importar_csv_taco(origem, tamanho_lote=TAMANHO_LOTE, sep=';', decimal=',', substituir=False):
+    try:
+        return gravar_lotes_taco(ler_csv_taco(origem, tamanho_lote, sep, decimal), substituir)
+    except UnicodeDecodeError:
+        if hasattr(origem, 'seek'):
+            origem.seek(0)
+        return gravar_lotes_taco(ler_csv_taco(origem, tamanho_lote, sep, decimal, encoding='latin-1'), substituir)
+
+
+# Importação manual: python -m nutricao_app.taco arquivo.csv [caminho do banco]
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        from nutricao_app.banco import definir_caminho_bd
+        definir_caminho_bd(sys.argv[2])
+
+    estatisticas = importar_csv_taco(sys.argv[1])
+    print(f"{estatisticas['linhas']} alimentos em {estatisticas['segundos']:.3f} s "
+          f"({estatisticas['linhas_por_segundo']:,.0f} linhas/s)")
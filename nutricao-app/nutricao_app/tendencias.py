@@ -0,0 +1,302 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app.datas import dias_para_datetime, para_dia
+from nutricao_app.rastreamento import rastrear
+from nutricao_app.repositorio import alteracoes_usuario, ler_medias, ler_usuario, maior_id
+
+# Tendências de consumo e de composição corporal calculadas em NumPy sobre séries
+# diárias (um elemento por dia, do primeiro registro até hoje; dias sem registro como NaN):
+# médias móveis, déficit calórico e aderência às metas saem de somas acumuladas (cada
+# janela é a diferença de dois elementos), o peso é suavizado por média móvel exponencial
+# e a taxa de variação é a inclinação da reta de mínimos quadrados da janela
+NUTRIENTES = ['calorias', 'proteinas', 'carboidratos', 'gorduras']
+METAS_NUTRIENTES = {
+    'calorias': 'calorias_diarias',
+    'proteinas': 'proteinas_diarias',
+    'carboidratos': 'carboidratos_diarios',
+    'gorduras': 'gorduras_diarias',
+}
+
+JANELAS_MEDIAS = (7, 30)
+JANELA_DEFICIT = 7
+JANELA_TAXA_PESO = 28
+
+# Fração da diferença entre a medida e a tendência incorporada por dia (média móvel
+# exponencial do peso: cada pesagem pesa 10%, e a tendência ignora as oscilações diárias)
+FATOR_SUAVIZACAO_PESO = 0.1
+
+# Dia aderente: consumo a até 10% da meta do nutriente
+TOLERANCIA_ADERENCIA = 0.10
+
+# Maior expoente usado na suavização vetorizada: (1 - fator)^dias fica acima de e^-600,
+# longe do limite do float64 (os pontos são processados em blocos desse intervalo de dias)
+LIMITE_EXPOENTE = 600.0
+
+# Colunas das somas acumuladas da regressão do peso: dias com medida, x, y, x*y e x²
+_REGRESSAO = 5
+
+
+# Função para calcular as somas acumuladas de uma série diária (NaN conta como sem registro)
+# Retorna (somas, dias_com_registro), com um zero no início: os dias i..j-1 somam somas[j] - somas[i]
+def somas_acumuladas(valores):
+    valores = np.asarray(valores, dtype=np.float64)
+    presentes = ~np.isnan(valores)
+    zeros = np.zeros((1,) + valores.shape[1:])
+    return (np.concatenate([zeros, np.cumsum(np.where(presentes, valores, 0.0), axis=0)]),
+            np.concatenate([zeros, np.cumsum(presentes, axis=0, dtype=np.float64)]))
+
+
+# Função para obter, para cada dia, o total dos últimos 'janela' dias (o próprio dia incluído)
+# a partir das somas acumuladas
+def total_movel(acumulado, janela):
+    fim = np.arange(1, len(acumulado))
+    return acumulado[fim] - acumulado[np.maximum(fim - janela, 0)]
+
+
+# Função para dividir totais móveis (NaN onde a janela não tem dias com registro)
+def _razao(numerador, denominador):
+    return np.divide(numerador, denominador, out=np.full(np.broadcast(numerador, denominador).shape, np.nan),
+                     where=denominador > 0)
+
+
+# Função para calcular a média móvel de cada dia: média dos dias com registro entre os
+# últimos 'janela' dias (NaN quando nenhum tem registro)
+def media_movel(valores, janela):
+    somas, dias = somas_acumuladas(valores)
+    return _razao(total_movel(somas, janela), total_movel(dias, janela))
+
+
+# Função para suavizar uma série irregular com média móvel exponencial por dia: entre
+# medidas a tendência fica parada, e uma medida feita n dias depois da anterior pesa
+# 1 - (1 - fator)^n. Vetorizada pela forma fechada s_i = P_i (s_0 + Σ (1 - d_k) x_k / P_k),
+# com P_i = (1 - fator)^(dia_i - dia_0) e d_k = P_k / P_(k-1), em blocos de dias curtos o
+# bastante para P não se anular. 'inicial' é (dia, tendência) antes do primeiro ponto
+# (None: a tendência começa no primeiro valor). Retorna a tendência em cada ponto
+def suavizar_exponencial(dias, valores, fator=FATOR_SUAVIZACAO_PESO, inicial=None):
+    dias = np.asarray(dias, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    tendencia = np.empty(len(valores))
+    if not len(valores):
+        return tendencia
+
+    log_decaimento = np.log1p(-fator)
+    bloco = max(1, int(LIMITE_EXPOENTE / -log_decaimento))
+    dia_anterior, anterior = inicial if inicial is not None else (dias[0], valores[0])
+
+    i = 0
+    while i < len(valores):
+        j = max(int(np.searchsorted(dias, dia_anterior + bloco, side='right')), i + 1)
+        # Um ponto isolado mais de 'bloco' dias depois do anterior: a tendência antiga já não pesa
+        p = np.exp(log_decaimento * np.minimum(dias[i:j] - dia_anterior, bloco))
+        pesos = 1.0 - p / np.concatenate(([1.0], p[:-1]))
+        tendencia[i:j] = p * (anterior + np.cumsum(pesos * valores[i:j] / p))
+        dia_anterior, anterior = dias[j - 1], tendencia[j - 1]
+        i = j
+    return tendencia
+
+
+# Função para calcular as somas acumuladas da regressão linear de uma série diária
+# (x é a posição do dia; 'inicio' é a posição do primeiro elemento)
+def acumulados_regressao(valores, inicio=0):
+    valores = np.asarray(valores, dtype=np.float64)
+    presentes = ~np.isnan(valores)
+    x = np.arange(inicio, inicio + len(valores), dtype=np.float64) * presentes
+    y = np.where(presentes, valores, 0.0)
+    termos = np.column_stack([presentes.astype(np.float64), x, y, x * y, x * x])
+    return np.concatenate([np.zeros((1, _REGRESSAO)), np.cumsum(termos, axis=0)])
+
+
+# Função para calcular a inclinação da reta de mínimos quadrados (unidade por dia) a partir
+# dos totais da regressão de uma janela (NaN com menos de dois dias com medida)
+def inclinacao(totais):
+    n, x, y, xy, xx = np.moveaxis(np.asarray(totais, dtype=np.float64), -1, 0)
+    return _razao(n * xy - x * y, np.where(n >= 2, n * xx - x * x, 0.0))
+
+
+# Função para calcular o percentual, em cada dia, dos dias com registro entre os últimos
+# 'janela' dias em que o consumo ficou a até 'tolerancia' da meta (metas: uma por coluna)
+def aderencia_movel(valores, metas, janela, tolerancia=TOLERANCIA_ADERENCIA):
+    valores = np.asarray(valores, dtype=np.float64)
+    metas = np.asarray(metas, dtype=np.float64)
+    presentes = ~np.isnan(valores)
+    dentro = presentes & (np.abs(np.where(presentes, valores, 0.0) - metas) <= tolerancia * metas)
+    acumulado_dentro = np.concatenate([np.zeros((1,) + valores.shape[1:]), np.cumsum(dentro, axis=0)])
+    acumulado_dias = np.concatenate([np.zeros((1,) + valores.shape[1:]), np.cumsum(presentes, axis=0)])
+    return 100 * _razao(total_movel(acumulado_dentro, janela), total_movel(acumulado_dias, janela))
+
+
+# Tendências de um usuário mantidas em memória na sessão: consumo diário (do resumo
+# diário), peso médio de cada dia, somas acumuladas e a tendência do peso em cada pesagem.
+# atualizar() lê só as refeições e medidas gravadas desde a última leitura (ids maiores
+# que o último visto) e recalcula a partir do dia mais antigo que elas alteraram;
+# um dia novo sem registros só acrescenta um elemento às séries
+class TendenciasUsuario:
+    @rastrear
+    def __init__(self, usuario_id, hoje=None):
+        self.usuario_id = usuario_id
+        self.ultimo_id_refeicoes = maior_id('refeicoes', usuario_id)
+        self.ultimo_id_medidas = maior_id('medidas', usuario_id)
+        self._carregar(para_dia(hoje or date.today()))
+
+    # Dia mais antigo e maior id das linhas gravadas em uma tabela depois do último id visto
+    def _alteracoes(self, tabela, ultimo_id):
+        dia, maior = alteracoes_usuario(tabela, self.usuario_id, ultimo_id)
+        return dia, maior or ultimo_id
+
+    # Consumo diário e peso médio de cada dia a partir de um dia (dias como número do dia)
+    def _ler(self, dia_inicio):
+        consumo = ler_usuario('resumo_diario', ['data', *NUTRIENTES], self.usuario_id, inicio=dia_inicio,
+                              converter=lambda cursor: np.array(cursor.fetchall(), dtype=np.float64))
+        pesos = ler_medias('medidas', ['peso'], self.usuario_id, inicio=dia_inicio, positivas=['peso'],
+                           converter=lambda cursor: np.array(cursor.fetchall(), dtype=np.float64))
+        return consumo.reshape(-1, 1 + len(NUTRIENTES)), pesos.reshape(-1, 2)
+
+    # Carrega o histórico inteiro e calcula as séries do zero
+    def _carregar(self, hoje):
+        consumo, pesos = self._ler(0)
+        primeiros = [int(dados[:, 0].min()) for dados in (consumo, pesos) if len(dados)]
+        self.dia_inicial = min(primeiros + [hoje])
+        self.dia_final = max([hoje] + [int(dados[:, 0].max()) for dados in (consumo, pesos) if len(dados)])
+
+        dias = self.dia_final - self.dia_inicial + 1
+        self.consumo = np.full((dias, len(NUTRIENTES)), np.nan)
+        self.peso = np.full(dias, np.nan)
+        self._acumulado_consumo = np.zeros((dias + 1, len(NUTRIENTES)))
+        self._acumulado_dias = np.zeros(dias + 1)
+        self._acumulado_regressao = np.zeros((dias + 1, _REGRESSAO))
+        self.posicoes_peso = np.empty(0, dtype=np.int64)
+        self.tendencia_peso = np.empty(0)
+        self._aplicar(0, consumo, pesos)
+
+    # Acrescenta às séries os dias até 'dia' (sem registros)
+    def _estender(self, dia):
+        novos = dia - self.dia_final
+        if novos <= 0:
+            return
+        self.consumo = np.concatenate([self.consumo, np.full((novos, len(NUTRIENTES)), np.nan)])
+        self.peso = np.concatenate([self.peso, np.full(novos, np.nan)])
+        self._acumulado_consumo = np.concatenate([self._acumulado_consumo,
+                                                  np.repeat(self._acumulado_consumo[-1:], novos, axis=0)])
+        self._acumulado_dias = np.concatenate([self._acumulado_dias, np.repeat(self._acumulado_dias[-1:], novos)])
+        self._acumulado_regressao = np.concatenate([self._acumulado_regressao,
+                                                    np.repeat(self._acumulado_regressao[-1:], novos, axis=0)])
+        self.dia_final = dia
+
+    # Substitui as séries a partir da posição k pelos dados lidos e refaz somas acumuladas e
+    # tendência do peso só desse trecho
+    def _aplicar(self, k, consumo, pesos):
+        self.consumo[k:] = np.nan
+        self.consumo[consumo[:, 0].astype(np.int64) - self.dia_inicial] = consumo[:, 1:]
+        self.peso[k:] = np.nan
+        self.peso[pesos[:, 0].astype(np.int64) - self.dia_inicial] = pesos[:, 1]
+
+        trecho = self.consumo[k:]
+        presentes = ~np.isnan(trecho[:, 0])
+        self._acumulado_consumo[k + 1:] = self._acumulado_consumo[k] + np.cumsum(np.nan_to_num(trecho), axis=0)
+        self._acumulado_dias[k + 1:] = self._acumulado_dias[k] + np.cumsum(presentes)
+        self._acumulado_regressao[k + 1:] = self._acumulado_regressao[k] + acumulados_regressao(self.peso[k:], k)[1:]
+
+        mantidas = np.searchsorted(self.posicoes_peso, k)
+        inicial = None
+        if mantidas:
+            inicial = (self.posicoes_peso[mantidas - 1], self.tendencia_peso[mantidas - 1])
+        novas = k + np.flatnonzero(~np.isnan(self.peso[k:]))
+        self.posicoes_peso = np.concatenate([self.posicoes_peso[:mantidas], novas])
+        self.tendencia_peso = np.concatenate([self.tendencia_peso[:mantidas],
+                                              suavizar_exponencial(novas, self.peso[novas], inicial=inicial)])
+
+    # Busca as refeições e medidas gravadas depois da última leitura e recalcula a partir do
+    # dia mais antigo alterado. Retorna a quantidade de dias recalculados
+    @rastrear
+    def atualizar(self, hoje=None):
+        hoje = para_dia(hoje or date.today())
+        dia_refeicoes, self.ultimo_id_refeicoes = self._alteracoes('refeicoes', self.ultimo_id_refeicoes)
+        dia_medidas, self.ultimo_id_medidas = self._alteracoes('medidas', self.ultimo_id_medidas)
+        alterados = [dia for dia in (dia_refeicoes, dia_medidas) if dia is not None]
+
+        if alterados and min(alterados) < self.dia_inicial:
+            # Registros anteriores ao início das séries (ex.: histórico importado): recarrega tudo
+            self._carregar(hoje)
+            return len(self.peso)
+
+        if not alterados:
+            self._estender(hoje)
+            return 0
+        consumo, pesos = self._ler(min(alterados))
+        # Linhas novas podem ter datas depois do fim das séries (refeições planejadas, importações)
+        self._estender(max([hoje] + [int(dados[:, 0].max()) for dados in (consumo, pesos) if len(dados)]))
+        k = min(alterados) - self.dia_inicial
+        self._aplicar(k, consumo, pesos)
+        return len(self.peso) - k
+
+    # Datas das séries (datetime64, uma por dia)
+    def datas(self):
+        return dias_para_datetime(np.arange(self.dia_inicial, self.dia_final + 1))
+
+    # Média móvel de um nutriente em cada dia (dias com registro entre os últimos 'janela')
+    def media_movel(self, janela, nutriente='calorias'):
+        coluna = NUTRIENTES.index(nutriente)
+        return _razao(total_movel(self._acumulado_consumo[:, coluna], janela),
+                      total_movel(self._acumulado_dias, janela))
+
+    # Déficit calórico em cada dia: meta menos consumo, somado nos dias com registro dos
+    # últimos 'janela' dias (positivo quando se comeu menos que a meta)
+    def deficit_calorico(self, meta_calorias, janela=JANELA_DEFICIT):
+        return (meta_calorias * total_movel(self._acumulado_dias, janela)
+                - total_movel(self._acumulado_consumo[:, 0], janela))
+
+    # Percentual de dias aderentes à meta de cada nutriente nos últimos 'janela' dias (dias × nutrientes)
+    def aderencia(self, metas, janela):
+        return aderencia_movel(self.consumo, [metas[METAS_NUTRIENTES[nutriente]] for nutriente in NUTRIENTES],
+                               janela)
+
+    # Tendência do peso em cada dia (a da última pesagem até o dia; NaN antes da primeira)
+    def tendencia_diaria(self):
+        indices = np.searchsorted(self.posicoes_peso, np.arange(len(self.peso)), side='right') - 1
+        tendencia = np.append(self.tendencia_peso, np.nan)
+        return tendencia[np.where(indices >= 0, indices, -1)]
+
+    # Taxa de variação do peso em cada dia (kg por semana; mínimos quadrados das pesagens
+    # dos últimos 'janela' dias)
+    def taxa_peso(self, janela=JANELA_TAXA_PESO):
+        return 7 * inclinacao(total_movel(self._acumulado_regressao, janela))
+
+    # Séries diárias das tendências para gráficos: consumo, médias móveis, déficit da semana,
+    # aderência às calorias, peso, tendência e taxa do peso
+    @rastrear
+    def serie(self, metas, janelas=JANELAS_MEDIAS):
+        colunas = {'data': self.datas(), 'calorias': self.consumo[:, 0]}
+        for janela in janelas:
+            colunas[f'calorias_media_{janela}'] = self.media_movel(janela)
+        colunas['deficit_semanal'] = self.deficit_calorico(metas['calorias_diarias'])
+        for janela in janelas:
+            colunas[f'aderencia_calorias_{janela}'] = self.aderencia(metas, janela)[:, 0]
+        colunas['peso'] = self.peso
+        colunas['tendencia_peso'] = self.tendencia_diaria()
+        colunas['taxa_peso_semanal'] = self.taxa_peso()
+        return pd.DataFrame(colunas)
+
+    # Valores das tendências no último dia (só as janelas finais são calculadas)
+    @rastrear
+    def resumo(self, metas, janelas=JANELAS_MEDIAS):
+        def ultimo_total(acumulado, janela):
+            return acumulado[-1] - acumulado[max(len(acumulado) - 1 - janela, 0)]
+
+        resumo = {}
+        for janela in janelas:
+            dias = ultimo_total(self._acumulado_dias, janela)
+            medias = ultimo_total(self._acumulado_consumo, janela) / dias if dias else np.full(len(NUTRIENTES), np.nan)
+            resumo[f'media_{janela}'] = dict(zip(NUTRIENTES, medias.tolist()))
+            aderencia = aderencia_movel(self.consumo[-janela:], [metas[METAS_NUTRIENTES[n]] for n in NUTRIENTES],
+                                        janela)[-1]
+            resumo[f'aderencia_{janela}'] = dict(zip(NUTRIENTES, aderencia.tolist()))
+
+        dias = ultimo_total(self._acumulado_dias, JANELA_DEFICIT)
+        resumo['deficit_semanal'] = float(metas['calorias_diarias'] * dias
+                                          - ultimo_total(self._acumulado_consumo[:, 0], JANELA_DEFICIT)) if dias else np.nan
+        resumo['tendencia_peso'] = float(self.tendencia_peso[-1]) if len(self.tendencia_peso) else np.nan
+        resumo['taxa_peso_semanal'] = float(7 * inclinacao(ultimo_total(self._acumulado_regressao, JANELA_TAXA_PESO)))
+        return resumo
@@ -0,0 +1,35 @@
+import os
+import threading
+from datetime import datetime
+
+# O usuário padrão e a tabela de usuários ficam em models (esquema); reexportados aqui
+from nutricao_app.models import ID_USUARIO_PADRAO, USUARIO_PADRAO, criar_tabela_usuarios
+from nutricao_app.repositorio import obter_ou_criar_usuario
+
+# Escolha do usuário pelo nome na barra lateral (ou por ?usuario=nome na URL): não há
+# autenticação, e quem acessa o app lê e grava os dados de qualquer nome informado; por
+# isso só é ligada com NUTRICAO_MULTIUSUARIO=1 (sem ela, todos usam o usuário padrão)
+MULTIUSUARIO = os.environ.get('NUTRICAO_MULTIUSUARIO') == '1'
+
+# Ids já resolvidos neste processo (nome -> id); ids de usuário nunca mudam
+_ids_usuarios = {}
+_lock = threading.Lock()
+
+
+# Função para obter o id de um usuário pelo nome, criando o usuário no primeiro acesso
+def obter_id_usuario(nome):
+    nome = nome.strip() or USUARIO_PADRAO
+    if nome in _ids_usuarios:
+        return _ids_usuarios[nome]
+
+    with _lock:
+        id_usuario = obter_ou_criar_usuario(nome, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        _ids_usuarios[nome] = id_usuario
+
+    return id_usuario
+
+
+# Função para descartar os ids em memória (chamar ao trocar de banco de dados)
+def limpar_cache_usuarios():
+    with _lock:
+        _ids_usuarios.clear()
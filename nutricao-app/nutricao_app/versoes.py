@@ -0,0 +1,74 @@
+import threading
+
+from nutricao_app.banco import contador_alteracoes
+from nutricao_app.repositorio import ler_versao_dados
+
+# Versões dos dados de cada usuário, por tabela ('refeicoes', 'medidas' ou 'metas'),
+# gravadas no banco: gatilhos em cada tabela incrementam a versão na mesma transação de
+# toda escrita (do app, da API, do gravador em lote ou de outro processo), e as visões
+# derivadas (gráficos, metas em memória) usam a versão lida do banco como chave de cache
+TABELAS_VERSIONADAS = ('refeicoes', 'medidas', 'metas')
+
+# Versões já lidas, válidas enquanto o contador de alterações do banco não muda: sem
+# commits desde a leitura, a versão vem da memória, sem consultar versoes_dados
+_versoes = {}
+_contador_lido = None
+_lock = threading.Lock()
+
+
+# Função para montar o comando que incrementa, dentro de um gatilho, a versão de uma tabela
+# do usuário da linha 'linha' (NEW ou OLD) quando 'condicao' é verdadeira
+# (INSERT ... SELECT com upsert: o SQLite exige o WHERE no SELECT)
+def _incrementar(tabela, linha, condicao='true'):
+    return f'''
+        INSERT INTO versoes_dados (usuario_id, tabela, versao)
+        SELECT {linha}.usuario_id, '{tabela}', 1 WHERE {condicao}
+        ON CONFLICT (usuario_id, tabela) DO UPDATE SET versao = versao + 1;'''
+
+
+# Função para criar a tabela de versões e os gatilhos que a mantêm
+# (uma alteração de usuario_id muda a versão dos dois usuários)
+def criar_versoes_dados(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS versoes_dados (
+        usuario_id INTEGER NOT NULL,
+        tabela TEXT NOT NULL,
+        versao INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (usuario_id, tabela)
+    ) WITHOUT ROWID
+    ''')
+
+    for tabela in TABELAS_VERSIONADAS:
+        gatilhos = {
+            'inserir': ('INSERT', _incrementar(tabela, 'NEW')),
+            'excluir': ('DELETE', _incrementar(tabela, 'OLD')),
+            'alterar': ('UPDATE', _incrementar(tabela, 'NEW')
+                        + _incrementar(tabela, 'OLD', 'OLD.usuario_id IS NOT NEW.usuario_id')),
+        }
+        for nome, (evento, comandos) in gatilhos.items():
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS versoes_{tabela}_{nome}
+            AFTER {evento} ON {tabela}
+            BEGIN{comandos}
+            END
+            ''')
+
+
+# Função para obter a versão atual de uma tabela do usuário (0: nunca alterada)
+# A tabela versoes_dados só é lida se algum commit aconteceu desde a última leitura
+def versao_dados(usuario_id, tabela):
+    global _contador_lido
+    contador = contador_alteracoes()
+    with _lock:
+        if contador != _contador_lido:
+            _versoes.clear()
+            _contador_lido = contador
+        elif (usuario_id, tabela) in _versoes:
+            return _versoes[(usuario_id, tabela)]
+
+    versao = ler_versao_dados(usuario_id, tabela)
+    with _lock:
+        # Uma leitura feita antes de um commit mais novo não entra no cache já renovado
+        if _contador_lido == contador:
+            _versoes[(usuario_id, tabela)] = versao
+    return versao
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+
+from nutricao_app import banco
+from nutricao_app.busca import limpar_cache_busca
+from nutricao_app.graficos import limpar_cache_figuras
+from nutricao_app.metas import limpar_cache_metas
+from nutricao_app.nutrientes import invalidar_matriz_nutrientes
+from nutricao_app.usuarios import limpar_cache_usuarios
+from tools.dados_sinteticos import gerar_alimentos_taco, gerar_dados, preparar_banco
+
+# Tamanhos dos bancos sintéticos medidos: (usuários, anos de histórico, alimentos sintéticos na TACO)
+TAMANHOS = {
+    'pequeno': (1, 1, 0),
+    'medio': (5, 3, 600),
+    'grande': (10, 10, 5000),
+}
+
+
+# Linhas de base dos benchmarks (uma pasta por máquina, gravadas com --benchmark-save) e
+# piora máxima tolerada em relação à última linha de base: o mínimo das rodadas é a medida
+# menos sensível a outros processos, e o limite largo pega regressões de algoritmo ou de
+# índice sem falhar pela variação entre execuções em máquinas compartilhadas
+# (em máquinas dedicadas: pytest --benchmark-compare-fail=min:20%)
+PASTA_LINHAS_BASE = Path(__file__).parent / 'benchmarks'
+LIMITE_REGRESSAO = 'min:100%'
+
+
+# Guarda as linhas de base em tests/benchmarks e, se esta máquina já tem uma, compara a
+# execução com ela (falha acima do limite); sem linha de base, só mede
+def pytest_configure(config):
+    if config.getoption('benchmark_storage').endswith('.benchmarks'):
+        config.option.benchmark_storage = f'file://{PASTA_LINHAS_BASE}'
+    linhas_base = list((PASTA_LINHAS_BASE / get_machine_id()).glob('*.json'))
+    if linhas_base and not config.getoption('benchmark_disable') and not config.getoption('benchmark_compare'):
+        config.option.benchmark_compare = True
+        config.option.benchmark_compare_fail = (config.getoption('benchmark_compare_fail')
+                                                or [parse_compare_fail(LIMITE_REGRESSAO)])
+
+
+# Caches do processo que dependem do banco em uso (descartados ao trocar de banco)
+LIMPEZAS_CACHE = (limpar_cache_usuarios, limpar_cache_busca, invalidar_matriz_nutrientes, limpar_cache_metas,
+                  limpar_cache_figuras)
+
+
+# Função para descartar os caches do processo
+def limpar_caches():
+    for limpar in LIMPEZAS_CACHE:
+        limpar()
+
+
+# Banco sintético de cada tamanho, gerado uma vez por execução (mesma semente: mesmos dados)
+# Os testes que usam o fixture rodam agrupados por tamanho
+@pytest.fixture(scope='session', params=list(TAMANHOS))
+def banco_sintetico(request, tmp_path_factory):
+    usuarios, anos, alimentos = TAMANHOS[request.param]
+    preparar_banco(str(tmp_path_factory.mktemp(request.param) / 'nutricao.db'))
+    limpar_caches()
+
+    if alimentos:
+        gerar_alimentos_taco(alimentos)
+    estatisticas = gerar_dados(usuarios, anos)
+    estatisticas['tamanho'] = request.param
+    yield estatisticas
+    banco.fechar_pool()
+
+
+# Usuário com o histórico completo (o último gerado) no banco do tamanho em uso
+@pytest.fixture
+def usuario_id(banco_sintetico):
+    return banco_sintetico['usuarios'][-1]
+
+
+# Banco novo para os testes de comportamento: esquema atual, usuário padrão e a tabela TACO
+# do snapshot, sem refeições nem medidas (um por teste; o banco em uso antes do teste,
+# como o sintético dos benchmarks, volta a ser o do processo no fim)
+@pytest.fixture
+def banco_vazio(tmp_path):
+    caminho_anterior = banco.CAMINHO_BD
+    caminho = tmp_path / 'nutricao.db'
+    preparar_banco(str(caminho))
+    limpar_caches()
+    yield caminho
+    banco.definir_caminho_bd(caminho_anterior)
+    limpar_caches()
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('aiosqlite')
+from starlette.testclient import TestClient
+
+from nutricao_app.api import TAMANHO_MINIMO_GZIP, app
+from nutricao_app.metas import obter_metas
+from nutricao_app.models import METAS_PADRAO
+from nutricao_app.registros import adicionar_refeicao
+from nutricao_app.usuarios import ID_USUARIO_PADRAO
+
+HOJE = date(2024, 3, 15)
+URL_REFEICOES = f'/usuarios/{ID_USUARIO_PADRAO}/refeicoes'
+
+
+@pytest.fixture
+def cliente(banco_vazio):
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+# Função para gravar 'quantidade' refeições, duas por dia a partir de HOJE (retorna os ids)
+def _gravar_refeicoes(quantidade):
+    return [adicionar_refeicao(ID_USUARIO_PADRAO, HOJE + timedelta(days=i // 2), 'Almoço', 'Arroz, tipo 1, cozido',
+                               100, 128, 2.5, 28.1, 0.2) for i in range(quantidade)]
+
+
+def test_paginacao_por_cursor_entrega_cada_linha_uma_vez(cliente):
+    ids = _gravar_refeicoes(25)
+
+    vistos = []
+    resposta = cliente.get(URL_REFEICOES, params={'limite': 10})
+    while True:
+        assert resposta.status_code == 200
+        pagina = resposta.json()
+        vistos.extend(item['id'] for item in pagina['itens'])
+        if pagina['proximo'] is None:
+            assert 'link' not in resposta.headers
+            break
+        assert len(pagina['itens']) == 10
+        assert 'rel="next"' in resposta.headers['link']
+        resposta = cliente.get(URL_REFEICOES, params={'limite': 10, 'cursor': pagina['proximo']})
+
+    assert vistos == ids
+
+
+def test_paginacao_respeita_o_periodo(cliente):
+    _gravar_refeicoes(10)
+    inicio, fim = HOJE + timedelta(days=1), HOJE + timedelta(days=2)
+    itens = cliente.get(URL_REFEICOES, params={'inicio': inicio.isoformat(), 'fim': fim.isoformat()}).json()['itens']
+    assert {item['data'] for item in itens} == {inicio.isoformat(), fim.isoformat()}
+    assert len(itens) == 4
+
+
+def test_cursor_invalido_responde_400(cliente):
+    resposta = cliente.get(URL_REFEICOES, params={'cursor': 'nao-e-um-cursor'})
+    assert resposta.status_code == 400
+    assert resposta.json() == {'erro': 'Cursor inválido'}
+
+
+def test_etag_devolve_304_ate_os_dados_mudarem(cliente):
+    _gravar_refeicoes(3)
+    primeira = cliente.get(URL_REFEICOES)
+    etag = primeira.headers['etag']
+    assert etag.startswith('W/"')
+
+    repetida = cliente.get(URL_REFEICOES, headers={'If-None-Match': etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b''
+    assert repetida.headers['etag'] == etag
+
+    resposta = cliente.post(URL_REFEICOES, json={'data': HOJE.isoformat(), 'refeicao': 'Jantar',
+                                                 'alimento': 'Feijão', 'quantidade': 100, 'calorias': 76,
+                                                 'proteinas': 4.8, 'carboidratos': 13.6, 'gorduras': 0.5})
+    assert resposta.status_code == 201
+
+    alterada = cliente.get(URL_REFEICOES, headers={'If-None-Match': etag})
+    assert alterada.status_code == 200
+    assert alterada.headers['etag'] != etag
+    assert len(alterada.json()['itens']) == 4
+
+
+def test_gzip_so_quando_o_cliente_aceita_e_o_corpo_e_grande(cliente):
+    _gravar_refeicoes(50)
+
+    comprimida = cliente.get(URL_REFEICOES, headers={'Accept-Encoding': 'gzip'})
+    assert comprimida.headers['content-encoding'] == 'gzip'
+    assert len(comprimida.json()['itens']) == 50
+
+    sem_gzip = cliente.get(URL_REFEICOES, headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in sem_gzip.headers
+    assert len(sem_gzip.content) >= TAMANHO_MINIMO_GZIP
+    assert sem_gzip.json() == comprimida.json()
+
+    pequena = cliente.get('/saude', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in pequena.headers
+
+
+def test_metas_gravadas_pela_api_invalidam_o_cache_do_app(cliente):
+    url = f'/usuarios/{ID_USUARIO_PADRAO}/metas'
+    # Metas em cache no processo do app antes da gravação pela API
+    assert obter_metas(ID_USUARIO_PADRAO) == METAS_PADRAO
+
+    novas = {**METAS_PADRAO, 'calorias_diarias': 1800.0}
+    resposta = cliente.put(url, json=novas)
+    assert resposta.status_code == 200
+
+    assert obter_metas(ID_USUARIO_PADRAO) == novas
+    assert cliente.get(url).json() == novas
+
+
+def test_gravar_para_usuario_inexistente_responde_404(cliente):
+    resposta = cliente.put('/usuarios/999/metas', json=METAS_PADRAO)
+    assert resposta.status_code == 404
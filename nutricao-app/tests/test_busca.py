@@ -0,0 +1,28 @@
+import pandas as pd
+
+from nutricao_app.busca import LIMITE_CANDIDATOS, buscar_alimentos
+from nutricao_app.nutrientes import COLUNAS_NUTRIENTES
+from nutricao_app.taco import gravar_lotes_taco
+
+
+# Função para gravar alimentos na tabela TACO (nutrientes zerados)
+def _gravar_alimentos(nomes):
+    df = pd.DataFrame({'nome': nomes})
+    for coluna in COLUNAS_NUTRIENTES:
+        df[coluna] = 0.0
+    gravar_lotes_taco([df])
+
+
+def test_busca_ignora_acentos_e_aceita_prefixos(banco_vazio):
+    nomes = [linha[1] for linha in buscar_alimentos('feijao car')]
+    assert nomes[0] == 'Feijão, carioca, cozido'
+    assert buscar_alimentos('xyzw') == ()
+
+
+def test_busca_ampla_mantem_o_mais_relevante(banco_vazio):
+    # Mais candidatos que o limite, gravados antes do alimento mais relevante (ids menores)
+    _gravar_alimentos([f'Arroz, variedade {i}, preparado no vapor com temperos' for i in range(LIMITE_CANDIDATOS + 100)])
+    _gravar_alimentos(['Arroz'])
+
+    resultados = buscar_alimentos('arroz')
+    assert resultados[0][1] == 'Arroz'
@@ -0,0 +1,141 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from nutricao_app.busca import buscar_alimentos
+from nutricao_app.catalogo import baixar_catalogo, garantir_catalogo_completo
+from nutricao_app.receitas import obter_ingredientes, salvar_receita
+from nutricao_app.repositorio import buscar_alimentos_por_nome, contar_linhas, ler_alimentos_taco
+from nutricao_app.snapshot import SnapshotTaco, construir_snapshot, materializar_snapshot_taco, obter_snapshot_materializado
+from nutricao_app.taco import LINHAS_TACO_COMPLETA
+from nutricao_app.usuarios import ID_USUARIO_PADRAO
+
+LINHAS_CSV = 600
+
+
+# Função para montar um CSV no layout da TACO 4ª edição com 'linhas' alimentos
+def _csv_taco(linhas=LINHAS_CSV):
+    cabecalho = 'Descrição dos alimentos;Energia (kcal);Proteína (g);Lipídeos (g);Carboidrato (g);' \
+                'Fibra Alimentar (g);Cálcio (mg);Ferro (mg)'
+    corpo = [f'Alimento completo {i};{100 + i % 50};{i % 30},5;1,2;20;Tr;{i % 90};0,4' for i in range(linhas)]
+    return '\n'.join([cabecalho, *corpo]).encode('utf-8')
+
+
+# Servidor HTTP local no lugar do site da TACO: cada requisição consome a próxima resposta
+# da lista (status, cabeçalhos, corpo e, opcionalmente, segundos de espera antes de responder);
+# a última se repete
+class _Handler(BaseHTTPRequestHandler):
+    respostas = []
+    requisicoes = []
+
+    def do_GET(self):
+        type(self).requisicoes.append(dict(self.headers))
+        status, cabecalhos, corpo, *espera = self.respostas.pop(0) if len(self.respostas) > 1 else self.respostas[0]
+        if espera:
+            time.sleep(espera[0])
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *argumentos):
+        pass
+
+
+@pytest.fixture
+def servidor_taco():
+    _Handler.respostas, _Handler.requisicoes = [], []
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield _Handler, f'http://127.0.0.1:{servidor.server_port}/taco.csv'
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_download_grava_o_cache_e_reusa_com_304(servidor_taco, tmp_path):
+    handler, url = servidor_taco
+    handler.respostas.extend([(200, {'ETag': '"v1"'}, _csv_taco(3)), (304, {'ETag': '"v1"'}, b'')])
+
+    assert baixar_catalogo(url, str(tmp_path)) == _csv_taco(3)
+    assert 'If-None-Match' not in handler.requisicoes[0]
+
+    # Segunda vez: requisição condicional e conteúdo lido do cache
+    assert baixar_catalogo(url, str(tmp_path)) == _csv_taco(3)
+    assert handler.requisicoes[1]['If-None-Match'] == '"v1"'
+
+
+def test_erro_do_servidor_e_repetido(servidor_taco, tmp_path):
+    handler, url = servidor_taco
+    handler.respostas.extend([(503, {}, b'indisponivel'), (200, {}, _csv_taco(3))])
+
+    assert baixar_catalogo(url, str(tmp_path), espera_inicial=0) == _csv_taco(3)
+    assert len(handler.requisicoes) == 2
+
+
+def test_timeout_de_leitura_esgota_as_tentativas(servidor_taco, tmp_path):
+    handler, url = servidor_taco
+    handler.respostas.append((200, {}, _csv_taco(3), 1))
+
+    with pytest.raises(requests.Timeout):
+        baixar_catalogo(url, str(tmp_path), timeout=(1, 0.1), tentativas=2, espera_inicial=0)
+    assert len(handler.requisicoes) == 2
+
+
+def test_404_nao_e_repetido(servidor_taco, tmp_path):
+    handler, url = servidor_taco
+    handler.respostas.append((404, {}, b'nao encontrado'))
+
+    with pytest.raises(requests.HTTPError):
+        baixar_catalogo(url, str(tmp_path), espera_inicial=0)
+    assert len(handler.requisicoes) == 1
+
+
+def test_banco_novo_chega_a_tabela_completa(banco_vazio, servidor_taco, tmp_path):
+    handler, url = servidor_taco
+    handler.respostas.append((200, {'ETag': '"v1"'}, _csv_taco()))
+    # O banco novo só tem a tabela de exemplo do snapshot distribuído
+    with SnapshotTaco() as snapshot:
+        assert not snapshot.completo
+    assert contar_linhas('alimentos_taco') < LINHAS_TACO_COMPLETA
+    arroz = buscar_alimentos_por_nome('Arroz, tipo 1, cozido', 1)[0][0]
+    receita_id = salvar_receita(ID_USUARIO_PADRAO, 'Arroz', [(arroz, 100)])
+
+    garantir_catalogo_completo(url, str(tmp_path / 'cache')).result(timeout=30)
+
+    # O catálogo baixado substitui a tabela de exemplo, menos o alimento usado na receita
+    assert contar_linhas('alimentos_taco') == LINHAS_CSV + 1
+    assert buscar_alimentos('alimento completo 599')
+    assert not buscar_alimentos_por_nome('Banana prata', 1)
+    assert not buscar_alimentos('banana prata')
+    assert obter_ingredientes(receita_id) == [(arroz, 'Arroz, tipo 1, cozido', 100)]
+    # Com a tabela completa, nada é baixado de novo e o snapshot de exemplo não a sobrescreve
+    assert garantir_catalogo_completo(url, str(tmp_path / 'cache')) is None
+    assert materializar_snapshot_taco(forcar=True) is None
+    assert len(handler.requisicoes) == 1
+
+
+def test_snapshot_com_checksum_invalido_nao_e_gravado(banco_vazio, tmp_path):
+    with SnapshotTaco() as snapshot:
+        df = snapshot.como_dataframe()
+    df['nome'] = df['nome'] + ' (versão 2)'
+    caminho = construir_snapshot(df, str(tmp_path / 'taco_snapshot.bin'), versao=2)
+    # Um byte alterado no fim do arquivo (tabela de nomes) depois de gravado o checksum
+    with open(caminho, 'r+b') as arquivo:
+        arquivo.seek(-1, 2)
+        ultimo = arquivo.read(1)
+        arquivo.seek(-1, 2)
+        arquivo.write(bytes([ultimo[0] ^ 0xFF]))
+
+    anteriores = ler_alimentos_taco(['nome'])
+    materializado = obter_snapshot_materializado()
+    with pytest.raises(ValueError, match='Checksum'):
+        materializar_snapshot_taco(caminho)
+
+    assert ler_alimentos_taco(['nome']) == anteriores
+    assert obter_snapshot_materializado() == materializado
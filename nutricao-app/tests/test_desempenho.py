@@ -0,0 +1,339 @@
+# Benchmarks da camada de dados (pytest-benchmark) em bancos sintéticos de três tamanhos
+# (tests/conftest.py). Cada execução é comparada com a última linha de base salva em
+# tests/benchmarks para esta máquina e falha se o tempo mínimo dobrar (LIMITE_REGRESSAO)
+#   pytest                                   mede e compara com a linha de base
+#   pytest --benchmark-save=base             salva uma nova linha de base
+#   pytest --benchmark-disable               só executa (verifica os resultados, sem medir)
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from nutricao_app import banco, busca, repositorio
+from nutricao_app.agregacao import lttb, obter_consumo_agregado, obter_progresso_agregado
+from nutricao_app.graficos import (figuras_consumo_diario, gerar_grafico_consumo_diario,
+                                   gerar_grafico_progresso_corporal)
+from nutricao_app.gravacao import estatisticas_gravacao
+from nutricao_app.historico import HistoricoRefeicoes
+from nutricao_app.metas import obter_metas
+from nutricao_app.receitas import porcao_receita, salvar_receita
+from nutricao_app.registros import (COLUNAS_INSERCAO_REFEICOES, adicionar_medida, adicionar_refeicao, atualizar_metas,
+                                    obter_refeicoes_por_data, obter_refeicoes_por_periodo, obter_todas_medidas)
+from nutricao_app.resumo import obter_resumo_do_dia, obter_resumo_por_periodo
+from nutricao_app.tendencias import TendenciasUsuario
+from tools.dados_sinteticos import gerar_refeicoes, nutrientes_cardapio
+from tools.desempenho_repositorio import inserir_refeicoes_executemany, linhas_refeicoes, obter_metas_orm
+from tools.desempenho_tendencias import serie_pandas
+
+HOJE = date.today()
+PERIODOS_DIAS = [7, 30, 365]
+TERMOS_BUSCA = ['arroz', 'feijao carioca', 'frango grel', 'p']
+LINHAS_EM_MASSA = 10_000
+
+
+# Consultas de leitura
+
+@pytest.mark.benchmark(group='obter_refeicoes_por_data')
+def test_obter_refeicoes_por_data(benchmark, usuario_id):
+    df = benchmark(obter_refeicoes_por_data, usuario_id, HOJE - timedelta(days=1))
+    assert list(df.columns)[:3] == ['data', 'refeicao', 'alimento']
+
+
+@pytest.mark.benchmark(group='obter_refeicoes_por_periodo')
+@pytest.mark.parametrize('dias', PERIODOS_DIAS)
+def test_obter_refeicoes_por_periodo(benchmark, usuario_id, dias):
+    df = benchmark(obter_refeicoes_por_periodo, usuario_id, HOJE - timedelta(days=dias))
+    assert not df.empty
+
+
+@pytest.mark.benchmark(group='historico_refeicoes')
+def test_historico_refeicoes(benchmark, usuario_id):
+    historico = benchmark(HistoricoRefeicoes, usuario_id)
+    assert not historico.refeicoes.empty
+
+
+@pytest.mark.benchmark(group='obter_todas_medidas')
+def test_obter_todas_medidas(benchmark, usuario_id):
+    df = benchmark(obter_todas_medidas, usuario_id)
+    assert df['peso'].notna().all()
+
+
+@pytest.mark.benchmark(group='obter_metas')
+def test_obter_metas_banco(benchmark, usuario_id):
+    metas = benchmark(repositorio.obter_metas, usuario_id)
+    assert metas['calorias_diarias'] > 0
+
+
+@pytest.mark.benchmark(group='obter_metas')
+def test_obter_metas_orm(benchmark, usuario_id):
+    metas = benchmark(obter_metas_orm, usuario_id)
+    assert metas == repositorio.obter_metas(usuario_id)
+
+
+@pytest.mark.benchmark(group='obter_metas')
+def test_obter_metas_cache(benchmark, usuario_id):
+    metas = benchmark(obter_metas, usuario_id)
+    assert metas == repositorio.obter_metas(usuario_id)
+
+
+@pytest.mark.benchmark(group='obter_resumo')
+def test_obter_resumo_do_dia(benchmark, usuario_id):
+    resumo = benchmark(obter_resumo_do_dia, usuario_id, HOJE - timedelta(days=1))
+    assert set(resumo) >= {'calorias', 'proteinas', 'carboidratos', 'gorduras'}
+
+
+@pytest.mark.benchmark(group='obter_resumo')
+@pytest.mark.parametrize('dias', PERIODOS_DIAS)
+def test_obter_resumo_por_periodo(benchmark, usuario_id, dias):
+    df = benchmark(obter_resumo_por_periodo, usuario_id, HOJE - timedelta(days=dias))
+    assert len(df) <= dias + 1
+
+
+# Busca na tabela TACO (sem o cache de resultados, para medir a consulta FTS5)
+
+@pytest.mark.benchmark(group='buscar_alimentos')
+@pytest.mark.parametrize('termo', TERMOS_BUSCA)
+def test_buscar_alimentos(benchmark, banco_sintetico, termo):
+    resultado = benchmark(busca._buscar_alimentos.__wrapped__, busca.normalizar_termo(termo), busca.LIMITE_SUGESTOES)
+    assert len(resultado) <= busca.LIMITE_SUGESTOES
+
+
+# Agregações e construção das figuras do dashboard
+
+@pytest.mark.benchmark(group='obter_consumo_agregado')
+@pytest.mark.parametrize('dias', PERIODOS_DIAS + [None])
+def test_obter_consumo_agregado(benchmark, usuario_id, dias):
+    inicio = HOJE - timedelta(days=dias) if dias else None
+    df, _ = benchmark(obter_consumo_agregado, usuario_id, inicio)
+    assert 0 < len(df) <= 200
+
+
+@pytest.mark.benchmark(group='obter_progresso_agregado')
+def test_obter_progresso_agregado(benchmark, usuario_id):
+    df_peso, df_gordura, df_circunferencias, _ = benchmark(obter_progresso_agregado, usuario_id)
+    assert 0 < len(df_peso) <= 200 and 0 < len(df_gordura) <= 200 and len(df_circunferencias) <= 200
+
+
+@pytest.mark.benchmark(group='lttb')
+@pytest.mark.parametrize('pontos', [10_000, 1_000_000])
+def test_lttb(benchmark, pontos):
+    x = list(range(pontos))
+    y = [(i * 7919) % 1000 for i in range(pontos)]
+    indices = benchmark(lttb, x, y)
+    assert len(indices) == 200
+
+
+@pytest.mark.benchmark(group='figuras')
+def test_gerar_grafico_consumo_diario(benchmark, usuario_id):
+    df, granularidade = obter_consumo_agregado(usuario_id)
+    figuras = benchmark(gerar_grafico_consumo_diario, df, obter_metas(usuario_id), granularidade)
+    assert len(figuras) == 2
+
+
+@pytest.mark.benchmark(group='figuras')
+def test_gerar_grafico_progresso_corporal(benchmark, usuario_id):
+    df_peso, df_gordura, df_circunferencias, granularidade = obter_progresso_agregado(usuario_id)
+    figuras = benchmark(gerar_grafico_progresso_corporal, df_peso, df_gordura, df_circunferencias,
+                        obter_metas(usuario_id), granularidade)
+    assert len(figuras) == 3
+
+
+@pytest.mark.benchmark(group='figuras')
+def test_figuras_consumo_diario_cache(benchmark, usuario_id):
+    figuras_consumo_diario(usuario_id, HOJE - timedelta(days=30))
+    figuras = benchmark(figuras_consumo_diario, usuario_id, HOJE - timedelta(days=30))
+    assert len(figuras) == 2
+
+
+@pytest.mark.benchmark(group='tendencias')
+def test_tendencias_carregar(benchmark, usuario_id):
+    tendencias = benchmark(TendenciasUsuario, usuario_id, HOJE)
+    assert len(tendencias.peso) == len(tendencias.consumo)
+
+
+@pytest.mark.benchmark(group='tendencias')
+def test_tendencias_serie(benchmark, usuario_id):
+    tendencias = TendenciasUsuario(usuario_id, HOJE)
+    metas = obter_metas(usuario_id)
+    serie = benchmark(tendencias.serie, metas)
+    referencia = serie_pandas(usuario_id, metas, HOJE)
+    assert np.allclose(serie.iloc[:, 1:], referencia.iloc[:, 1:], equal_nan=True)
+
+
+@pytest.mark.benchmark(group='tendencias')
+def test_tendencias_serie_pandas(benchmark, usuario_id):
+    serie = benchmark(serie_pandas, usuario_id, obter_metas(usuario_id), HOJE)
+    assert serie['data'].iloc[-1] == np.datetime64(HOJE)
+
+
+@pytest.mark.benchmark(group='tendencias')
+def test_tendencias_resumo(benchmark, usuario_id):
+    tendencias = TendenciasUsuario(usuario_id, HOJE)
+    metas = obter_metas(usuario_id)
+    resumo = benchmark(tendencias.resumo, metas)
+    assert resumo['media_7']['calorias'] == pytest.approx(tendencias.serie(metas)['calorias_media_7'].iloc[-1])
+
+
+# Gravações (por último: acrescentam linhas ao banco do tamanho em uso)
+
+@pytest.mark.benchmark(group='adicionar')
+def test_adicionar_refeicao(benchmark, usuario_id):
+    id_refeicao = benchmark(adicionar_refeicao, usuario_id, HOJE, 'Almoço', 'Arroz, tipo 1, cozido',
+                            150, 192, 3.8, 42.2, 0.3)
+    assert id_refeicao > 0
+
+
+@pytest.mark.benchmark(group='adicionar')
+def test_adicionar_refeicoes_concorrentes(benchmark, usuario_id):
+    # Sessões gravando ao mesmo tempo: o gravador junta as inserções em lotes
+    def gravar_em_sessoes(sessoes=8, refeicoes=20):
+        with ThreadPoolExecutor(sessoes) as executor:
+            return list(executor.map(lambda i: adicionar_refeicao(usuario_id, HOJE, 'Almoço', 'Arroz, tipo 1, cozido',
+                                                                  100 + i, 128, 2.5, 28.1, 0.2),
+                                     range(sessoes * refeicoes)))
+
+    ids = benchmark(gravar_em_sessoes)
+    assert len(set(ids)) == len(ids)
+    assert estatisticas_gravacao()['maior_lote'] > 1
+
+
+@pytest.mark.benchmark(group='adicionar')
+def test_adicionar_medida(benchmark, usuario_id):
+    benchmark(adicionar_medida, usuario_id, HOJE, 80.0, 1.75, 90.0, 100.0, 22.0)
+
+
+@pytest.mark.benchmark(group='adicionar')
+def test_atualizar_metas(benchmark, usuario_id):
+    metas = obter_metas(usuario_id)
+    benchmark(atualizar_metas, usuario_id, metas)
+    assert repositorio.obter_metas(usuario_id) == metas
+
+
+@pytest.mark.benchmark(group='tendencias')
+def test_tendencias_atualizar(benchmark, usuario_id):
+    # Uma refeição nova antes de cada rodada: só o dia de hoje é recalculado
+    tendencias = TendenciasUsuario(usuario_id, HOJE)
+
+    def registrar_refeicao():
+        adicionar_refeicao(usuario_id, HOJE, 'Lanche da Tarde', 'Banana, prata, crua', 100, 98, 1.3, 26.0, 0.1)
+
+    assert benchmark.pedantic(tendencias.atualizar, args=(HOJE,), setup=registrar_refeicao, rounds=20) == 1
+    assert np.allclose(tendencias.consumo, TendenciasUsuario(usuario_id, HOJE).consumo, equal_nan=True)
+
+
+# Receitas: porção calculada pelo vetor gravado (uma leitura) contra a consulta de cada ingrediente
+
+INGREDIENTES_RECEITA = 8
+
+
+# Função para salvar a receita de teste do usuário com os primeiros alimentos da TACO
+# Retorna (id da receita, [(id do alimento, nome, gramas)])
+def _salvar_receita_teste(usuario_id):
+    conn = banco.conectar_bd()
+    try:
+        alimentos = conn.execute('SELECT id, nome FROM alimentos_taco ORDER BY id LIMIT ?',
+                                 (INGREDIENTES_RECEITA,)).fetchall()
+    finally:
+        conn.close()
+    ingredientes = [(alimento_id, nome, 25.0 * (i + 1)) for i, (alimento_id, nome) in enumerate(alimentos)]
+    receita_id = salvar_receita(usuario_id, 'Receita de teste',
+                                [(alimento_id, gramas) for alimento_id, _, gramas in ingredientes])
+    return receita_id, ingredientes
+
+
+# Função para calcular a porção de uma receita consultando cada ingrediente na TACO (sem o vetor gravado)
+def _porcao_por_ingredientes(ingredientes, quantidade):
+    total = sum(gramas for _, _, gramas in ingredientes)
+    porcao = dict.fromkeys(['calorias', 'proteinas', 'carboidratos', 'gorduras'], 0.0)
+    for _, nome, gramas in ingredientes:
+        info = repositorio.obter_info_nutricional(nome)
+        for coluna in porcao:
+            porcao[coluna] += (info[coluna] or 0.0) * gramas / total * quantidade / 100
+    return porcao
+
+
+@pytest.mark.benchmark(group='receitas')
+def test_salvar_receita(benchmark, usuario_id):
+    receita_id, _ = _salvar_receita_teste(usuario_id)
+    assert benchmark(_salvar_receita_teste, usuario_id)[0] == receita_id
+
+
+@pytest.mark.benchmark(group='receitas')
+def test_porcao_receita(benchmark, usuario_id):
+    receita_id, ingredientes = _salvar_receita_teste(usuario_id)
+    porcao = benchmark(porcao_receita, usuario_id, receita_id, 250)
+    for coluna, valor in _porcao_por_ingredientes(ingredientes, 250).items():
+        assert porcao[coluna] == pytest.approx(valor)
+
+
+@pytest.mark.benchmark(group='receitas')
+def test_porcao_por_ingredientes(benchmark, usuario_id):
+    _, ingredientes = _salvar_receita_teste(usuario_id)
+    assert benchmark(_porcao_por_ingredientes, ingredientes, 250)['calorias'] > 0
+
+
+@pytest.mark.benchmark(group='receitas')
+def test_receita_alimento_alterado(benchmark, usuario_id):
+    # Alteração de um ingrediente na TACO (desfeita no fim): o gatilho recalcula o vetor da receita
+    receita_id, ingredientes = _salvar_receita_teste(usuario_id)
+    calorias = porcao_receita(usuario_id, receita_id, 100)['calorias']
+
+    def alterar_alimento():
+        conn = banco.conectar_bd()
+        try:
+            conn.execute('UPDATE alimentos_taco SET energia_kcal = IFNULL(energia_kcal, 0) + 100 WHERE id = ?',
+                         (ingredientes[0][0],))
+            vetor = conn.execute('SELECT energia_kcal FROM receitas WHERE id = ?', (receita_id,)).fetchone()[0]
+            conn.rollback()
+        finally:
+            conn.close()
+        return vetor
+
+    total = sum(gramas for _, _, gramas in ingredientes)
+    assert benchmark(alterar_alimento) == pytest.approx(calorias + 100 * ingredientes[0][2] / total)
+    assert porcao_receita(usuario_id, receita_id, 100)['calorias'] == pytest.approx(calorias)
+
+
+# Gravação em massa (em uma transação desfeita no fim: o banco não cresce)
+
+# Função para gravar as linhas em uma transação e desfazê-la. Retorna as refeições do usuário vistas na transação
+def _gravar_e_desfazer(gravar, linhas):
+    conn = banco.conectar_bd()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        gravar(conn, linhas)
+        total = conn.execute('SELECT COUNT(*) FROM refeicoes WHERE usuario_id = ?', (linhas[0][0],)).fetchone()[0]
+        conn.rollback()
+    finally:
+        conn.close()
+    return total
+
+
+@pytest.mark.benchmark(group='inserir_em_massa')
+def test_inserir_em_massa_executemany(benchmark, usuario_id):
+    linhas = linhas_refeicoes(usuario_id, LINHAS_EM_MASSA)
+    antes = len(obter_refeicoes_por_periodo(usuario_id, date.min))
+    assert benchmark(_gravar_e_desfazer, inserir_refeicoes_executemany, linhas) == antes + LINHAS_EM_MASSA
+
+
+@pytest.mark.benchmark(group='inserir_em_massa')
+def test_inserir_em_massa_repositorio(benchmark, usuario_id):
+    linhas = linhas_refeicoes(usuario_id, LINHAS_EM_MASSA)
+    antes = len(obter_refeicoes_por_periodo(usuario_id, date.min))
+
+    def gravar(conn, linhas):
+        repositorio.inserir_em_massa(conn, 'refeicoes', COLUNAS_INSERCAO_REFEICOES, linhas)
+
+    assert benchmark(_gravar_e_desfazer, gravar, linhas) == antes + LINHAS_EM_MASSA
+
+
+# Gerador de dados sintéticos (reprodutível pela semente)
+
+@pytest.mark.benchmark(group='dados_sinteticos')
+def test_gerar_refeicoes_um_ano(benchmark):
+    nutrientes = nutrientes_cardapio()
+    df = benchmark(lambda: gerar_refeicoes(np.random.default_rng(0), HOJE - timedelta(days=364), HOJE, nutrientes))
+    repetido = gerar_refeicoes(np.random.default_rng(0), HOJE - timedelta(days=364), HOJE, nutrientes)
+    assert df.equals(repetido)
+    assert df['calorias'].notna().all()
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from nutricao_app.datas import de_dia
+from nutricao_app.exportacao import TABELAS_EXPORTACAO, exportar_dados, formatos_disponiveis
+from nutricao_app.registros import adicionar_medida, adicionar_refeicao
+from nutricao_app.usuarios import ID_USUARIO_PADRAO, obter_id_usuario
+
+HOJE = date(2024, 3, 15)
+
+
+# Função para gravar refeições e medidas do usuário padrão e uma refeição de outro usuário
+def _gravar_historico():
+    for i in range(7):
+        adicionar_refeicao(ID_USUARIO_PADRAO, HOJE - timedelta(days=i), 'Almoço', 'Arroz, tipo 1, cozido',
+                           100 + i, 128, 2.5, 28.1, 0.2)
+        adicionar_refeicao(ID_USUARIO_PADRAO, HOJE - timedelta(days=i), 'Jantar', 'Feijão, carioca, cozido',
+                           80, 76, 4.8, 13.6, 0.5)
+    for i in range(3):
+        adicionar_medida(ID_USUARIO_PADRAO, HOJE - timedelta(days=10 * i), 80 - i, 175, 90, 100, 22)
+    adicionar_refeicao(obter_id_usuario('ana'), HOJE, 'Almoço', 'Pão, francês', 50, 150, 4, 29.3, 1.5)
+
+
+# Função para ler as linhas do usuário direto do banco, nas colunas da exportação
+def _linhas_banco(banco_vazio, tabela, inicio=None):
+    colunas = list(TABELAS_EXPORTACAO[tabela])
+    conn = sqlite3.connect(banco_vazio)
+    try:
+        linhas = conn.execute(f'SELECT {", ".join(colunas)} FROM {tabela} WHERE usuario_id = ? ORDER BY data, id',
+                              (ID_USUARIO_PADRAO,)).fetchall()
+    finally:
+        conn.close()
+    posicao_data = colunas.index('data')
+    return [linha[:posicao_data] + (de_dia(linha[posicao_data]),) + linha[posicao_data + 1:]
+            for linha in linhas if inicio is None or de_dia(linha[posicao_data]) >= inicio]
+
+
+# Função para ler um CSV exportado como tuplas (números como float, datas como date)
+def _ler_csv(conteudo):
+    leitor = csv.reader(io.StringIO(conteudo.decode('utf-8')))
+    colunas = next(leitor)
+    return colunas, [tuple(date.fromisoformat(valor) if coluna == 'data' else
+                           valor if coluna in ('refeicao', 'alimento') else float(valor)
+                           for coluna, valor in zip(colunas, linha)) for linha in leitor]
+
+
+@pytest.mark.parametrize('tabela', list(TABELAS_EXPORTACAO))
+@pytest.mark.parametrize('formato', ['csv', 'csv.gz'])
+def test_exportacao_csv_igual_as_linhas_do_banco(banco_vazio, tabela, formato):
+    _gravar_historico()
+    destino = io.BytesIO()
+
+    linhas = exportar_dados(destino, ID_USUARIO_PADRAO, tabela, formato, tamanho_lote=4)
+
+    conteudo = gzip.decompress(destino.getvalue()) if formato == 'csv.gz' else destino.getvalue()
+    colunas, exportadas = _ler_csv(conteudo)
+    assert colunas == list(TABELAS_EXPORTACAO[tabela])
+    assert exportadas == _linhas_banco(banco_vazio, tabela)
+    assert linhas == len(exportadas)
+
+
+def test_exportacao_por_periodo(banco_vazio, tmp_path):
+    _gravar_historico()
+    inicio = HOJE - timedelta(days=2)
+
+    linhas = exportar_dados(tmp_path / 'refeicoes.csv', ID_USUARIO_PADRAO, 'refeicoes', data_inicio=inicio)
+
+    _, exportadas = _ler_csv((tmp_path / 'refeicoes.csv').read_bytes())
+    assert exportadas == _linhas_banco(banco_vazio, 'refeicoes', inicio)
+    assert linhas == 6
+
+
+@pytest.mark.skipif('parquet' not in formatos_disponiveis(), reason='requer pyarrow')
+@pytest.mark.parametrize('formato', ['parquet', 'arrow'])
+def test_exportacao_arrow_igual_as_linhas_do_banco(banco_vazio, tmp_path, formato):
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    _gravar_historico()
+    destino = tmp_path / f'refeicoes.{formato}'
+
+    exportar_dados(destino, ID_USUARIO_PADRAO, 'refeicoes', formato, tamanho_lote=4)
+
+    tabela = pq.read_table(destino) if formato == 'parquet' else feather.read_table(destino)
+    assert tabela.column_names == list(TABELAS_EXPORTACAO['refeicoes'])
+    assert [tuple(linha.values()) for linha in tabela.to_pylist()] == _linhas_banco(banco_vazio, 'refeicoes')
@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+from nutricao_app import gravacao
+from nutricao_app.gravacao import GravadorEmGrupo
+from nutricao_app.usuarios import ID_USUARIO_PADRAO
+
+SQL_REFEICAO = 'INSERT INTO refeicoes (usuario_id, data, alimento) VALUES (?, ?, ?)'
+
+
+@pytest.fixture
+def gravador(banco_vazio):
+    # Espera longa o bastante para as inserções do teste caírem no mesmo lote
+    gravador = GravadorEmGrupo(espera_lote=0.5)
+    yield gravador
+    gravador.parar(timeout=10)
+
+
+# Função para ler os alimentos gravados em refeicoes
+def _alimentos(banco_vazio):
+    conn = sqlite3.connect(banco_vazio)
+    try:
+        return [linha[0] for linha in conn.execute('SELECT alimento FROM refeicoes ORDER BY id')]
+    finally:
+        conn.close()
+
+
+def test_linha_com_erro_nao_derruba_o_lote(gravador, banco_vazio):
+    valida = gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (ID_USUARIO_PADRAO, 19797, 'Arroz'))
+    # usuario_id nulo viola o NOT NULL
+    invalida = gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (None, 19797, 'Feijão'))
+
+    assert valida.result(timeout=10) > 0
+    with pytest.raises(sqlite3.IntegrityError):
+        invalida.result(timeout=10)
+    assert _alimentos(banco_vazio) == ['Arroz']
+    estatisticas = gravador.estatisticas()
+    assert (estatisticas['lotes'], estatisticas['linhas'], estatisticas['falhas']) == (1, 1, 1)
+    assert estatisticas['maior_lote'] == 2
+
+
+def test_falha_ao_abrir_o_banco_falha_o_lote_e_o_gravador_continua(gravador, banco_vazio, monkeypatch):
+    conectar_bd = gravacao.conectar_bd
+
+    def conectar_uma_falha():
+        monkeypatch.setattr(gravacao, 'conectar_bd', conectar_bd)
+        raise OSError('banco inacessível')
+
+    monkeypatch.setattr(gravacao, 'conectar_bd', conectar_uma_falha)
+    falha = gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (ID_USUARIO_PADRAO, 19797, 'Arroz'))
+    with pytest.raises(OSError):
+        falha.result(timeout=10)
+
+    # A próxima inserção é gravada pela mesma thread
+    nova = gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (ID_USUARIO_PADRAO, 19797, 'Feijão'))
+    assert nova.result(timeout=10) > 0
+    assert _alimentos(banco_vazio) == ['Feijão']
+    assert gravador.estatisticas()['linhas'] == 1
+
+
+def test_lote_com_erro_fora_do_sqlite_devolve_a_conexao_como_estava(gravador, monkeypatch):
+    conectar_bd = gravacao.conectar_bd
+    conexoes = []
+
+    def conectar_guardando():
+        conn = conectar_bd()
+        conexoes.append(conn.dbapi_connection)
+        return conn
+
+    monkeypatch.setattr(gravacao, 'conectar_bd', conectar_guardando)
+    valida = gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (ID_USUARIO_PADRAO, 19797, 'Arroz'))
+    # sql que não é texto: TypeError do módulo sqlite3, depois da primeira linha do lote
+    invalida = gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', None, ())
+
+    for futuro in (valida, invalida):
+        with pytest.raises(TypeError):
+            futuro.result(timeout=10)
+    # Sincronização de volta à do pool (NORMAL) e nenhuma transação aberta na conexão devolvida
+    assert conexoes[0].execute('PRAGMA synchronous').fetchone()[0] == 1
+    assert not conexoes[0].in_transaction
+
+
+def test_fila_cheia_rejeita_sem_esperar(banco_vazio):
+    gravador = GravadorEmGrupo(tamanho_fila=1)
+    # Sem a thread consumindo, a segunda inserção não cabe na fila
+    gravador._iniciar = lambda: None
+    gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (ID_USUARIO_PADRAO, 19797, 'Arroz'))
+
+    with pytest.raises(TimeoutError):
+        gravador.enfileirar(ID_USUARIO_PADRAO, 'refeicoes', SQL_REFEICAO, (ID_USUARIO_PADRAO, 19797, 'Feijão'), espera=0)
+    assert gravador.estatisticas()['rejeicoes'] == 1
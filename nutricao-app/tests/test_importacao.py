@@ -0,0 +1,138 @@
+import io
+import json
+import sqlite3
+from datetime import date
+
+import pytest
+
+from nutricao_app import banco, importacao
+from nutricao_app.importacao import importar_refeicoes
+from nutricao_app.migracoes import MIGRACOES
+from nutricao_app.registros import adicionar_refeicao, obter_refeicoes_por_periodo
+from nutricao_app.usuarios import ID_USUARIO_PADRAO
+
+INICIO = date(2024, 3, 1)
+
+CSV_REFEICOES = '''data,meal,food,amount,calories
+2024-03-01,lunch,"Arroz, tipo 1, cozido",100,
+2024-03-01,lunch,"Arroz, tipo 1, cozido",100,
+2024-03-01,dinner,"feijao, CARIOCA, cozido",80,61
+2024-03-02,breakfast,Torrada integral caseira da vovó,30,120
+,lunch,Sem data,100,100
+'''
+
+
+# Função para importar um texto como arquivo do formato dado
+def _importar(texto, formato='csv', **opcoes):
+    return importar_refeicoes(io.BytesIO(texto.encode('utf-8')), ID_USUARIO_PADRAO, formato, **opcoes)
+
+
+def _alimentos_importados():
+    return obter_refeicoes_por_periodo(ID_USUARIO_PADRAO, INICIO)['alimento'].astype(str).tolist()
+
+
+def test_importacao_repetida_nao_duplica_refeicoes(banco_vazio):
+    primeira = _importar(CSV_REFEICOES)
+    assert (primeira['importadas'], primeira['duplicadas'], primeira['invalidas']) == (3, 1, 1)
+
+    segunda = _importar(CSV_REFEICOES)
+    assert (segunda['importadas'], segunda['duplicadas'], segunda['invalidas']) == (0, 4, 1)
+    assert len(_alimentos_importados()) == 3
+
+
+def test_importacao_interrompida_pode_ser_repetida(banco_vazio):
+    # Interrompe depois do primeiro lote já gravado
+    def interromper(fracao, parcial):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        _importar(CSV_REFEICOES, tamanho_lote=2, progresso=interromper)
+    assert _alimentos_importados() == ['Arroz, tipo 1, cozido']
+
+    estatisticas = _importar(CSV_REFEICOES, tamanho_lote=2)
+
+    assert (estatisticas['importadas'], estatisticas['duplicadas'], estatisticas['invalidas']) == (2, 2, 1)
+    assert sorted(_alimentos_importados()) == ['Arroz, tipo 1, cozido', 'Feijão, carioca, cozido',
+                                               'Torrada integral caseira da vovó']
+
+
+def test_refeicoes_iguais_registradas_no_app_nao_sao_deduplicadas(banco_vazio):
+    for _ in range(2):
+        adicionar_refeicao(ID_USUARIO_PADRAO, INICIO, 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2)
+    _importar(CSV_REFEICOES)
+    assert _alimentos_importados().count('Arroz, tipo 1, cozido') == 3
+
+
+def test_alimento_sem_nome_igual_na_taco_fica_como_no_arquivo(banco_vazio, monkeypatch):
+    # Busca de texto completo com um resultado para qualquer nome: só uma sugestão
+    monkeypatch.setattr(importacao, 'buscar_alimentos', lambda nome, limite: [(1, 'Pão, francês')])
+
+    estatisticas = _importar(CSV_REFEICOES)
+
+    alimentos = _alimentos_importados()
+    assert 'Feijão, carioca, cozido' in alimentos
+    assert 'Torrada integral caseira da vovó' in alimentos
+    assert 'Pão, francês' not in alimentos
+    assert estatisticas['incertos'] == {'Torrada integral caseira da vovó': 'Pão, francês'}
+
+    df = obter_refeicoes_por_periodo(ID_USUARIO_PADRAO, INICIO).set_index('alimento')
+    # Nutrientes ausentes calculados pela TACO só para o nome igual; calorias do arquivo mantidas
+    assert df.loc['Arroz, tipo 1, cozido', 'calorias'] == pytest.approx(128)
+    assert df.loc['Feijão, carioca, cozido', 'calorias'] == pytest.approx(61)
+    assert df.loc['Torrada integral caseira da vovó', 'calorias'] == pytest.approx(120)
+
+
+REFEICOES_JSON = [
+    {'date': '2024-03-01', 'meal': 'lunch', 'food': 'Arroz, tipo 1, cozido', 'grams': 100},
+    {'date': '2024-03-01', 'meal': 'dinner', 'food': 'Feijão, carioca, cozido', 'grams': 80},
+    {'date': '2024-03-02', 'meal': 'lunch', 'food': 'Pão, francês', 'grams': 50},
+]
+
+
+@pytest.mark.parametrize('com_ijson', [False, True])
+@pytest.mark.parametrize('conteudo', [REFEICOES_JSON, {'versao': 2, 'refeicoes': REFEICOES_JSON}],
+                         ids=['lista', 'objeto'])
+def test_importacao_json_em_lotes(banco_vazio, monkeypatch, com_ijson, conteudo):
+    if com_ijson:
+        pytest.importorskip('ijson')
+    else:
+        monkeypatch.setattr(importacao, 'ijson', None)
+
+    estatisticas = _importar(json.dumps(conteudo), 'json', tamanho_lote=2)
+
+    assert estatisticas['importadas'] == 3
+    assert sorted(_alimentos_importados()) == sorted(refeicao['food'] for refeicao in REFEICOES_JSON)
+
+
+def test_importacao_json_lines(banco_vazio):
+    texto = '\n'.join(json.dumps(refeicao) for refeicao in REFEICOES_JSON)
+    assert _importar(texto, 'jsonl', tamanho_lote=2)['importadas'] == 3
+
+
+def test_migracao_da_chave_unica_mantem_a_primeira_refeicao_repetida(banco_vazio):
+    conn = sqlite3.connect(banco_vazio)
+    try:
+        # Banco anterior à migração 11: índice não único e chaves repetidas
+        conn.execute('DROP INDEX idx_refeicoes_usuario_chave')
+        conn.execute('CREATE INDEX idx_refeicoes_usuario_chave ON refeicoes (usuario_id, chave_registro)')
+        conn.executemany('INSERT INTO refeicoes (usuario_id, data, alimento, chave_registro) VALUES (?, ?, ?, ?)',
+                         [(ID_USUARIO_PADRAO, 19783, 'Arroz', 7), (ID_USUARIO_PADRAO, 19783, 'Arroz', 7),
+                          (ID_USUARIO_PADRAO, 19784, 'Feijão', 8)])
+        conn.commit()
+    finally:
+        conn.close()
+
+    _, _, comandos = next(migracao for migracao in MIGRACOES if migracao[0] == 11)
+    conn = banco.conectar_bd()
+    try:
+        for comando in comandos:
+            conn.execute(comando)
+        conn.commit()
+        chaves = conn.execute('SELECT chave_registro FROM refeicoes ORDER BY id').fetchall()
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute('INSERT INTO refeicoes (usuario_id, chave_registro) VALUES (?, 8)', (ID_USUARIO_PADRAO,))
+        conn.rollback()
+    finally:
+        conn.close()
+
+    assert chaves == [(7,), (None,), (8,)]
@@ -0,0 +1,139 @@
+import sqlite3
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from nutricao_app import banco, catalogo, migracoes
+from nutricao_app.metas import obter_metas
+from nutricao_app.migracoes import (CONSULTAS_CRITICAS, MIGRACOES, VERSAO_BASE, aplicar_migracoes,
+                                    obter_versao_esquema, verificar_planos_consulta)
+from nutricao_app.receitas import salvar_receita
+from nutricao_app.registros import obter_refeicoes_por_data, obter_todas_medidas
+from nutricao_app.repositorio import ler_alimentos_taco
+from nutricao_app.resumo import obter_resumo_do_dia
+from nutricao_app.usuarios import ID_USUARIO_PADRAO
+from tests.conftest import limpar_caches
+from tools.dados_sinteticos import gerar_dados
+
+CAMINHO_APP = Path(__file__).resolve().parents[1] / 'nutricao_app' / 'app.py'
+
+# Esquema do banco criado pela primeira versão do app (versão 2, antes das migrações):
+# datas em texto, sem usuários e metas em uma única linha
+ESQUEMA_ORIGINAL = '''
+CREATE TABLE refeicoes (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT, refeicao TEXT, alimento TEXT,
+                        quantidade REAL, calorias REAL, proteinas REAL, carboidratos REAL, gorduras REAL);
+CREATE TABLE medidas (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT, peso REAL, imc REAL, cintura REAL,
+                      quadril REAL, gordura_corporal REAL);
+CREATE TABLE metas (id INTEGER PRIMARY KEY CHECK (id = 1), calorias_diarias REAL, proteinas_diarias REAL,
+                    carboidratos_diarios REAL, gorduras_diarias REAL, peso_meta REAL, gordura_corporal_meta REAL);
+CREATE TABLE alimentos_taco (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT, energia_kcal REAL, proteina_g REAL,
+                             lipideos_g REAL, carboidrato_g REAL, fibra_g REAL, calcio_mg REAL, ferro_mg REAL);
+INSERT INTO refeicoes (data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras) VALUES
+    ('2024-03-14', 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2),
+    ('2024-03-14', 'Jantar', 'Feijão, carioca, cozido', 100, 76, 4.8, 13.6, 0.5),
+    ('2024-03-15', 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2),
+    ('2024-03-15', 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2);
+INSERT INTO medidas (data, peso, imc, cintura, quadril, gordura_corporal) VALUES ('2024-03-14', 80, 26.1, 90, 100, 22);
+INSERT INTO metas VALUES (1, 1800, 120, 200, 60, 72, 18);
+INSERT INTO alimentos_taco (nome, energia_kcal) VALUES ('Arroz, tipo 1, cozido', 128), ('Arroz, tipo 1, cozido', 128),
+    ('Feijão, carioca, cozido', 76);
+'''
+
+
+# Banco criado pela primeira versão do app: esquema original, sem a tabela de versão
+@pytest.fixture
+def banco_original(tmp_path):
+    caminho_anterior = banco.CAMINHO_BD
+    caminho = tmp_path / 'nutricao.db'
+    conn = sqlite3.connect(caminho)
+    conn.executescript(ESQUEMA_ORIGINAL)
+    conn.close()
+
+    banco.definir_caminho_bd(str(caminho))
+    limpar_caches()
+    yield caminho
+    banco.definir_caminho_bd(caminho_anterior)
+    limpar_caches()
+
+
+def test_consultas_criticas_sem_varredura_de_tabelas_grandes(banco_vazio):
+    usuario_id = gerar_dados(1, 1)['usuarios'][0]
+    salvar_receita(usuario_id, 'Prato', [(alimento_id, 100) for (alimento_id,) in ler_alimentos_taco(['id'])[:3]])
+
+    planos = verificar_planos_consulta(usuario_id, date.today())
+
+    assert set(planos) == set(CONSULTAS_CRITICAS)
+    for nome, (usa_indice, plano) in planos.items():
+        assert plano, f'{nome} não executou consultas no repositório'
+        assert usa_indice, f'{nome}: {" | ".join(plano)}'
+
+
+def test_aplicar_migracoes_rele_a_versao_na_transacao(banco_vazio, monkeypatch):
+    # Outro processo aplicou as migrações depois da leitura inicial da versão
+    monkeypatch.setattr(migracoes, 'obter_versao_esquema', lambda: 0)
+    assert aplicar_migracoes() == []
+
+
+def test_migracao_do_nome_unico_pode_ser_repetida(banco_vazio):
+    _, _, comandos = next(migracao for migracao in MIGRACOES if migracao[0] == 5)
+    conn = banco.conectar_bd()
+    try:
+        for comando in comandos:
+            conn.execute(comando)
+        conn.commit()
+    finally:
+        conn.close()
+    assert obter_versao_esquema() == MIGRACOES[-1][0]
+
+
+def test_banco_sem_versao_com_o_esquema_original_fica_na_versao_base(banco_original, tmp_path):
+    assert obter_versao_esquema() == VERSAO_BASE
+
+    # Banco sem as tabelas do esquema original: novo, as etapas de inicialização ainda vão rodar
+    banco.definir_caminho_bd(str(tmp_path / 'novo.db'))
+    assert obter_versao_esquema() == 0
+
+
+def test_migracoes_sobre_o_esquema_original(banco_original):
+    assert aplicar_migracoes() == [versao for versao, _, _ in MIGRACOES]
+
+    # Migração 6: dados existentes com o usuário padrão; migração 7: datas como número do dia
+    refeicoes = obter_refeicoes_por_data(ID_USUARIO_PADRAO, date(2024, 3, 15))
+    assert refeicoes['alimento'].astype(str).tolist() == ['Arroz, tipo 1, cozido'] * 2
+    assert obter_todas_medidas(ID_USUARIO_PADRAO)['peso'].tolist() == [80]
+    assert obter_resumo_do_dia(ID_USUARIO_PADRAO, date(2024, 3, 14))['calorias'] == pytest.approx(204)
+    assert obter_metas(ID_USUARIO_PADRAO)['calorias_diarias'] == 1800
+
+    conn = sqlite3.connect(banco_original)
+    try:
+        assert {tipo for (tipo,) in conn.execute('SELECT DISTINCT typeof(data) FROM refeicoes')} == {'integer'}
+        # Migração 5: nomes TACO únicos; migração 11: refeição repetida sem chave
+        assert conn.execute('SELECT COUNT(*) FROM alimentos_taco').fetchone()[0] == 2
+        assert conn.execute('SELECT COUNT(chave_registro) FROM refeicoes').fetchone()[0] == 3
+    finally:
+        conn.close()
+
+    planos = verificar_planos_consulta(ID_USUARIO_PADRAO, date(2024, 3, 15))
+    assert all(usa_indice for usa_indice, _ in planos.values())
+
+
+def test_app_abre_banco_do_esquema_original(banco_original, monkeypatch):
+    app_test = pytest.importorskip('streamlit.testing.v1')
+    # Sem download da TACO completa em segundo plano
+    monkeypatch.setattr(catalogo, 'garantir_catalogo_completo', lambda *args, **kwargs: None)
+
+    at = app_test.AppTest.from_file(str(CAMINHO_APP), default_timeout=120)
+    at.run()
+    at.run()
+
+    assert not at.exception
+    assert obter_versao_esquema() == MIGRACOES[-1][0]
+    # Dados do usuário migrados, sem os dados de exemplo de um banco novo
+    assert obter_metas(ID_USUARIO_PADRAO)['calorias_diarias'] == 1800
+    assert len(obter_refeicoes_por_data(ID_USUARIO_PADRAO, date(2024, 3, 15))) == 2
+    conn = sqlite3.connect(banco_original)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM refeicoes').fetchone()[0] == 4
+    finally:
+        conn.close()
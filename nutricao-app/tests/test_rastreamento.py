@@ -0,0 +1,142 @@
+import json
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from nutricao_app import catalogo, metas, rastreamento
+from nutricao_app.rastreamento import (finalizar_rastreamento, iniciar_rastreamento, rastrear, rastrear_execucao,
+                                       rastreamento_ativo, span)
+
+CAMINHO_APP = Path(__file__).resolve().parents[1] / 'nutricao_app' / 'app.py'
+
+
+# Função para fechar e remover o handler do log, que aponta para o arquivo de cada teste
+def _fechar_log():
+    if rastreamento._manipulador_log is not None:
+        rastreamento._logger.removeHandler(rastreamento._manipulador_log)
+        rastreamento._manipulador_log.close()
+        rastreamento._manipulador_log = None
+
+
+@pytest.fixture
+def log_rastreamento(tmp_path, monkeypatch):
+    caminho = tmp_path / 'rastreamento.jsonl'
+    _fechar_log()
+    monkeypatch.setattr(rastreamento, 'CAMINHO_LOG', str(caminho))
+    yield caminho
+    _fechar_log()
+
+
+@rastrear
+def _listar(quantidade):
+    return list(range(quantidade))
+
+
+def test_spans_aninhados_e_log(log_rastreamento):
+    execucao = iniciar_rastreamento('teste')
+    assert rastreamento_ativo()
+    with span('pagina', aba='resumo'):
+        _listar(3)
+        with span('grafico') as registro:
+            registro.contar([0] * 5)
+
+    spans = finalizar_rastreamento(execucao)
+
+    assert not rastreamento_ativo()
+    por_nome = {registro['nome']: registro for registro in spans}
+    assert set(por_nome) == {'pagina', 'test_rastreamento._listar', 'grafico'}
+    assert (por_nome['pagina']['nivel'], por_nome['pagina']['pai'], por_nome['pagina']['aba']) == (0, None, 'resumo')
+    assert (por_nome['test_rastreamento._listar']['pai'], por_nome['test_rastreamento._listar']['linhas']) == ('pagina', 3)
+    assert (por_nome['grafico']['nivel'], por_nome['grafico']['linhas']) == (1, 5)
+    assert all(registro['erro'] is None and registro['duracao_ms'] >= 0 for registro in spans)
+
+    linhas = [json.loads(linha) for linha in log_rastreamento.read_text(encoding='utf-8').splitlines()]
+    assert [linha['nome'] for linha in linhas] == [registro['nome'] for registro in spans]
+    assert {linha['execucao'] for linha in linhas} == {execucao.id}
+
+
+def test_span_com_excecao_registra_o_erro(log_rastreamento):
+    execucao = iniciar_rastreamento('teste')
+    with pytest.raises(ZeroDivisionError):
+        with span('conta'):
+            1 / 0
+
+    assert finalizar_rastreamento(execucao)[0]['erro'] == 'ZeroDivisionError'
+
+
+# Interrupção da execução fora das exceções comuns, como as de st.rerun() e st.stop()
+class _Interrupcao(BaseException):
+    pass
+
+
+@pytest.mark.parametrize('excecao', [RuntimeError, _Interrupcao])
+def test_execucao_interrompida_desliga_o_tracemalloc(log_rastreamento, excecao):
+    with pytest.raises(excecao):
+        with rastrear_execucao('teste') as execucao:
+            assert tracemalloc.is_tracing()
+            with span('pagina'):
+                raise excecao
+
+    assert not rastreamento_ativo()
+    assert rastreamento._execucoes_ativas == 0
+    assert not tracemalloc.is_tracing()
+    assert execucao.spans[0]['erro'] == excecao.__name__
+    assert json.loads(log_rastreamento.read_text(encoding='utf-8'))['nome'] == 'pagina'
+
+
+def test_sem_rastreamento_nada_e_medido(log_rastreamento):
+    with rastrear_execucao('teste', ativo=False) as execucao:
+        assert execucao is None
+        with span('pagina') as registro:
+            assert registro.contar([1, 2]) == [1, 2]
+        assert _listar(2) == [0, 1]
+        assert not tracemalloc.is_tracing()
+    assert not log_rastreamento.exists()
+
+
+@pytest.mark.parametrize('desempenho', [True, False])
+def test_painel_de_desempenho_no_app(banco_vazio, log_rastreamento, monkeypatch, desempenho):
+    app_test = pytest.importorskip('streamlit.testing.v1')
+    # Sem download da TACO completa em segundo plano
+    monkeypatch.setattr(catalogo, 'garantir_catalogo_completo', lambda *args, **kwargs: None)
+
+    at = app_test.AppTest.from_file(str(CAMINHO_APP), default_timeout=120)
+    if desempenho:
+        at.query_params['desempenho'] = '1'
+    at.run()
+
+    assert not at.exception
+    paineis = [expander for expander in at.expander if 'Desempenho desta execução' in expander.label]
+    if not desempenho:
+        assert not paineis
+        assert not log_rastreamento.exists()
+        return
+
+    assert len(paineis) == 1
+    assert paineis[0].caption[0].value.startswith('Execução ')
+    fases = paineis[0].dataframe[0].value['fase'].str.strip()
+    assert len(fases) > 0
+    linhas = [json.loads(linha) for linha in log_rastreamento.read_text(encoding='utf-8').splitlines()]
+    assert sorted(linha['nome'] for linha in linhas) == sorted(fases)
+
+
+def test_execucao_do_app_com_erro_finaliza_o_rastreamento(banco_vazio, log_rastreamento, monkeypatch):
+    app_test = pytest.importorskip('streamlit.testing.v1')
+    monkeypatch.setattr(catalogo, 'garantir_catalogo_completo', lambda *args, **kwargs: None)
+
+    def falhar(usuario_id):
+        raise RuntimeError('falha ao ler as metas')
+
+    monkeypatch.setattr(metas, 'obter_metas', falhar)
+
+    at = app_test.AppTest.from_file(str(CAMINHO_APP), default_timeout=120)
+    at.query_params['desempenho'] = '1'
+    at.run()
+
+    assert 'falha ao ler as metas' in at.exception[0].message
+    assert rastreamento._execucoes_ativas == 0
+    assert not tracemalloc.is_tracing()
+    linhas = [json.loads(linha) for linha in log_rastreamento.read_text(encoding='utf-8').splitlines()]
+    erros = {linha['nome']: linha['erro'] for linha in linhas}
+    assert erros['carregar_sessao'] == 'RuntimeError'
@@ -0,0 +1,41 @@
+from datetime import date
+
+import pytest
+
+from nutricao_app import repositorio
+from nutricao_app.datas import para_dia
+from nutricao_app.receitas import listar_receitas, salvar_receita
+from nutricao_app.registros import adicionar_medida
+from nutricao_app.usuarios import ID_USUARIO_PADRAO, obter_id_usuario
+
+HOJE = date(2024, 3, 15)
+
+
+def test_insercao_com_colunas_fora_da_ordem_dos_parametros_levanta_value_error():
+    # Coluna repetida: o INSERT compilado não tem um parâmetro por coluna
+    with pytest.raises(ValueError):
+        repositorio.sql_insercao('refeicoes', ['usuario_id', 'usuario_id'])
+
+
+def test_obter_id_usuario_cria_uma_vez(banco_vazio):
+    usuario_id = obter_id_usuario('ana')
+    assert usuario_id != ID_USUARIO_PADRAO
+    assert repositorio.obter_ou_criar_usuario('ana', '2024-01-01 00:00:00') == usuario_id
+    assert obter_id_usuario('  ') == ID_USUARIO_PADRAO
+
+
+def test_ler_medias_ignora_pesos_nao_positivos(banco_vazio):
+    adicionar_medida(ID_USUARIO_PADRAO, HOJE, 80.0, 175, 90, 100, 22)
+    adicionar_medida(ID_USUARIO_PADRAO, HOJE, 0, 175, 92, 100, 22)
+
+    assert repositorio.ler_medias('medidas', ['peso'], ID_USUARIO_PADRAO, positivas=['peso']) == [(para_dia(HOJE), 80.0)]
+    assert repositorio.ler_medias('medidas', ['cintura'], ID_USUARIO_PADRAO, contar=True) == [(para_dia(HOJE), 91.0, 2)]
+    assert repositorio.maior_id('medidas', ID_USUARIO_PADRAO) == 2
+    assert repositorio.primeiro_dia('medidas', ID_USUARIO_PADRAO) == para_dia(HOJE)
+
+
+def test_receita_com_ingrediente_ausente_nao_grava_nada(banco_vazio):
+    alimento_id = repositorio.ler_alimentos_taco(['id'])[0][0]
+    with pytest.raises(ValueError):
+        salvar_receita(ID_USUARIO_PADRAO, 'Prato', [(alimento_id, 100), (10 ** 9, 50)])
+    assert listar_receitas(ID_USUARIO_PADRAO) == []
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from nutricao_app.registros import adicionar_medida, adicionar_refeicao
+from nutricao_app.tendencias import TendenciasUsuario
+from nutricao_app.usuarios import ID_USUARIO_PADRAO
+
+HOJE = date.today()
+
+
+# Função para registrar uma refeição do usuário padrão em uma data
+def _refeicao(data, calorias):
+    return adicionar_refeicao(ID_USUARIO_PADRAO, data, 'Almoço', 'Arroz, tipo 1, cozido', 100, calorias, 2.5, 28.1, 0.2)
+
+
+# Função para comparar as séries atualizadas com as de uma carga completa
+def _comparar_com_carga(tendencias, hoje=HOJE):
+    recarregadas = TendenciasUsuario(ID_USUARIO_PADRAO, hoje)
+    assert (tendencias.dia_inicial, tendencias.dia_final) == (recarregadas.dia_inicial, recarregadas.dia_final)
+    np.testing.assert_allclose(tendencias.consumo, recarregadas.consumo)
+    np.testing.assert_allclose(tendencias.peso, recarregadas.peso)
+    np.testing.assert_allclose(tendencias.tendencia_peso, recarregadas.tendencia_peso)
+    np.testing.assert_allclose(tendencias.taxa_peso(), recarregadas.taxa_peso())
+
+
+def test_atualizar_com_refeicoes_depois_do_fim_das_series(banco_vazio):
+    _refeicao(HOJE - timedelta(days=3), 500)
+    tendencias = TendenciasUsuario(ID_USUARIO_PADRAO, HOJE)
+
+    # Mesma atualização: uma refeição de hoje e outra planejada para depois de amanhã
+    _refeicao(HOJE, 600)
+    _refeicao(HOJE + timedelta(days=2), 700)
+    assert tendencias.atualizar(HOJE) == 3
+
+    assert tendencias.consumo[-1, 0] == 700
+    assert tendencias.consumo[-3, 0] == 600
+    _comparar_com_carga(tendencias)
+
+
+def test_atualizar_igual_a_carga_completa(banco_vazio):
+    for dias in range(60, 0, -1):
+        _refeicao(HOJE - timedelta(days=dias), 1800 + 10 * dias)
+        if dias % 3 == 0:
+            adicionar_medida(ID_USUARIO_PADRAO, HOJE - timedelta(days=dias), 80 - dias / 30, 175, 90, 100, 22)
+    tendencias = TendenciasUsuario(ID_USUARIO_PADRAO, HOJE)
+
+    adicionar_medida(ID_USUARIO_PADRAO, HOJE - timedelta(days=10), 79.0, 175, 90, 100, 22)
+    _refeicao(HOJE - timedelta(days=5), 2500)
+    assert tendencias.atualizar(HOJE) == 11
+    _comparar_com_carga(tendencias)
+
+    # Dia novo sem registros: só acrescenta um elemento
+    assert tendencias.atualizar(HOJE + timedelta(days=1)) == 0
+    assert np.isnan(tendencias.consumo[-1, 0])
+    _comparar_com_carga(tendencias, HOJE + timedelta(days=1))
+
+
+def test_atualizar_com_registro_anterior_ao_inicio_recarrega(banco_vazio):
+    _refeicao(HOJE, 2000)
+    tendencias = TendenciasUsuario(ID_USUARIO_PADRAO, HOJE)
+    _refeicao(HOJE - timedelta(days=30), 1500)
+    assert tendencias.atualizar(HOJE) == 31
+    _comparar_com_carga(tendencias)
+
+
+def test_resumo_sem_registros(banco_vazio):
+    tendencias = TendenciasUsuario(ID_USUARIO_PADRAO, HOJE)
+    resumo = tendencias.resumo({'calorias_diarias': 2000, 'proteinas_diarias': 150, 'carboidratos_diarios': 225,
+                                'gorduras_diarias': 65})
+    assert np.isnan(resumo['media_7']['calorias'])
+    assert np.isnan(resumo['tendencia_peso'])
+    assert np.isnan(resumo['deficit_semanal'])
@@ -0,0 +1,91 @@
+import sqlite3
+from datetime import date
+
+from nutricao_app import metas, versoes
+from nutricao_app.datas import para_dia
+from nutricao_app.graficos import figuras_consumo_diario
+from nutricao_app.metas import obter_metas, salvar_metas
+from nutricao_app.models import METAS_PADRAO
+from nutricao_app.registros import adicionar_refeicao
+from nutricao_app.usuarios import ID_USUARIO_PADRAO, obter_id_usuario
+from nutricao_app.versoes import versao_dados
+
+HOJE = date(2024, 3, 15)
+
+
+# Função para executar um comando em uma conexão própria (como outro processo, fora do pool)
+def _gravar_em_outro_processo(banco_vazio, sql, parametros=()):
+    conn = sqlite3.connect(banco_vazio)
+    try:
+        conn.execute(sql, parametros)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_gravacoes_incrementam_a_versao(banco_vazio):
+    assert versao_dados(ID_USUARIO_PADRAO, 'refeicoes') == 0
+    adicionar_refeicao(ID_USUARIO_PADRAO, HOJE, 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2)
+    assert versao_dados(ID_USUARIO_PADRAO, 'refeicoes') == 1
+    assert versao_dados(ID_USUARIO_PADRAO, 'medidas') == 0
+
+    _gravar_em_outro_processo(banco_vazio, 'DELETE FROM refeicoes WHERE usuario_id = ?', (ID_USUARIO_PADRAO,))
+    assert versao_dados(ID_USUARIO_PADRAO, 'refeicoes') == 2
+
+
+def test_mudar_o_usuario_da_linha_altera_a_versao_dos_dois(banco_vazio):
+    outro = obter_id_usuario('ana')
+    adicionar_refeicao(ID_USUARIO_PADRAO, HOJE, 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2)
+
+    _gravar_em_outro_processo(banco_vazio, 'UPDATE refeicoes SET usuario_id = ?', (outro,))
+
+    assert versao_dados(ID_USUARIO_PADRAO, 'refeicoes') == 2
+    assert versao_dados(outro, 'refeicoes') == 1
+
+
+def test_metas_gravadas_por_outro_processo_invalidam_o_cache(banco_vazio):
+    salvar_metas(ID_USUARIO_PADRAO, METAS_PADRAO)
+    assert obter_metas(ID_USUARIO_PADRAO)['calorias_diarias'] == METAS_PADRAO['calorias_diarias']
+
+    _gravar_em_outro_processo(banco_vazio, 'UPDATE metas SET calorias_diarias = 1800 WHERE usuario_id = ?',
+                              (ID_USUARIO_PADRAO,))
+
+    assert obter_metas(ID_USUARIO_PADRAO)['calorias_diarias'] == 1800
+
+
+def test_metas_em_cache_sao_lidas_sem_consultar_as_tabelas(banco_vazio, monkeypatch):
+    salvar_metas(ID_USUARIO_PADRAO, METAS_PADRAO)
+    obter_metas(ID_USUARIO_PADRAO)
+    consultas = []
+    ler_versao_dados, ler_metas = versoes.ler_versao_dados, metas.repositorio.obter_metas
+    monkeypatch.setattr(versoes, 'ler_versao_dados',
+                        lambda *argumentos: consultas.append('versoes_dados') or ler_versao_dados(*argumentos))
+    monkeypatch.setattr(metas.repositorio, 'obter_metas',
+                        lambda *argumentos: consultas.append('metas') or ler_metas(*argumentos))
+
+    for _ in range(3):
+        assert obter_metas(ID_USUARIO_PADRAO) == METAS_PADRAO
+    assert consultas == []
+
+    _gravar_em_outro_processo(banco_vazio, 'UPDATE metas SET calorias_diarias = 1800 WHERE usuario_id = ?',
+                              (ID_USUARIO_PADRAO,))
+    assert obter_metas(ID_USUARIO_PADRAO)['calorias_diarias'] == 1800
+    assert consultas == ['versoes_dados', 'metas']
+
+
+def test_salvar_metas_retorna_a_versao_gravada(banco_vazio):
+    versao = salvar_metas(ID_USUARIO_PADRAO, METAS_PADRAO)
+    assert versao == versao_dados(ID_USUARIO_PADRAO, 'metas') == 1
+    assert salvar_metas(ID_USUARIO_PADRAO, {**METAS_PADRAO, 'peso_meta': 68}) == 2
+
+
+def test_figuras_refletem_refeicoes_gravadas_por_outro_processo(banco_vazio):
+    hoje = date.today()
+    assert figuras_consumo_diario(ID_USUARIO_PADRAO, hoje) == ()
+
+    _gravar_em_outro_processo(
+        banco_vazio, 'INSERT INTO refeicoes (usuario_id, data, refeicao, alimento, quantidade, calorias, proteinas, '
+        'carboidratos, gorduras) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (ID_USUARIO_PADRAO, para_dia(hoje), 'Almoço', 'Arroz, tipo 1, cozido', 100, 128, 2.5, 28.1, 0.2))
+
+    assert figuras_consumo_diario(ID_USUARIO_PADRAO, hoje) != ()
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from nutricao_app import banco
+from nutricao_app.busca import LIMITE_SUGESTOES
+from tools.dados_sinteticos import CARDAPIO
+
+# Gerador de carga para a API (nutricao_app.api): conexões HTTP/1.1 persistentes, cada
+# uma enviando uma requisição por vez, sorteada de uma mistura parecida com o uso do
+# aplicativo móvel; mede requisições por segundo e latências
+
+# Termos buscados na tabela TACO
+TERMOS_BUSCA = ['arroz', 'feijao', 'frango grel', 'banana', 'leite', 'pao frances', 'ovo', 'queijo']
+
+# Pesos de cada tipo de requisição na mistura de leitura
+PESOS_LEITURA = {
+    'refeicoes_do_dia': 30,
+    'refeicoes_30_dias': 10,
+    'resumo_30_dias': 20,
+    'medidas': 10,
+    'metas': 15,
+    'alimentos': 15,
+}
+
+TEMPO_MAXIMO_INICIO_SERVIDOR = 30
+
+
+# Função para sortear uma requisição da mistura: retorna (tipo, método, caminho, corpo JSON)
+# (uma fração 'escritas' das requisições grava uma refeição do cardápio sintético)
+def sortear_requisicao(rng, usuarios, hoje, escritas=0.0):
+    usuario_id = rng.choice(usuarios)
+    base = f'/usuarios/{usuario_id}'
+    if rng.random() < escritas:
+        refeicao = rng.choice(list(CARDAPIO))
+        alimento, porcao = rng.choice(CARDAPIO[refeicao])
+        corpo = json.dumps({'data': hoje.isoformat(), 'refeicao': refeicao, 'alimento': alimento,
+                            'quantidade': round(porcao * rng.uniform(0.5, 1.5))}).encode()
+        return 'gravar_refeicao', 'POST', f'{base}/refeicoes', corpo
+
+    tipo = rng.choices(list(PESOS_LEITURA), weights=list(PESOS_LEITURA.values()))[0]
+    dia = hoje - timedelta(days=rng.randint(0, 29))
+    if tipo == 'refeicoes_do_dia':
+        caminho = f'{base}/refeicoes?' + urlencode({'inicio': dia.isoformat(), 'fim': dia.isoformat()})
+    elif tipo == 'refeicoes_30_dias':
+        caminho = f'{base}/refeicoes?' + urlencode({'inicio': (hoje - timedelta(days=30)).isoformat()})
+    elif tipo == 'resumo_30_dias':
+        caminho = f'{base}/resumo?' + urlencode({'inicio': (hoje - timedelta(days=30)).isoformat()})
+    elif tipo == 'medidas':
+        caminho = f'{base}/medidas?' + urlencode({'inicio': (hoje - timedelta(days=365)).isoformat()})
+    elif tipo == 'metas':
+        caminho = f'{base}/metas'
+    else:
+        caminho = '/alimentos?' + urlencode({'busca': rng.choice(TERMOS_BUSCA), 'limite': LIMITE_SUGESTOES})
+    return tipo, 'GET', caminho, None
+
+
+# Função para enviar uma requisição em uma conexão aberta e ler a resposta inteira
+# Retorna o status HTTP
+async def _enviar(leitor, escritor, host, metodo, caminho, corpo, gzip):
+    cabecalhos = [f'{metodo} {caminho} HTTP/1.1', f'Host: {host}', 'Connection: keep-alive']
+    if gzip:
+        cabecalhos.append('Accept-Encoding: gzip')
+    if corpo is not None:
+        cabecalhos += ['Content-Type: application/json', f'Content-Length: {len(corpo)}']
+    escritor.write(('\r\n'.join(cabecalhos) + '\r\n\r\n').encode() + (corpo or b''))
+    await escritor.drain()
+
+    resposta = await leitor.readuntil(b'\r\n\r\n')
+    linhas = resposta.decode('latin-1').split('\r\n')
+    status = int(linhas[0].split(' ', 2)[1])
+    tamanho = 0
+    for linha in linhas[1:]:
+        nome, _, valor = linha.partition(':')
+        if nome.lower() == 'content-length':
+            tamanho = int(valor)
+    if tamanho:
+        await leitor.readexactly(tamanho)
+    return status
+
+
+# Cliente de uma conexão: envia requisições em sequência até o fim do tempo
+async def _cliente(host, porta, usuarios, hoje, escritas, gzip, semente, fim, latencias, contagens):
+    rng = random.Random(semente)
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        while time.perf_counter() < fim:
+            tipo, metodo, caminho, corpo = sortear_requisicao(rng, usuarios, hoje, escritas)
+            inicio = time.perf_counter()
+            status = await _enviar(leitor, escritor, host, metodo, caminho, corpo, gzip)
+            latencias.append(time.perf_counter() - inicio)
+            contagens[(tipo, status)] += 1
+    finally:
+        escritor.close()
+
+
+# Função para executar a carga: 'conexoes' clientes simultâneos durante 'segundos'
+# Retorna um dicionário com requisições, requisições por segundo, latências (ms) e
+# contagem por (tipo, status)
+async def executar_carga(url, usuarios, conexoes=16, segundos=10, escritas=0.0, gzip=True, semente=0, hoje=None):
+    partes = urlsplit(url)
+    hoje = hoje or date.today()
+    latencias = []
+    contagens = Counter()
+
+    inicio = time.perf_counter()
+    fim = inicio + segundos
+    await asyncio.gather(*[
+        _cliente(partes.hostname, partes.port or 80, usuarios, hoje, escritas, gzip, semente + i, fim,
+                 latencias, contagens)
+        for i in range(conexoes)
+    ])
+    duracao = time.perf_counter() - inicio
+
+    ms = np.array(latencias) * 1000
+    return {
+        'requisicoes': len(latencias),
+        'requisicoes_por_segundo': len(latencias) / duracao,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'erros': sum(quantidade for (_, status), quantidade in contagens.items() if status >= 400),
+        'contagens': dict(contagens),
+    }
+
+
+# Função para obter os ids dos usuários do banco (alvos das requisições)
+def obter_usuarios():
+    conn = banco.conectar_bd()
+    usuarios = [linha[0] for linha in conn.execute('SELECT id FROM usuarios ORDER BY id')]
+    conn.close()
+    return usuarios
+
+
+# Função para iniciar a API em um subprocesso e esperar que responda
+def iniciar_servidor(caminho_bd, porta):
+    processo = subprocess.Popen([sys.executable, '-m', 'nutricao_app.api', '--banco', caminho_bd,
+                                 '--porta', str(porta)], env=os.environ.copy())
+    limite = time.monotonic() + TEMPO_MAXIMO_INICIO_SERVIDOR
+    while time.monotonic() < limite:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{porta}/saude', timeout=1).read()
+            return processo
+        except OSError:
+            if processo.poll() is not None:
+                raise RuntimeError('A API terminou durante a inicialização')
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError('A API não respondeu a tempo')
+
+
+# Carga: python -m tools.carga_api banco.db [--conexoes 16] [--segundos 10] [--escritas 0.05]
+# (inicia a API no banco informado; com --url, usa uma API já em execução)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede a vazão e a latência da API JSON')
+    parser.add_argument('banco', help='arquivo do banco (ex.: gerado por tools.dados_sinteticos)')
+    parser.add_argument('--url', help='API já em execução (padrão: inicia uma em --porta)')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--conexoes', type=int, default=16)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--escritas', type=float, default=0.0, help='fração de requisições que gravam refeições')
+    parser.add_argument('--sem-gzip', action='store_true')
+    argumentos = parser.parse_args()
+
+    banco.definir_caminho_bd(argumentos.banco)
+    usuarios = obter_usuarios()
+    servidor = None if argumentos.url else iniciar_servidor(argumentos.banco, argumentos.porta)
+    url = argumentos.url or f'http://127.0.0.1:{argumentos.porta}'
+    try:
+        resultado = asyncio.run(executar_carga(url, usuarios, argumentos.conexoes, argumentos.segundos,
+                                               argumentos.escritas, not argumentos.sem_gzip))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    print(f"{resultado['requisicoes']:,} requisições em {argumentos.segundos:g} s com {argumentos.conexoes} conexões: "
+          f"{resultado['requisicoes_por_segundo']:,.0f} req/s, p50 {resultado['p50_ms']:.1f} ms, "
+          f"p95 {resultado['p95_ms']:.1f} ms, p99 {resultado['p99_ms']:.1f} ms, {resultado['erros']} erros")
+    for (tipo, status), quantidade in sorted(resultado['contagens'].items()):
+        print(f'  {tipo:<20} {status}  {quantidade:>8,}')
@@ -0,0 +1,235 @@
+import argparse
+import itertools
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app import banco
+from nutricao_app.datas import para_dia
+from nutricao_app.migracoes import aplicar_migracoes
+from nutricao_app.models import METAS_PADRAO, inicializar_bd
+from nutricao_app.nutrientes import COLUNAS_NUTRIENTES, COLUNAS_REFEICAO
+from nutricao_app.registros import (COLUNAS_INSERCAO_MEDIDAS, COLUNAS_INSERCAO_REFEICOES, COLUNAS_MEDIDAS,
+                                    COLUNAS_REFEICOES, chaves_refeicoes)
+from nutricao_app.repositorio import inserir_em_massa
+from nutricao_app.resumo import carga_em_massa_resumo, criar_resumo_diario
+from nutricao_app.snapshot import CAMINHO_SNAPSHOT, SnapshotTaco, materializar_snapshot_taco
+from nutricao_app.taco import gravar_lotes_taco
+
+SEMENTE_PADRAO = 42
+
+# Cardápio de cada refeição: alimentos da tabela TACO (snapshot do pacote) e porção típica em gramas
+CARDAPIO = {
+    'Café da Manhã': [('Pão, francês', 50), ('Leite, integral', 200), ('Ovo, galinha, inteiro, cozido', 50),
+                      ('Manteiga, com sal', 10), ('Banana prata', 80), ('Aveia, flocos', 30)],
+    'Lanche da Manhã': [('Maçã, com casca', 130), ('Banana prata', 80), ('Aveia, flocos', 20)],
+    'Almoço': [('Arroz, tipo 1, cozido', 150), ('Feijão, carioca, cozido', 140),
+               ('Frango, peito, sem pele, cozido', 120), ('Carne, bovina, patinho, sem gordura, cozido', 110),
+               ('Batata, inglesa, cozida', 130), ('Alface, lisa, crua', 30), ('Cenoura, crua', 40),
+               ('Azeite, de oliva', 8)],
+    'Lanche da Tarde': [('Pão, francês', 50), ('Maçã, com casca', 130), ('Leite, integral', 200),
+                        ('Banana prata', 80)],
+    'Jantar': [('Arroz, tipo 1, cozido', 120), ('Feijão, carioca, cozido', 100),
+               ('Frango, peito, sem pele, cozido', 110), ('Ovo, galinha, inteiro, cozido', 100),
+               ('Batata, inglesa, cozida', 120), ('Alface, lisa, crua', 30), ('Azeite, de oliva', 8)],
+    'Ceia': [('Leite, integral', 200), ('Maçã, com casca', 130), ('Aveia, flocos', 20)],
+}
+# Chance de cada refeição ser registrada em um dia e quantidade de itens (mínimo, máximo)
+FREQUENCIA_REFEICOES = {
+    'Café da Manhã': (0.9, 2, 4),
+    'Lanche da Manhã': (0.3, 1, 2),
+    'Almoço': (0.95, 3, 6),
+    'Lanche da Tarde': (0.5, 1, 2),
+    'Jantar': (0.8, 2, 5),
+    'Ceia': (0.15, 1, 1),
+}
+# Chance de uma pesagem em um dia e intervalo (dias) entre as medidas de cintura e quadril
+CHANCE_PESAGEM = 2 / 7
+INTERVALO_CIRCUNFERENCIAS = 28
+
+# Partes dos nomes dos alimentos sintéticos gravados em alimentos_taco (busca em tabelas grandes)
+NOMES_ALIMENTOS = ['Arroz', 'Feijão', 'Frango', 'Carne', 'Peixe', 'Batata', 'Milho', 'Queijo', 'Iogurte',
+                   'Biscoito', 'Bolo', 'Farinha', 'Suco', 'Doce', 'Pão', 'Macarrão', 'Abóbora', 'Couve']
+VARIEDADES_ALIMENTOS = ['integral', 'branco', 'preto', 'carioca', 'bovina', 'suína', 'de milho', 'de trigo',
+                        'light', 'tipo 1', 'tipo 2', 'caseiro', 'industrializado', 'orgânico']
+PREPAROS_ALIMENTOS = ['cru', 'cozido', 'assado', 'frito', 'grelhado', 'refogado', 'desidratado', 'em conserva']
+
+
+
+# Função para criar um banco vazio com o esquema atual e a tabela TACO do snapshot
+def preparar_banco(caminho_bd):
+    banco.definir_caminho_bd(caminho_bd)
+    inicializar_bd()
+    conn = banco.conectar_bd()
+    try:
+        criar_resumo_diario(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    aplicar_migracoes()
+    materializar_snapshot_taco()
+
+
+# Função para obter os nutrientes por 100 g dos alimentos do cardápio (do snapshot TACO)
+# Retorna um DataFrame indexado pelo nome com as colunas de refeicoes (calorias, proteinas...)
+def nutrientes_cardapio(caminho_snapshot=CAMINHO_SNAPSHOT):
+    with SnapshotTaco(caminho_snapshot) as snapshot:
+        df = snapshot.como_dataframe()
+    return df.set_index('nome')[list(COLUNAS_REFEICAO)].rename(columns=COLUNAS_REFEICAO)
+
+
+# Função para gerar as refeições de um usuário entre data_inicio e data_fim (inclusive)
+# O apetite do usuário escala todas as porções; as quantidades variam em torno da porção típica
+# Retorna um DataFrame com as colunas de refeicoes (data como número do dia)
+def gerar_refeicoes(rng, data_inicio, data_fim, nutrientes, apetite=1.0):
+    dias = np.arange(para_dia(data_inicio), para_dia(data_fim) + 1)
+    partes = []
+    for refeicao, (chance, minimo, maximo) in FREQUENCIA_REFEICOES.items():
+        dias_refeicao = dias[rng.random(len(dias)) < chance]
+        itens = rng.integers(minimo, maximo + 1, len(dias_refeicao))
+        alimentos, porcoes = zip(*CARDAPIO[refeicao])
+        escolhas = rng.integers(0, len(alimentos), int(itens.sum()))
+        quantidades = np.asarray(porcoes, dtype=np.float64)[escolhas] * apetite * rng.lognormal(0, 0.25, len(escolhas))
+        partes.append(pd.DataFrame({
+            'data': np.repeat(dias_refeicao, itens),
+            'refeicao': refeicao,
+            'alimento': np.asarray(alimentos, dtype=object)[escolhas],
+            'quantidade': np.maximum(np.round(quantidades / 5) * 5, 5.0),
+        }))
+
+    df = pd.concat(partes, ignore_index=True).sort_values('data', kind='stable', ignore_index=True)
+    por_100g = nutrientes.reindex(df['alimento']).to_numpy()
+    for posicao, coluna in enumerate(COLUNAS_REFEICAO.values()):
+        df[coluna] = np.round(por_100g[:, posicao] * df['quantidade'].to_numpy() / 100, 1)
+    return df
+
+
+# Função para gerar as medidas de um usuário: pesagens em parte dos dias (passeio aleatório
+# com tendência), gordura corporal acompanhando o IMC e cintura/quadril a cada quatro semanas
+# Retorna (DataFrame com as colunas de medidas, altura em metros, peso inicial)
+def gerar_medidas(rng, data_inicio, data_fim):
+    dias = np.arange(para_dia(data_inicio), para_dia(data_fim) + 1)
+    altura = float(np.clip(rng.normal(1.70, 0.09), 1.45, 2.0))
+    peso_inicial = float(np.clip(rng.normal(24.5, 3.5), 18, 38) * altura ** 2)
+    tendencia = rng.normal(-0.004, 0.006)
+
+    variacao = np.cumsum(rng.normal(tendencia, 0.05, len(dias)))
+    peso = peso_inicial + variacao + rng.normal(0, 0.4, len(dias))
+    pesagens = rng.random(len(dias)) < CHANCE_PESAGEM
+    circunferencias = (dias - dias[0]) % INTERVALO_CIRCUNFERENCIAS == 0
+    registrados = pesagens | circunferencias
+
+    imc = peso / altura ** 2
+    cintura = np.where(circunferencias, imc * 3.4 + rng.normal(0, 1.0, len(dias)), np.nan)
+    quadril = np.where(circunferencias, imc * 3.6 + 12 + rng.normal(0, 1.0, len(dias)), np.nan)
+    df = pd.DataFrame({
+        'data': dias,
+        'peso': np.round(peso, 1),
+        'imc': np.round(imc, 1),
+        'cintura': np.round(cintura, 1),
+        'quadril': np.round(quadril, 1),
+        'gordura_corporal': np.round(np.clip(15 + (imc - 22) * 1.2 + rng.normal(0, 1.0, len(dias)), 4, 50), 1),
+    })[registrados].reset_index(drop=True)
+    return df, altura, peso_inicial
+
+
+# Função para gravar as linhas de um DataFrame (valores ausentes como NULL)
+def _linhas(usuario_id, df, colunas):
+    valores = df[colunas].astype(object).where(df[colunas].notna(), None)
+    return zip(itertools.repeat(usuario_id), *(valores[coluna].tolist() for coluna in colunas))
+
+
+# Função para gerar usuários sintéticos com 'anos' de refeições, medidas e metas até data_fim
+# Cada usuário tem sua própria semente (semente, índice): o mesmo usuário sai igual qualquer
+# que seja a quantidade gerada. Deve ser chamada uma vez por banco (os nomes são fixos)
+# Retorna estatísticas da geração (ids dos usuários, refeições, medidas e segundos)
+def gerar_dados(usuarios=1, anos=1, semente=SEMENTE_PADRAO, data_fim=None):
+    inicio = time.perf_counter()
+    data_fim = data_fim or date.today()
+    data_inicio = date.fromordinal(data_fim.toordinal() - int(round(anos * 365.25)) + 1)
+    nutrientes = nutrientes_cardapio()
+    estatisticas = {'usuarios': [], 'refeicoes': 0, 'medidas': 0}
+
+    conn = banco.conectar_bd()
+    try:
+        for indice in range(usuarios):
+            rng = np.random.default_rng([semente, indice])
+            df_medidas, altura, peso_inicial = gerar_medidas(rng, data_inicio, data_fim)
+            df_refeicoes = gerar_refeicoes(rng, data_inicio, data_fim, nutrientes, rng.uniform(1.2, 1.8))
+            chaves = chaves_refeicoes(df_refeicoes['data'], df_refeicoes['refeicao'], df_refeicoes['alimento'],
+                                      df_refeicoes['quantidade'])
+            # Chave única por usuário (como na migração 11): as refeições repetidas ficam sem chave
+            chaves = pd.Series(chaves, dtype=object).mask(pd.Series(chaves).duplicated(), None)
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                usuario_id = conn.execute(
+                    'INSERT INTO usuarios (nome, criado_em) VALUES (?, ?)',
+                    (f'sintetico{semente}_{indice}', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                ).lastrowid
+                with carga_em_massa_resumo(conn):
+                    inserir_em_massa(conn, 'refeicoes', COLUNAS_INSERCAO_REFEICOES, (
+                        linha + (chave,) for linha, chave in zip(
+                            _linhas(usuario_id, df_refeicoes, COLUNAS_REFEICOES), chaves.tolist())
+                    ))
+                inserir_em_massa(conn, 'medidas', COLUNAS_INSERCAO_MEDIDAS,
+                                 _linhas(usuario_id, df_medidas, COLUNAS_MEDIDAS))
+                peso_meta = round(min(peso_inicial, 23 * altura ** 2), 1)
+                calorias = round(22 * peso_meta * 1.5 / 50) * 50
+                inserir_em_massa(conn, 'metas', ['usuario_id', *METAS_PADRAO], [
+                    (usuario_id, calorias, round(peso_meta * 1.8), round(calorias * 0.5 / 4),
+                     round(calorias * 0.28 / 9), peso_meta, 18.0)
+                ], conflito=['usuario_id'])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            estatisticas['usuarios'].append(usuario_id)
+            estatisticas['refeicoes'] += len(df_refeicoes)
+            estatisticas['medidas'] += len(df_medidas)
+    finally:
+        conn.close()
+
+    estatisticas['segundos'] = time.perf_counter() - inicio
+    return estatisticas
+
+
+# Função para gravar alimentos sintéticos em alimentos_taco (nomes no padrão da TACO,
+# nutrientes sorteados), para medir a busca com tabelas maiores que o snapshot
+# Retorna as estatísticas da gravação
+def gerar_alimentos_taco(quantidade, semente=SEMENTE_PADRAO):
+    rng = np.random.default_rng([semente, quantidade])
+    combinacoes = np.array([f'{nome}, {variedade}, {preparo}' for nome in NOMES_ALIMENTOS
+                            for variedade in VARIEDADES_ALIMENTOS for preparo in PREPAROS_ALIMENTOS], dtype=object)
+    nomes = combinacoes[rng.permutation(len(combinacoes))[:quantidade]]
+    if quantidade > len(nomes):
+        extras = np.arange(quantidade - len(nomes)) % len(combinacoes)
+        nomes = np.concatenate([nomes, [f'{nome} ({numero})' for numero, nome in
+                                        enumerate(combinacoes[extras], start=2)]])
+
+    df = pd.DataFrame({'nome': nomes})
+    for coluna, maximo in zip(COLUNAS_NUTRIENTES, [600, 40, 60, 90, 20, 400, 10]):
+        df[coluna] = np.round(rng.uniform(0, maximo, quantidade), 1)
+    return gravar_lotes_taco([df])
+
+
+# Geração manual: python -m tools.dados_sinteticos banco.db [--usuarios 10] [--anos 3]
+#                 [--semente 42] [--alimentos 0]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera um banco com usuários, refeições e medidas sintéticos')
+    parser.add_argument('banco', help='arquivo do banco (criado se não existir)')
+    parser.add_argument('--usuarios', type=int, default=1)
+    parser.add_argument('--anos', type=float, default=1)
+    parser.add_argument('--semente', type=int, default=SEMENTE_PADRAO)
+    parser.add_argument('--alimentos', type=int, default=0, help='alimentos sintéticos acrescentados à tabela TACO')
+    argumentos = parser.parse_args()
+
+    preparar_banco(argumentos.banco)
+    if argumentos.alimentos:
+        gerar_alimentos_taco(argumentos.alimentos, argumentos.semente)
+    estatisticas = gerar_dados(argumentos.usuarios, argumentos.anos, argumentos.semente)
+    print(f"{len(estatisticas['usuarios'])} usuários, {estatisticas['refeicoes']:,} refeições e "
+          f"{estatisticas['medidas']:,} medidas gerados em {estatisticas['segundos']:.1f} s")
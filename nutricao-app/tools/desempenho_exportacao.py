@@ -0,0 +1,98 @@
+import argparse
+import os
+import resource
+import tempfile
+import time
+from datetime import date
+
+from nutricao_app import banco
+from nutricao_app.datas import para_dia
+from nutricao_app.exportacao import FORMATOS_EXPORTACAO, exportar_dados, formatos_disponiveis
+from nutricao_app.models import inicializar_bd
+from nutricao_app.registros import obter_refeicoes_por_periodo
+
+LINHAS_PADRAO = 10_000_000
+REFEICOES_POR_DIA = 6
+DIAS_HISTORICO = 3650
+
+
+# Função para gravar N refeições sintéticas do usuário 1 (geradas no próprio SQLite,
+# distribuídas em DIAS_HISTORICO dias até hoje)
+def _popular_refeicoes(linhas):
+    hoje = para_dia(date.today())
+    conn = banco.conectar_bd()
+    try:
+        conn.execute("INSERT OR IGNORE INTO usuarios (id, nome) VALUES (1, 'padrao')")
+        conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ? - 1)
+        INSERT INTO refeicoes (usuario_id, data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras)
+        SELECT 1, ? - (i / ?) % ?,
+               CASE i % 3 WHEN 0 THEN 'Café da Manhã' WHEN 1 THEN 'Almoço' ELSE 'Jantar' END,
+               'Alimento ' || (i % 997), 100.0 + i % 50, 150.0 + i % 400, 8.5, 20.25, 5.5
+        FROM n
+        ''', (linhas, hoje, REFEICOES_POR_DIA, DIAS_HISTORICO))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# Função para obter o pico de memória residente do processo (MiB)
+def _pico_memoria_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Função para executar o benchmark de exportação das refeições em cada formato
+# Retorna uma lista de {formato, segundos, bytes, linhas_por_segundo, pico_mib}
+def executar_benchmark(caminho_bd, linhas=LINHAS_PADRAO, pasta=None, comparar=False):
+    banco.definir_caminho_bd(caminho_bd)
+    inicializar_bd()
+    _popular_refeicoes(linhas)
+
+    resultados = []
+    for formato in formatos_disponiveis():
+        destino = os.path.join(pasta, f'refeicoes{FORMATOS_EXPORTACAO[formato][0]}')
+        inicio = time.perf_counter()
+        exportadas = exportar_dados(destino, 1, 'refeicoes', formato)
+        segundos = time.perf_counter() - inicio
+        resultados.append({
+            'formato': formato,
+            'segundos': segundos,
+            'bytes': os.path.getsize(destino),
+            'linhas_por_segundo': exportadas / segundos,
+            'pico_mib': _pico_memoria_mib(),
+        })
+
+    if comparar:
+        # Exportação anterior: histórico inteiro em um DataFrame e o CSV inteiro em uma string
+        inicio = time.perf_counter()
+        texto = obter_refeicoes_por_periodo(1, date.min).to_csv(index=False)
+        segundos = time.perf_counter() - inicio
+        resultados.append({
+            'formato': 'csv (to_csv)',
+            'segundos': segundos,
+            'bytes': len(texto.encode('utf-8')),
+            'linhas_por_segundo': linhas / segundos,
+            'pico_mib': _pico_memoria_mib(),
+        })
+
+    return resultados
+
+
+# Benchmark: python -m tools.desempenho_exportacao [--linhas 10000000] [--banco caminho] [--comparar]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark da exportação de refeições em lotes')
+    parser.add_argument('--linhas', type=int, default=LINHAS_PADRAO)
+    parser.add_argument('--banco', help='arquivo do banco gerado (padrão: arquivo temporário)')
+    parser.add_argument('--comparar', action='store_true',
+                        help='mede também a exportação anterior, em memória (executada por último)')
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_bd = argumentos.banco or os.path.join(pasta, 'exportacao.db')
+        print(f'Gerando {argumentos.linhas:,} refeições em {caminho_bd}')
+        resultados = executar_benchmark(caminho_bd, argumentos.linhas, pasta, argumentos.comparar)
+
+    print(f"{'formato':<14} {'segundos':>9} {'MiB':>9} {'linhas/s':>12} {'pico RSS (MiB)':>15}")
+    for resultado in resultados:
+        print(f"{resultado['formato']:<14} {resultado['segundos']:>9.1f} {resultado['bytes'] / 2**20:>9.1f} "
+              f"{resultado['linhas_por_segundo']:>12,.0f} {resultado['pico_mib']:>15,.0f}")
@@ -0,0 +1,166 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from nutricao_app import banco, repositorio
+from nutricao_app.datas import para_dia
+from nutricao_app.models import METAS_PADRAO, Metas, Refeicoes
+from nutricao_app.registros import (COLUNAS_INSERCAO_REFEICOES, ESQUEMA_REFEICOES, montar_df,
+                                    obter_refeicoes_por_periodo)
+from tools.dados_sinteticos import gerar_dados, preparar_banco
+
+# Benchmark do repositório (nutricao_app.repositorio) contra as implementações anteriores:
+# INSERT escrito à mão com executemany, objetos do ORM (Session.add_all) e consultas pela
+# sessão do ORM. As gravações são desfeitas ao fim de cada medição (mesmo banco para todas)
+LINHAS_PADRAO = 100_000
+REPETICOES = 200
+
+SQL_INSERIR_REFEICOES = '''
+INSERT INTO refeicoes (usuario_id, data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras,
+                       chave_registro)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+TIPOS_REFEICAO = ['Café da Manhã', 'Almoço', 'Lanche da Tarde', 'Jantar']
+
+
+# Função para gerar linhas de refeições sintéticas do usuário (na ordem de COLUNAS_INSERCAO_REFEICOES)
+def linhas_refeicoes(usuario_id, quantidade, semente=0):
+    rng = np.random.default_rng(semente)
+    hoje = para_dia(date.today())
+    return [
+        (usuario_id, hoje - i // 6, TIPOS_REFEICAO[i % len(TIPOS_REFEICAO)], f'Alimento {i % 997}', float(quantidade_g),
+         float(quantidade_g) * 1.5, 8.5, 20.25, 5.5, int(chave))
+        for i, (quantidade_g, chave) in enumerate(zip(rng.integers(50, 300, quantidade),
+                                                      rng.integers(-2**63, 2**63 - 1, quantidade, dtype=np.int64)))
+    ]
+
+
+# Função para gravar refeições com o INSERT escrito à mão e executemany (implementação anterior)
+def inserir_refeicoes_executemany(conn, linhas):
+    conn.executemany(SQL_INSERIR_REFEICOES, linhas)
+
+
+# Função para gravar refeições como objetos do ORM (Session.add_all), sem commit
+def inserir_refeicoes_orm(sessao, linhas):
+    sessao.add_all([Refeicoes(**dict(zip(COLUNAS_INSERCAO_REFEICOES, linha))) for linha in linhas])
+    sessao.flush()
+
+
+# Função para obter as metas pela sessão do ORM (implementação anterior de obter_metas)
+def obter_metas_orm(usuario_id):
+    with Session(bind=banco.obter_engine()) as sessao:
+        resultado = sessao.query(Metas).filter(Metas.usuario_id == usuario_id).first()
+    if resultado is None:
+        return dict(METAS_PADRAO)
+    return {campo: getattr(resultado, campo) for campo in METAS_PADRAO}
+
+
+# Função para obter as refeições de um período com o SELECT escrito à mão (implementação anterior)
+def obter_refeicoes_por_periodo_sql(usuario_id, data_inicio):
+    conn = banco.conectar_bd()
+    try:
+        cursor = conn.execute('''
+        SELECT data, refeicao, alimento, quantidade, calorias, proteinas, carboidratos, gorduras
+        FROM refeicoes
+        WHERE usuario_id = ? AND data >= ?
+        ORDER BY data
+        ''', (usuario_id, para_dia(data_inicio)))
+        return montar_df(cursor, ESQUEMA_REFEICOES)
+    finally:
+        conn.close()
+
+
+# Função para medir uma gravação em massa: executa gravar(conn, linhas) em uma transação
+# desfeita no fim. Retorna os segundos
+def _medir_gravacao(gravar, linhas):
+    conn = banco.conectar_bd()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        inicio = time.perf_counter()
+        gravar(conn, linhas)
+        segundos = time.perf_counter() - inicio
+        conn.rollback()
+    finally:
+        conn.close()
+    return segundos
+
+
+# Função para medir a gravação pelo ORM (transação da sessão desfeita no fim). Retorna os segundos
+def _medir_gravacao_orm(linhas):
+    with Session(bind=banco.obter_engine()) as sessao:
+        inicio = time.perf_counter()
+        inserir_refeicoes_orm(sessao, linhas)
+        segundos = time.perf_counter() - inicio
+        sessao.rollback()
+    return segundos
+
+
+# Função para medir a mediana (ms) de uma leitura
+def _medir_leitura(funcao, *args, repeticoes=REPETICOES):
+    funcao(*args)  # aquece o pool e o cache de páginas
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+# Função para executar o benchmark em um banco sintético (1 usuário, 1 ano de histórico)
+# Retorna (gravações, leituras): [{implementacao, segundos, linhas_por_segundo}] e
+# [{consulta, implementacao, mediana_ms}]
+def executar_benchmark(caminho_bd, linhas=LINHAS_PADRAO, repeticoes=REPETICOES):
+    preparar_banco(caminho_bd)
+    usuario_id = gerar_dados(1, 1)['usuarios'][0]
+    refeicoes = linhas_refeicoes(usuario_id, linhas)
+
+    gravacoes = []
+    for implementacao, medir in [
+        ('executemany (SQL à mão)', lambda: _medir_gravacao(inserir_refeicoes_executemany, refeicoes)),
+        ('ORM (Session.add_all)', lambda: _medir_gravacao_orm(refeicoes)),
+        ('repositorio.inserir_em_massa', lambda: _medir_gravacao(
+            lambda conn, linhas: repositorio.inserir_em_massa(conn, 'refeicoes', COLUNAS_INSERCAO_REFEICOES, linhas),
+            refeicoes)),
+    ]:
+        segundos = medir()
+        gravacoes.append({'implementacao': implementacao, 'segundos': segundos, 'linhas_por_segundo': linhas / segundos})
+
+    data_inicio = date.today() - timedelta(days=30)
+    leituras = []
+    for consulta, implementacao, funcao, args in [
+        ('obter_metas', 'ORM (Session.query)', obter_metas_orm, (usuario_id,)),
+        ('obter_metas', 'repositorio', repositorio.obter_metas, (usuario_id,)),
+        ('refeicoes_30_dias', 'SQL à mão', obter_refeicoes_por_periodo_sql, (usuario_id, data_inicio)),
+        ('refeicoes_30_dias', 'repositorio', obter_refeicoes_por_periodo, (usuario_id, data_inicio)),
+    ]:
+        leituras.append({'consulta': consulta, 'implementacao': implementacao,
+                         'mediana_ms': _medir_leitura(funcao, *args, repeticoes=repeticoes)})
+
+    return gravacoes, leituras
+
+
+# Benchmark: python -m tools.desempenho_repositorio [--linhas 100000] [--banco caminho]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Repositório contra SQL à mão e ORM: gravação em massa e leituras')
+    parser.add_argument('--linhas', type=int, default=LINHAS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    parser.add_argument('--banco', help='arquivo do banco gerado (padrão: arquivo temporário)')
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_bd = argumentos.banco or os.path.join(pasta, 'repositorio.db')
+        gravacoes, leituras = executar_benchmark(caminho_bd, argumentos.linhas, argumentos.repeticoes)
+
+    print(f"Gravação de {argumentos.linhas:,} refeições")
+    for resultado in gravacoes:
+        print(f"  {resultado['implementacao']:<30} {resultado['segundos']:>8.2f} s {resultado['linhas_por_segundo']:>12,.0f} linhas/s")
+    print('Leituras (mediana por chamada)')
+    for resultado in leituras:
+        print(f"  {resultado['consulta']:<18} {resultado['implementacao']:<22} {resultado['mediana_ms']:>8.3f} ms")
@@ -0,0 +1,139 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from nutricao_app import banco
+from nutricao_app.datas import de_dia, para_dia
+from nutricao_app.registros import adicionar_refeicao
+from nutricao_app.repositorio import obter_metas
+from nutricao_app.tendencias import (FATOR_SUAVIZACAO_PESO, JANELA_DEFICIT, JANELA_TAXA_PESO, JANELAS_MEDIAS,
+                                     METAS_NUTRIENTES, TOLERANCIA_ADERENCIA, TendenciasUsuario)
+from tools.dados_sinteticos import gerar_dados, preparar_banco
+
+# Benchmark das tendências (nutricao_app.tendencias) em um histórico diário de 10 anos:
+# carga inicial, atualização incremental depois de uma refeição, dia novo sem registros,
+# séries e resumo, contra o recálculo completo em pandas (rolling, loop da média
+# exponencial e rolling.apply com polyfit para a taxa do peso)
+ANOS_PADRAO = 10
+REPETICOES = 50
+
+
+# Função para recalcular as séries de tendências do zero em pandas (implementação de referência)
+def serie_pandas(usuario_id, metas, hoje=None):
+    conn = banco.conectar_bd()
+    try:
+        consumo = pd.DataFrame(conn.execute('SELECT data, calorias, proteinas, carboidratos, gorduras '
+                                            'FROM resumo_diario WHERE usuario_id = ? ORDER BY data',
+                                            (usuario_id,)).fetchall(),
+                               columns=['data', 'calorias', 'proteinas', 'carboidratos', 'gorduras']).set_index('data')
+        pesos = pd.DataFrame(conn.execute('SELECT data, AVG(peso) FROM medidas WHERE usuario_id = ? AND peso > 0 '
+                                          'GROUP BY data ORDER BY data', (usuario_id,)).fetchall(),
+                             columns=['data', 'peso']).set_index('data')['peso']
+    finally:
+        conn.close()
+
+    hoje = para_dia(hoje or date.today())
+    dias = pd.RangeIndex(min([hoje, *consumo.index[:1], *pesos.index[:1]]),
+                         max([hoje, *consumo.index[-1:], *pesos.index[-1:]]) + 1)
+    consumo = consumo.reindex(dias)
+    pesos = pesos.reindex(dias)
+
+    serie = pd.DataFrame({'calorias': consumo['calorias']})
+    for janela in JANELAS_MEDIAS:
+        serie[f'calorias_media_{janela}'] = consumo['calorias'].rolling(janela, min_periods=1).mean()
+    com_registro = consumo['calorias'].notna().rolling(JANELA_DEFICIT, min_periods=1).sum()
+    serie['deficit_semanal'] = (metas['calorias_diarias'] * com_registro
+                                - consumo['calorias'].rolling(JANELA_DEFICIT, min_periods=1).sum())
+    meta = metas[METAS_NUTRIENTES['calorias']]
+    dentro = ((consumo['calorias'] - meta).abs() <= TOLERANCIA_ADERENCIA * meta).where(consumo['calorias'].notna())
+    for janela in JANELAS_MEDIAS:
+        serie[f'aderencia_calorias_{janela}'] = 100 * dentro.rolling(janela, min_periods=1).mean()
+
+    serie['peso'] = pesos
+    tendencia = []
+    dia_anterior = anterior = None
+    for dia, peso in pesos.dropna().items():
+        if anterior is None:
+            anterior = peso
+        else:
+            anterior += (1 - (1 - FATOR_SUAVIZACAO_PESO) ** (dia - dia_anterior)) * (peso - anterior)
+        dia_anterior = dia
+        tendencia.append((dia, anterior))
+    serie['tendencia_peso'] = pd.Series(dict(tendencia), dtype=np.float64).reindex(dias).ffill()
+
+    def inclinacao(janela):
+        presentes = ~np.isnan(janela)
+        if presentes.sum() < 2:
+            return np.nan
+        return np.polyfit(np.arange(len(janela))[presentes], janela[presentes], 1)[0]
+
+    serie['taxa_peso_semanal'] = 7 * pesos.rolling(JANELA_TAXA_PESO, min_periods=1).apply(inclinacao, raw=True)
+    serie.insert(0, 'data', pd.to_datetime([de_dia(dia) for dia in dias]))
+    return serie.reset_index(drop=True)
+
+
+# Função para medir a mediana (ms) de uma chamada; 'preparar' roda antes de cada medição, fora do tempo
+def _medir(funcao, repeticoes=REPETICOES, preparar=None):
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+# Função para executar o benchmark em um banco sintético (1 usuário, 'anos' de histórico)
+# Retorna (dias, resultados): [{operacao, implementacao, mediana_ms}]
+def executar_benchmark(caminho_bd, anos=ANOS_PADRAO, repeticoes=REPETICOES):
+    preparar_banco(caminho_bd)
+    usuario_id = gerar_dados(1, anos)['usuarios'][0]
+    metas = obter_metas(usuario_id)
+    hoje = date.today()
+    tendencias = TendenciasUsuario(usuario_id, hoje)
+
+    def registrar_refeicao():
+        adicionar_refeicao(usuario_id, hoje, 'Lanche da Tarde', 'Banana, prata, crua', 100, 98, 1.3, 26.0, 0.1)
+
+    dia_seguinte = [para_dia(hoje)]
+
+    def avancar_dia():
+        dia_seguinte[0] += 1
+        tendencias.atualizar(de_dia(dia_seguinte[0]))
+
+    resultados = [
+        ('carga inicial', 'TendenciasUsuario', _medir(lambda: TendenciasUsuario(usuario_id, hoje), repeticoes)),
+        ('refeição nova', 'atualizar', _medir(lambda: tendencias.atualizar(hoje), repeticoes, registrar_refeicao)),
+        ('dia novo sem registros', 'atualizar', _medir(avancar_dia, repeticoes)),
+        ('séries', 'TendenciasUsuario.serie', _medir(lambda: tendencias.serie(metas), repeticoes)),
+        ('resumo', 'TendenciasUsuario.resumo', _medir(lambda: tendencias.resumo(metas), repeticoes)),
+        ('séries', 'pandas (recálculo completo)', _medir(lambda: serie_pandas(usuario_id, metas, hoje),
+                                                         max(1, repeticoes // 10))),
+    ]
+    return len(tendencias.peso), [{'operacao': operacao, 'implementacao': implementacao, 'mediana_ms': mediana}
+                                  for operacao, implementacao, mediana in resultados]
+
+
+# Benchmark: python -m tools.desempenho_tendencias [--anos 10] [--banco caminho]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tendências vetorizadas e incrementais contra o recálculo em pandas')
+    parser.add_argument('--anos', type=int, default=ANOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    parser.add_argument('--banco', help='arquivo do banco gerado (padrão: arquivo temporário)')
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_bd = argumentos.banco or os.path.join(pasta, 'tendencias.db')
+        dias, resultados = executar_benchmark(caminho_bd, argumentos.anos, argumentos.repeticoes)
+        banco.fechar_pool()
+
+    print(f'Tendências de {dias:,} dias (mediana por chamada)')
+    for resultado in resultados:
+        print(f"  {resultado['operacao']:<24} {resultado['implementacao']:<30} {resultado['mediana_ms']:>9.3f} ms")
@@ -0,0 +1,130 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from nutricao_app import banco
+from nutricao_app.datas import para_dia
+from nutricao_app.historico import HistoricoRefeicoes
+from nutricao_app.migracoes import verificar_planos_consulta
+from nutricao_app.models import METAS_PADRAO, inicializar_bd
+from nutricao_app.registros import (COLUNAS_MEDIDAS, COLUNAS_REFEICOES, obter_refeicoes_por_data,
+                                    obter_refeicoes_por_periodo, obter_todas_medidas)
+from nutricao_app.repositorio import inserir_em_massa, obter_metas
+from nutricao_app.resumo import criar_resumo_diario, obter_resumo_do_dia, obter_resumo_por_periodo
+
+# Quantidades de usuários medidas (cada etapa acrescenta usuários ao mesmo banco)
+QUANTIDADES_USUARIOS = [10, 100, 1000, 10000]
+DIAS_POR_USUARIO = 30
+REFEICOES_POR_DIA = 3
+MEDIDAS_POR_USUARIO = 6
+AMOSTRA = 200
+
+TIPOS_REFEICAO = ['Café da Manhã', 'Almoço', 'Lanche da Tarde', 'Jantar']
+ALIMENTOS = ['Arroz', 'Feijão', 'Frango', 'Pão', 'Maçã', 'Banana', 'Ovo', 'Salada', 'Aveia', 'Leite']
+
+
+# Função para gravar os dados de um intervalo de usuários (refeições, medidas e metas)
+def _popular_usuarios(primeiro_id, ultimo_id, hoje):
+    refeicoes = []
+    medidas = []
+    metas = []
+    for usuario_id in range(primeiro_id, ultimo_id + 1):
+        for dia in range(DIAS_POR_USUARIO):
+            data = para_dia(hoje - timedelta(days=dia))
+            for i in range(REFEICOES_POR_DIA):
+                refeicoes.append((usuario_id, data, TIPOS_REFEICAO[i % len(TIPOS_REFEICAO)],
+                                  random.choice(ALIMENTOS), 100.0, 250.0, 10.0, 30.0, 8.0))
+        for i in range(MEDIDAS_POR_USUARIO):
+            data = para_dia(hoje - timedelta(days=i * 5))
+            medidas.append((usuario_id, data, 80.0 - i * 0.5, 26.0, 90.0, 100.0, 22.0))
+        metas.append((usuario_id, 2000, 150, 225, 65, 70.0, 15.0))
+
+    conn = banco.conectar_bd()
+    try:
+        conn.executemany('INSERT OR IGNORE INTO usuarios (id, nome) VALUES (?, ?)',
+                         [(usuario_id, f'usuario{usuario_id}') for usuario_id in range(primeiro_id, ultimo_id + 1)])
+        inserir_em_massa(conn, 'refeicoes', ['usuario_id', *COLUNAS_REFEICOES], refeicoes)
+        inserir_em_massa(conn, 'medidas', ['usuario_id', *COLUNAS_MEDIDAS], medidas)
+        inserir_em_massa(conn, 'metas', ['usuario_id', *METAS_PADRAO], metas)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# Função para medir a latência (mediana e p95, em ms) de uma consulta por usuário
+def _medir(funcao, usuarios):
+    tempos = []
+    for usuario_id in usuarios:
+        inicio = time.perf_counter()
+        funcao(usuario_id)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+
+# Função para executar o benchmark de latência por usuário com o banco crescendo
+# Retorna uma lista de {usuarios, refeicoes, consulta: (mediana_ms, p95_ms)}
+def executar_benchmark(caminho_bd, quantidades=QUANTIDADES_USUARIOS, amostra=AMOSTRA):
+    banco.definir_caminho_bd(caminho_bd)
+    inicializar_bd()
+    conn = banco.conectar_bd()
+    criar_resumo_diario(conn)
+    conn.commit()
+    conn.close()
+
+    hoje = date.today()
+    data_semana = hoje - timedelta(days=7)
+    consultas = {
+        'refeicoes_por_data': lambda usuario_id: obter_refeicoes_por_data(usuario_id, hoje),
+        'refeicoes_por_periodo': lambda usuario_id: obter_refeicoes_por_periodo(usuario_id, data_semana),
+        'todas_medidas': obter_todas_medidas,
+        'metas': obter_metas,
+        'resumo_do_dia': lambda usuario_id: obter_resumo_do_dia(usuario_id, hoje),
+        'resumo_por_periodo': lambda usuario_id: obter_resumo_por_periodo(usuario_id, data_semana),
+        'historico_sessao': HistoricoRefeicoes,
+    }
+
+    resultados = []
+    usuarios_gravados = 0
+    for quantidade in quantidades:
+        _popular_usuarios(usuarios_gravados + 1, quantidade, hoje)
+        usuarios_gravados = quantidade
+
+        usuarios = [random.randint(1, quantidade) for _ in range(amostra)]
+        for funcao in consultas.values():
+            funcao(usuarios[0])  # aquece o pool e o cache de páginas
+
+        resultado = {'usuarios': quantidade, 'refeicoes': quantidade * DIAS_POR_USUARIO * REFEICOES_POR_DIA}
+        for nome, funcao in consultas.items():
+            resultado[nome] = _medir(funcao, usuarios)
+        resultados.append(resultado)
+
+    return resultados
+
+
+# Benchmark: python -m tools.desempenho_usuarios [--banco arquivo.db]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latência das consultas por usuário com 10 a 10.000 usuários')
+    parser.add_argument('--banco', help='arquivo do banco (padrão: arquivo temporário)')
+    parser.add_argument('--amostra', type=int, default=AMOSTRA, help='usuários sorteados por medição')
+    argumentos = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    caminho = argumentos.banco or os.path.join(pasta, 'desempenho.db')
+    random.seed(0)
+
+    resultados = executar_benchmark(caminho, amostra=argumentos.amostra)
+    consultas = [nome for nome in resultados[0] if nome not in ('usuarios', 'refeicoes')]
+
+    print(f"{'usuários':>9} {'refeições':>10}  " + '  '.join(f'{nome:>21}' for nome in consultas))
+    for resultado in resultados:
+        colunas = [f'{resultado[nome][0]:8.3f} / {resultado[nome][1]:8.3f}' for nome in consultas]
+        print(f"{resultado['usuarios']:>9} {resultado['refeicoes']:>10}  " + '  '.join(f'{coluna:>21}' for coluna in colunas))
+    print('(mediana / p95 em ms por chamada)')
+
+    for nome, (usa_indice, plano) in verificar_planos_consulta().items():
+        print(f'[{"ok" if usa_indice else "SEM ÍNDICE"}] {nome}: {" | ".join(plano)}')
@@ -0,0 +1,74 @@
+import argparse
+
+import pandas as pd
+
+from nutricao_app import banco
+from nutricao_app.datas import de_dia, para_dia
+from nutricao_app.historico import JANELA_PADRAO_DIAS, HistoricoRefeicoes, inicio_janela_padrao
+from nutricao_app.registros import COLUNAS_MEDIDAS, COLUNAS_REFEICOES, obter_todas_medidas
+from nutricao_app.usuarios import USUARIO_PADRAO, obter_id_usuario
+
+
+# Função para medir os bytes de um DataFrame (incluindo o conteúdo dos textos)
+def bytes_df(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Função para carregar um DataFrame como era feito antes dos esquemas tipados:
+# lista de tuplas, tipos inferidos pelo pandas, datas em texto e textos como
+# object (o padrão do pandas 2.x usado pelo projeto)
+def _carregar_sem_tipos(sql, parametros, colunas):
+    conn = banco.conectar_bd()
+    resultados = conn.execute(sql, parametros).fetchall()
+    conn.close()
+
+    with pd.option_context('future.infer_string', False):
+        df = pd.DataFrame(resultados, columns=colunas)
+        df['data'] = [de_dia(dia).isoformat() for dia in df['data']]
+    return df
+
+
+# Função para comparar a memória dos DataFrames que cada sessão mantém
+# (janela do histórico de refeições e medidas), sem e com os esquemas tipados
+# Retorna {DataFrame: (linhas, bytes_antes, bytes_depois)}
+def relatorio_memoria_sessao(usuario_id, dias=JANELA_PADRAO_DIAS):
+    data_inicio = inicio_janela_padrao(dias)
+    historico = HistoricoRefeicoes(usuario_id, data_inicio)
+    medidas = obter_todas_medidas(usuario_id)
+
+    refeicoes_antes = _carregar_sem_tipos(
+        f'SELECT {", ".join(COLUNAS_REFEICOES)} FROM refeicoes WHERE usuario_id = ? AND data >= ? AND id <= ?',
+        (usuario_id, para_dia(data_inicio), historico.ultimo_id), COLUNAS_REFEICOES)
+    medidas_antes = _carregar_sem_tipos(
+        f'SELECT {", ".join(COLUNAS_MEDIDAS)} FROM medidas WHERE usuario_id = ?',
+        (usuario_id,), COLUNAS_MEDIDAS)
+
+    return {
+        'refeicoes': (len(historico.refeicoes), bytes_df(refeicoes_antes), bytes_df(historico.refeicoes)),
+        'medidas': (len(medidas), bytes_df(medidas_antes), bytes_df(medidas)),
+    }
+
+
+# Relatório: python -m tools.memoria [caminho do banco] [--usuario nome] [--dias 30] [--sessoes 1000]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memória dos DataFrames mantidos por sessão')
+    parser.add_argument('banco', nargs='?', help='arquivo do banco (padrão: NUTRICAO_DB ou nutricao.db)')
+    parser.add_argument('--usuario', default=USUARIO_PADRAO)
+    parser.add_argument('--dias', type=int, default=JANELA_PADRAO_DIAS, help='janela do histórico de refeições')
+    parser.add_argument('--sessoes', type=int, default=1000, help='sessões simultâneas para a estimativa total')
+    argumentos = parser.parse_args()
+
+    if argumentos.banco:
+        banco.definir_caminho_bd(argumentos.banco)
+
+    relatorio = relatorio_memoria_sessao(obter_id_usuario(argumentos.usuario), argumentos.dias)
+
+    print(f"{'DataFrame':<12} {'linhas':>8} {'antes (bytes)':>14} {'depois (bytes)':>15} {'redução':>8}")
+    total_antes = total_depois = 0
+    for nome, (linhas, antes, depois) in relatorio.items():
+        print(f'{nome:<12} {linhas:>8} {antes:>14,} {depois:>15,} {1 - depois / antes:>8.0%}')
+        total_antes += antes
+        total_depois += depois
+    print(f"{'por sessão':<12} {'':>8} {total_antes:>14,} {total_depois:>15,} {1 - total_depois / total_antes:>8.0%}")
+    print(f'{argumentos.sessoes} sessões: {total_antes * argumentos.sessoes / 2**20:,.1f} MiB -> '
+          f'{total_depois * argumentos.sessoes / 2**20:,.1f} MiB')